@@ -7,6 +7,7 @@ from __future__ import print_function
 
 from dbcollection.core.manager import CacheManager
 from dbcollection.core.loader import DataLoader
+from dbcollection.core.registry import loader_registry
 
 from .download import download
 from .process import process
@@ -14,11 +15,18 @@ from .process import process
 from .metadata import MetadataConstructor
 
 
-def load(name, task='default', data_dir='', verbose=True):
+def load(name, task='default', data_dir='', verbose=True, **kwargs):
     """Returns a metadata loader of a dataset.
 
     Returns a loader with the necessary functions to manage the selected dataset.
 
+    Each call returns a new loader by default. With reuse=True, loaders are
+    memoized per process: loading the same dataset/task again (with the same
+    loader options and hdf5 metadata file) returns the same loader, as long
+    as the file was not modified. A reused loader is shared by all its
+    callers, so changes to its state (e.g., moving fields to memory, the
+    memory policy, its statistics or closing it) affect all of them.
+
     Parameters
     ----------
     name : str
@@ -29,6 +37,11 @@ def load(name, task='default', data_dir='', verbose=True):
         Directory path to store the downloaded data.
     verbose : bool, optional
         Displays text information (if true).
+    kwargs : dict, optional
+        Options of the data loader (see DataLoader), like the memory budget
+        of the fields kept in memory (memory_budget='4GB') and the policy
+        that manages them (policy='auto'). Use reuse=True to return a
+        previously loaded (shared) loader instead of creating a new one.
 
     Returns
     -------
@@ -49,16 +62,37 @@ def load(name, task='default', data_dir='', verbose=True):
     >>> print('Dataset name: ', mnist.db_name)
     Dataset name:  mnist
 
+    Load the COCO dataset keeping its most used fields in memory (up to 4GB).
+
+    >>> coco = dbc.load('coco', memory_budget='4GB', policy='auto')
+
+    Share the loader of the MNIST dataset between different parts of a program.
+
+    >>> mnist = dbc.load('mnist', reuse=True)
+    >>> mnist is dbc.load('mnist', reuse=True)
+    True
+
     """
     assert name, 'Must input a valid dataset name: {}'.format(name)
 
+    reuse = kwargs.pop('reuse', False)
+    if reuse:
+        data_loader = loader_registry.find(name, task, kwargs)
+        if data_loader is not None:
+            return data_loader
+
     loader = LoadAPI(name=name,
                      task=task,
                      data_dir=data_dir,
-                     verbose=verbose)
+                     verbose=verbose,
+                     **kwargs)
 
     data_loader = loader.run()
 
+    if reuse:
+        data_loader = loader_registry.add(loader.name, loader.task, data_loader, kwargs,
+                                          requested_task=task)
+
     return data_loader
 
 
@@ -78,6 +112,8 @@ class LoadAPI(object):
         Directory path to store the downloaded data.
     verbose : bool
         Displays text information (if true).
+    loader_options : dict, optional
+        Options of the data loader (e.g., memory_budget, policy).
 
     Attributes
     ----------
@@ -89,6 +125,8 @@ class LoadAPI(object):
         Directory path to store the downloaded data.
     verbose : bool
         Displays text information (if true).
+    loader_options : dict
+        Options of the data loader.
     cache_manager : CacheManager
         Cache manager object.
     available_datasets_list : list
@@ -96,7 +134,7 @@ class LoadAPI(object):
 
     """
 
-    def __init__(self, name, task, data_dir, verbose):
+    def __init__(self, name, task, data_dir, verbose, **loader_options):
         """Initialize class."""
         assert isinstance(name, str), 'Must input a valid dataset name.'
         assert isinstance(task, str), 'Must input a valid task name.'
@@ -106,6 +144,7 @@ class LoadAPI(object):
         self.name = name
         self.data_dir = data_dir
         self.verbose = verbose
+        self.loader_options = loader_options
         self.cache_manager = self.get_cache_manager()
         self.task = self.parse_task_name(task)
 
@@ -199,4 +238,5 @@ class LoadAPI(object):
         return DataLoader(name=self.name,
                           task=self.task,
                           data_dir=data_dir,
-                          hdf5_filepath=hdf5_filepath)
+                          hdf5_filepath=hdf5_filepath,
+                          **self.loader_options)
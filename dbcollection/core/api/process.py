@@ -7,11 +7,14 @@ from __future__ import print_function
 import os
 
 from dbcollection.core.manager import CacheManager
+from dbcollection.core.registry import loader_registry
+from dbcollection.utils.hdf5 import (parse_storage_profile, parse_narrow_tolerance,
+                                     DEFAULT_STORAGE_PROFILE)
 
 from .metadata import MetadataConstructor
 
 
-def process(name, task='default', verbose=True):
+def process(name, task='default', verbose=True, **kwargs):
     """Process a dataset's metadata and stores it to file.
 
     The data is stored a a HSF5 file for each task composing the dataset's tasks.
@@ -24,11 +27,32 @@ def process(name, task='default', verbose=True):
         Name of the task to process.
     verbose : bool, optional
         Displays text information (if true).
+    kwargs : dict, optional
+        Processing options, like the storage layout profile of the fields
+        (storage_profile='random_access', 'sequential', 'compact',
+        'uncompressed' or 'default') or the narrowing of the fields' types
+        to the smallest type that holds their values (narrow_dtypes=True,
+        or the relative tolerance of the conversions to float32), the
+        number of processes used to process the sets of the task (workers)
+        or the hashing of the contents of the input files of the sets to
+        detect if they changed since the last time they were processed
+        (hash_inputs=True; by default, only their sizes and modification
+        times are compared).
+
+    With several workers, tasks that load each set on its own (the COCO and
+    MPII Human Pose tasks, see BaseTask.get_set_loaders()) load and process
+    their sets in the worker processes. The other tasks parse all sets in
+    this process and send (pickle) the full parsed data of each set to a
+    worker, which costs time and memory for big sets. In python 2, workers
+    require the 'futures' package.
 
     Raises
     ------
     KeyError
         If a task does not exist for a dataset.
+    ImportError
+        If several workers are used without concurrent.futures (python 2
+        without the 'futures' package).
 
     Examples
     --------
@@ -38,12 +62,21 @@ def process(name, task='default', verbose=True):
 
     >>> dbc.process('cifar10', task='classification', verbose=False)
 
+    Process the COCO dataset with small chunks for fast random access.
+
+    >>> dbc.process('coco', task='detection_2015', storage_profile='random_access')
+
+    Process the sets of the MPII Human Pose dataset with 4 processes.
+
+    >>> dbc.process('mpii_pose', task='keypoints', workers=4)
+
     """
     assert name, 'Must input a valid dataset name.'
 
     processer = ProcessAPI(name=name,
                            task=task,
-                           verbose=verbose)
+                           verbose=verbose,
+                           **kwargs)
 
     processer.run()
 
@@ -63,6 +96,14 @@ class ProcessAPI(object):
         Name of the task to process.
     verbose : bool
         Displays text information (if true).
+    storage_profile : str, optional
+        Storage layout profile of the fields of the metadata file (keyword-only).
+    narrow_dtypes : bool/float, optional
+        Narrow the types of the fields of the metadata file (keyword-only).
+    workers : int, optional
+        Number of processes used to process the sets of the task (keyword-only).
+    hash_inputs : bool, optional
+        Hash the contents of the input files of the sets (keyword-only).
 
     Attributes
     ----------
@@ -72,6 +113,14 @@ class ProcessAPI(object):
         Name of the task to process.
     verbose : bool
         Displays text information (if true).
+    storage_profile : str
+        Storage layout profile of the fields of the metadata file.
+    narrow_dtypes : bool/float
+        Narrow the types of the fields of the metadata file.
+    workers : int
+        Number of processes used to process the sets of the task.
+    hash_inputs : bool
+        Hash the contents of the input files of the sets.
     extract_data : bool
         Flag to extract data (if True).
     cache_manager : CacheManager
@@ -84,15 +133,28 @@ class ProcessAPI(object):
 
     """
 
-    def __init__(self, name, task, verbose):
+    def __init__(self, name, task, verbose, **kwargs):
         """Initialize class."""
         assert isinstance(name, str), 'Must input a valid dataset name.'
         assert isinstance(task, str), 'Must input a valid task name.'
         assert isinstance(verbose, bool), "Must input a valid boolean for verbose."
+        storage_profile = kwargs.pop('storage_profile', DEFAULT_STORAGE_PROFILE)
+        narrow_dtypes = kwargs.pop('narrow_dtypes', False)
+        workers = kwargs.pop('workers', 1)
+        hash_inputs = kwargs.pop('hash_inputs', False)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: {}.'.format(sorted(kwargs)))
 
         self.name = name
         self.task = task
         self.verbose = verbose
+        self.storage_profile = parse_storage_profile(storage_profile)
+        parse_narrow_tolerance(narrow_dtypes)
+        self.narrow_dtypes = narrow_dtypes
+        assert isinstance(workers, int) and workers > 0, 'Must input a number of workers greater than 0.'
+        self.workers = workers
+        assert isinstance(hash_inputs, bool), 'Must input a valid boolean for hash_inputs.'
+        self.hash_inputs = hash_inputs
         self.extract_data = False
         self.cache_manager = self.get_cache_manager()
 
@@ -189,6 +251,10 @@ class ProcessAPI(object):
                          cache_path=cache_dir,
                          extract_data=self.extract_data,
                          verbose=self.verbose)
+        db.storage_profile = self.storage_profile
+        db.narrow_dtypes = self.narrow_dtypes
+        db.workers = self.workers
+        db.hash_inputs = self.hash_inputs
         task_info = db.process(task)
         return task_info
 
@@ -198,3 +264,4 @@ class ProcessAPI(object):
         self.cache_manager.dataset.update(name=self.name,
                                           cache_dir=cache_dir,
                                           tasks=task_info)
+        loader_registry.invalidate(self.name)
@@ -7,6 +7,7 @@ from __future__ import print_function
 import shutil
 
 from dbcollection.core.manager import CacheManager
+from dbcollection.core.registry import loader_registry
 
 
 def remove(name, task='', delete_data=False, verbose=True):
@@ -125,6 +126,7 @@ class RemoveAPI(object):
 
     def remove_registry_from_cache(self):
         """Remove the dataset or task from cache."""
+        loader_registry.invalidate(self.name)
         if any(self.task):
             self.remove_task_registry()
         else:
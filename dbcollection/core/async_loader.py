@@ -0,0 +1,277 @@
+"""
+asyncio interface of the data loader (Python 3.5+).
+"""
+
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dbcollection.core.batch import DEFAULT_PREFETCH
+from dbcollection.core.gather import normalize_index
+
+
+# Default number of threads reading data for the coroutines.
+DEFAULT_ASYNC_WORKERS = 4
+
+
+class AsyncDataLoader(object):
+    """asyncio interface of a DataLoader.
+
+    Reads are run on a bounded pool of threads so they do not block the event
+    loop. Concurrent aget() requests for rows of the same field (i.e., made in
+    the same iteration of the event loop) are coalesced into a single read of
+    all their rows, and each request gets its own rows from it. The outputs
+    are the same as the ones of the DataLoader's get()/object() methods.
+
+    Parameters
+    ----------
+    data_loader : DataLoader
+        Data loader of a dataset/task.
+    max_workers : int, optional
+        Maximum number of threads reading data at the same time.
+    executor : concurrent.futures.Executor, optional
+        Executor used to run the reads. By default, a ThreadPoolExecutor with
+        'max_workers' threads is created (and shut down by close()).
+
+    Attributes
+    ----------
+    data_loader : DataLoader
+        Data loader of a dataset/task.
+    executor : concurrent.futures.Executor
+        Executor used to run the reads.
+
+    Examples
+    --------
+    >>> import dbcollection as dbc
+    >>> from dbcollection.core.async_loader import AsyncDataLoader
+    >>> loader = AsyncDataLoader(dbc.load('mnist'))
+    >>> data = await loader.aget('train', 'labels', [0, 1, 2])
+
+    """
+
+    def __init__(self, data_loader, max_workers=DEFAULT_ASYNC_WORKERS, executor=None):
+        """Initialize class."""
+        assert data_loader, 'Must input a valid data loader.'
+        assert max_workers > 0, 'Must input a number of workers greater than 0.'
+        self.data_loader = data_loader
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = {}
+
+    def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor, func, *args)
+
+    async def aget(self, set_name, field, index=None, convert_to_str=False):
+        """Retrieves data from the dataset's hdf5 metadata file (see DataLoader.get()).
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        field : str
+            Name of the data field.
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the field.
+        convert_to_str : bool, optional
+            Convert the output data into a string.
+
+        Returns
+        -------
+        np.ndarray/list/str
+            Numpy array containing the field's data.
+
+        Raises
+        ------
+        KeyError
+            If set name is not valid or does not exist.
+
+        """
+        rows = self._get_coalescable_rows(set_name, field, index, convert_to_str)
+        if rows is None:
+            return await self._run(self.data_loader.get, set_name, field, index, convert_to_str)
+        future = asyncio.get_event_loop().create_future()
+        key = (set_name, field)
+        if key not in self._pending:
+            self._pending[key] = []
+            asyncio.get_event_loop().call_soon(self._read_pending, key)
+        self._pending[key].append((rows, future))
+        return await future
+
+    def _get_coalescable_rows(self, set_name, field, index, convert_to_str):
+        """Returns the rows of a request that can be merged with others (or None).
+
+        Full reads, conversions to strings and invalid requests are read on their
+        own, so their outputs and errors are the same as the ones of get().
+
+        """
+        if index is None or convert_to_str:
+            return None
+        try:
+            field_loader = self.data_loader.sets[set_name].fields[field]
+            rows = normalize_index(index, len(field_loader))
+        except (KeyError, TypeError, IndexError, AttributeError):
+            return None
+        if rows is None or len(field_loader.shape) == 0:
+            return None
+        if isinstance(rows, slice):
+            rows = np.arange(rows.start, rows.stop, rows.step, dtype=np.int64)
+        return rows
+
+    def _read_pending(self, key):
+        """Reads the union of the rows of the pending requests of a field."""
+        requests = self._pending.pop(key)
+        union = np.unique(np.concatenate([np.atleast_1d(rows) for rows, _ in requests]))
+        read = self._run(self.data_loader.get, key[0], key[1], union)
+        read.add_done_callback(lambda read: self._set_results(read, union, requests))
+
+    def _set_results(self, read, union, requests):
+        for rows, future in requests:
+            if future.cancelled():
+                continue
+            if read.cancelled():
+                future.cancel()
+                continue
+            if read.exception() is not None:
+                future.set_exception(read.exception())
+                continue
+            data = read.result()
+            positions = np.searchsorted(union, rows)
+            if isinstance(rows, int):
+                row = data[positions]
+                future.set_result(row.copy() if isinstance(row, np.ndarray) else row)
+            elif isinstance(data, list):  # rows of ragged fields
+                future.set_result([data[position] for position in positions])
+            else:
+                future.set_result(data[positions])
+
+    async def aobject(self, set_name, index=None, convert_to_value=False):
+        """Retrieves a list of all fields' indexes/values of an object composition
+        (see DataLoader.object()).
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the object(s).
+        convert_to_value : bool, optional
+            If False, outputs a list of indexes. If True,
+            it outputs a list of arrays/values instead of indexes.
+
+        Returns
+        -------
+        list
+            Returns a list of indexes or, if convert_to_value is True,
+            a list of data arrays/values.
+
+        Raises
+        ------
+        KeyError
+            If set name is not valid or does not exist.
+
+        """
+        return await self._run(self.data_loader.object, set_name, index, convert_to_value)
+
+    def aiter_batches(self, set_name, fields, batch_size=1, shuffle=False, drop_last=False,
+                      prefetch=DEFAULT_PREFETCH, seed=None):
+        """Iterates asynchronously over batches of rows of one or more fields
+        (see DataLoader.iter_batches()).
+
+        Up to 'prefetch' batches are read ahead in the executor.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        fields : str/list/tuple
+            Name(s) of the field(s) to retrieve.
+        batch_size : int, optional
+            Number of rows per batch.
+        shuffle : bool, optional
+            Shuffle the order of the rows.
+        drop_last : bool, optional
+            Drop the last batch if it has less than batch_size rows.
+        prefetch : int, optional
+            Number of batches read ahead.
+        seed : int, optional
+            Seed of the random generator used to shuffle the rows.
+
+        Returns
+        -------
+        AsyncBatchIterator
+            Asynchronous iterator of dictionaries with the fields' rows of a batch.
+
+        Raises
+        ------
+        KeyError
+            If the set or a field do not exist.
+
+        Examples
+        --------
+        >>> async for batch in loader.aiter_batches('train', ['images', 'labels'], 32):
+        ...     train_step(batch['images'], batch['labels'])
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.data_loader.sets:
+            self.data_loader._raise_error_invalid_set_name(set_name)
+        read_batch, batches = self.data_loader.sets[set_name]._get_batch_reader(
+            fields, batch_size, shuffle, drop_last, seed)
+        return AsyncBatchIterator(self._run, read_batch, batches, prefetch)
+
+    def close(self):
+        """Shuts down the executor (if created by this class)."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncBatchIterator(object):
+    """Asynchronous iterator over batches of data read in an executor.
+
+    Parameters
+    ----------
+    run : callable
+        Function that runs a function in the executor and returns an awaitable.
+    read_batch : callable
+        Function that receives an item of 'batches' and returns its data.
+    batches : list
+        List of batch indexes.
+    prefetch : int, optional
+        Number of batches read ahead.
+
+    """
+
+    def __init__(self, run, read_batch, batches, prefetch=DEFAULT_PREFETCH):
+        """Initialize class."""
+        assert prefetch >= 0, 'Must input a non-negative number of batches to prefetch.'
+        self._run = run
+        self._read_batch = read_batch
+        self._batches = iter(batches)
+        self._prefetch = prefetch
+        self._reads = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._fill()
+        if not self._reads:
+            raise StopAsyncIteration
+        return await self._reads.pop(0)
+
+    def _fill(self):
+        while len(self._reads) < self._prefetch + 1:
+            try:
+                batch = next(self._batches)
+            except StopIteration:
+                return
+            self._reads.append(self._run(self._read_batch, batch))
@@ -0,0 +1,164 @@
+"""
+Batch iteration methods with background prefetching of data.
+"""
+
+
+import threading
+
+import numpy as np
+from six.moves import queue, range
+
+
+# Default number of batches read ahead by the background thread.
+DEFAULT_PREFETCH = 2
+
+# Time interval (in seconds) used by the background thread to check if it must stop.
+_STOP_CHECK_INTERVAL = 0.1
+
+
+def get_batch_indexes(num_rows, batch_size, shuffle=False, drop_last=False, seed=None):
+    """Splits the rows of a field into batches.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows of the field(s).
+    batch_size : int
+        Number of rows per batch.
+    shuffle : bool, optional
+        Shuffle the order of the rows.
+    drop_last : bool, optional
+        Drop the last batch if it has less than batch_size rows.
+    seed : int, optional
+        Seed of the random generator used to shuffle the rows.
+
+    Returns
+    -------
+    list
+        List of slices (sequential order) or of numpy arrays of row
+        positions (shuffled order), one per batch.
+
+    """
+    assert num_rows >= 0, 'Must input a valid number of rows.'
+    assert batch_size > 0, 'Must input a batch size greater than 0.'
+    if drop_last:
+        stop = num_rows - num_rows % batch_size
+    else:
+        stop = num_rows
+    if shuffle:
+        rows = np.random.RandomState(seed).permutation(num_rows)
+        return [rows[start:start + batch_size] for start in range(0, stop, batch_size)]
+    else:
+        return [slice(start, min(start + batch_size, stop)) for start in range(0, stop, batch_size)]
+
+
+def get_chunk_aligned_reader(read_rows, chunk_rows, num_rows):
+    """Returns a function that reads sequential batches of rows with chunk-aligned reads.
+
+    Each read starts where the previous one stopped and stops at a chunk
+    boundary (or at the last row), so every chunk is read (and decompressed)
+    once, even if the batch size is not a multiple of the chunk's rows. The
+    rows read after the end of a batch are kept for the next one.
+
+    Parameters
+    ----------
+    read_rows : callable
+        Function that receives a slice of rows and returns their data
+        (a numpy array).
+    chunk_rows : int
+        Number of rows per chunk.
+    num_rows : int
+        Number of rows of the field.
+
+    Returns
+    -------
+    callable
+        Function that receives the slice of rows of a batch (see
+        get_batch_indexes()) and returns their data. Batches must be read
+        in order; other slices restart the reads at their first row.
+
+    """
+    assert chunk_rows > 0, 'Must input a number of rows per chunk greater than 0.'
+    buffer = {'start': 0, 'stop': 0, 'data': None}  # rows [start, stop) read ahead
+
+    def read_batch(index):
+        start, stop = index.start, index.stop
+        if not buffer['start'] <= start <= buffer['stop']:
+            buffer.update(start=start, stop=start, data=None)
+        if stop > buffer['stop']:
+            read_stop = min(num_rows, -(-stop // chunk_rows) * chunk_rows)
+            data = read_rows(slice(buffer['stop'], read_stop))
+            if buffer['stop'] > start:
+                data = np.concatenate((buffer['data'][start - buffer['start']:], data))
+            buffer.update(start=start, stop=read_stop, data=data)
+        offset = start - buffer['start']
+        return buffer['data'][offset:offset + stop - start]
+
+    return read_batch
+
+
+def prefetch_batches(read_batch, batches, prefetch=DEFAULT_PREFETCH):
+    """Iterates over batches of data read by a background thread.
+
+    While the caller processes a batch, the background thread reads the next
+    batches and keeps up to 'prefetch' of them ready in a queue, so reading
+    from disk (and decompressing) overlaps with the caller's work.
+
+    Parameters
+    ----------
+    read_batch : callable
+        Function that receives an item of 'batches' and returns its data.
+    batches : list
+        List of batch indexes.
+    prefetch : int, optional
+        Number of batches read ahead. If 0, batches are read in the
+        caller's thread.
+
+    Yields
+    ------
+    object
+        Data of each batch, in the same order as 'batches'.
+
+    Raises
+    ------
+    Exception
+        Any exception raised by 'read_batch' is re-raised in the caller's thread.
+
+    """
+    assert prefetch >= 0, 'Must input a non-negative number of batches to prefetch.'
+    if prefetch == 0:
+        for batch in batches:
+            yield read_batch(batch)
+        return
+
+    buffer = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    worker = threading.Thread(target=_fill_buffer, args=(read_batch, batches, buffer, stop))
+    worker.daemon = True
+    worker.start()
+    try:
+        for _ in range(len(batches)):
+            data, error = buffer.get()
+            if error is not None:
+                raise error
+            yield data
+    finally:
+        stop.set()
+        worker.join()
+
+
+def _fill_buffer(read_batch, batches, buffer, stop):
+    """Reads batches into the buffer until all are read, an error occurs or it is stopped."""
+    for batch in batches:
+        try:
+            item = (read_batch(batch), None)
+        except Exception as error:
+            item = (None, error)
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_STOP_CHECK_INTERVAL)
+                break
+            except queue.Full:
+                pass
+        if stop.is_set() or item[1] is not None:
+            return
@@ -0,0 +1,149 @@
+"""
+Cache of decompressed blocks of rows of hdf5 datasets.
+"""
+
+
+import os
+import threading
+from collections import OrderedDict
+
+
+# Default size (in bytes) of the block cache of a data loader.
+DEFAULT_BLOCK_CACHE_NBYTES = 64 * 1024 * 1024
+
+
+class BlockCache(object):
+    """LRU cache of decompressed chunks of rows.
+
+    Reading a single row of a compressed hdf5 dataset requires decompressing
+    the whole chunk that contains it. This cache keeps the decompressed chunks
+    in memory so that subsequent reads of rows of the same chunk do not hit
+    the disk or the decompressor again. It is meant to be shared by all the
+    field loaders of a file, and the least recently used blocks are evicted
+    when the total size exceeds the byte budget.
+
+    Parameters
+    ----------
+    max_nbytes : int, optional
+        Maximum size (in bytes) of all cached blocks.
+
+    Attributes
+    ----------
+    max_nbytes : int
+        Maximum size (in bytes) of all cached blocks.
+    nbytes : int
+        Current size (in bytes) of all cached blocks.
+    hits : int
+        Number of block requests served from the cache.
+    misses : int
+        Number of block requests that had to be read from disk.
+    evictions : int
+        Number of blocks evicted from the cache.
+
+    """
+
+    def __init__(self, max_nbytes=DEFAULT_BLOCK_CACHE_NBYTES):
+        """Initialize class."""
+        assert max_nbytes >= 0, 'Must input a valid byte budget for the cache.'
+        self.max_nbytes = max_nbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _get_lock(self):
+        """Returns the cache's lock, creating a new one in forked processes.
+
+        A lock held by another thread at the time of a fork would never be
+        released in the child process.
+
+        """
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+        return self._lock
+
+    def get(self, key, load_block):
+        """Returns a block from the cache or loads and stores it if missing.
+
+        Parameters
+        ----------
+        key : tuple
+            Identifier of the block (e.g., field path + chunk number).
+        load_block : callable
+            Function with no arguments that returns the block as a numpy array.
+
+        Returns
+        -------
+        np.ndarray
+            Read-only block of rows.
+
+        """
+        with self._get_lock():
+            block = self._blocks.pop(key, None)
+            if block is not None:
+                self._blocks[key] = block  # mark as the most recently used
+                self.hits += 1
+                return block
+            self.misses += 1
+        block = load_block()
+        block.flags.writeable = False
+        self.put(key, block)
+        return block
+
+    def put(self, key, block):
+        """Stores a block in the cache, evicting the least recently used blocks if needed."""
+        if block.nbytes > self.max_nbytes:
+            return
+        with self._get_lock():
+            if key in self._blocks:
+                self.nbytes -= self._blocks.pop(key).nbytes
+            while self._blocks and self.nbytes + block.nbytes > self.max_nbytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+            self._blocks[key] = block
+            self.nbytes += block.nbytes
+
+    def clear(self):
+        """Removes all blocks from the cache and resets the counters."""
+        with self._get_lock():
+            self._blocks.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Returns the cache usage counters.
+
+        Returns
+        -------
+        dict
+            Number of hits, misses, evictions, cached blocks and bytes.
+
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "blocks": len(self._blocks),
+            "nbytes": self.nbytes,
+            "max_nbytes": self.max_nbytes
+        }
+
+    def __contains__(self, key):
+        return key in self._blocks
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __str__(self):
+        return 'BlockCache: {} blocks, {}/{} bytes, hits={}, misses={}' \
+            .format(len(self._blocks), self.nbytes, self.max_nbytes, self.hits, self.misses)
+
+    def __repr__(self):
+        return str(self)
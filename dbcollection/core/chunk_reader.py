@@ -0,0 +1,149 @@
+"""
+Parallel decompression of gzip-compressed chunks of hdf5 datasets.
+"""
+
+
+import itertools
+import multiprocessing
+import zlib
+from multiprocessing.pool import ThreadPool
+
+import h5py
+import numpy as np
+from six.moves import range
+
+
+# Default number of threads used to decompress chunks.
+DEFAULT_NUM_DECODE_THREADS = min(4, multiprocessing.cpu_count())
+
+# Minimum number of chunks of a read for it to be decompressed in parallel.
+MIN_PARALLEL_CHUNKS = 4
+
+# Filters that can be decoded by this module.
+_SUPPORTED_FILTERS = (h5py.h5z.FILTER_DEFLATE, h5py.h5z.FILTER_SHUFFLE)
+
+
+def get_dataset_filters(h5_dataset):
+    """Returns the ids of the filters of the pipeline of a dataset (in order)."""
+    plist = h5_dataset.id.get_create_plist()
+    return tuple(plist.get_filter(i)[0] for i in range(plist.get_nfilters()))
+
+
+def is_parallel_decodable(h5_dataset):
+    """Checks if the chunks of a dataset can be read raw and decompressed with zlib.
+
+    Only chunked datasets of plain numeric types compressed with gzip (and
+    optionally the shuffle filter) are supported.
+
+    """
+    if h5_dataset.chunks is None or not h5_dataset.shape or h5_dataset.size == 0:
+        return False
+    if h5_dataset.dtype.hasobject or h5_dataset.dtype.kind not in 'biuf':
+        return False
+    if not hasattr(h5_dataset.id, 'read_direct_chunk'):
+        return False
+    filters = get_dataset_filters(h5_dataset)
+    return h5py.h5z.FILTER_DEFLATE in filters and all(f in _SUPPORTED_FILTERS for f in filters)
+
+
+def read_rows_parallel(h5_dataset, start, stop, num_threads=DEFAULT_NUM_DECODE_THREADS):
+    """Reads a range of rows of a gzip-compressed dataset decompressing its chunks in parallel.
+
+    The raw (compressed) chunks are fetched with h5py's direct chunk read and
+    inflated by a pool of threads (zlib releases the GIL while decompressing).
+    Each thread copies its decompressed chunk into a preallocated output array.
+
+    Parameters
+    ----------
+    h5_dataset : h5py._hl.dataset.Dataset
+        Handler for an HDF5 dataset object. Must be decodable
+        (see is_parallel_decodable()).
+    start : int
+        First row of the range.
+    stop : int
+        Last row (exclusive) of the range.
+    num_threads : int, optional
+        Number of threads used to decompress the chunks.
+
+    Returns
+    -------
+    np.ndarray
+        Array with the rows in the range.
+
+    """
+    assert num_threads > 0, 'Must input a valid number of threads.'
+    shape, chunks = h5_dataset.shape, h5_dataset.chunks
+    out = np.empty((stop - start,) + shape[1:], dtype=h5_dataset.dtype)
+    if stop <= start:
+        return out
+    filters = get_dataset_filters(h5_dataset)
+    offsets = get_chunk_offsets(shape, chunks, start, stop)
+
+    def decode_chunk(offset):
+        chunk = _read_chunk(h5_dataset, offset, filters)
+        src, dst = _get_chunk_selection(offset, shape, chunks, start, stop)
+        out[dst] = chunk[src]
+
+    if num_threads == 1 or len(offsets) < 2:
+        for offset in offsets:
+            decode_chunk(offset)
+    else:
+        pool = ThreadPool(min(num_threads, len(offsets)))
+        try:
+            pool.map(decode_chunk, offsets)
+        finally:
+            pool.close()
+            pool.join()
+    return out
+
+
+def get_chunk_offsets(shape, chunks, start, stop):
+    """Returns the offsets of all chunks that contain rows in the range [start, stop)."""
+    first_row = (start // chunks[0]) * chunks[0]
+    ranges = [range(first_row, stop, chunks[0])]
+    ranges += [range(0, dim, chunk_dim) for dim, chunk_dim in zip(shape[1:], chunks[1:])]
+    return list(itertools.product(*ranges))
+
+
+def _get_chunk_selection(offset, shape, chunks, start, stop):
+    """Returns the selections of a chunk's data and of the output array it is copied to."""
+    src, dst = [], []
+    for axis, (pos, dim, chunk_dim) in enumerate(zip(offset, shape, chunks)):
+        lo, hi = pos, min(pos + chunk_dim, dim)
+        if axis == 0:
+            lo, hi = max(lo, start), min(hi, stop)
+            dst.append(slice(lo - start, hi - start))
+        else:
+            dst.append(slice(lo, hi))
+        src.append(slice(lo - pos, hi - pos))
+    return tuple(src), tuple(dst)
+
+
+def _read_chunk(h5_dataset, offset, filters):
+    """Reads a raw chunk from disk and decodes it into an array with the chunk's shape."""
+    chunks, dtype = h5_dataset.chunks, h5_dataset.dtype
+    try:
+        filter_mask, data = h5_dataset.id.read_direct_chunk(offset)
+    except (KeyError, ValueError, RuntimeError):
+        # chunks never written to are not allocated in the file
+        chunk = np.empty(chunks, dtype=dtype)
+        chunk[...] = h5_dataset.fillvalue
+        return chunk
+    for i in reversed(range(len(filters))):
+        if filter_mask & (1 << i):
+            continue  # the filter was skipped when writing the chunk
+        if filters[i] == h5py.h5z.FILTER_DEFLATE:
+            data = zlib.decompress(data)
+        elif filters[i] == h5py.h5z.FILTER_SHUFFLE:
+            data = _unshuffle(data, dtype.itemsize)
+    return np.frombuffer(data, dtype=dtype).reshape(chunks)
+
+
+def _unshuffle(data, itemsize):
+    """Reverts hdf5's shuffle filter (bytes grouped by their position in each element)."""
+    if itemsize == 1:
+        return data
+    buf = np.frombuffer(data, dtype=np.uint8)
+    num_elems = len(buf) // itemsize
+    body = buf[:num_elems * itemsize].reshape(itemsize, num_elems).T
+    return body.tobytes() + buf[num_elems * itemsize:].tobytes()
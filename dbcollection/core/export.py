@@ -0,0 +1,347 @@
+"""
+Chunked export of the fields of a set to Arrow tables and pandas DataFrames.
+"""
+
+
+import numpy as np
+from six import string_types
+
+from dbcollection.core.batch import get_batch_indexes, prefetch_batches, DEFAULT_PREFETCH
+from dbcollection.utils.hdf5 import hdf5_get_encoding, HDF5_CSR_ENCODING, HDF5_RAGGED_ENCODING
+from dbcollection.utils.string_ascii import convert_ascii_rows_to_str
+
+
+# Default number of rows read/converted at a time when exporting a set.
+DEFAULT_EXPORT_CHUNK_ROWS = 64 * 1024
+
+# Kinds of columns of an exported set.
+SCALAR_COLUMN = 'scalar'
+ARRAY_COLUMN = 'array'
+STRING_COLUMN = 'string'
+LIST_COLUMN = 'list'
+
+
+def import_pyarrow():
+    """Imports pyarrow (an optional dependency).
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed.
+
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('pyarrow is required to export sets to Arrow. '
+                          'Install it with: pip install pyarrow')
+    return pyarrow
+
+
+def get_export_fields(set_loader, fields=None):
+    """Returns the names of the fields to export.
+
+    Parameters
+    ----------
+    set_loader : SetLoader
+        Loader of the set.
+    fields : str/list/tuple, optional
+        Name(s) of the field(s) to export. By default, all fields with
+        the same number of rows as 'object_ids' are exported.
+
+    Returns
+    -------
+    list
+        Names of the fields.
+
+    Raises
+    ------
+    KeyError
+        If a field does not exist in the set.
+
+    """
+    if fields is None:
+        num_rows = len(set_loader.fields['object_ids'])
+        return [field for field in sorted(set_loader.fields)
+                if len(set_loader.fields[field]) == num_rows]
+    if isinstance(fields, string_types):
+        fields = [fields]
+    fields = list(fields)
+    assert fields, 'Must input a valid list of field names.'
+    for field in fields:
+        if field not in set_loader.fields:
+            raise KeyError('\'{}\' does not exist in the \'{}\' set.'.format(field, set_loader.set))
+    return fields
+
+
+def get_column_kind(set_loader, field):
+    """Returns how a field is exported: as a scalar, array, string or list column."""
+    field_loader = set_loader.fields[field]
+    if hdf5_get_encoding(field_loader.hdf5_handler) == HDF5_RAGGED_ENCODING:
+        return LIST_COLUMN
+    if set_loader._is_field_a_list(field):
+        return LIST_COLUMN
+    if field_loader.original_type == np.uint8 and len(field_loader.shape) == 2:
+        return STRING_COLUMN
+    if len(field_loader.shape) == 1 or field_loader.shape[1:] == (1,):
+        return SCALAR_COLUMN
+    return ARRAY_COLUMN
+
+
+def get_column_type(field_loader):
+    """Returns the type of the values read from a field (the original type of upcast fields)."""
+    if getattr(field_loader, 'upcast', False):
+        return field_loader.original_type
+    return field_loader.type
+
+
+def read_column_chunk(field_loader, kind, start, stop):
+    """Reads a range of rows of a field in the format of its column kind.
+
+    Parameters
+    ----------
+    field_loader : FieldLoader/CSRFieldLoader/RaggedFieldLoader
+        Loader of the field.
+    kind : str
+        Kind of the column (see get_column_kind()).
+    start : int
+        First row.
+    stop : int
+        Last row (excluded).
+
+    Returns
+    -------
+    np.ndarray/tuple
+        Values of the rows. List columns return a tuple with the values of
+        all lists concatenated and the (int32) offsets of each list.
+        String columns return the matrix of ascii codes.
+
+    """
+    if kind == LIST_COLUMN:
+        return _read_list_chunk(field_loader, start, stop)
+    data = field_loader.get(slice(start, stop))
+    if kind == SCALAR_COLUMN:
+        return data.reshape(-1)
+    return data
+
+
+def _read_list_chunk(field_loader, start, stop):
+    if hdf5_get_encoding(field_loader.hdf5_handler) in (HDF5_CSR_ENCODING, HDF5_RAGGED_ENCODING):
+        offsets = field_loader.offsets.get(slice(start, stop + 1))
+        values = field_loader.values.get(slice(int(offsets[0]), int(offsets[-1])))
+        return values, (offsets - offsets[0]).astype(np.int32)
+    data = field_loader.get(slice(start, stop))
+    return unpad_rows(data, field_loader.fillvalue)
+
+
+def unpad_rows(data, fillvalue):
+    """Converts a padded matrix into the values of all rows and the (int32) offsets of each row."""
+    mask = data != fillvalue
+    offsets = np.zeros((len(data) + 1,), dtype=np.int32)
+    np.cumsum(mask.sum(axis=1), out=offsets[1:])
+    return data[mask], offsets
+
+
+def iter_column_chunks(set_loader, fields, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS,
+                       prefetch=DEFAULT_PREFETCH):
+    """Iterates over chunks of rows of the columns of a set.
+
+    The chunks are read in the background (see prefetch_batches()) while
+    the previous chunk is being converted.
+
+    Parameters
+    ----------
+    set_loader : SetLoader
+        Loader of the set.
+    fields : list
+        Names of the fields. All fields must have the same number of rows.
+    chunk_size : int, optional
+        Number of rows per chunk.
+    prefetch : int, optional
+        Number of chunks read ahead in the background.
+
+    Yields
+    ------
+    dict
+        Data of the columns of a chunk (see read_column_chunk()).
+
+    """
+    assert chunk_size > 0, 'Must input a chunk size greater than 0.'
+    kinds = {field: get_column_kind(set_loader, field) for field in fields}
+    num_rows = get_num_rows(set_loader, fields)
+
+    def read_chunk(rows):
+        return {field: read_column_chunk(set_loader.fields[field], kinds[field],
+                                         rows.start, rows.stop)
+                for field in fields}
+
+    return prefetch_batches(read_chunk, get_batch_indexes(num_rows, chunk_size), prefetch)
+
+
+def get_num_rows(set_loader, fields):
+    """Returns the number of rows of the fields (which must be the same for all)."""
+    num_rows = len(set_loader.fields[fields[0]])
+    assert all(len(set_loader.fields[field]) == num_rows for field in fields), \
+        'All fields must have the same number of rows.'
+    return num_rows
+
+
+def iter_record_batches(set_loader, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+    """Iterates over the rows of a set as Arrow record batches.
+
+    Numeric columns are wrapped without copying, strings are decoded in bulk
+    and list fields are converted to list columns from their values/offsets.
+
+    Parameters
+    ----------
+    set_loader : SetLoader
+        Loader of the set.
+    fields : str/list/tuple, optional
+        Name(s) of the field(s) to export (see get_export_fields()).
+    chunk_size : int, optional
+        Number of rows per record batch.
+
+    Yields
+    ------
+    pyarrow.RecordBatch
+        Rows of a chunk.
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed.
+    KeyError
+        If a field does not exist in the set.
+
+    """
+    pa = import_pyarrow()
+    fields = get_export_fields(set_loader, fields)
+    kinds = [get_column_kind(set_loader, field) for field in fields]
+    schema = get_arrow_schema(set_loader, fields)
+    for chunk in iter_column_chunks(set_loader, fields, chunk_size):
+        columns = [_convert_to_arrow(pa, chunk[field], kind) for field, kind in zip(fields, kinds)]
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def get_arrow_schema(set_loader, fields):
+    """Returns the Arrow schema of the exported fields of a set."""
+    pa = import_pyarrow()
+    schema = []
+    for field in fields:
+        field_loader = set_loader.fields[field]
+        kind = get_column_kind(set_loader, field)
+        if kind == STRING_COLUMN:
+            arrow_type = pa.string()
+        else:
+            arrow_type = pa.from_numpy_dtype(np.dtype(get_column_type(field_loader)))
+        if kind == LIST_COLUMN:
+            arrow_type = pa.list_(arrow_type)
+        elif kind == ARRAY_COLUMN:
+            arrow_type = pa.list_(arrow_type, int(np.prod(field_loader.shape[1:])))
+        schema.append(pa.field(str(field), arrow_type))
+    return pa.schema(schema)
+
+
+def _convert_to_arrow(pa, data, kind):
+    if kind == LIST_COLUMN:
+        values, offsets = data
+        return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+    if kind == STRING_COLUMN:
+        values, offsets = unpad_rows(data, 0)
+        return pa.StringArray.from_buffers(len(data), pa.py_buffer(offsets),
+                                           pa.py_buffer(values))
+    if kind == ARRAY_COLUMN:
+        width = int(np.prod(data.shape[1:]))
+        return pa.FixedSizeListArray.from_arrays(pa.array(data.reshape(-1)), width)
+    return pa.array(data)
+
+
+def set_to_arrow(set_loader, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+    """Exports the rows of a set to an Arrow table (see iter_record_batches())."""
+    pa = import_pyarrow()
+    fields = get_export_fields(set_loader, fields)
+    batches = iter_record_batches(set_loader, fields, chunk_size)
+    return pa.Table.from_batches(batches, schema=get_arrow_schema(set_loader, fields))
+
+
+def set_to_pandas(set_loader, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+    """Exports the rows of a set to a pandas DataFrame.
+
+    The output columns are allocated once and filled chunk by chunk, so
+    only a chunk of rows of the hdf5 file is held in memory besides the
+    DataFrame's data. Scalar fields become numeric columns, strings become
+    'str' columns, and 2D arrays and list fields become columns of numpy
+    arrays.
+
+    Parameters
+    ----------
+    set_loader : SetLoader
+        Loader of the set.
+    fields : str/list/tuple, optional
+        Name(s) of the field(s) to export (see get_export_fields()).
+    chunk_size : int, optional
+        Number of rows read at a time.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of the set.
+
+    Raises
+    ------
+    KeyError
+        If a field does not exist in the set.
+
+    """
+    import pandas as pd
+
+    fields = get_export_fields(set_loader, fields)
+    kinds = {field: get_column_kind(set_loader, field) for field in fields}
+    num_rows = get_num_rows(set_loader, fields)
+    columns = {field: _allocate_pandas_column(set_loader.fields[field], kinds[field], num_rows)
+               for field in fields}
+    start = 0
+    for chunk in iter_column_chunks(set_loader, fields, chunk_size):
+        size = 0
+        for field in fields:
+            size = _fill_pandas_column(columns[field], chunk[field], kinds[field], start)
+        start += size
+    return pd.DataFrame({str(field): columns[field] for field in fields},
+                        columns=[str(field) for field in fields])
+
+
+def _allocate_pandas_column(field_loader, kind, num_rows):
+    if kind == SCALAR_COLUMN:
+        return np.empty((num_rows,), dtype=get_column_type(field_loader))
+    return np.empty((num_rows,), dtype=object)
+
+
+def _fill_pandas_column(column, data, kind, start):
+    """Copies the rows of a chunk into a column and returns the number of rows."""
+    if kind == LIST_COLUMN:
+        values, offsets = data
+        size = len(offsets) - 1
+        column[start:start + size] = _split_rows(values, offsets)
+    elif kind == STRING_COLUMN:
+        size = len(data)
+        column[start:start + size] = convert_ascii_rows_to_str(data)
+    elif kind == ARRAY_COLUMN:
+        size = len(data)
+        column[start:start + size] = _split_rows(data)
+    else:
+        size = len(data)
+        column[start:start + size] = data
+    return size
+
+
+def _split_rows(data, offsets=None):
+    """Returns an object array with a numpy array (view) per row (or per list if offsets are used)."""
+    if offsets is None:
+        rows = np.empty((len(data),), dtype=object)
+        for i in range(len(rows)):
+            rows[i] = data[i]
+        return rows
+    rows = np.empty((len(offsets) - 1,), dtype=object)
+    for i in range(len(rows)):
+        rows[i] = data[offsets[i]:offsets[i + 1]]
+    return rows
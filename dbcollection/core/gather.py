@@ -0,0 +1,198 @@
+"""
+Index normalization and batched row gather methods for hdf5 fields.
+"""
+
+
+import numpy as np
+from six.moves import range
+
+
+# Number of bytes of a pseudo-chunk used to group reads of non-chunked (contiguous) datasets.
+CONTIGUOUS_BLOCK_NBYTES = 64 * 1024
+
+# Maximum number of bytes read from disk in a single block when gathering rows.
+MAX_BLOCK_NBYTES = 64 * 1024 * 1024
+
+
+def normalize_index(index, length):
+    """Converts an input index into a valid selection of rows of a field.
+
+    Parameters
+    ----------
+    index : int/list/tuple/range/slice/np.ndarray
+        Index of the rows to select. Lists, tuples and ranges with a single
+        element select a single row, and empty ones select all rows (this
+        mimics the original behaviour of the loader). Numpy arrays are
+        handled the same way as numpy does: integer arrays select rows in
+        the given order and boolean arrays are used as masks.
+    length : int
+        Number of rows of the field.
+
+    Returns
+    -------
+    int/slice/np.ndarray/None
+        An int for a single row, a slice with a positive step for a range of
+        rows, a 1D array of (non-negative) row positions or None to select all
+        the rows of the field.
+
+    Raises
+    ------
+    TypeError
+        If the index type is not supported.
+    IndexError
+        If any index is out of range.
+
+    """
+    if isinstance(index, (int, np.integer)) and not isinstance(index, (bool, np.bool_)):
+        return _check_bounds_int(int(index), length)
+    if isinstance(index, slice):
+        return _normalize_slice(index, length)
+    if isinstance(index, np.ndarray):
+        if index.ndim == 0:
+            return normalize_index(index.item(), length)
+        return _normalize_array(index, length)
+    if isinstance(index, (list, tuple, range)):
+        if len(index) == 0:
+            return None
+        if len(index) == 1:
+            return normalize_index(index[0], length)
+        return _normalize_array(np.asarray(index), length)
+    raise TypeError('Invalid index type: {}. Must be an int, list, tuple, slice or np.ndarray.'
+                    .format(type(index)))
+
+
+def _check_bounds_int(idx, length):
+    if idx < -length or idx >= length:
+        raise IndexError('Index {} is out of range for a field with {} rows.'.format(idx, length))
+    return idx % length
+
+
+def _normalize_slice(index, length):
+    start, stop, step = index.indices(length)
+    if step > 0:
+        return slice(start, max(start, stop), step)
+    return np.arange(start, stop, step, dtype=np.int64)
+
+
+def _normalize_array(index, length):
+    if index.ndim != 1:
+        raise IndexError('Index arrays must be one-dimensional. Got {} dimensions.'
+                         .format(index.ndim))
+    if index.dtype == np.bool_:
+        if len(index) != length:
+            raise IndexError('Boolean index has length {} but the field has {} rows.'
+                             .format(len(index), length))
+        return np.flatnonzero(index)
+    if index.size == 0:
+        return np.zeros((0,), dtype=np.int64)
+    if not np.issubdtype(index.dtype, np.integer):
+        raise TypeError('Index arrays must be of integer or boolean type. Got {}.'
+                        .format(index.dtype))
+    rows = index.astype(np.int64)
+    if rows.min() < -length or rows.max() >= length:
+        raise IndexError('Index out of range for a field with {} rows.'.format(length))
+    return np.where(rows < 0, rows + length, rows)
+
+
+def get_chunk_rows(shape, dtype, chunks=None):
+    """Returns the number of rows stored in each chunk of a dataset.
+
+    For non-chunked datasets, it returns the number of rows that
+    fit in a pseudo-chunk of CONTIGUOUS_BLOCK_NBYTES bytes.
+
+    """
+    if chunks:
+        return max(1, chunks[0])
+    row_nbytes = get_row_nbytes(shape, dtype)
+    return max(1, CONTIGUOUS_BLOCK_NBYTES // row_nbytes)
+
+
+def get_row_nbytes(shape, dtype):
+    """Returns the size (in bytes) of a single row of a dataset."""
+    return max(1, int(np.prod(shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize)
+
+
+def get_covering_ranges(rows, chunk_rows, length, max_block_rows=None):
+    """Groups sorted row positions into ranges of rows aligned with the chunks.
+
+    Consecutive chunks containing requested rows are merged into a single
+    range so they can be fetched with a single read.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Sorted array of unique row positions.
+    chunk_rows : int
+        Number of rows per chunk.
+    length : int
+        Number of rows of the field.
+    max_block_rows : int, optional
+        Maximum number of rows of a range.
+
+    Returns
+    -------
+    list
+        List of (start, stop) tuples.
+
+    """
+    if len(rows) == 0:
+        return []
+    chunk_ids = np.unique(rows // chunk_rows)
+    max_chunks = None
+    if max_block_rows:
+        max_chunks = max(1, max_block_rows // chunk_rows)
+    ranges = []
+    first = last = chunk_ids[0]
+    for chunk_id in chunk_ids[1:]:
+        if chunk_id == last + 1 and (max_chunks is None or chunk_id - first < max_chunks):
+            last = chunk_id
+        else:
+            ranges.append((int(first * chunk_rows), int(min((last + 1) * chunk_rows, length))))
+            first = last = chunk_id
+    ranges.append((int(first * chunk_rows), int(min((last + 1) * chunk_rows, length))))
+    return ranges
+
+
+def gather_rows(read_block, rows, chunk_rows, length, row_nbytes=1):
+    """Gathers rows of a field in the requested order by reading whole blocks of rows.
+
+    Instead of issuing a point selection per row, the rows are grouped into
+    chunk-aligned ranges, each range is read once from disk and the requested
+    rows are picked with numpy. The output keeps the order and duplicates of
+    the input rows.
+
+    Parameters
+    ----------
+    read_block : callable
+        Function that receives (start, stop) and returns the rows of the
+        field in that range as a numpy array.
+    rows : np.ndarray
+        Array of row positions.
+    chunk_rows : int
+        Number of rows per chunk.
+    length : int
+        Number of rows of the field.
+    row_nbytes : int, optional
+        Size (in bytes) of a row. Used to bound the size of the blocks.
+
+    Returns
+    -------
+    np.ndarray
+        Array with the selected rows.
+
+    """
+    if len(rows) == 0:
+        return read_block(0, 0)
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    max_block_rows = max(chunk_rows, MAX_BLOCK_NBYTES // max(1, row_nbytes))
+    ranges = get_covering_ranges(unique_rows, chunk_rows, length, max_block_rows)
+    parts = []
+    for start, stop in ranges:
+        block = read_block(start, stop)
+        lo, hi = np.searchsorted(unique_rows, [start, stop])
+        parts.append(np.take(block, unique_rows[lo:hi] - start, axis=0))
+    if len(parts) == 1:
+        data = parts[0]
+    else:
+        data = np.concatenate(parts, axis=0)
+    return np.take(data, inverse.ravel(), axis=0)
@@ -3,8 +3,39 @@ Dataset's metadata loader classes.
 """
 
 
+import os
+import threading
 import h5py
-from dbcollection.utils.string_ascii import convert_ascii_to_str
+import numpy as np
+from six import string_types, ensure_str, ensure_binary
+from six.moves.collections_abc import Mapping
+
+from dbcollection.core.batch import (get_batch_indexes, get_chunk_aligned_reader, prefetch_batches,
+                                     DEFAULT_PREFETCH)
+from dbcollection.core.block_cache import BlockCache, DEFAULT_BLOCK_CACHE_NBYTES
+from dbcollection.core.chunk_reader import (is_parallel_decodable, read_rows_parallel,
+                                            DEFAULT_NUM_DECODE_THREADS, MIN_PARALLEL_CHUNKS)
+from dbcollection.core.export import set_to_arrow, set_to_pandas, DEFAULT_EXPORT_CHUNK_ROWS
+from dbcollection.core.gather import normalize_index, gather_rows, get_chunk_rows, get_row_nbytes
+from dbcollection.core.memory_policy import get_memory_policy
+from dbcollection.core.query import SetQuery
+from dbcollection.core.stats import AccessStats, default_timer
+from dbcollection.core.storage import open_hdf5_file, is_local_hdf5_file
+from dbcollection.utils.csr import get_csr_value_rows
+from dbcollection.utils.hdf5 import (hdf5_build_catalog, hdf5_read_catalog, get_catalog_chunk_nbytes,
+                                     get_chunk_cache_settings, get_storage_profile_cache_chunks,
+                                     hdf5_get_object,
+                                     hdf5_get_encoding, hdf5_get_original_dtype, HDF5_CSR_ENCODING,
+                                     HDF5_RAGGED_ENCODING, HDF5_DICTIONARY_ENCODING,
+                                     HDF5_FRONT_CODED_ENCODING, DEFAULT_STORAGE_PROFILE)
+from dbcollection.utils.memmap import (hdf5_dataset_memmap, hdf5_dataset_to_npy, get_sidecar_filename,
+                                       is_sidecar_file_valid, load_npy_memmap, get_default_block_rows)
+from dbcollection.utils.shared_memory import SharedArray, get_shared_memory_name
+from dbcollection.utils.string_ascii import convert_ascii_to_str, convert_ascii_rows_to_str
+
+
+# Maximum size (in bytes) of a string field for its decoded strings to be cached.
+DEFAULT_STRING_TABLE_NBYTES = 16 * 1024 * 1024
 
 
 class FieldLoader(object):
@@ -20,6 +51,19 @@ class FieldLoader(object):
         hdf5 field object handler.
     obj_id : int, optional
         Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    string_table_nbytes : int, optional
+        Maximum size (in bytes) of a string field for its decoded strings
+        to be cached. Set it to 0 to disable the cache.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the field is kept in memory based on its reads.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the field.
 
     Attributes
     ----------
@@ -31,50 +75,104 @@ class FieldLoader(object):
         Name of the field.
     type : type
         Type of the field's data.
+    original_type : type
+        Type of the field's data before it was narrowed when written
+        (the same as 'type' for fields that were not narrowed).
+    upcast : bool
+        Converts the retrieved data to the original type (if True).
     shape : tuple
         Shape of the field's data.
     fillvalue : int
         Value used to pad arrays when storing the data in the hdf5 file.
     obj_id : int
         Identifier of the field if contained in the 'object_ids' list.
+    block_cache : BlockCache
+        Cache of decompressed chunks used when reading data from disk.
+    num_decode_threads : int
+        Number of threads used to decompress gzip chunks of large reads.
+    string_table_nbytes : int
+        Maximum size (in bytes) of a string field for its decoded strings
+        to be cached.
+    memory_policy : MemoryPolicy
+        Policy that decides if the field is kept in memory based on its reads.
+    num_reads : int
+        Number of reads of the field's data.
+    access_stats : AccessStats
+        Collector of statistics of the reads of the field.
 
     """
 
-    def __init__(self, hdf5_field, obj_id=None):
+    def __init__(self, hdf5_field, obj_id=None, block_cache=None, file_handler=None,
+                 num_decode_threads=DEFAULT_NUM_DECODE_THREADS,
+                 string_table_nbytes=DEFAULT_STRING_TABLE_NBYTES, memory_policy=None,
+                 access_stats=None):
         """Initialize class."""
         assert hdf5_field, 'Must input a valid hdf5 dataset.'
 
         self.data = hdf5_field
         self.hdf5_handler = hdf5_field
+        self._data_lock = threading.RLock()
         self._in_memory = False
+        self._in_mmap = False
+        self._shared_array = None
         self.set = self._get_set_name()
         self.name = self._get_field_name()
         self.shape = hdf5_field.shape
         self.type = hdf5_field.dtype
+        self.original_type = hdf5_get_original_dtype(hdf5_field)
+        self.upcast = False
         self.fillvalue = hdf5_field.fillvalue
         self.obj_id = obj_id
+        self.block_cache = block_cache
+        self.file_handler = file_handler
+        self.num_decode_threads = num_decode_threads
+        self._chunked = hdf5_field.chunks is not None
+        self._parallel_decodable = is_parallel_decodable(hdf5_field)
+        self._chunk_rows = get_chunk_rows(self.shape, self.type, hdf5_field.chunks)
+        self._row_nbytes = get_row_nbytes(self.shape, self.type)
+        self.string_table_nbytes = string_table_nbytes
+        self._string_table = None
+        self._string_index = None
+        self.num_reads = 0
+        self.access_stats = access_stats
+        self.memory_policy = memory_policy
+        if memory_policy is not None:
+            memory_policy.register(self)
 
     def _get_set_name(self):
         hdf5_object_str = self._get_hdf5_object_str()
         return hdf5_object_str[1]
 
     def _get_field_name(self):
+        """Path of the field inside its set (e.g., 'list_boxes/values' for CSR-encoded lists)."""
         hdf5_object_str = self._get_hdf5_object_str()
-        return hdf5_object_str[-1]
+        return '/'.join(hdf5_object_str[2:])
 
     def _get_hdf5_object_str(self):
         return self.hdf5_handler.name.split('/')
 
+    def _check_hdf5_file(self):
+        """Makes sure the hdf5 file is open in the current process."""
+        if self.file_handler is not None:
+            self.file_handler.check()
+
+    def _rebind(self, hdf5_field):
+        """Replaces the hdf5 dataset handler (e.g., after reopening the file)."""
+        with self._data_lock:
+            self.hdf5_handler = hdf5_field
+            if self._is_on_disk():
+                self.data = hdf5_field
+
     def get(self, index=None, convert_to_str=False):
         """Retrieves data of the field from the dataset's hdf5 metadata file.
 
         This method retrieves the i'th data from the hdf5 file. Also, it is
-        possible to retrieve multiple values by inserting a list/tuple of
-        number values as indexes.
+        possible to retrieve multiple values by inserting a list/tuple/numpy
+        array of number values as indexes, a slice or a boolean mask.
 
         Parameters
         ----------
-        index : int/list/tuple, optional
+        index : int/list/tuple/slice/np.ndarray, optional
             Index number of he field. If it is a list, returns the data
             for all the value indexes of that list.
         convert_to_str : bool, optional
@@ -88,42 +186,288 @@ class FieldLoader(object):
             If convert_to_str is set to True, it returns a string
             or list of strings.
 
+        Raises
+        ------
+        TypeError
+            If the index type is not supported.
+        IndexError
+            If an index is out of range.
+
         Note
         ----
-        When using lists/tuples of indexes, this method sorts the list
-        and removes duplicate values. This is because the h5py
-        api requires the indexing elements to be in increasing order when
-        retrieving data.
+        When using lists/tuples/arrays of indexes, the rows are returned
+        in the same order as the indexes, including duplicates. Data on disk
+        is fetched by reading whole chunks of rows at once and then picking
+        the requested rows, which is much faster than selecting each row
+        individually with h5py.
 
         """
+        self._check_hdf5_file()
+        if self.memory_policy is not None:
+            self.memory_policy.record_read(self)
+        if not self._is_traced():
+            with self._data_lock:
+                return self._get(index, convert_to_str)
+        start = default_timer()
+        with self._data_lock:
+            data = self._get(index, convert_to_str)
+        rows = self._get_num_rows(data)
+        self.access_stats.record_call(self.set, self.name, 'get', rows, rows * self._row_nbytes,
+                                      default_timer() - start)
+        return data
+
+    def _get(self, index, convert_to_str):
+        if convert_to_str and self._uses_string_table():
+            return self._get_strings(index)
         if index is None:
             data = self._get_all_idx()
         else:
             data = self._get_range_idx(index)
         if convert_to_str:
-            data = convert_ascii_to_str(data)
+            data = self._convert_to_str(convert_ascii_to_str, data)
+        elif self.upcast and self.original_type != self.type:
+            data = data.astype(self.original_type)
         return data
 
+    def _is_traced(self):
+        """Statistics of the reads are only recorded when enabled."""
+        return self.access_stats is not None and self.access_stats.enabled
+
+    def _get_num_rows(self, data):
+        """Return the number of rows of the output of get()."""
+        if isinstance(data, np.ndarray):
+            return len(data) if data.ndim == len(self.shape) and data.ndim > 0 else 1
+        elif isinstance(data, list):
+            return len(data)
+        else:
+            return 1
+
+    def _convert_to_str(self, convert, data):
+        """Convert ascii codes into strings (recording the time spent, if traced)."""
+        if not self._is_traced():
+            return convert(data)
+        start = default_timer()
+        data = convert(data)
+        self.access_stats.record_conversion(self.set, self.name, 'get', default_timer() - start)
+        return data
+
+    def get_list(self, index=None):
+        """Retrieves the list(s) of values of a (padded) list field without the padding.
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the list(s). If no index is used,
+            it returns all lists.
+
+        Returns
+        -------
+        np.ndarray/list
+            Numpy array with the values of a list if the index is an int,
+            or a list of numpy arrays otherwise.
+
+        """
+        assert len(self.shape) == 2, 'List fields must be 2D arrays.'
+        data = self.get(index)
+        if data.ndim == 1:
+            return data[data != self.fillvalue]
+        return [row[row != self.fillvalue] for row in data]
+
+    def _is_string_field(self):
+        """Strings are stored as 2D arrays of ascii codes."""
+        return self.type == np.uint8 and len(self.shape) == 2
+
+    def _uses_string_table(self):
+        nbytes = int(np.prod(self.shape, dtype=np.int64))
+        return self._is_string_field() and 0 < nbytes <= self.string_table_nbytes
+
+    def _get_string_table(self):
+        """Return the list of decoded strings of the field (decoded only once)."""
+        if self._string_table is None:
+            self._string_table = self._convert_to_str(convert_ascii_rows_to_str,
+                                                      np.asarray(self._get_all_idx()))
+        return self._string_table
+
+    def _get_strings(self, index):
+        """Return a selection of decoded strings of the field."""
+        table = self._get_string_table()
+        rows = None if index is None else normalize_index(index, len(self))
+        if rows is None:
+            return list(table)
+        elif isinstance(rows, (int, slice)):
+            return table[rows]
+        else:
+            return [table[row] for row in rows]
+
+    def index_of(self, value):
+        """Retrieves the row of a string in the field.
+
+        Uses a hash table of the field's decoded strings built on the first
+        lookup. Useful to get the id of a class/category name.
+
+        Parameters
+        ----------
+        value : str
+            String to look up.
+
+        Returns
+        -------
+        int
+            Index of the (first) row containing the string.
+
+        Raises
+        ------
+        KeyError
+            If the string does not exist in the field.
+
+        """
+        assert self._is_string_field(), 'The field does not contain strings.'
+        if self._string_index is None:
+            self._check_hdf5_file()
+            string_index = {}
+            for row, string in enumerate(self._get_string_table()):
+                string_index.setdefault(string, row)
+            self._string_index = string_index
+        try:
+            return self._string_index[value]
+        except KeyError:
+            raise KeyError('\'{}\' does not exist in the \'{}\' field.'.format(value, self.name))
+
     def _get_all_idx(self):
         """Return the full data array."""
-        if self._in_memory:
+        if not self._is_on_disk():
             return self.data
         else:
-            return self.data.value
+            return self._read_all()
+
+    def _read_all(self):
+        """Return the full data array read from disk."""
+        if not self.shape:
+            return self.hdf5_handler.value
+        else:
+            return self._read_rows(0, len(self))
+
+    def _read_rows(self, start, stop):
+        """Return a contiguous range of rows read from disk (bypassing the block cache).
+
+        Large reads of gzip-compressed fields have their chunks decompressed
+        in parallel.
+
+        """
+        if self._uses_parallel_decode(start, stop):
+            return self._read_from_disk(self._read_rows_parallel, start, stop)
+        else:
+            return self._read_from_disk(self._read_hdf5_rows, start, stop)
+
+    def _read_rows_parallel(self, start, stop):
+        return read_rows_parallel(self.hdf5_handler, start, stop, self.num_decode_threads)
+
+    def _read_hdf5_rows(self, start, stop):
+        return self.hdf5_handler[start:stop]
+
+    def _read_from_disk(self, read, start, stop):
+        """Reads rows from disk (recording the time spent reading/decompressing, if traced)."""
+        if not self._is_traced():
+            return read(start, stop)
+        begin = default_timer()
+        data = read(start, stop)
+        self.access_stats.record_read(self.set, self.name, stop - start,
+                                      (stop - start) * self._row_nbytes, default_timer() - begin)
+        return data
+
+    def _uses_parallel_decode(self, start, stop):
+        if not self._parallel_decodable or self.num_decode_threads < 2:
+            return False
+        num_chunks = (stop - 1) // self._chunk_rows - start // self._chunk_rows + 1
+        return num_chunks >= MIN_PARALLEL_CHUNKS
 
     def _get_range_idx(self, idx):
-        """Return a slice of the data array."""
+        """Return a selection of rows of the data array."""
         assert idx is not None
-        if isinstance(idx, int):
-            return self.data[idx]
+        rows = normalize_index(idx, len(self))
+        if rows is None:
+            return self._get_all_idx()
+        elif isinstance(rows, int):
+            return self._get_row(rows)
+        elif isinstance(rows, slice):
+            return self._get_slice(rows)
         else:
-            size = len(idx)
-            if size > 1:
-                return self.data[sorted(set(idx))]
-            elif size == 1:
-                return self.data[idx[0]]
-            else:
-                return self._get_all_idx()
+            return self._gather_rows(rows)
+
+    def _get_row(self, row):
+        """Return a single row of the data array."""
+        if self._uses_block_cache():
+            chunk = row // self._chunk_rows
+            block = self._get_cached_chunk(chunk)
+            return block[row - chunk * self._chunk_rows].copy()
+        elif self._is_traced() and self._is_on_disk():
+            return self._read_from_disk(self._read_hdf5_rows, row, row + 1)[0]
+        else:
+            return self.data[row]
+
+    def _get_slice(self, rows):
+        """Return a range of rows (with a positive step) of the data array."""
+        if not self._is_on_disk() or rows.step != 1:
+            return self.data[rows]
+        else:
+            return self._read_block(rows.start, rows.stop)
+
+    def _gather_rows(self, rows):
+        """Return the rows of the data array in the same order as the input rows."""
+        if not self._is_on_disk():
+            return np.take(self.data, rows, axis=0)
+        else:
+            return gather_rows(self._read_block, rows, self._chunk_rows, len(self),
+                               self._row_nbytes)
+
+    def _read_block(self, start, stop):
+        """Return a contiguous range of rows of the data array."""
+        if self._uses_block_cache() and self._fits_block_cache(stop - start):
+            return self._read_block_from_cache(start, stop)
+        elif self._is_on_disk():
+            return self._read_rows(start, stop)
+        else:
+            return self.data[start:stop]
+
+    def _uses_block_cache(self):
+        """Only compressed/chunked data stored on disk benefits from caching."""
+        return self.block_cache is not None and self._chunked and self._is_on_disk()
+
+    def _is_on_disk(self):
+        """Data is accessed through the hdf5 object handler (i.e., not in memory or mmap)."""
+        return not (self._in_memory or self._in_mmap)
+
+    def _fits_block_cache(self, num_rows):
+        """Big reads bypass the cache to avoid flushing it."""
+        return num_rows * self._row_nbytes <= self.block_cache.max_nbytes // 2
+
+    def _read_block_from_cache(self, start, stop):
+        first_chunk = start // self._chunk_rows
+        last_chunk = (max(start, stop - 1)) // self._chunk_rows
+        blocks = [self._get_cached_chunk(chunk) for chunk in range(first_chunk, last_chunk + 1)]
+        if len(blocks) == 1:
+            data = blocks[0]
+        else:
+            data = np.concatenate(blocks, axis=0)
+        offset = first_chunk * self._chunk_rows
+        return data[start - offset:stop - offset]
+
+    def _get_cached_chunk(self, chunk):
+        """Return the (decompressed) rows of a chunk from the block cache."""
+        start = chunk * self._chunk_rows
+        stop = min(start + self._chunk_rows, len(self))
+        if not self._is_traced():
+            return self.block_cache.get((self.hdf5_handler.name, chunk),
+                                        lambda: self.data[start:stop])
+        misses = []
+
+        def read_chunk():
+            misses.append(chunk)
+            return self._read_from_disk(self._read_hdf5_rows, start, stop)
+
+        block = self.block_cache.get((self.hdf5_handler.name, chunk), read_chunk)
+        self.access_stats.record_cache(self.set, self.name, hit=not misses)
+        return block
 
     def size(self):
         """Size of the field.
@@ -171,27 +515,50 @@ class FieldLoader(object):
                 print('Field: {},  shape = {},  dtype = {}'
                       .format(self.name, str(self.shape), str(self.type)))
 
-    def _set_to_memory(self, is_in_memory):
+    def _set_to_memory(self, is_in_memory, shared=False):
         """Stores the contents of the field in a numpy array if True.
 
         Parameters
         ----------
         is_in_memory : bool
             Move the data to memory (if True).
+        shared : bool, optional
+            Store the data in a shared memory block used by all processes
+            of the host (see to_shared_memory).
 
         """
         assert isinstance(is_in_memory, bool), 'Invalid input. Must insert a boolean type.'
-        if is_in_memory:
-            self.data = self.hdf5_handler.value
+        self._check_hdf5_file()
+        with self._data_lock:
+            self._swap_to_memory(is_in_memory, shared)
+
+    def _swap_to_memory(self, is_in_memory, shared):
+        """Swaps the data (and access mode) of the field.
+
+        Called with the data lock held, so readers (get()) never see the data
+        of one access mode with the flags of another (e.g., when the memory
+        policy rebalances the fields while other threads read them).
+
+        """
+        shared_array = self._shared_array
+        self._shared_array = None
+        if is_in_memory and shared:
+            self._shared_array = self._get_shared_array()
+            self.data = self._shared_array.data
+        elif is_in_memory:
+            self.data = self._read_all()
         else:
             self.data = self.hdf5_handler
         self._in_memory = is_in_memory
+        self._in_mmap = False
+        if shared_array is not None:
+            shared_array.release()
 
     def _get_to_memory(self):
         """Modifies how data is accessed and stored.
 
-        Accessing data from a field can be done in two ways: memory or disk.
-        To enable data allocation and access from memory requires the user to
+        Accessing data from a field can be done in three ways: memory, memory-mapped
+        or disk. To enable data allocation and access from memory requires the user to
         specify a boolean. If set to True, data is allocated to a numpy ndarray
         and all accesses are done in memory. Otherwise, data is kept in disk and
         accesses are done using the HDF5 object handler.
@@ -201,6 +568,99 @@ class FieldLoader(object):
 
     to_memory = property(_get_to_memory, _set_to_memory)
 
+    def _set_to_mmap(self, is_in_mmap):
+        """Memory-maps the contents of the field into a read-only numpy array if True.
+
+        Uncompressed and contiguous datasets are mapped directly from the hdf5
+        file. Other datasets are decompressed once into a sidecar .npy file stored
+        next to the hdf5 file, which is then memory-mapped.
+
+        Parameters
+        ----------
+        is_in_mmap : bool
+            Memory-map the data (if True).
+
+        """
+        assert isinstance(is_in_mmap, bool), 'Invalid input. Must insert a boolean type.'
+        self._check_hdf5_file()
+        with self._data_lock:
+            if is_in_mmap:
+                self.data = self._get_memmap()
+            else:
+                self.data = self.hdf5_handler
+            self._in_mmap = is_in_mmap
+            self._in_memory = False
+            self._release_shared_array()
+
+    def _get_memmap(self):
+        """Return a read-only memory-mapped array of the field's data."""
+        if self.hdf5_handler.size == 0:
+            return self.hdf5_handler[()]
+        memmap = hdf5_dataset_memmap(self.hdf5_handler)
+        if memmap is None:
+            memmap = self._get_sidecar_memmap()
+        return memmap
+
+    def _get_sidecar_memmap(self):
+        if not is_local_hdf5_file(self.hdf5_handler.file):
+            raise IOError('Memory-mapping \'{}\' requires a local hdf5 file. Use to_memory instead.'
+                          .format(self.name))
+        hdf5_filepath = self.hdf5_handler.file.filename
+        filename = get_sidecar_filename(hdf5_filepath, self.set, self.name)
+        if not is_sidecar_file_valid(filename, hdf5_filepath):
+            hdf5_dataset_to_npy(self.hdf5_handler, filename, read_block=self._read_block)
+        return load_npy_memmap(filename)
+
+    def _get_to_mmap(self):
+        """Accesses the data of the field via a read-only memory-mapped array.
+
+        Memory-mapped data is loaded lazily by the operating system when accessed,
+        and it is shared through the page cache by all processes reading the same
+        field without being copied into each process' memory.
+
+        """
+        return self._in_mmap
+
+    to_mmap = property(_get_to_mmap, _set_to_mmap)
+
+    def _set_to_shared_memory(self, is_in_shared_memory):
+        self._set_to_memory(is_in_shared_memory, shared=True)
+
+    def _get_to_shared_memory(self):
+        """Stores the contents of the field in memory shared by all processes of the host.
+
+        The first process to load the field copies it into a named shared memory
+        block, and other processes (e.g., data loader workers) attach to it by
+        name as a read-only numpy array instead of making their own copy. The
+        block is reference-counted and removed when the last process releases
+        it (to_shared_memory=False, to_memory=False, to_mmap=True or exit).
+        Requires python 3.8+.
+
+        """
+        return self._shared_array is not None
+
+    to_shared_memory = property(_get_to_shared_memory, _set_to_shared_memory)
+
+    def _get_shared_array(self):
+        hdf5_filepath = self.hdf5_handler.file.filename
+        name = get_shared_memory_name(hdf5_filepath, self.set, self.name)
+        return SharedArray(name, self.shape, self.type, self._fill_shared_array)
+
+    def _fill_shared_array(self, out):
+        """Copies the field's data into a shared memory array in blocks of rows."""
+        if not self.shape:
+            out[()] = self.hdf5_handler[()]
+            return
+        block_rows = get_default_block_rows(self.hdf5_handler)
+        for start in range(0, len(self), block_rows):
+            stop = min(start + block_rows, len(self))
+            out[start:stop] = self._read_rows(start, stop)
+
+    def _release_shared_array(self):
+        if self._shared_array is not None:
+            self._shared_array.release()
+            self._shared_array = None
+
     def __getitem__(self, index):
         """
         Parameters
@@ -214,6 +674,12 @@ class FieldLoader(object):
             Numpy data array.
 
         """
+        self._check_hdf5_file()
+        if self._uses_block_cache():
+            if isinstance(index, (int, np.integer)):
+                return self._get_row(normalize_index(index, len(self)))
+            if isinstance(index, tuple) and index and isinstance(index[0], (int, np.integer)):
+                return self._get_row(normalize_index(index[0], len(self)))[index[1:]]
         return self.data[index]
 
     def __len__(self):
@@ -230,6 +696,9 @@ class FieldLoader(object):
         if self._in_memory:
             s = 'FieldLoader: <numpy.ndarray "{}": shape {}, type "{}">' \
                 .format(self.name, self.data.shape, self.data.dtype)
+        elif self._in_mmap:
+            s = 'FieldLoader: <numpy.memmap "{}": shape {}, type "{}">' \
+                .format(self.name, self.data.shape, self.data.dtype)
         else:
             s = 'FieldLoader: ' + self.data.__str__()
         return s
@@ -238,6 +707,765 @@ class FieldLoader(object):
         return str(self)
 
 
+class CSRFieldLoader(object):
+    """Loader class of a list field stored with a CSR (values + offsets) encoding.
+
+    Lists of different sizes (e.g., 'list_boxes_per_image') can be stored as
+    a group with a 'values' dataset with all lists concatenated and an 'offsets'
+    dataset with the position where each list starts, instead of a matrix padded
+    with -1. This class reads the lists directly with get_list(), and also
+    returns them as a padded matrix with get() to behave like a FieldLoader.
+
+    Parameters
+    ----------
+    hdf5_group : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the values/offsets are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the values/offsets.
+
+    Attributes
+    ----------
+    hdf5_handler : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    set : str
+        Name of the set.
+    name : str
+        Name of the field.
+    type : type
+        Type of the field's data.
+    original_type : type
+        Type of the field's data before it was narrowed when written.
+    shape : tuple
+        Shape of the field's data as a padded matrix.
+    fillvalue : int
+        Value used to pad the lists.
+    obj_id : int
+        Identifier of the field if contained in the 'object_ids' list.
+    values : FieldLoader
+        Loader of the concatenated values of all lists.
+    offsets : FieldLoader
+        Loader of the offsets of the lists in 'values'.
+
+    """
+
+    def __init__(self, hdf5_group, obj_id=None, block_cache=None, file_handler=None,
+                 num_decode_threads=DEFAULT_NUM_DECODE_THREADS, memory_policy=None,
+                 access_stats=None):
+        """Initialize class."""
+        assert hdf5_group, 'Must input a valid hdf5 group.'
+
+        self.hdf5_handler = hdf5_group
+        self.values = FieldLoader(get_hdf5_field(hdf5_group, 'values', file_handler), None, block_cache, file_handler,
+                                  num_decode_threads, memory_policy=memory_policy,
+                                  access_stats=access_stats)
+        self.offsets = FieldLoader(get_hdf5_field(hdf5_group, 'offsets', file_handler), None, block_cache, file_handler,
+                                   num_decode_threads, memory_policy=memory_policy,
+                                   access_stats=access_stats)
+        self.set = self.values.set
+        self.name = hdf5_group.name.split('/')[-1]
+        self.type = self.values.type
+        self.original_type = self.values.original_type
+        self.fillvalue = hdf5_group.attrs.get('fillvalue', -1)
+        self.shape = (len(self.offsets) - 1, int(hdf5_group.attrs.get('max_length', 0)))
+        self.obj_id = obj_id
+        self.file_handler = file_handler
+
+    def _rebind(self, hdf5_group):
+        """Replaces the hdf5 group/datasets handlers (e.g., after reopening the file)."""
+        self.hdf5_handler = hdf5_group
+        self.values._rebind(get_hdf5_field(hdf5_group, 'values', self.file_handler))
+        self.offsets._rebind(get_hdf5_field(hdf5_group, 'offsets', self.file_handler))
+
+    def get_list(self, index=None):
+        """Retrieves the list(s) of values of the field without padding.
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the list(s). If no index is used,
+            it returns all lists.
+
+        Returns
+        -------
+        np.ndarray/list
+            Numpy array with the values of a list if the index is an int,
+            or a list of numpy arrays otherwise.
+
+        Raises
+        ------
+        TypeError
+            If the index type is not supported.
+        IndexError
+            If an index is out of range.
+
+        """
+        if index is None:
+            rows = np.arange(len(self))
+        else:
+            rows = normalize_index(index, len(self))
+        if rows is None:
+            rows = np.arange(len(self))
+        elif isinstance(rows, int):
+            start, stop = self.offsets.get(slice(rows, rows + 2))
+            return self.values.get(slice(start, stop))
+        elif isinstance(rows, slice):
+            rows = np.arange(rows.start, rows.stop, rows.step)
+        values, split = self._get_lists_values(rows)
+        return [values[split[i]:split[i + 1]] for i in range(len(rows))]
+
+    def _get_lists_values(self, rows):
+        """Reads the values of several lists with a single (batched) read."""
+        starts = self.offsets.get(rows)
+        stops = self.offsets.get(rows + 1)
+        value_rows, split = get_csr_value_rows(starts, stops)
+        return self.values.get(value_rows), split
+
+    def get(self, index=None, convert_to_str=False):
+        """Retrieves the list(s) of the field as a matrix padded with the fill value.
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the list(s). If no index is used,
+            it returns all lists.
+        convert_to_str : bool, optional
+            Not supported by list fields.
+
+        Returns
+        -------
+        np.ndarray
+            Numpy array with the padded list(s).
+
+        """
+        assert not convert_to_str, 'List fields cannot be converted to strings.'
+        lists = self.get_list(index)
+        if isinstance(lists, np.ndarray):
+            return self._pad(lists)
+        data = np.empty((len(lists), self.shape[1]), dtype=self.type)
+        data[...] = self.fillvalue
+        for i, values in enumerate(lists):
+            data[i, :len(values)] = values
+        return data
+
+    def _pad(self, values):
+        data = np.empty((self.shape[1],), dtype=self.type)
+        data[...] = self.fillvalue
+        data[:len(values)] = values
+        return data
+
+    def size(self):
+        """Size of the field as a padded matrix.
+
+        Returns
+        -------
+        tuple
+            Number of lists and size of the biggest list.
+
+        """
+        return self.shape
+
+    def object_field_id(self):
+        """Retrieves the index position of the field in the 'object_ids' list.
+
+        Returns
+        -------
+        int
+            Index of the field in the 'object_ids' list.
+
+        """
+        return self.obj_id
+
+    def info(self, verbose=True):
+        """Prints information about the field.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            If true, display extra information about the field.
+
+        """
+        if verbose:
+            print('Field: {},  shape = {},  dtype = {},  (CSR-encoded list)'
+                  .format(self.name, str(self.shape), str(self.type)))
+
+    def _set_to_memory(self, is_in_memory):
+        self.values.to_memory = is_in_memory
+        self.offsets.to_memory = is_in_memory
+
+    def _get_to_memory(self):
+        """Loads the values and offsets of the lists to memory (if True)."""
+        return self.values.to_memory and self.offsets.to_memory
+
+    to_memory = property(_get_to_memory, _set_to_memory)
+
+    def _set_to_mmap(self, is_in_mmap):
+        self.values.to_mmap = is_in_mmap
+        self.offsets.to_mmap = is_in_mmap
+
+    def _get_to_mmap(self):
+        """Memory-maps the values and offsets of the lists (if True)."""
+        return self.values.to_mmap and self.offsets.to_mmap
+
+    to_mmap = property(_get_to_mmap, _set_to_mmap)
+
+    def _set_to_shared_memory(self, is_in_shared_memory):
+        self.values.to_shared_memory = is_in_shared_memory
+        self.offsets.to_shared_memory = is_in_shared_memory
+
+    def _get_to_shared_memory(self):
+        """Stores the values and offsets of the lists in shared memory (if True)."""
+        return self.values.to_shared_memory and self.offsets.to_shared_memory
+
+    to_shared_memory = property(_get_to_shared_memory, _set_to_shared_memory)
+
+    def _set_upcast(self, upcast):
+        self.values.upcast = upcast
+
+    def _get_upcast(self):
+        """Converts the values to their original (not narrowed) type when retrieved (if True)."""
+        return self.values.upcast
+
+    upcast = property(_get_upcast, _set_upcast)
+
+    def __getitem__(self, index):
+        return self.get(index)
+
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            Number of lists
+
+        """
+        return self.shape[0]
+
+    def __str__(self):
+        s = "CSRFieldLoader: <HDF5 group \"{}\": shape {}, type \"{}\">" \
+            .format(self.name, str(self.shape), self.type.str)
+        return s
+
+    def __repr__(self):
+        return str(self)
+
+
+class RaggedFieldLoader(CSRFieldLoader):
+    """Loader class of a ragged field (rows of different lengths).
+
+    Ragged fields are stored like CSR-encoded lists, but get() returns the
+    rows without padding: an array for a single row or a list of arrays,
+    whose values are read with a single (batched) read.
+
+    Parameters
+    ----------
+    hdf5_group : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the values/offsets are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the values/offsets.
+
+    """
+
+    def get(self, index=None, convert_to_str=False):
+        """Retrieves the row(s) of the field.
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the row(s). If no index is used,
+            it returns all rows.
+        convert_to_str : bool, optional
+            Convert the rows (ascii codes) into strings.
+
+        Returns
+        -------
+        np.ndarray/list/str
+            Numpy array with the values of a row if the index is an int,
+            or a list of numpy arrays otherwise (or strings, if
+            convert_to_str is True).
+
+        """
+        rows = self.get_list(index)
+        if not convert_to_str:
+            return rows
+        if isinstance(rows, np.ndarray):
+            return ensure_str(rows.tobytes(), 'latin-1')
+        return [ensure_str(row.tobytes(), 'latin-1') for row in rows]
+
+    def info(self, verbose=True):
+        """Prints information about the field.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            If true, display extra information about the field.
+
+        """
+        if verbose:
+            print('Field: {},  shape = {},  dtype = {},  (ragged)'
+                  .format(self.name, str(self.shape), str(self.type)))
+
+    def __str__(self):
+        s = "RaggedFieldLoader: <HDF5 group \"{}\": shape {}, type \"{}\">" \
+            .format(self.name, str(self.shape), self.type.str)
+        return s
+
+
+class StringFieldLoader(object):
+    """Base loader class of a string field stored with a compressed encoding.
+
+    String fields are usually stored as matrices of ascii codes padded with
+    zeros (see dbcollection.utils.string_ascii.convert_str_to_ascii()).
+    Encoded string fields are stored as a group of datasets instead, and this
+    class behaves like the FieldLoader of such a matrix: get() returns the
+    padded ascii codes of the rows, or the decoded strings if convert_to_str
+    is True.
+
+    Subclasses implement _get_strings() (and may override _get_ascii()).
+
+    Parameters
+    ----------
+    hdf5_group : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the datasets of the field are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the datasets of the field.
+
+    Attributes
+    ----------
+    hdf5_handler : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    set : str
+        Name of the set.
+    name : str
+        Name of the field.
+    type : type
+        Type of the field's data (np.uint8).
+    original_type : type
+        Type of the field's data (np.uint8).
+    shape : tuple
+        Shape of the field's data as a padded matrix of ascii codes.
+    fillvalue : int
+        Value used to pad the strings.
+    obj_id : int
+        Identifier of the field if contained in the 'object_ids' list.
+    parts : dict
+        Loaders of the datasets of the field's group.
+
+    """
+
+    encoding = None
+
+    def __init__(self, hdf5_group, obj_id=None, block_cache=None, file_handler=None,
+                 num_decode_threads=DEFAULT_NUM_DECODE_THREADS, memory_policy=None,
+                 access_stats=None):
+        """Initialize class."""
+        assert hdf5_group, 'Must input a valid hdf5 group.'
+
+        self.hdf5_handler = hdf5_group
+        self.parts = {name: get_field_loader(get_hdf5_field(hdf5_group, name, file_handler), None,
+                                             block_cache, file_handler, num_decode_threads,
+                                             memory_policy, access_stats)
+                      for name in hdf5_group}
+        self.set = hdf5_group.name.split('/')[1]
+        self.name = hdf5_group.name.split('/')[-1]
+        self.type = np.dtype(np.uint8)
+        self.original_type = self.type
+        self.fillvalue = 0
+        self.shape = (int(hdf5_group.attrs['num_rows']), int(hdf5_group.attrs['max_length']) + 1)
+        self.obj_id = obj_id
+        self.file_handler = file_handler
+        self._string_index = None
+
+    def _rebind(self, hdf5_group):
+        """Replaces the hdf5 group/datasets handlers (e.g., after reopening the file)."""
+        self.hdf5_handler = hdf5_group
+        for name, loader in self.parts.items():
+            loader._rebind(get_hdf5_field(hdf5_group, name, self.file_handler))
+
+    def get(self, index=None, convert_to_str=False):
+        """Retrieves the string(s) of the field as ascii codes (or decoded).
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the row(s). If no index is used,
+            it returns all rows.
+        convert_to_str : bool, optional
+            Convert the output data into a string.
+
+        Returns
+        -------
+        np.ndarray/list/str
+            Numpy array with the ascii codes of the string(s), padded with
+            zeros. If convert_to_str is set to True, it returns a string
+            or list of strings.
+
+        Raises
+        ------
+        TypeError
+            If the index type is not supported.
+        IndexError
+            If an index is out of range.
+
+        """
+        if self.file_handler is not None:
+            self.file_handler.check()
+        rows = None if index is None else normalize_index(index, len(self))
+        if rows is None:
+            rows = np.arange(len(self))
+        elif isinstance(rows, int):
+            data = self.get(np.array([rows]), convert_to_str)
+            return data[0]
+        elif isinstance(rows, slice):
+            rows = np.arange(rows.start, rows.stop, rows.step)
+        rows = np.asarray(rows, dtype=np.int64)
+        if convert_to_str:
+            return self._get_strings(rows)
+        return self._get_ascii(rows)
+
+    def _get_strings(self, rows):
+        """Returns the decoded strings of an array of rows."""
+        raise NotImplementedError
+
+    def _get_ascii(self, rows):
+        """Returns the ascii codes of an array of rows as a matrix padded with zeros."""
+        strings = self._get_strings(rows)
+        data = np.zeros((len(strings), self.shape[1]), dtype=np.uint8)
+        for i, string in enumerate(strings):
+            encoded = ensure_binary(string, 'latin-1')
+            data[i, :len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+        return data
+
+    def index_of(self, value):
+        """Retrieves the row of a string in the field.
+
+        Parameters
+        ----------
+        value : str
+            String to look up.
+
+        Returns
+        -------
+        int
+            Index of the (first) row containing the string.
+
+        Raises
+        ------
+        KeyError
+            If the string does not exist in the field.
+
+        """
+        if self._string_index is None:
+            string_index = {}
+            for row, string in enumerate(self.get(convert_to_str=True)):
+                string_index.setdefault(string, row)
+            self._string_index = string_index
+        try:
+            return self._string_index[value]
+        except KeyError:
+            raise KeyError('\'{}\' does not exist in the \'{}\' field.'.format(value, self.name))
+
+    def size(self):
+        """Size of the field as a padded matrix of ascii codes.
+
+        Returns
+        -------
+        tuple
+            Number of strings and size of the biggest string (plus one).
+
+        """
+        return self.shape
+
+    def object_field_id(self):
+        """Retrieves the index position of the field in the 'object_ids' list.
+
+        Returns
+        -------
+        int
+            Index of the field in the 'object_ids' list.
+
+        """
+        return self.obj_id
+
+    def info(self, verbose=True):
+        """Prints information about the field.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            If true, display extra information about the field.
+
+        """
+        if verbose:
+            print('Field: {},  shape = {},  dtype = {},  ({} strings)'
+                  .format(self.name, str(self.shape), str(self.type), self.encoding))
+
+    def _set_to_memory(self, is_in_memory):
+        for loader in self.parts.values():
+            loader.to_memory = is_in_memory
+
+    def _get_to_memory(self):
+        """Loads the datasets of the field to memory (if True)."""
+        return all(loader.to_memory for loader in self.parts.values())
+
+    to_memory = property(_get_to_memory, _set_to_memory)
+
+    def _set_to_mmap(self, is_in_mmap):
+        for loader in self.parts.values():
+            loader.to_mmap = is_in_mmap
+
+    def _get_to_mmap(self):
+        """Memory-maps the datasets of the field (if True)."""
+        return all(loader.to_mmap for loader in self.parts.values())
+
+    to_mmap = property(_get_to_mmap, _set_to_mmap)
+
+    def _set_to_shared_memory(self, is_in_shared_memory):
+        for loader in self.parts.values():
+            loader.to_shared_memory = is_in_shared_memory
+
+    def _get_to_shared_memory(self):
+        """Stores the datasets of the field in shared memory (if True)."""
+        return all(loader.to_shared_memory for loader in self.parts.values())
+
+    to_shared_memory = property(_get_to_shared_memory, _set_to_shared_memory)
+
+    def __getitem__(self, index):
+        return self.get(index)
+
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            Number of strings
+
+        """
+        return self.shape[0]
+
+    def __str__(self):
+        s = "{}: <HDF5 group \"{}\": shape {}, type \"{}\">" \
+            .format(type(self).__name__, self.name, str(self.shape), self.type.str)
+        return s
+
+    def __repr__(self):
+        return str(self)
+
+
+class DictionaryFieldLoader(StringFieldLoader):
+    """Loader class of a string field stored with a dictionary encoding.
+
+    The distinct strings of the field are stored once ('dictionary') and
+    each row stores the position of its string ('codes'). The dictionary
+    is decoded once and the rows are retrieved by looking up their codes.
+
+    Parameters
+    ----------
+    hdf5_group : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the datasets of the field are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the datasets of the field.
+
+    """
+
+    encoding = HDF5_DICTIONARY_ENCODING
+
+    def __init__(self, *args, **kwargs):
+        """Initialize class."""
+        super(DictionaryFieldLoader, self).__init__(*args, **kwargs)
+        self._dictionary = None
+        self._dictionary_ascii = None
+
+    def _get_dictionary(self):
+        """Returns the ascii codes and the decoded strings of the dictionary (read only once)."""
+        if self._dictionary is None:
+            self._dictionary_ascii = np.asarray(self.parts['dictionary'].get())
+            self._dictionary = convert_ascii_rows_to_str(self._dictionary_ascii)
+        return self._dictionary_ascii, self._dictionary
+
+    def _get_strings(self, rows):
+        _, dictionary = self._get_dictionary()
+        return [dictionary[code] for code in self.parts['codes'].get(rows).tolist()]
+
+    def _get_ascii(self, rows):
+        dictionary_ascii, _ = self._get_dictionary()
+        return dictionary_ascii[self.parts['codes'].get(rows)]
+
+
+class FrontCodedFieldLoader(StringFieldLoader):
+    """Loader class of a string field stored with front coding (prefix compression).
+
+    The strings are stored in blocks: the first string of a block is stored
+    whole and the others store the length of the prefix shared with the
+    previous string ('prefix_lengths') and the rest of the string
+    ('suffixes'). The blocks of the requested rows are read with a single
+    (batched) read per dataset and decoded from their first string.
+
+    Parameters
+    ----------
+    hdf5_group : h5py._hl.group.Group
+        hdf5 group object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides if the datasets of the field are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the datasets of the field.
+
+    Attributes
+    ----------
+    block_size : int
+        Number of strings per block.
+
+    """
+
+    encoding = HDF5_FRONT_CODED_ENCODING
+
+    def __init__(self, *args, **kwargs):
+        """Initialize class."""
+        super(FrontCodedFieldLoader, self).__init__(*args, **kwargs)
+        self.block_size = int(self.hdf5_handler.attrs['block_size'])
+
+    def _get_strings(self, rows):
+        if len(rows) == 0:
+            return []
+        blocks = np.unique(rows // self.block_size)
+        block_rows = (blocks[:, None] * self.block_size + np.arange(self.block_size)).ravel()
+        block_rows = block_rows[block_rows < len(self)]
+        strings = self._decode_rows(block_rows)
+        if len(block_rows) == len(rows) and np.array_equal(block_rows, rows):
+            return [ensure_str(string, 'latin-1') for string in strings]
+        positions = np.searchsorted(block_rows, rows).tolist()
+        return [ensure_str(strings[position], 'latin-1') for position in positions]
+
+    def _decode_rows(self, rows):
+        """Decodes the strings of whole blocks of (sorted) rows into bytes."""
+        if rows[-1] - rows[0] + 1 == len(rows):
+            rows = slice(int(rows[0]), int(rows[-1]) + 1)
+            blocks = slice(rows.start // self.block_size, (rows.stop - 1) // self.block_size + 1)
+            start, stop = self.parts['block_offsets'].get(slice(blocks.start, blocks.stop + 1))[[0, -1]]
+            data = self.parts['suffixes'].get(slice(int(start), int(stop)))
+        else:
+            blocks = np.unique(rows // self.block_size)
+            value_rows, _ = get_csr_value_rows(self.parts['block_offsets'].get(blocks),
+                                               self.parts['block_offsets'].get(blocks + 1))
+            data = self.parts['suffixes'].get(value_rows)
+        data = np.asarray(data, dtype=np.uint8).tobytes()
+        prefix_lengths = self.parts['prefix_lengths'].get(rows).tolist()
+        suffix_lengths = self.parts['suffix_lengths'].get(rows).tolist()
+        strings = []
+        previous = b''
+        position = 0
+        for prefix_length, suffix_length in zip(prefix_lengths, suffix_lengths):
+            previous = previous[:prefix_length] + data[position:position + suffix_length]
+            position += suffix_length
+            strings.append(previous)
+        return strings
+
+
+def get_hdf5_field(hdf5_group, name, file_handler=None):
+    """Returns the hdf5 object of a field, opening datasets with the chunk cache of their file."""
+    return hdf5_get_object(hdf5_group, name, getattr(file_handler, 'chunk_cache', None))
+
+
+def get_field_loader(hdf5_object, obj_id=None, block_cache=None, file_handler=None,
+                     num_decode_threads=DEFAULT_NUM_DECODE_THREADS, memory_policy=None,
+                     access_stats=None):
+    """Returns the loader of a field according to how it is stored in the hdf5 file.
+
+    Parameters
+    ----------
+    hdf5_object : h5py._hl.dataset.Dataset/h5py._hl.group.Group
+        hdf5 object handler of the field.
+    obj_id : int, optional
+        Position of the field in 'object_fields'.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides which fields are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the field.
+
+    Returns
+    -------
+    FieldLoader/CSRFieldLoader/RaggedFieldLoader/StringFieldLoader
+        Loader of the field.
+
+    Raises
+    ------
+    TypeError
+        If the field is stored with an unknown encoding.
+
+    """
+    encoding = hdf5_get_encoding(hdf5_object)
+    if encoding is None:
+        return FieldLoader(hdf5_object, obj_id, block_cache, file_handler, num_decode_threads,
+                           memory_policy=memory_policy, access_stats=access_stats)
+    elif encoding == HDF5_CSR_ENCODING:
+        return CSRFieldLoader(hdf5_object, obj_id, block_cache, file_handler, num_decode_threads,
+                              memory_policy, access_stats)
+    elif encoding == HDF5_RAGGED_ENCODING:
+        return RaggedFieldLoader(hdf5_object, obj_id, block_cache, file_handler,
+                                 num_decode_threads, memory_policy, access_stats)
+    elif encoding == HDF5_DICTIONARY_ENCODING:
+        return DictionaryFieldLoader(hdf5_object, obj_id, block_cache, file_handler,
+                                     num_decode_threads, memory_policy, access_stats)
+    elif encoding == HDF5_FRONT_CODED_ENCODING:
+        return FrontCodedFieldLoader(hdf5_object, obj_id, block_cache, file_handler,
+                                     num_decode_threads, memory_policy, access_stats)
+    else:
+        raise TypeError('Unknown encoding of field \'{}\': {}.'.format(hdf5_object.name, encoding))
+
+
 class SetLoader(object):
     """Set metadata loader class.
 
@@ -249,6 +1477,21 @@ class SetLoader(object):
     ----------
     hdf5_group : h5py._hl.group.Group
         hdf5 group object handler.
+    block_cache : BlockCache, optional
+        Cache of decompressed chunks shared by the fields of a file.
+    file_handler : HDF5FileHandler, optional
+        Handler of the hdf5 file. Used to reopen the file in forked processes.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks of large reads.
+    catalog : dict, optional
+        Catalog of the set's fields (see hdf5_build_catalog()). Avoids
+        reading the set's metadata from the file.
+    memory_policy : MemoryPolicy, optional
+        Policy that decides which fields are kept in memory.
+    access_stats : AccessStats, optional
+        Collector of statistics of the reads of the set.
+    upcast : bool, optional
+        Converts the data of narrowed fields to their original type (if True).
 
     Attributes
     ----------
@@ -256,25 +1499,37 @@ class SetLoader(object):
         hdf5 group object handler.
     set : str
         Name of the set.
-    fields : tuple
-        List of all field names of the set.
+    fields : LazyLoaderDict
+        Field loaders of the set. They are created when first accessed.
     object_fields : tuple
         List of all field names of the set contained by the 'object_ids' list.
     nelems : int
         Number of rows in 'object_ids'.
+    block_cache : BlockCache
+        Cache of decompressed chunks used when reading data from disk.
 
     """
 
-    def __init__(self, hdf5_group):
+    def __init__(self, hdf5_group, block_cache=None, file_handler=None,
+                 num_decode_threads=DEFAULT_NUM_DECODE_THREADS, catalog=None, memory_policy=None,
+                 access_stats=None, upcast=False):
         """Initialize class."""
         assert hdf5_group, 'Must input a valid hdf5 group'
 
         self.hdf5_group = hdf5_group
+        self.block_cache = block_cache
+        self.file_handler = file_handler
+        self.num_decode_threads = num_decode_threads
+        self.catalog = catalog
+        self.memory_policy = memory_policy
+        self.access_stats = access_stats
+        self.upcast = upcast
         self.set = self._get_set_name()
         self.object_fields = self._get_object_fields()
         self.nelems = self._get_num_elements()
         self._fields = self._get_field_names()
-        self.fields = self._load_hdf5_fields()  # add all hdf5 datasets as data fields
+        self.fields = LazyLoaderDict(self._fields, self._load_hdf5_field)
+        self._query = None
 
         self._fields_info = []
         self._lists_info = []
@@ -285,6 +1540,8 @@ class SetLoader(object):
         return str_split[-1]
 
     def _get_object_fields(self):
+        if self.catalog is not None:
+            return list(self.catalog['object_fields'])
         object_fields_data = self.hdf5_group['object_fields'].value
         output = convert_ascii_to_str(object_fields_data)
         if type(output) == 'string':
@@ -292,17 +1549,33 @@ class SetLoader(object):
         return output
 
     def _get_field_names(self):
+        if self.catalog is not None:
+            return tuple(sorted(self.catalog['fields']))
         return tuple(self.hdf5_group.keys())
 
     def _get_num_elements(self):
+        if self.catalog is not None:
+            return self.catalog['fields']['object_ids']['shape'][0]
         return len(self.hdf5_group['object_ids'])
 
-    def _load_hdf5_fields(self):
-        fields = {}
-        for field in self._fields:
-            obj_id = self._get_obj_id_field(field)
-            fields[field] = FieldLoader(self.hdf5_group[field], obj_id)
-        return fields
+    def _load_hdf5_field(self, field):
+        """Creates the loader of a field."""
+        if self.file_handler is not None:
+            self.file_handler.check()
+        obj_id = self._get_obj_id_field(field)
+        hdf5_field = get_hdf5_field(self.hdf5_group, field, self.file_handler)
+        field_loader = get_field_loader(hdf5_field, obj_id, self.block_cache,
+                                        self.file_handler, self.num_decode_threads,
+                                        self.memory_policy, self.access_stats)
+        if isinstance(field_loader, (FieldLoader, CSRFieldLoader)):
+            field_loader.upcast = self.upcast
+        return field_loader
+
+    def _rebind(self, hdf5_group):
+        """Replaces the hdf5 group/datasets handlers (e.g., after reopening the file)."""
+        self.hdf5_group = hdf5_group
+        for field, field_loader in self.fields.loaded().items():
+            field_loader._rebind(get_hdf5_field(hdf5_group, field, self.file_handler))
 
     def _get_obj_id_field(self, field):
         if field in self.object_fields:
@@ -321,9 +1594,9 @@ class SetLoader(object):
         ----------
         field : str
             Field name.
-        index : int/list/tuple, optional
+        index : int/list/tuple/slice/np.ndarray, optional
             Index number of the field. If it is a list, returns the data
-            for all the value indexes of that list.
+            for all the value indexes of that list (in the same order).
         convert_to_str : bool, optional
             Convert the output data into a string.
             Warning: output must be of type np.uint8
@@ -347,6 +1620,37 @@ class SetLoader(object):
         except KeyError:
             raise KeyError('\'{}\' does not exist in the \'{}\' set.'.format(field, self.set))
 
+    def get_list(self, field, index=None):
+        """Retrieves list(s) of a list field (e.g., 'list_boxes_per_image') without padding.
+
+        Works with list fields stored as padded matrices and with
+        CSR-encoded list fields.
+
+        Parameters
+        ----------
+        field : str
+            Field name.
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the list(s). If no index is used,
+            it returns all lists.
+
+        Returns
+        -------
+        np.ndarray/list
+            Numpy array with the values of a list if the index is an int,
+            or a list of numpy arrays otherwise.
+
+        Raises
+        ------
+        KeyError
+            If the field does not exist in the list.
+
+        """
+        assert field, 'Must input a valid field name.'
+        if field not in self.fields:
+            raise KeyError('\'{}\' does not exist in the \'{}\' set.'.format(field, self.set))
+        return self.fields[field].get_list(index)
+
     def object(self, index=None, convert_to_value=False):
         """Retrieves a list of all fields' indexes/values of an object composition.
 
@@ -358,7 +1662,7 @@ class SetLoader(object):
 
         Parameters
         ----------
-        index : int/list/tuple, optional
+        index : int/list/tuple/slice/np.ndarray, optional
             Index number of the field. If it is a list, returns the data
             for all the value indexes of that list. If no index is used,
             it returns the entire data field array.
@@ -373,9 +1677,18 @@ class SetLoader(object):
             a list of data arrays/values.
 
         """
+        if self.access_stats is None or not self.access_stats.enabled:
+            indexes = self._get_object_indexes(index)
+            if convert_to_value:
+                indexes = self._convert(indexes)
+            return indexes
+        start = default_timer()
         indexes = self._get_object_indexes(index)
+        num_objects = 1 if np.ndim(indexes) < 2 else len(indexes)
         if convert_to_value:
-            indexes = self._convert(indexes.tolist())
+            indexes = self._convert(indexes)
+        self.access_stats.record_call(self.set, 'object_ids', 'object', num_objects, 0,
+                                      default_timer() - start)
         return indexes
 
     def _get_object_indexes(self, index):
@@ -388,9 +1701,12 @@ class SetLoader(object):
         value for each field in 'object_ids' for a certain index(es), and then it
         groups the fetches data into a single list.
 
+        The values are fetched with a single (batched) read per field instead of
+        one read per object and field.
+
         Parameters
         ----------
-        index : list
+        index : list/np.ndarray
             List of indexes of data fields.
 
         Returns
@@ -404,25 +1720,212 @@ class SetLoader(object):
             If index is not a list of ints or a list of lists.
 
         """
-        assert index, 'Must input a valid index.'
-        if isinstance(index[0], int):
-            output = self._convert_to_value_single_object(index)
-        elif isinstance(index[0], list):
-            output = []
-            for idx in index:
-                output.append(self._convert_to_value_single_object(idx))
+        object_ids = np.asarray(index)
+        assert object_ids.size > 0, 'Must input a valid index.'
+        if not np.issubdtype(object_ids.dtype, np.integer):
+            raise TypeError("Invalid input index format.")
+        if object_ids.ndim == 1:
+            output = self._convert_to_value_objects(object_ids[np.newaxis])[0]
+        elif object_ids.ndim == 2:
+            output = self._convert_to_value_objects(object_ids)
         else:
             raise TypeError("Invalid input index format.")
         return output
 
-    def _convert_to_value_single_object(self, idx):
-        data = []
-        for i, field in enumerate(self.object_fields):
-            if idx[i] >= 0:
-                data.append(self.get(field, idx[i]))
-            else:
-                data.append([])  # undefined index retrieves an empty list
-        return data
+    def _convert_to_value_objects(self, object_ids):
+        columns, masks = self._get_object_columns(object_ids, self.object_fields)
+        start = default_timer()
+        output = self._group_object_values(object_ids, columns, masks)
+        if self.access_stats is not None and self.access_stats.enabled:
+            self.access_stats.record_conversion(self.set, 'object_ids', 'object',
+                                                default_timer() - start)
+        return output
+
+    def _group_object_values(self, object_ids, columns, masks):
+        """Groups the values of the fields of each object into a list (python objects)."""
+        output = []
+        for i in range(len(object_ids)):
+            data = []
+            for field in self.object_fields:
+                if masks[field][i]:
+                    data.append(columns[field][i])
+                else:
+                    data.append([])  # undefined index retrieves an empty list
+            output.append(data)
+        return output
+
+    def object_columns(self, index=None, fields=None, as_structured=False):
+        """Retrieves the values of the fields of a batch of objects column-wise.
+
+        This method reads the 'object_ids' rows of the objects and then fetches
+        the values of each referenced field with a single (batched) read. Only the
+        selected fields are read from disk.
+
+        Parameters
+        ----------
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the object(s). If no index is used,
+            it returns the values of all objects.
+        fields : list/tuple, optional
+            Names of the fields (in 'object_fields') to retrieve.
+            Defaults to all fields in 'object_fields'.
+        as_structured : bool, optional
+            If True, the values are returned as a numpy structured array
+            instead of a dictionary of arrays.
+
+        Returns
+        -------
+        dict/np.ndarray
+            Values of the fields with one row per object. Ragged fields are
+            lists of arrays (object columns of the structured array).
+        dict
+            Boolean array per field with False for the objects whose value is
+            undefined (-1 in 'object_ids'). These rows are filled with the
+            field's fill value (or are empty arrays, for ragged fields).
+
+        Raises
+        ------
+        KeyError
+            If a field is not contained in 'object_fields'.
+
+        """
+        object_ids = np.asarray(self._get_object_indexes(index))
+        if object_ids.ndim == 1:
+            object_ids = object_ids[np.newaxis]
+        if fields is None:
+            fields = self.object_fields
+        columns, masks = self._get_object_columns(object_ids, fields)
+        if as_structured:
+            columns = self._convert_columns_to_structured_array(columns, fields, len(object_ids))
+        return columns, masks
+
+    def _get_object_columns(self, object_ids, fields):
+        columns, masks = {}, {}
+        for field in fields:
+            ids = object_ids[:, self._get_object_field_position(field)]
+            masks[field] = ids >= 0
+            columns[field] = self._get_object_field_values(field, ids, masks[field])
+        return columns, masks
+
+    def _get_object_field_position(self, field):
+        try:
+            return self.object_fields.index(field)
+        except ValueError:
+            raise KeyError('\'{}\' is not contained in \'object_fields\'.'.format(field))
+
+    def _get_object_field_values(self, field, ids, mask):
+        field_loader = self.fields[field]
+        if mask.all():
+            return field_loader.get(ids)
+        if isinstance(field_loader, RaggedFieldLoader):
+            return self._get_ragged_object_field_values(field_loader, ids, mask)
+        values = np.empty((len(ids),) + field_loader.shape[1:], dtype=field_loader.type)
+        values[...] = field_loader.fillvalue
+        if mask.any():
+            values[mask] = field_loader.get(ids[mask])
+        return values
+
+    def _get_ragged_object_field_values(self, field_loader, ids, mask):
+        """Rows of a ragged field as a list of arrays (empty arrays for undefined rows)."""
+        dtype = field_loader.original_type if field_loader.upcast else field_loader.type
+        values = [np.empty((0,), dtype=dtype) for _ in range(len(ids))]
+        for i, row in zip(np.flatnonzero(mask), field_loader.get(ids[mask])):
+            values[i] = row
+        return values
+
+    def _convert_columns_to_structured_array(self, columns, fields, size):
+        """Stores the columns in a structured array (ragged fields are stored as object columns)."""
+        columns = {field: self._get_structured_column(columns[field], size) for field in fields}
+        dtype = [(str(field), columns[field].dtype, columns[field].shape[1:]) for field in fields]
+        output = np.empty(size, dtype=dtype)
+        for field in fields:
+            output[str(field)] = columns[field]
+        return output
+
+    def _get_structured_column(self, column, size):
+        if isinstance(column, np.ndarray):
+            return column
+        rows = np.empty(size, dtype=object)
+        for i, row in enumerate(column):
+            rows[i] = row
+        return rows
+
+    def iter_batches(self, fields, batch_size=1, shuffle=False, drop_last=False,
+                     prefetch=DEFAULT_PREFETCH, seed=None):
+        """Iterates over batches of rows of one or more fields.
+
+        The batches are read by a background thread that keeps the next
+        'prefetch' batches ready while the current one is being used.
+        Sequential batches of fields stored in chunks on disk are read in
+        chunk-aligned ranges of rows (see get_chunk_aligned_reader()), so
+        each chunk is read once whatever the batch size. Fields loaded into
+        memory are sliced without copying their data.
+
+        Parameters
+        ----------
+        fields : str/list/tuple
+            Name(s) of the field(s) to retrieve. All fields must have
+            the same number of rows.
+        batch_size : int, optional
+            Number of rows per batch.
+        shuffle : bool, optional
+            Shuffle the order of the rows.
+        drop_last : bool, optional
+            Drop the last batch if it has less than batch_size rows.
+        prefetch : int, optional
+            Number of batches read ahead in the background. If 0, the
+            batches are read when requested.
+        seed : int, optional
+            Seed of the random generator used to shuffle the rows.
+
+        Yields
+        ------
+        dict
+            Numpy arrays of the fields' rows of a batch.
+
+        Raises
+        ------
+        KeyError
+            If a field does not exist in the set.
+
+        """
+        read_batch, batches = self._get_batch_reader(fields, batch_size, shuffle, drop_last, seed)
+        return prefetch_batches(read_batch, batches, prefetch)
+
+    def _get_batch_reader(self, fields, batch_size=1, shuffle=False, drop_last=False, seed=None):
+        """Returns a function that reads the rows of a batch and the indexes of all batches."""
+        if isinstance(fields, string_types):
+            fields = (fields,)
+        assert fields, 'Must input a valid list of field names.'
+        field_loaders = self._get_field_loaders(fields)
+        num_rows = len(field_loaders[0])
+        assert all(len(field_loader) == num_rows for field_loader in field_loaders), \
+            'All fields must have the same number of rows.'
+        batches = get_batch_indexes(num_rows, batch_size, shuffle, drop_last, seed)
+        readers = [(field_loader.name, self._get_batch_field_reader(field_loader, shuffle))
+                   for field_loader in field_loaders]
+
+        def read_batch(index):
+            return {name: read_rows(index) for name, read_rows in readers}
+
+        return read_batch, batches
+
+    def _get_batch_field_reader(self, field_loader, shuffle):
+        """Reads the sequential batches of fields stored in chunks on disk with chunk-aligned reads."""
+        if shuffle or not isinstance(field_loader, FieldLoader) or not field_loader._chunked:
+            return field_loader.get
+        if field_loader.to_memory or field_loader.to_mmap or field_loader.to_shared_memory:
+            return field_loader.get
+        return get_chunk_aligned_reader(field_loader.get, field_loader._chunk_rows, len(field_loader))
+
+    def _get_field_loaders(self, fields):
+        field_loaders = []
+        for field in fields:
+            try:
+                field_loaders.append(self.fields[field])
+            except KeyError:
+                raise KeyError('\'{}\' does not exist in the \'{}\' set.'.format(field, self.set))
+        return field_loaders
 
     def size(self, field='object_ids'):
         """Size of a field.
@@ -489,6 +1992,127 @@ class SetLoader(object):
         except KeyError:
             raise KeyError('\'{}\' is not contained in \'object_fields\'.'.format(field))
 
+    def index_of(self, field, value):
+        """Retrieves the row of a string in a field.
+
+        Parameters
+        ----------
+        field : str
+            Name of the field (e.g., 'classes').
+        value : str
+            String to look up.
+
+        Returns
+        -------
+        int
+            Index of the (first) row containing the string.
+
+        Raises
+        ------
+        KeyError
+            If the field does not exist or does not contain the string.
+
+        """
+        assert field, 'Must input a valid field name.'
+        if field not in self.fields:
+            raise KeyError('\'{}\' does not exist in the \'{}\' set.'.format(field, self.set))
+        return self.fields[field].index_of(value)
+
+    def query(self, **conditions):
+        """Retrieves the indexes of the objects that satisfy all conditions.
+
+        The conditions are evaluated over the fields referenced by 'object_ids'
+        (e.g., 'category', 'area', 'iscrowd'). Results are cached in memory and
+        in files next to the hdf5 metadata file.
+
+        Parameters
+        ----------
+        conditions : dict
+            Conditions of the query. The keys are field names (in 'object_fields')
+            with an optional operator suffix: __eq, __ne, __lt, __le, __gt,
+            __ge or __in. String fields are compared with strings.
+
+        Returns
+        -------
+        np.ndarray
+            Sorted indexes of the objects.
+
+        Raises
+        ------
+        KeyError
+            If a field is not contained in 'object_fields'.
+
+        Examples
+        --------
+        >>> set_loader.query(category__in=['person', 'dog'], area__gt=1024, iscrowd=0)
+        array([   0,    5,   12, ...])
+
+        """
+        if self._query is None:
+            self._query = SetQuery(self)
+        return self._query.query(**conditions)
+
+    def to_arrow(self, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+        """Exports the rows of the set to an Arrow table.
+
+        The fields are read in chunks of rows. Numeric columns are wrapped
+        without copying, strings (ascii matrices) are decoded in bulk into
+        string columns, list fields ('list_*') become list columns and other
+        2D fields become fixed-size list columns.
+
+        Parameters
+        ----------
+        fields : str/list/tuple, optional
+            Name(s) of the field(s) to export. All fields must have the same
+            number of rows. By default, all fields with the same number of
+            rows as 'object_ids' are exported.
+        chunk_size : int, optional
+            Number of rows read at a time.
+
+        Returns
+        -------
+        pyarrow.Table
+            Rows of the set.
+
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed.
+        KeyError
+            If a field does not exist in the set.
+
+        """
+        return set_to_arrow(self, fields, chunk_size)
+
+    def to_pandas(self, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+        """Exports the rows of the set to a pandas DataFrame.
+
+        The fields are read in chunks of rows into preallocated columns.
+        Strings (ascii matrices) become 'str' columns, and list fields
+        ('list_*') and other 2D fields become columns of numpy arrays.
+
+        Parameters
+        ----------
+        fields : str/list/tuple, optional
+            Name(s) of the field(s) to export. All fields must have the same
+            number of rows. By default, all fields with the same number of
+            rows as 'object_ids' are exported.
+        chunk_size : int, optional
+            Number of rows read at a time.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Rows of the set.
+
+        Raises
+        ------
+        KeyError
+            If a field does not exist in the set.
+
+        """
+        return set_to_pandas(self, fields, chunk_size)
+
     def info(self):
         """Prints information about the data fields of a set.
 
@@ -591,6 +2215,109 @@ class SetLoader(object):
         return str(self)
 
 
+class LazyLoaderDict(Mapping):
+    """Read-only dictionary of loaders that are created when first accessed.
+
+    Loaders are created only once, even when first accessed concurrently by
+    several threads (e.g., field loaders registered in the memory policy).
+
+    Parameters
+    ----------
+    keys : list/tuple
+        Names of the loaders.
+    create_loader : callable
+        Function that receives a name and returns its loader.
+
+    """
+
+    def __init__(self, keys, create_loader):
+        """Initialize class."""
+        self._keys = tuple(keys)
+        self._create_loader = create_loader
+        self._loaders = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        if key not in self._loaders:
+            if key not in self._keys:
+                raise KeyError(key)
+            with self._lock:
+                if key not in self._loaders:
+                    self._loaders[key] = self._create_loader(key)
+        return self._loaders[key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def loaded(self):
+        """Returns a dictionary with the loaders created so far."""
+        return dict(self._loaders)
+
+
+class HDF5FileHandler(object):
+    """Process-aware handler of an hdf5 file opened for reading.
+
+    h5py file handlers cannot be shared between processes. This class keeps
+    track of the process that opened the file and lazily reopens it whenever
+    it is accessed from a different process (e.g., a forked worker).
+
+    Parameters
+    ----------
+    open_file : callable
+        Function with no arguments that opens and returns the hdf5 file.
+    on_open : callable, optional
+        Function called with the new hdf5 file handler every time the file
+        is (re)opened.
+
+    Attributes
+    ----------
+    chunk_cache : tuple
+        Size in bytes and number of slots of the chunk cache of the
+        datasets of the file (or None to use the defaults of the file).
+
+    """
+
+    def __init__(self, open_file, on_open=None):
+        """Initialize class."""
+        self._open_file = open_file
+        self._on_open = on_open
+        self.chunk_cache = None
+        self._file = None
+        self._pid = None
+
+    @property
+    def file(self):
+        """Returns the hdf5 file handler for the current process."""
+        if self._file is None or self._pid != os.getpid():
+            self._file = self._open_file()
+            self._pid = os.getpid()
+            if self._on_open is not None:
+                self._on_open(self._file)
+        return self._file
+
+    def check(self):
+        """Reopens the file if it was closed or opened by another process."""
+        if self._file is None or self._pid != os.getpid():
+            self.file
+
+    def is_open(self):
+        """Checks if the file is open in the current process."""
+        return self._file is not None and self._pid == os.getpid()
+
+    def close(self):
+        """Closes the file if it was opened by the current process."""
+        if self.is_open():
+            self._file.close()
+        self._file = None
+        self._pid = None
+
+
 class DataLoader(object):
     """Dataset metadata loader class.
 
@@ -606,7 +2333,28 @@ class DataLoader(object):
     data_dir : str
         Path of the dataset's data directory on disk.
     hdf5_filepath : str
-        Path of the metadata cache file stored on disk.
+        Path of the metadata cache file stored on disk, or a url opened
+        through a storage backend (e.g., 'https://host/coco/detection_2015.h5').
+    block_cache_size : int, optional
+        Size (in bytes) of the cache of decompressed chunks shared by all
+        fields of the file. Set it to 0 to disable the cache.
+    num_decode_threads : int, optional
+        Number of threads used to decompress gzip chunks when loading
+        fields into memory or reading large ranges of rows.
+    memory_budget : int/str, optional
+        Maximum size of the fields kept in memory by the memory policy
+        (e.g., 4294967296 or '4GB'). If None, fields are only kept in
+        memory when requested (to_memory=True).
+    policy : str, optional
+        Memory policy used with a memory budget. 'auto' keeps the most read
+        fields (per byte) in memory and moves cold fields back to disk/mmap;
+        small fields (e.g., 'classes', 'object_fields') are always kept in
+        memory. 'manual' disables the policy.
+    instrument : bool, optional
+        Record statistics of the reads of the fields (see stats()).
+    upcast : bool, optional
+        Converts the data of fields narrowed when written (see
+        dbc.process(..., narrow_dtypes=True)) to their original type.
 
     Attributes
     ----------
@@ -622,51 +2370,287 @@ class DataLoader(object):
         hdf5 file object handler.
     root_path : str
         Default data group of the hdf5 file.
-    sets : tuple
-        List of names of set splits (e.g. train, test, val, etc.)
+    sets : LazyLoaderDict
+        Loaders of the set splits (e.g. train, test, val, etc.). They
+        are created when first accessed.
     object_fields : dict
         Data field names for each set split.
+    block_cache : BlockCache
+        Cache of decompressed chunks shared by all fields of the file.
+    memory_policy : MemoryPolicy
+        Policy that decides which fields are kept in memory (or None).
+    access_stats : AccessStats
+        Collector of statistics of the reads of the fields.
+    upcast : bool
+        Converts the data of narrowed fields to their original type (if True).
 
     """
 
-    def __init__(self, name, task, data_dir, hdf5_filepath):
+    def __init__(self, name, task, data_dir, hdf5_filepath,
+                 block_cache_size=DEFAULT_BLOCK_CACHE_NBYTES,
+                 num_decode_threads=DEFAULT_NUM_DECODE_THREADS,
+                 memory_budget=None, policy='auto', instrument=False, upcast=False):
         """Initialize class."""
         assert name, 'Must input a valid dataset name.'
         assert task, 'Must input a valid task name.'
         assert data_dir, 'Must input a valid path for the data directory.'
         assert hdf5_filepath, 'Must input a valid path for the cache file.'
 
+        self._setup(name, task, data_dir, hdf5_filepath, block_cache_size, num_decode_threads,
+                    memory_budget=memory_budget, policy=policy, instrument=instrument,
+                    upcast=upcast)
+        self._load_set_loaders()
+
+    def _setup(self, name, task, data_dir, hdf5_filepath, block_cache_size,
+               num_decode_threads=DEFAULT_NUM_DECODE_THREADS, access_modes=None,
+               memory_budget=None, policy='auto', instrument=False, upcast=False):
+        """Sets up the loader's attributes without opening the hdf5 file."""
         self.db_name = name
         self.task = task
         self.data_dir = data_dir
         self.hdf5_filepath = hdf5_filepath
-        self.hdf5_file = self._load_hdf5_file()
+        self.block_cache_size = block_cache_size
+        self.block_cache = self._get_block_cache(block_cache_size)
+        self.num_decode_threads = num_decode_threads
+        self.memory_budget = memory_budget
+        self.policy = policy
+        self.memory_policy = get_memory_policy(memory_budget, policy)
+        self.access_stats = AccessStats(enabled=instrument)
+        self.upcast = upcast
         self.root_path = '/'
-        self._sets = self._get_sets()
-        self.object_fields = self._get_object_fields()
-
-        self.sets = self._get_set_loaders()
+        self._file_handler = HDF5FileHandler(self._load_hdf5_file, self._rebind_set_loaders)
+        self._access_modes = access_modes or {}
+        self._catalog = None
+        self._set_names = None
+        self._object_fields = None
+        self._set_loaders = None
+
+    def _get_block_cache(self, block_cache_size):
+        if block_cache_size:
+            return BlockCache(block_cache_size)
+        else:
+            return None
 
     def _load_hdf5_file(self):
-        return h5py.File(self.hdf5_filepath, 'r', libver='latest')
+        """Opens the hdf5 file (only once per process) and reads its catalog.
+
+        The chunk cache settings derived from the catalog are applied to each
+        dataset when its field loader is created (see get_hdf5_field()).
+        """
+        hdf5_file = open_hdf5_file(self.hdf5_filepath, libver='latest')
+        if self._catalog is None:
+            self._catalog = self._get_catalog(hdf5_file)
+        self._file_handler.chunk_cache = self._get_chunk_cache_settings()
+        return hdf5_file
+
+    def _get_chunk_cache_settings(self):
+        """Derive the hdf5 chunk cache size from the chunk shapes of the fields
+        and the storage profile of the file."""
+        if self._catalog is None:
+            self._load_set_loaders()
+        num_chunks = get_storage_profile_cache_chunks(self.storage_profile)
+        return get_chunk_cache_settings(get_catalog_chunk_nbytes(self._catalog), num_chunks)
+
+    @property
+    def storage_profile(self):
+        """Storage layout profile used to write the hdf5 file."""
+        if self._catalog is None:
+            self._load_set_loaders()
+        return self._catalog.get('storage_profile', DEFAULT_STORAGE_PROFILE)
+
+    def _get_catalog(self, hdf5_file):
+        """Reads the catalog of the file or builds it for files without one."""
+        catalog = hdf5_read_catalog(hdf5_file)
+        if catalog is None:
+            catalog = hdf5_build_catalog(hdf5_file)
+        return catalog
+
+    def _get_hdf5_file(self):
+        return self._file_handler.file
+
+    hdf5_file = property(_get_hdf5_file, doc="hdf5 file object handler of the current process.")
+
+    def _load_set_loaders(self):
+        """Sets up the (lazy) dictionary of set loaders (only once)."""
+        if self._set_loaders is None:
+            if self._catalog is None:
+                self._catalog = self._get_catalog(self.hdf5_file)
+            self._set_names = self._get_sets()
+            self._object_fields = self._get_object_fields()
+            self._set_loaders = LazyLoaderDict(self._set_names, self._get_set_loader)
+        return self._set_loaders
+
+    def _rebind_set_loaders(self, hdf5_file):
+        """Rebinds the existing set loaders to a newly opened hdf5 file."""
+        if self._set_loaders is not None:
+            for set_name, set_loader in self._set_loaders.loaded().items():
+                set_loader._rebind(hdf5_file[set_name])
+
+    def _get_set_loaders_process_safe(self):
+        self._file_handler.check()
+        return self._load_set_loaders()
+
+    sets = property(_get_set_loaders_process_safe, doc="Dictionary of set loaders.")
+
+    def _get_set_names(self):
+        self._load_set_loaders()
+        return self._set_names
+
+    _sets = property(_get_set_names)
+
+    def _get_object_fields_dict(self):
+        self._load_set_loaders()
+        return self._object_fields
+
+    object_fields = property(_get_object_fields_dict, doc="Data field names for each set split.")
 
     def _get_sets(self):
-        return tuple(sorted(self.hdf5_file['/'].keys()))
+        return tuple(sorted(self._catalog['sets']))
 
     def _get_object_fields(self):
         """# fetch list of field names that compose the object list."""
         object_fields = {}
-        for set_name in self._sets:
-            data = self.hdf5_file['/{}/object_fields'.format(set_name)].value
-            object_fields[set_name] = tuple(convert_ascii_to_str(data))
+        for set_name in self._set_names:
+            object_fields[set_name] = tuple(self._catalog['sets'][set_name]['object_fields'])
         return object_fields
 
-    def _get_set_loaders(self):
-        """Return a dictionary with list of set loaders."""
-        sets = {}
-        for set_name in self._sets:
-            sets[set_name] = SetLoader(self.hdf5_file[set_name])
-        return sets
+    def _get_set_loader(self, set_name):
+        """Creates the loader of a set."""
+        set_loader = SetLoader(self.hdf5_file[set_name], self.block_cache, self._file_handler,
+                               self.num_decode_threads, self._catalog['sets'][set_name],
+                               self.memory_policy, self.access_stats, self.upcast)
+        self._set_access_modes(set_loader, self._access_modes.get(set_name, {}))
+        return set_loader
+
+    def _get_access_modes(self):
+        """Returns the fields that are stored in memory or memory-mapped by the user."""
+        if self._set_loaders is None:
+            return self._access_modes
+        access_modes = {}
+        for set_name in self._access_modes:
+            if set_name not in self._set_loaders.loaded():
+                access_modes[set_name] = self._access_modes[set_name]
+        for set_name, set_loader in self._set_loaders.loaded().items():
+            for field, field_loader in set_loader.fields.loaded().items():
+                if self._is_managed_by_memory_policy(field_loader):
+                    continue
+                if field_loader.to_shared_memory:
+                    access_modes.setdefault(set_name, {})[field] = 'shared'
+                elif field_loader.to_memory:
+                    access_modes.setdefault(set_name, {})[field] = 'memory'
+                elif field_loader.to_mmap:
+                    access_modes.setdefault(set_name, {})[field] = 'mmap'
+        return access_modes
+
+    def _is_managed_by_memory_policy(self, field_loader):
+        if self.memory_policy is None:
+            return False
+        if isinstance(field_loader, CSRFieldLoader):
+            return any(self.memory_policy.is_pinned(loader)
+                       for loader in (field_loader.values, field_loader.offsets))
+        if isinstance(field_loader, StringFieldLoader):
+            return any(self.memory_policy.is_pinned(loader) for loader in field_loader.parts.values())
+        return self.memory_policy.is_pinned(field_loader)
+
+    def _set_access_modes(self, set_loader, access_modes):
+        for field, mode in access_modes.items():
+            field_loader = set_loader.fields[field]
+            if mode == 'memory':
+                field_loader.to_memory = True
+            elif mode == 'mmap':
+                field_loader.to_mmap = True
+            elif mode == 'shared':
+                field_loader.to_shared_memory = True
+
+    def enable_stats(self, tracer=None):
+        """Starts recording statistics of the reads of the fields.
+
+        Parameters
+        ----------
+        tracer : callable, optional
+            Function called with a dictionary for each read event (see AccessStats).
+
+        """
+        self.access_stats.enable(tracer)
+
+    def disable_stats(self):
+        """Stops recording statistics of the reads of the fields."""
+        self.access_stats.disable()
+
+    def reset_stats(self):
+        """Clears the recorded statistics of the reads of the fields."""
+        self.access_stats.reset()
+
+    def stats(self):
+        """Returns the statistics of the reads of the fields.
+
+        Statistics are only recorded while enabled (see enable_stats()).
+
+        Returns
+        -------
+        list
+            List of dictionaries with the statistics of each set, field and
+            operation ('get' or 'object'), sorted by the total time spent. Each
+            contains the number of 'calls', 'rows' and 'nbytes' read, the total
+            time ('seconds'), the time spent reading/decompressing data from disk
+            ('read_seconds') and converting it to python objects ('convert_seconds'),
+            the number of 'disk_reads' and 'disk_nbytes', the 'cache_hits' and
+            'cache_misses' of the block cache, and the 'latency_histogram' of the
+            calls with its estimated 'latency_p50' and 'latency_p99'.
+
+        Examples
+        --------
+        >>> loader.enable_stats()
+        >>> data = loader.get('train', 'boxes', [0, 1, 2])
+        >>> loader.stats()[0]['field']
+        'boxes'
+
+        """
+        return self.access_stats.report()
+
+    def close(self):
+        """Closes the hdf5 file.
+
+        The file is reopened automatically if the loader is used again.
+
+        """
+        self._file_handler.close()
+
+    def is_open(self):
+        """Checks if the hdf5 file is open."""
+        return self._file_handler.is_open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        """Pickles the loader by its name, task and file path.
+
+        Opened hdf5 file handlers cannot be pickled, so the unpickled loader
+        reopens the file lazily in the process it is used. Fields stored in
+        memory or memory-mapped keep their access mode, and fields stored in
+        shared memory are attached to the same block in the new process.
+
+        """
+        return {
+            "name": self.db_name,
+            "task": self.task,
+            "data_dir": self.data_dir,
+            "hdf5_filepath": self.hdf5_filepath,
+            "block_cache_size": self.block_cache_size,
+            "num_decode_threads": self.num_decode_threads,
+            "access_modes": self._get_access_modes(),
+            "memory_budget": self.memory_budget,
+            "policy": self.policy,
+            "instrument": self.access_stats.enabled,
+            "upcast": self.upcast
+        }
+
+    def __setstate__(self, state):
+        self._setup(**state)
 
     def get(self, set_name, field, index=None, convert_to_str=False):
         """Retrieves data from the dataset's hdf5 metadata file.
@@ -681,9 +2665,9 @@ class DataLoader(object):
             Name of the set.
         field : str
             Name of the data field.
-        idx : int/list/tuple, optional
+        idx : int/list/tuple/slice/np.ndarray, optional
             Index number of the field. If it is a list, returns the data
-            for all the value indexes of that list.
+            for all the value indexes of that list (in the same order).
         convert_to_str : bool, optional
             Convert the output data into a string.
             Warning: output must be of type np.uint8
@@ -708,6 +2692,41 @@ class DataLoader(object):
         except KeyError:
             self._raise_error_invalid_set_name(set_name)
 
+    def get_list(self, set_name, field, index=None):
+        """Retrieves list(s) of a list field (e.g., 'list_boxes_per_image') without padding.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        field : str
+            Name of the list field.
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the list(s). If no index is used,
+            it returns all lists.
+
+        Returns
+        -------
+        np.ndarray/list
+            Numpy array with the values of a list if the index is an int,
+            or a list of numpy arrays otherwise.
+
+        Raises
+        ------
+        KeyError
+            If set name is not valid or does not exist.
+
+        Examples
+        --------
+        >>> loader.get_list('train', 'list_boxes_per_image', 0)
+        array([0, 1, 2], dtype=int32)
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].get_list(field, index)
+
     def _raise_error_invalid_set_name(self, set_name):
         raise KeyError("'{}' does not exist in the sets list: {}".format(set_name, self._sets))
 
@@ -724,7 +2743,7 @@ class DataLoader(object):
         ----------
         set_name : str
             Name of the set.
-        index : int/list/tuple, optional
+        index : int/list/tuple/slice/np.ndarray, optional
             Index number of the field. If it is a list, returns the data
             for all the value indexes of that list. If no index is used,
             it returns the entire data field array.
@@ -751,6 +2770,91 @@ class DataLoader(object):
         except KeyError:
             self._raise_error_invalid_set_name(set_name)
 
+    def object_columns(self, set_name, index=None, fields=None, as_structured=False):
+        """Retrieves the values of the fields of a batch of objects column-wise.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        index : int/list/tuple/slice/np.ndarray, optional
+            Index number of the object(s). If no index is used,
+            it returns the values of all objects.
+        fields : list/tuple, optional
+            Names of the fields (in 'object_fields') to retrieve.
+            Defaults to all fields in 'object_fields'.
+        as_structured : bool, optional
+            If True, the values are returned as a numpy structured array
+            instead of a dictionary of arrays.
+
+        Returns
+        -------
+        dict/np.ndarray
+            Values of the fields with one row per object.
+        dict
+            Boolean array per field with False for the objects whose
+            value is undefined.
+
+        Raises
+        ------
+        KeyError
+            If set name is not valid or does not exist.
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].object_columns(index, fields, as_structured)
+
+    def iter_batches(self, set_name, fields, batch_size=1, shuffle=False, drop_last=False,
+                     prefetch=DEFAULT_PREFETCH, seed=None):
+        """Iterates over batches of rows of one or more fields of a set.
+
+        The batches are read by a background thread that keeps the next
+        'prefetch' batches ready while the current one is being used.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        fields : str/list/tuple
+            Name(s) of the field(s) to retrieve. All fields must have
+            the same number of rows.
+        batch_size : int, optional
+            Number of rows per batch.
+        shuffle : bool, optional
+            Shuffle the order of the rows.
+        drop_last : bool, optional
+            Drop the last batch if it has less than batch_size rows.
+        prefetch : int, optional
+            Number of batches read ahead in the background. If 0, the
+            batches are read when requested.
+        seed : int, optional
+            Seed of the random generator used to shuffle the rows.
+
+        Yields
+        ------
+        dict
+            Numpy arrays of the fields' rows of a batch.
+
+        Raises
+        ------
+        KeyError
+            If set name is not valid or does not exist.
+
+        Examples
+        --------
+        >>> for batch in loader.iter_batches('train', ['image_filenames', 'labels'], 32,
+        ...                                  shuffle=True):
+        ...     train_step(batch['image_filenames'], batch['labels'])
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].iter_batches(fields, batch_size, shuffle, drop_last,
+                                                prefetch, seed)
+
     def size(self, set_name=None, field='object_ids'):
         """Size of a field.
 
@@ -862,6 +2966,141 @@ class DataLoader(object):
         except KeyError:
             self._raise_error_invalid_set_name(set_name)
 
+    def index_of(self, set_name, field, value):
+        """Retrieves the row of a string in a field of a set.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        field : str
+            Name of the field (e.g., 'classes').
+        value : str
+            String to look up.
+
+        Returns
+        -------
+        int
+            Index of the (first) row containing the string.
+
+        Raises
+        ------
+        KeyError
+            If the set or field do not exist or the field does not
+            contain the string.
+
+        Examples
+        --------
+        >>> loader.index_of('train', 'classes', 'dog')
+        5
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].index_of(field, value)
+
+    def query(self, set_name, **conditions):
+        """Retrieves the indexes of the objects of a set that satisfy all conditions.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        conditions : dict
+            Conditions of the query. The keys are field names (in 'object_fields')
+            with an optional operator suffix: __eq, __ne, __lt, __le, __gt,
+            __ge or __in.
+
+        Returns
+        -------
+        np.ndarray
+            Sorted indexes of the objects.
+
+        Raises
+        ------
+        KeyError
+            If the set does not exist or a field is not contained in 'object_fields'.
+
+        Examples
+        --------
+        >>> loader.query('train', category__in=['person'], area__gt=1024, iscrowd=0)
+        array([   0,    5,   12, ...])
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].query(**conditions)
+
+    def to_arrow(self, set_name, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+        """Exports the rows of a set to an Arrow table.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        fields : str/list/tuple, optional
+            Name(s) of the field(s) to export. By default, all fields with the
+            same number of rows as 'object_ids' are exported.
+        chunk_size : int, optional
+            Number of rows read at a time.
+
+        Returns
+        -------
+        pyarrow.Table
+            Rows of the set.
+
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed.
+        KeyError
+            If the set or a field do not exist.
+
+        Examples
+        --------
+        >>> table = loader.to_arrow('train', fields=['classes', 'boxes'])
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].to_arrow(fields, chunk_size)
+
+    def to_pandas(self, set_name, fields=None, chunk_size=DEFAULT_EXPORT_CHUNK_ROWS):
+        """Exports the rows of a set to a pandas DataFrame.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set.
+        fields : str/list/tuple, optional
+            Name(s) of the field(s) to export. By default, all fields with the
+            same number of rows as 'object_ids' are exported.
+        chunk_size : int, optional
+            Number of rows read at a time.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Rows of the set.
+
+        Raises
+        ------
+        KeyError
+            If the set or a field do not exist.
+
+        Examples
+        --------
+        >>> df = loader.to_pandas('train', fields=['classes', 'boxes'])
+
+        """
+        assert set_name, 'Must input a valid set name.'
+        if set_name not in self.sets:
+            self._raise_error_invalid_set_name(set_name)
+        return self.sets[set_name].to_pandas(fields, chunk_size)
+
     def info(self, set_name=None):
         """Prints information about all data fields of a set.
 
@@ -0,0 +1,217 @@
+"""
+Memory-budgeted policy to keep the most accessed fields of a loader in memory.
+"""
+
+
+import re
+import threading
+
+import numpy as np
+from six import string_types
+
+
+# Fields with up to this number of bytes (e.g., 'classes', 'object_fields') are always in memory.
+DEFAULT_PIN_NBYTES = 256 * 1024
+
+# Number of field reads between two updates of the fields kept in memory.
+DEFAULT_REBALANCE_INTERVAL = 256
+
+# Available policies: 'auto' manages the fields in memory, 'manual' leaves it to the user.
+MEMORY_POLICIES = ('auto', 'manual')
+
+_MEMORY_UNITS = {
+    '': 1, 'B': 1,
+    'K': 1024, 'KB': 1024,
+    'M': 1024 ** 2, 'MB': 1024 ** 2,
+    'G': 1024 ** 3, 'GB': 1024 ** 3,
+    'T': 1024 ** 4, 'TB': 1024 ** 4,
+}
+
+
+def parse_memory_size(size):
+    """Converts a memory size into a number of bytes.
+
+    Parameters
+    ----------
+    size : int/float/str
+        Number of bytes or a string with a number and a unit
+        (e.g., '512MB', '4GB', '1.5G').
+
+    Returns
+    -------
+    int
+        Number of bytes.
+
+    Raises
+    ------
+    ValueError
+        If the size is not valid.
+
+    Examples
+    --------
+    >>> parse_memory_size('4GB')
+    4294967296
+
+    """
+    if isinstance(size, string_types):
+        match = re.match(r'^\s*(\d+(?:\.\d*)?)\s*([a-zA-Z]*)\s*$', size)
+        if match is None or match.group(2).upper() not in _MEMORY_UNITS:
+            raise ValueError('Invalid memory size: \'{}\'.'.format(size))
+        size = float(match.group(1)) * _MEMORY_UNITS[match.group(2).upper()]
+    if size < 0:
+        raise ValueError('Invalid memory size: {}.'.format(size))
+    return int(size)
+
+
+def get_field_nbytes(field_loader):
+    """Returns the number of bytes of the data of a field."""
+    return int(np.prod(field_loader.shape, dtype=np.int64)) * np.dtype(field_loader.type).itemsize
+
+
+class MemoryPolicy(object):
+    """Keeps the most accessed fields of a loader in memory within a memory budget.
+
+    Field loaders register themselves when they are created and report each
+    read. Fields up to 'pin_nbytes' are always kept in memory. Every
+    'rebalance_interval' reads, the fields are ranked by the number of reads
+    per byte and the best ones are loaded into memory until the budget is
+    filled. Fields that are no longer selected are moved back to their
+    previous access mode (disk or memory-mapped).
+
+    Fields loaded into memory by the user (to_memory=True) are not managed
+    by the policy.
+
+    Parameters
+    ----------
+    memory_budget : int/str
+        Maximum number of bytes of the fields kept in memory by the policy
+        (e.g., 4294967296 or '4GB').
+    pin_nbytes : int, optional
+        Size (in bytes) of the fields that are always kept in memory.
+    rebalance_interval : int, optional
+        Number of reads between updates of the fields kept in memory.
+
+    Attributes
+    ----------
+    memory_budget : int
+        Maximum number of bytes of the fields kept in memory.
+    pin_nbytes : int
+        Size (in bytes) of the fields that are always kept in memory.
+    rebalance_interval : int
+        Number of reads between updates of the fields kept in memory.
+
+    """
+
+    def __init__(self, memory_budget, pin_nbytes=DEFAULT_PIN_NBYTES,
+                 rebalance_interval=DEFAULT_REBALANCE_INTERVAL):
+        """Initialize class."""
+        assert rebalance_interval > 0, 'Must input a rebalance interval greater than 0.'
+        self.memory_budget = parse_memory_size(memory_budget)
+        self.pin_nbytes = pin_nbytes
+        self.rebalance_interval = rebalance_interval
+        self._field_loaders = []
+        self._pinned = {}  # field loader id -> previous access mode ('disk' or 'mmap')
+        self._num_reads = 0
+        self._lock = threading.RLock()
+
+    def register(self, field_loader):
+        """Starts managing a field loader. Small fields are loaded into memory."""
+        with self._lock:
+            self._field_loaders.append(field_loader)
+            if get_field_nbytes(field_loader) <= self.pin_nbytes and not field_loader.to_memory:
+                self._pin(field_loader)
+
+    def record_read(self, field_loader):
+        """Counts a read of a field and periodically updates the fields in memory.
+
+        Reads can be recorded concurrently (e.g., by prefetch threads). The
+        counters are updated with the lock held and only the thread that
+        completes an interval rebalances the fields.
+        """
+        with self._lock:
+            field_loader.num_reads += 1
+            self._num_reads += 1
+            is_rebalance_due = self._num_reads % self.rebalance_interval == 0
+        if is_rebalance_due:
+            self.rebalance()
+
+    def rebalance(self):
+        """Loads the most accessed fields into memory and moves the others back."""
+        with self._lock:
+            selected = self._select_fields()
+            for field_loader in self._field_loaders:
+                if self.is_pinned(field_loader) and id(field_loader) not in selected:
+                    self._unpin(field_loader)
+            for field_loader in self._field_loaders:
+                if id(field_loader) in selected and not field_loader.to_memory:
+                    self._pin(field_loader)
+
+    def _select_fields(self):
+        """Ranks the fields by reads per byte and selects the best ones within the budget."""
+        selected, used_nbytes, candidates = set(), 0, []
+        for field_loader in self._field_loaders:
+            if field_loader.to_memory and not self.is_pinned(field_loader):
+                continue  # managed by the user
+            nbytes = get_field_nbytes(field_loader)
+            if nbytes <= self.pin_nbytes:
+                selected.add(id(field_loader))
+                used_nbytes += nbytes
+            elif field_loader.num_reads > 0:
+                candidates.append((field_loader.num_reads / float(nbytes), nbytes, field_loader))
+        candidates.sort(key=lambda candidate: -candidate[0])
+        for _, nbytes, field_loader in candidates:
+            if used_nbytes + nbytes <= self.memory_budget:
+                selected.add(id(field_loader))
+                used_nbytes += nbytes
+        return selected
+
+    def _pin(self, field_loader):
+        self._pinned[id(field_loader)] = 'mmap' if field_loader.to_mmap else 'disk'
+        field_loader.to_memory = True
+
+    def _unpin(self, field_loader):
+        mode = self._pinned.pop(id(field_loader))
+        if mode == 'mmap':
+            field_loader.to_mmap = True
+        else:
+            field_loader.to_memory = False
+
+    def is_pinned(self, field_loader):
+        """Checks if a field was loaded into memory by the policy."""
+        return id(field_loader) in self._pinned
+
+    def pinned_nbytes(self):
+        """Returns the number of bytes of the fields loaded into memory by the policy."""
+        return sum(get_field_nbytes(field_loader) for field_loader in self._field_loaders
+                   if self.is_pinned(field_loader))
+
+
+def get_memory_policy(memory_budget=None, policy='auto'):
+    """Creates the memory policy of a loader.
+
+    Parameters
+    ----------
+    memory_budget : int/str, optional
+        Maximum number of bytes of the fields kept in memory (e.g., '4GB').
+        If None, no policy is used.
+    policy : str, optional
+        'auto' manages the fields kept in memory within the budget,
+        'manual' leaves it to the user (to_memory/to_mmap).
+
+    Returns
+    -------
+    MemoryPolicy
+        Memory policy (or None).
+
+    Raises
+    ------
+    ValueError
+        If the policy or the memory budget are not valid.
+
+    """
+    if policy not in MEMORY_POLICIES:
+        raise ValueError('Invalid memory policy: \'{}\'. Available policies: {}.'
+                         .format(policy, MEMORY_POLICIES))
+    if memory_budget is None or policy == 'manual':
+        return None
+    return MemoryPolicy(memory_budget)
@@ -0,0 +1,275 @@
+"""
+Vectorized queries over the object fields of a set.
+"""
+
+
+import hashlib
+import json
+import operator
+import os
+
+import numpy as np
+from six import string_types
+
+from dbcollection.core.storage import is_local_hdf5_file
+from dbcollection.utils.csr import get_csr_value_rows
+from dbcollection.utils.file import rename_file
+from dbcollection.utils.memmap import get_sidecar_filename, is_sidecar_file_valid
+
+
+# Comparison operators available as suffixes of the query conditions (e.g., 'area__gt').
+QUERY_OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'in': None,
+}
+
+
+def parse_condition(key, value):
+    """Splits a query condition into a field name, an operator and a value.
+
+    Parameters
+    ----------
+    key : str
+        Field name with an optional operator suffix (e.g., 'area__gt').
+        Without a suffix, the 'eq' operator is used.
+    value : object
+        Value to compare with. The 'in' operator requires a list/tuple/set.
+
+    Returns
+    -------
+    tuple
+        Field name, operator name and value.
+
+    Raises
+    ------
+    TypeError
+        If the 'in' operator is not used with a list/tuple/set of values.
+
+    Examples
+    --------
+    >>> parse_condition('area__gt', 1024)
+    ('area', 'gt', 1024)
+    >>> parse_condition('category', 'person')
+    ('category', 'eq', 'person')
+
+    """
+    field, op = key, 'eq'
+    if '__' in key:
+        name, suffix = key.rsplit('__', 1)
+        if name and suffix in QUERY_OPERATORS:
+            field, op = name, suffix
+    if op == 'in':
+        if not isinstance(value, (list, tuple, set, frozenset, np.ndarray)):
+            raise TypeError('The \'in\' operator requires a list of values. Got {}.'
+                            .format(type(value)))
+        value = sorted(np.asarray(list(value)).tolist())
+    elif isinstance(value, np.generic):
+        value = value.item()
+    return field, op, value
+
+
+def get_condition_key(field, op, value):
+    """Returns a unique string identifier of a condition."""
+    key = json.dumps([field, op, value], sort_keys=True)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def build_inverted_index(ids, num_rows):
+    """Builds an inverted index from the rows of a field to the objects that reference them.
+
+    Parameters
+    ----------
+    ids : np.ndarray
+        Row of the field referenced by each object (-1 if undefined).
+    num_rows : int
+        Number of rows of the field.
+
+    Returns
+    -------
+    np.ndarray
+        Indexes of the objects sorted by the row they reference.
+    np.ndarray
+        Position in the first array where the objects of each row start
+        (plus the total size at the end).
+
+    """
+    order = np.argsort(ids, kind='mergesort').astype(np.int64)
+    sorted_ids = ids[order]
+    starts = np.searchsorted(sorted_ids, np.arange(num_rows + 1)).astype(np.int64)
+    first = np.searchsorted(sorted_ids, 0)  # skip objects with undefined (-1) rows
+    return order[first:], starts - first
+
+
+def get_inverted_index_objects(order, starts, rows):
+    """Returns the (sorted) indexes of the objects that reference any of the input rows."""
+    rows = np.asarray(rows, dtype=np.int64)
+    positions, _ = get_csr_value_rows(starts[rows], starts[rows + 1])
+    return np.sort(order[positions])
+
+
+class SetQuery(object):
+    """Query engine over the object fields of a set.
+
+    Conditions are evaluated with numpy on the rows of each field (e.g., the
+    80 categories of COCO) and then mapped to the objects through the columns
+    of 'object_ids'. Equality conditions use an inverted index (field row ->
+    objects). The results of each condition and the inverted indexes are cached
+    in memory and persisted in files next to the hdf5 metadata file, so they are
+    reused by other processes/jobs until the hdf5 file changes.
+
+    Parameters
+    ----------
+    set_loader : SetLoader
+        Loader of the set.
+    persist : bool, optional
+        Store/load the cached results in/from disk. Results of hdf5 files
+        opened through a storage backend (e.g., http) are only kept in memory.
+
+    """
+
+    def __init__(self, set_loader, persist=True):
+        """Initialize class."""
+        self.set_loader = set_loader
+        self.persist = persist and is_local_hdf5_file(set_loader.hdf5_group.file)
+        self._object_ids = {}
+        self._inverted_indexes = {}
+        self._masks = {}
+
+    def query(self, **conditions):
+        """Retrieves the indexes of the objects that satisfy all conditions.
+
+        Parameters
+        ----------
+        conditions : dict
+            Conditions of the query. The keys are field names (in 'object_fields')
+            with an optional operator suffix: __eq, __ne, __lt, __le, __gt,
+            __ge or __in.
+
+        Returns
+        -------
+        np.ndarray
+            Sorted indexes of the objects.
+
+        Raises
+        ------
+        KeyError
+            If a field is not contained in 'object_fields'.
+
+        """
+        mask = np.ones((self.set_loader.nelems,), dtype=bool)
+        for key in sorted(conditions):
+            field, op, value = parse_condition(key, conditions[key])
+            mask &= self._get_condition_mask(field, op, value)
+        return np.flatnonzero(mask)
+
+    def clear(self):
+        """Clears the results cached in memory."""
+        self._object_ids.clear()
+        self._inverted_indexes.clear()
+        self._masks.clear()
+
+    def _get_condition_mask(self, field, op, value):
+        key = get_condition_key(field, op, value)
+        if key not in self._masks:
+            filename = self._get_sidecar_filename('query', key)
+            mask = self._load_mask(filename)
+            if mask is None:
+                mask = self._compute_condition_mask(field, op, value)
+                self._save(filename, np.packbits(mask))
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def _compute_condition_mask(self, field, op, value):
+        ids = self._get_object_ids(field)
+        rows_mask = self._get_field_rows_mask(field, op, value)
+        if op in ('eq', 'in'):
+            order, starts = self._get_inverted_index(field)
+            mask = np.zeros((len(ids),), dtype=bool)
+            mask[get_inverted_index_objects(order, starts, np.flatnonzero(rows_mask))] = True
+            return mask
+        return (ids >= 0) & rows_mask[np.maximum(ids, 0)]
+
+    def _get_field_rows_mask(self, field, op, value):
+        """Evaluates a condition over all rows of a field."""
+        data = self._get_field_data(field, as_str=self._is_str_value(value))
+        if op == 'in':
+            return np.isin(data, value)
+        return np.asarray(QUERY_OPERATORS[op](data, value), dtype=bool)
+
+    @staticmethod
+    def _is_str_value(value):
+        """Strings are stored as uint8 arrays, so the value decides how to compare them."""
+        if isinstance(value, list):
+            return len(value) > 0 and isinstance(value[0], string_types)
+        return isinstance(value, string_types)
+
+    def _get_field_data(self, field, as_str=False):
+        field_loader = self.set_loader.fields[field]
+        if as_str:
+            assert field_loader.type == np.uint8 and len(field_loader.shape) == 2, \
+                '\'{}\' is not a string field.'.format(field)
+            return np.array(field_loader.get(convert_to_str=True), ndmin=1)
+        data = np.asarray(field_loader.get())
+        if data.ndim == 2 and data.shape[1] == 1:
+            data = data[:, 0]
+        assert data.ndim == 1, 'Only 1D fields can be queried. \'{}\' has shape {}.' \
+            .format(field, data.shape)
+        return data
+
+    def _get_object_ids(self, field):
+        """Returns the column of 'object_ids' of a field."""
+        if field not in self._object_ids:
+            position = self.set_loader._get_object_field_position(field)
+            object_ids = self.set_loader.fields['object_ids'].get()
+            self._object_ids[field] = np.asarray(object_ids[:, position], dtype=np.int64)
+        return self._object_ids[field]
+
+    def _get_inverted_index(self, field):
+        if field not in self._inverted_indexes:
+            filename = self._get_sidecar_filename('index', field)
+            index = self._load_inverted_index(filename, field)
+            if index is None:
+                num_rows = len(self.set_loader.fields[field])
+                index = build_inverted_index(self._get_object_ids(field), num_rows)
+                self._save(filename, np.concatenate(index))
+            self._inverted_indexes[field] = index
+        return self._inverted_indexes[field]
+
+    def _get_sidecar_filename(self, *names):
+        hdf5_filepath = self.set_loader.hdf5_group.file.filename
+        return get_sidecar_filename(hdf5_filepath, self.set_loader.set, *names)
+
+    def _is_sidecar_file_valid(self, filename):
+        hdf5_filepath = self.set_loader.hdf5_group.file.filename
+        return self.persist and is_sidecar_file_valid(filename, hdf5_filepath)
+
+    def _load_mask(self, filename):
+        if not self._is_sidecar_file_valid(filename):
+            return None
+        bits = np.load(filename)
+        return np.unpackbits(bits)[:self.set_loader.nelems].astype(bool)
+
+    def _load_inverted_index(self, filename, field):
+        if not self._is_sidecar_file_valid(filename):
+            return None
+        data = np.load(filename)
+        num_objects = len(data) - (len(self.set_loader.fields[field]) + 1)
+        return data[:num_objects], data[num_objects:]
+
+    def _save(self, filename, data):
+        """Stores an array in disk. Failures (e.g., read-only directories) are ignored."""
+        if not self.persist:
+            return
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        try:
+            with open(tmp_filename, 'wb') as f:
+                np.save(f, data)
+            rename_file(tmp_filename, filename)
+        except (IOError, OSError):
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
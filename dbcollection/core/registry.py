@@ -0,0 +1,250 @@
+"""
+Process-wide registry of the data loaders returned by load().
+"""
+
+
+import os
+import threading
+from collections import OrderedDict
+
+from dbcollection.core.storage import get_storage_backend, get_local_path
+
+
+# Maximum number of hdf5 files kept open by the loaders of the registry.
+DEFAULT_MAX_OPEN_FILES = 32
+
+
+def get_loader_key(name, task, hdf5_filepath, options=None):
+    """Returns the key of the loader of a dataset/task's hdf5 file.
+
+    The key is made of the dataset's name, the (resolved) task name, the
+    path of the hdf5 file (see get_file_key) and the loader options. It is
+    None if the file is unknown or if the options are not hashable.
+
+    """
+    if not hdf5_filepath:
+        return None
+    key = (name, task, get_file_key(hdf5_filepath), tuple(sorted((options or {}).items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def get_request_key(name, task, options=None):
+    """Returns the key of a load() request (or None if its options are not hashable).
+
+    The task is the name requested by the caller (e.g., 'default'), before
+    it is resolved with the dataset's metadata.
+
+    """
+    key = (name, task, tuple(sorted((options or {}).items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def get_file_signature(filename):
+    """Returns a value that changes when a file is modified (or None if it does not exist).
+
+    Local files use their inode, size and modification time. Files opened
+    through other storage backends use the signature of the backend.
+
+    """
+    if not filename:
+        return None
+    return get_storage_backend(filename).signature(filename)
+
+
+def get_file_key(filename):
+    """Returns the path of local files without symbolic links (or the location of remote files)."""
+    if get_storage_backend(filename).is_local():
+        return os.path.realpath(get_local_path(filename))
+    return filename
+
+
+class LoaderRegistry(object):
+    """Memoizes the data loaders of the datasets/tasks loaded in a process.
+
+    Loading a dataset reads the cache file, builds the dataset's metadata
+    constructor and opens the hdf5 file. The registry keeps the loaders
+    returned by load() so that repeated loads of the same dataset/task (with
+    the same loader options) return the same loader without any of these
+    steps. Loaders are registered by dataset name, resolved task name (i.e.,
+    'default' and the default task's name share a loader), hdf5 file path
+    and loader options. The registry also remembers the loader of each
+    request (dataset name, requested task name and options), which find()
+    returns without resolving the task or reading the cache file again.
+
+    A registered loader is discarded when its hdf5 file is replaced or
+    modified (i.e., its inode, size or modification time change, or the
+    signature of its storage backend) or when the dataset is removed or
+    processed again.
+
+    Registered loaders are shared objects: moving fields to memory, changing
+    their policy or closing the loader affects every caller that holds it.
+    Only the 'max_open_files' most recently used loaders keep their hdf5
+    file open; the others are closed and reopen the file lazily when used.
+
+    Parameters
+    ----------
+    max_open_files : int, optional
+        Maximum number of hdf5 files kept open by the registered loaders.
+
+    Attributes
+    ----------
+    max_open_files : int
+        Maximum number of hdf5 files kept open by the registered loaders.
+
+    """
+
+    def __init__(self, max_open_files=DEFAULT_MAX_OPEN_FILES):
+        """Initialize class."""
+        assert max_open_files > 0, 'Must input a number of open files greater than 0.'
+        self.max_open_files = max_open_files
+        self._loaders = OrderedDict()  # (name, task, hdf5 file path, options) -> (data loader, file signature)
+        self._requests = {}  # (name, requested task, options) -> (name, task, hdf5 file path, options)
+        self._lock = threading.RLock()
+
+    def get(self, name, task, hdf5_filepath, options=None):
+        """Returns the registered loader of a dataset/task (or None).
+
+        Parameters
+        ----------
+        name : str
+            Name of the dataset.
+        task : str
+            Name of the task (resolved, i.e., not 'default').
+        hdf5_filepath : str
+            Path of the task's hdf5 metadata file.
+        options : dict, optional
+            Options of the data loader.
+
+        Returns
+        -------
+        DataLoader
+            Registered data loader, or None if it was not registered or
+            if its hdf5 file was modified.
+
+        """
+        with self._lock:
+            return self._get(get_loader_key(name, task, hdf5_filepath, options))
+
+    def find(self, name, task, options=None):
+        """Returns the registered loader of a load() request (or None).
+
+        Unlike get(), the task is the name requested by the caller and the
+        hdf5 file is the one of the loader registered for the request (see
+        add()), so neither the task nor the file path need to be resolved.
+
+        Parameters
+        ----------
+        name : str
+            Name of the dataset.
+        task : str
+            Name of the task requested by the caller (e.g., 'default').
+        options : dict, optional
+            Options of the data loader.
+
+        Returns
+        -------
+        DataLoader
+            Registered data loader, or None if no loader was registered for
+            the request or if its hdf5 file was modified.
+
+        """
+        with self._lock:
+            return self._get(self._requests.get(get_request_key(name, task, options)))
+
+    def _get(self, key):
+        """Returns the loader of a key (or None), discarding it if its hdf5 file was modified."""
+        data_loader, signature = self._loaders.get(key, (None, None))
+        if data_loader is None:
+            return None
+        if get_file_signature(key[2]) != signature:
+            self._remove(key)
+            return None
+        self._touch(key)
+        return data_loader
+
+    def add(self, name, task, data_loader, options=None, requested_task=None):
+        """Registers the loader of a dataset/task.
+
+        The loader is registered with the path of its hdf5 file. If a loader
+        of the same file (and options) is already registered, the new loader
+        is closed and the registered one is used instead.
+
+        Parameters
+        ----------
+        name : str
+            Name of the dataset.
+        task : str
+            Name of the task (resolved, i.e., not 'default').
+        data_loader : DataLoader
+            Data loader of the dataset/task.
+        options : dict, optional
+            Options of the data loader.
+        requested_task : str, optional
+            Name of the task requested by the caller (e.g., 'default'). The
+            loader is returned by find() for this name and for the task's name.
+
+        Returns
+        -------
+        DataLoader
+            Registered data loader of the dataset/task. Loaders with
+            unhashable options or without a hdf5 file on disk are
+            returned without being registered.
+
+        """
+        hdf5_filepath = getattr(data_loader, 'hdf5_filepath', None)
+        key = get_loader_key(name, task, hdf5_filepath, options)
+        signature = get_file_signature(hdf5_filepath)
+        if key is None or signature is None:
+            return data_loader
+        with self._lock:
+            registered_loader, registered_signature = self._loaders.get(key, (None, None))
+            if registered_loader is not None and registered_signature == signature:
+                if registered_loader is not data_loader:
+                    data_loader.close()
+                data_loader = registered_loader
+            else:
+                self._loaders[key] = (data_loader, signature)
+            for request_task in set([task, requested_task or task]):
+                self._requests[get_request_key(name, request_task, options)] = key
+            self._touch(key)
+            self._close_least_recently_used()
+        return data_loader
+
+    def invalidate(self, name=None):
+        """Discards the registered loaders of a dataset (or all loaders if name is None)."""
+        with self._lock:
+            for key in list(self._loaders):
+                if name is None or key[0] == name:
+                    self._remove(key)
+
+    def _remove(self, key):
+        """Discards a loader and the requests that returned it."""
+        self._loaders.pop(key, None)
+        for request_key in [request_key for request_key, value in self._requests.items() if value == key]:
+            del self._requests[request_key]
+
+    def _touch(self, key):
+        """Marks a loader as the most recently used."""
+        self._loaders[key] = self._loaders.pop(key)
+
+    def _close_least_recently_used(self):
+        """Closes the hdf5 files of the loaders beyond the 'max_open_files' most recently used."""
+        open_loaders = [data_loader for data_loader, _ in reversed(list(self._loaders.values()))
+                        if data_loader.is_open()]
+        for data_loader in open_loaders[self.max_open_files:]:
+            data_loader.close()
+
+    def __len__(self):
+        return len(self._loaders)
+
+
+# Registry of the loaders returned by load() in this process.
+loader_registry = LoaderRegistry()
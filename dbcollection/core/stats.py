@@ -0,0 +1,190 @@
+"""
+Instrumentation of the reads of a data loader.
+"""
+
+
+import bisect
+import threading
+import timeit
+
+
+# Upper bounds (in seconds) of the buckets of the latency histograms: 1us, 2us, 4us, ..., ~33s.
+LATENCY_BUCKETS = [1e-6 * 2 ** i for i in range(26)]
+
+# Clock used to measure the time of the reads.
+default_timer = timeit.default_timer
+
+
+def get_latency_bucket(seconds):
+    """Returns the bucket of a latency histogram of a time interval."""
+    return bisect.bisect_left(LATENCY_BUCKETS, seconds)
+
+
+def get_latency_percentile(histogram, percentile):
+    """Estimates a percentile of the latency from a histogram.
+
+    Parameters
+    ----------
+    histogram : list
+        Number of calls per bucket (see LATENCY_BUCKETS).
+    percentile : float
+        Percentile in the range [0, 100].
+
+    Returns
+    -------
+    float
+        Upper bound (in seconds) of the bucket containing the percentile
+        (or None if the histogram is empty).
+
+    """
+    total = sum(histogram)
+    if total == 0:
+        return None
+    threshold = total * percentile / 100.0
+    count = 0
+    for bucket, bucket_count in enumerate(histogram):
+        count += bucket_count
+        if count >= threshold and bucket_count > 0:
+            break
+    if bucket < len(LATENCY_BUCKETS):
+        return LATENCY_BUCKETS[bucket]
+    return float('inf')
+
+
+class AccessStats(object):
+    """Collects statistics of the reads of the fields of a data loader.
+
+    Statistics are recorded per set, field and operation ('get' for reads of
+    a field and 'object' for reads of objects of a set) and contain the number
+    of calls, rows and bytes read, the total time spent, the time spent reading
+    (and decompressing) data from disk, the time spent converting data to
+    python objects, the hits/misses of the block cache and a histogram of the
+    latency of the calls.
+
+    Nothing is recorded while disabled, so the overhead of the reads is a
+    single attribute check.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Record statistics (if True).
+    tracer : callable, optional
+        Function called with a dictionary for each recorded event, with the
+        keys 'set', 'field', 'op' ('get', 'object', 'read', 'convert' or
+        'cache'), 'rows', 'nbytes', 'seconds' and 'hit'.
+
+    Attributes
+    ----------
+    enabled : bool
+        Record statistics (if True).
+    tracer : callable
+        Function called for each recorded event.
+
+    """
+
+    def __init__(self, enabled=False, tracer=None):
+        """Initialize class."""
+        self.enabled = enabled
+        self.tracer = tracer
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def enable(self, tracer=None):
+        """Starts recording statistics (and calling the tracer, if any)."""
+        assert tracer is None or callable(tracer), 'The tracer must be a callable.'
+        self.tracer = tracer
+        self.enabled = True
+
+    def disable(self):
+        """Stops recording statistics."""
+        self.enabled = False
+        self.tracer = None
+
+    def reset(self):
+        """Clears the recorded statistics."""
+        with self._lock:
+            self._stats = {}
+
+    def record_call(self, set_name, field, op, rows, nbytes, seconds):
+        """Records a call that read rows of a field (op='get') or objects of a set (op='object')."""
+        with self._lock:
+            stats = self._get_stats(set_name, field, op)
+            stats['calls'] += 1
+            stats['rows'] += rows
+            stats['nbytes'] += nbytes
+            stats['seconds'] += seconds
+            stats['latency_histogram'][get_latency_bucket(seconds)] += 1
+        self._trace(set_name, field, op, rows=rows, nbytes=nbytes, seconds=seconds)
+
+    def record_read(self, set_name, field, rows, nbytes, seconds):
+        """Records a read (and decompression) of rows from disk."""
+        with self._lock:
+            stats = self._get_stats(set_name, field, 'get')
+            stats['disk_reads'] += 1
+            stats['disk_nbytes'] += nbytes
+            stats['read_seconds'] += seconds
+        self._trace(set_name, field, 'read', rows=rows, nbytes=nbytes, seconds=seconds)
+
+    def record_conversion(self, set_name, field, op, seconds):
+        """Records the time spent converting data into python objects (e.g., strings)."""
+        with self._lock:
+            self._get_stats(set_name, field, op)['convert_seconds'] += seconds
+        self._trace(set_name, field, 'convert', seconds=seconds)
+
+    def record_cache(self, set_name, field, hit):
+        """Records a hit/miss of the block cache."""
+        with self._lock:
+            stats = self._get_stats(set_name, field, 'get')
+            stats['cache_hits' if hit else 'cache_misses'] += 1
+        self._trace(set_name, field, 'cache', hit=hit)
+
+    def _get_stats(self, set_name, field, op):
+        key = (set_name, field, op)
+        if key not in self._stats:
+            self._stats[key] = {
+                "calls": 0,
+                "rows": 0,
+                "nbytes": 0,
+                "seconds": 0.0,
+                "disk_reads": 0,
+                "disk_nbytes": 0,
+                "read_seconds": 0.0,
+                "convert_seconds": 0.0,
+                "cache_hits": 0,
+                "cache_misses": 0,
+                "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return self._stats[key]
+
+    def _trace(self, set_name, field, op, rows=0, nbytes=0, seconds=0.0, hit=None):
+        tracer = self.tracer
+        if tracer is not None:
+            tracer({"set": set_name, "field": field, "op": op, "rows": rows,
+                    "nbytes": nbytes, "seconds": seconds, "hit": hit})
+
+    def report(self):
+        """Returns the recorded statistics sorted by the total time spent.
+
+        Returns
+        -------
+        list
+            List of dictionaries with the statistics of each set, field and
+            operation, plus the estimated median ('latency_p50') and 99th
+            percentile ('latency_p99') of the latency of the calls.
+
+        """
+        with self._lock:
+            items = [(key, dict(stats, latency_histogram=list(stats['latency_histogram'])))
+                     for key, stats in self._stats.items()]
+        report = []
+        for (set_name, field, op), stats in items:
+            stats.update({
+                "set": set_name,
+                "field": field,
+                "op": op,
+                "latency_p50": get_latency_percentile(stats['latency_histogram'], 50),
+                "latency_p99": get_latency_percentile(stats['latency_histogram'], 99),
+            })
+            report.append(stats)
+        report.sort(key=lambda stats: (-stats['seconds'], stats['set'], stats['field'], stats['op']))
+        return report
@@ -0,0 +1,371 @@
+"""
+Storage backends to open the hdf5 metadata files of the datasets.
+"""
+
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import h5py
+import requests
+from six.moves.urllib.parse import urlparse
+
+
+# Size (in bytes) of the blocks read by byte-range backends.
+DEFAULT_RANGE_BLOCK_NBYTES = 256 * 1024
+
+# Maximum size (in bytes) of the blocks cached per file opened by byte-range backends.
+DEFAULT_RANGE_CACHE_NBYTES = 64 * 1024 * 1024
+
+# Number of blocks read in a single request when a file is read sequentially.
+DEFAULT_READAHEAD_BLOCKS = 4
+
+
+class StorageBackend(object):
+    """Opens the hdf5 files of the datasets.
+
+    Backends return either a local path or a file-like object, which are
+    both accepted by h5py.File().
+
+    """
+
+    def open(self, path):
+        """Returns a path or a (read-only) file-like object of a file."""
+        raise NotImplementedError
+
+    def signature(self, path):
+        """Returns a value that changes when a file is modified (or None if it does not exist)."""
+        raise NotImplementedError
+
+    def is_local(self):
+        """Checks if the files are opened from local paths (i.e., they can be memory-mapped)."""
+        return False
+
+
+def get_local_path(path):
+    """Returns the path of a 'file://' url (or the path itself)."""
+    url = urlparse(path)
+    if url.scheme == 'file':
+        return url.path
+    return path
+
+
+class LocalStorage(StorageBackend):
+    """Opens files from the local file system.
+
+    Accepts paths and 'file://' urls.
+
+    """
+
+    def open(self, path):
+        return get_local_path(path)
+
+    def signature(self, path):
+        try:
+            stat = os.stat(get_local_path(path))
+        except (OSError, TypeError):
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime)
+
+    def is_local(self):
+        return True
+
+
+class RangeStorage(StorageBackend):
+    """Opens files through byte-range reads with block caching and readahead.
+
+    Subclasses implement get_size() and read_range().
+
+    Parameters
+    ----------
+    block_nbytes : int, optional
+        Size (in bytes) of the blocks read from the files.
+    cache_nbytes : int, optional
+        Maximum size (in bytes) of the blocks cached per opened file.
+    readahead : int, optional
+        Number of blocks read in a single request when reading sequentially.
+
+    """
+
+    def __init__(self, block_nbytes=DEFAULT_RANGE_BLOCK_NBYTES,
+                 cache_nbytes=DEFAULT_RANGE_CACHE_NBYTES, readahead=DEFAULT_READAHEAD_BLOCKS):
+        """Initialize class."""
+        assert block_nbytes > 0, 'Must input a block size greater than 0.'
+        assert readahead > 0, 'Must input a number of readahead blocks greater than 0.'
+        self.block_nbytes = block_nbytes
+        self.cache_nbytes = cache_nbytes
+        self.readahead = readahead
+
+    def open(self, path):
+        return RangeReader(path, self.get_size(path), lambda start, stop: self.read_range(path, start, stop),
+                           self.block_nbytes, self.cache_nbytes, self.readahead)
+
+    def get_size(self, path):
+        """Returns the size (in bytes) of a file."""
+        raise NotImplementedError
+
+    def read_range(self, path, start, stop):
+        """Returns the bytes of a file in the range [start, stop)."""
+        raise NotImplementedError
+
+
+class FileRangeStorage(RangeStorage):
+    """Reads local (or network-mounted) files through byte-range reads.
+
+    Accepts paths and 'file://' urls.
+
+    """
+
+    def get_size(self, path):
+        return os.path.getsize(get_local_path(path))
+
+    def read_range(self, path, start, stop):
+        with open(get_local_path(path), 'rb') as f:
+            f.seek(start)
+            return f.read(stop - start)
+
+    def signature(self, path):
+        return LocalStorage().signature(get_local_path(path))
+
+
+class HTTPRangeStorage(RangeStorage):
+    """Reads files from a http(s) server with range requests.
+
+    The server must support HEAD requests and 'Range' headers (e.g., nginx,
+    Apache or object stores). Each process uses its own session.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Timeout (in seconds) of the requests.
+    block_nbytes : int, optional
+        Size (in bytes) of the blocks read from the files.
+    cache_nbytes : int, optional
+        Maximum size (in bytes) of the blocks cached per opened file.
+    readahead : int, optional
+        Number of blocks read in a single request when reading sequentially.
+
+    """
+
+    def __init__(self, timeout=60, **kwargs):
+        """Initialize class."""
+        super(HTTPRangeStorage, self).__init__(**kwargs)
+        self.timeout = timeout
+        self._session = None
+        self._pid = None
+
+    def _get_session(self):
+        if self._session is None or self._pid != os.getpid():
+            self._session = requests.Session()
+            self._pid = os.getpid()
+        return self._session
+
+    def _head(self, path):
+        response = self._get_session().head(path, timeout=self.timeout, allow_redirects=True)
+        response.raise_for_status()
+        return response.headers
+
+    def get_size(self, path):
+        return int(self._head(path)['Content-Length'])
+
+    def read_range(self, path, start, stop):
+        headers = {"Range": "bytes={}-{}".format(start, stop - 1)}
+        response = self._get_session().get(path, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError('The server of \'{}\' does not support range requests.'.format(path))
+        return response.content
+
+    def signature(self, path):
+        try:
+            headers = self._head(path)
+        except Exception:
+            return None
+        return (headers.get('Content-Length'), headers.get('ETag'), headers.get('Last-Modified'))
+
+
+class RangeReader(io.RawIOBase):
+    """Read-only file-like object that reads a file in blocks of bytes.
+
+    Blocks are kept in a LRU cache. When blocks are read sequentially, the
+    next 'readahead' blocks are requested at once to reduce the number of
+    requests.
+
+    Parameters
+    ----------
+    name : str
+        Location of the file (e.g., a path or a url).
+    size : int
+        Size (in bytes) of the file.
+    read_range : callable
+        Function that receives (start, stop) and returns the bytes of the file in that range.
+    block_nbytes : int, optional
+        Size (in bytes) of the blocks.
+    cache_nbytes : int, optional
+        Maximum size (in bytes) of the cached blocks.
+    readahead : int, optional
+        Number of blocks read in a single request when reading sequentially.
+
+    Attributes
+    ----------
+    name : str
+        Location of the file.
+    size : int
+        Size (in bytes) of the file.
+    num_requests : int
+        Number of range reads done.
+
+    """
+
+    def __init__(self, name, size, read_range, block_nbytes=DEFAULT_RANGE_BLOCK_NBYTES,
+                 cache_nbytes=DEFAULT_RANGE_CACHE_NBYTES, readahead=DEFAULT_READAHEAD_BLOCKS):
+        """Initialize class."""
+        super(RangeReader, self).__init__()
+        self.name = name
+        self.size = size
+        self.num_requests = 0
+        self._read_range = read_range
+        self._block_nbytes = block_nbytes
+        self._max_blocks = max(1, cache_nbytes // block_nbytes)
+        self._readahead = readahead
+        self._blocks = OrderedDict()
+        self._position = 0
+        self._last_block = None
+        self._lock = threading.Lock()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError('Invalid whence: {}.'.format(whence))
+        if position < 0:
+            raise ValueError('Negative seek position: {}.'.format(position))
+        self._position = position
+        return position
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, buffer):
+        view = get_byte_view(buffer)
+        start = self._position
+        stop = min(start + len(view), self.size)
+        if stop <= start:
+            return 0
+        with self._lock:
+            written = 0
+            for block in range(start // self._block_nbytes, (stop - 1) // self._block_nbytes + 1):
+                data = self._get_block(block)
+                block_start = block * self._block_nbytes
+                lo = max(start, block_start) - block_start
+                hi = min(stop, block_start + len(data)) - block_start
+                view[written:written + hi - lo] = data[lo:hi]
+                written += hi - lo
+        self._position = stop
+        return written
+
+    def _get_block(self, block):
+        if block in self._blocks:
+            self._blocks[block] = self._blocks.pop(block)
+        else:
+            num_blocks = self._readahead if self._last_block == block - 1 else 1
+            self._fetch_blocks(block, num_blocks)
+        self._last_block = block
+        return self._blocks[block]
+
+    def _fetch_blocks(self, block, num_blocks):
+        """Reads a range of blocks with a single request and caches them."""
+        start = block * self._block_nbytes
+        stop = min(start + num_blocks * self._block_nbytes, self.size)
+        data = self._read_range(start, stop)
+        self.num_requests += 1
+        for i in range(0, len(data), self._block_nbytes):
+            self._blocks[block + i // self._block_nbytes] = data[i:i + self._block_nbytes]
+        while len(self._blocks) > self._max_blocks:
+            self._blocks.popitem(last=False)
+
+    def __repr__(self):
+        # h5py uses the repr of file-like objects as the file name
+        return self.name
+
+
+def get_byte_view(buffer):
+    """Returns a writable view of the bytes of a buffer.
+
+    memoryview.cast() does not exist in python 2, but it is only needed
+    for buffers of other types than bytes (h5py passes byte buffers).
+    """
+    view = memoryview(buffer)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+
+_storage_backends = {
+    "http": HTTPRangeStorage(),
+    "https": HTTPRangeStorage(),
+}
+
+
+def register_storage_backend(scheme, backend):
+    """Registers the storage backend of the paths with a url scheme.
+
+    Parameters
+    ----------
+    scheme : str
+        Url scheme of the paths (e.g., 'http' or 's3').
+    backend : StorageBackend
+        Backend used to open the files.
+
+    Examples
+    --------
+    >>> register_storage_backend('https', HTTPRangeStorage(block_nbytes=1024 * 1024))
+
+    """
+    assert scheme, 'Must input a valid url scheme.'
+    assert isinstance(backend, StorageBackend), 'Must input a valid storage backend.'
+    _storage_backends[scheme.lower()] = backend
+
+
+def get_storage_backend(path):
+    """Returns the storage backend of a path (local files by default)."""
+    scheme = urlparse(path).scheme.lower() if path else ''
+    if len(scheme) > 1 and scheme in _storage_backends:
+        return _storage_backends[scheme]
+    return LocalStorage()
+
+
+def open_hdf5_file(path, **kwargs):
+    """Opens an hdf5 file for reading through its storage backend.
+
+    Parameters
+    ----------
+    path : str
+        Path or url of the hdf5 file.
+    kwargs : dict, optional
+        Options of h5py.File().
+
+    Returns
+    -------
+    h5py._hl.files.File
+        hdf5 file handler.
+
+    """
+    return h5py.File(get_storage_backend(path).open(path), 'r', **kwargs)
+
+
+def is_local_hdf5_file(hdf5_file):
+    """Checks if an hdf5 file was opened from a local path (and not from a file-like object)."""
+    return hdf5_file.driver != 'fileobj'
@@ -8,15 +8,35 @@ and used to manually setup a dataset.
 
 
 from __future__ import print_function
+import io
 import os
 import h5py
 import numpy as np
 
-from dbcollection.utils.hdf5 import HDF5Manager
+from dbcollection.utils.hdf5 import HDF5Manager, DEFAULT_STORAGE_PROFILE, HDF5_FINGERPRINT_ATTR
+from dbcollection.utils.file import rename_file
+from dbcollection.utils.fingerprint import get_fingerprint, get_source_version
 from dbcollection.utils.url import download_extract_urls
 from dbcollection.utils.string_ascii import convert_str_to_ascii as str2ascii
 
 
+def import_futures():
+    """Imports concurrent.futures (the 'futures' backport in python 2).
+
+    Raises
+    ------
+    ImportError
+        If concurrent.futures is not available.
+
+    """
+    try:
+        from concurrent import futures
+    except ImportError:
+        raise ImportError('concurrent.futures is required to process the sets with several '
+                          'workers (workers > 1). Install it with: pip install futures')
+    return futures
+
+
 class BaseDataset(object):
     """Base class for download/processing a dataset.
 
@@ -49,6 +69,17 @@ class BaseDataset(object):
         Dataset's tasks for processing.
     default_task : str
         Default task name.
+    storage_profile : str
+        Storage layout profile of the fields of the processed metadata files
+        (see dbcollection.utils.hdf5.get_storage_layout()).
+    narrow_dtypes : bool/float
+        Narrow the types of the fields of the processed metadata files
+        (see dbcollection.utils.hdf5.parse_narrow_tolerance()).
+    workers : int
+        Number of processes used to process the sets of a task.
+    hash_inputs : bool
+        Hash the contents of the input files of the sets to detect changes
+        (see BaseTask.get_set_fingerprint()).
 
     """
 
@@ -56,6 +87,10 @@ class BaseDataset(object):
     keywords = ()  # List of keywords to classify/categorize datasets in the cache.
     tasks = {}  # dictionary of available tasks to process
     default_task = ''  # Defines the default class
+    storage_profile = DEFAULT_STORAGE_PROFILE  # storage layout of the metadata files
+    narrow_dtypes = False  # narrow the types of the fields of the metadata files
+    workers = 1  # number of processes used to process the sets of a task
+    hash_inputs = False  # hash the contents of the input files of the sets
 
     def __init__(self, data_path, cache_path, extract_data=True, verbose=True):
         """Initialize class."""
@@ -126,6 +161,10 @@ class BaseDataset(object):
         processer = constructor(data_path=self.data_path,
                                 cache_path=self.cache_path,
                                 verbose=self.verbose)
+        processer.storage_profile = self.storage_profile
+        processer.narrow_dtypes = self.narrow_dtypes
+        processer.workers = self.workers
+        processer.hash_inputs = self.hash_inputs
         return processer.run()
 
     def get_task_constructor(self, task):
@@ -170,10 +209,25 @@ class BaseTask(object):
         Name of the HDF5 file.
     hdf5_filepath : str
         File name + path of the HDF5 metadata file in disk.
+    storage_profile : str
+        Storage layout profile of the fields of the HDF5 metadata file.
+    narrow_dtypes : bool/float
+        Narrow the types of the fields of the HDF5 metadata file.
+    workers : int
+        Number of processes used to process the sets (see process_metadata_parallel()).
+    hash_inputs : bool
+        Hash the contents of the input files of the sets (see get_set_fingerprint()).
+    previous_hdf5_file : h5py._hl.files.File
+        Previous HDF5 metadata file of the task (None if it does not exist),
+        from where unchanged sets are copied.
 
     """
 
     filename_h5 = ''  # name of the task file
+    storage_profile = DEFAULT_STORAGE_PROFILE  # storage layout of the metadata file
+    narrow_dtypes = False  # narrow the types of the fields of the metadata file
+    workers = 1  # number of processes used to process the sets
+    hash_inputs = False  # hash the contents of the input files of the sets
 
     def __init__(self, data_path, cache_path, verbose=True):
         """Initialize class."""
@@ -184,11 +238,16 @@ class BaseTask(object):
         self.verbose = verbose
         self.hdf5_filepath = self.get_hdf5_save_filename()
         self.hdf5_manager = None
+        self.previous_hdf5_file = None
 
     def get_hdf5_save_filename(self):
         """Builds the HDF5 file name + path on disk."""
         return os.path.join(self.cache_path, self.filename_h5 + '.h5')
 
+    def get_hdf5_temp_filename(self):
+        """Builds the file name + path of the HDF5 file written before replacing the metadata file."""
+        return '{}.{}.tmp'.format(self.hdf5_filepath, os.getpid())
+
     def run(self):
         """Main Method. Runs the task metadata processing.
 
@@ -198,14 +257,23 @@ class BaseTask(object):
         generator, retrieves the data fields obtained in the processing stage
         and saves them into an HDF5 file in disk.
 
+        The data is written to a temporary file that replaces the metadata file
+        when the processing is complete, so the metadata file is never left
+        half-written. Sets whose inputs did not change since the metadata file
+        was written are copied from it (see get_set_fingerprint()).
+
         Returns
         -------
         str
             File name + path of the task's HDF5 metadata file.
         """
         self.setup_hdf5_manager()
-        data_generator = self.load_data()
-        self.process_metadata(data_generator)
+        try:
+            data_generator = self.load_data()
+            self.process_metadata(data_generator)
+        except BaseException:
+            self.abort_hdf5_manager()
+            raise
         self.teardown_hdf5_manager()
         return self.hdf5_filepath
 
@@ -213,7 +281,19 @@ class BaseTask(object):
         """Sets up the metadata manager to store the processed data to disk."""
         if self.verbose:
             print('\n==> Storing metadata to file: {}'.format(self.hdf5_filepath))
-        self.hdf5_manager = HDF5Manager(filename=self.hdf5_filepath)
+        self.previous_hdf5_file = self.open_previous_hdf5_file()
+        self.hdf5_manager = HDF5Manager(filename=self.get_hdf5_temp_filename(),
+                                        storage_profile=self.storage_profile,
+                                        narrow_dtypes=self.narrow_dtypes)
+
+    def open_previous_hdf5_file(self):
+        """Opens the current HDF5 metadata file of the task (or returns None if not valid)."""
+        if not os.path.exists(self.hdf5_filepath):
+            return None
+        try:
+            return h5py.File(self.hdf5_filepath, 'r')
+        except (IOError, OSError):
+            return None  # corrupted file
 
     def load_data(self):
         """Loads the dataset's (meta)data from disk (create a generator).
@@ -230,13 +310,188 @@ class BaseTask(object):
         """
         pass  # stub
 
+    def get_set_loaders(self):
+        """Returns the functions that load the (meta)data of each set split.
+
+        Tasks whose sets can be loaded independently of each other return
+        a list of (set name, function) pairs, which allows the sets to be
+        loaded by different processes (see process_metadata_parallel()).
+
+        Returns
+        -------
+        list
+            List of (set name, function) pairs, or None if the sets are
+            only loaded by load_data().
+
+        """
+        return None
+
+    def get_set_input_files(self, set_name):
+        """Returns the paths of the files the (meta)data of a set is loaded from.
+
+        Tasks that know the input files of their sets return them, so sets
+        whose inputs did not change are not processed again.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set split.
+
+        Returns
+        -------
+        list
+            Paths of the input files, or None if unknown.
+
+        """
+        return None
+
+    def get_set_fingerprint(self, set_name):
+        """Returns the fingerprint of the inputs of a set.
+
+        The fingerprint changes when the input files of the set (size,
+        modification time and, if 'hash_inputs' is True, their contents),
+        the source code of the task or the processing options change.
+
+        Parameters
+        ----------
+        set_name : str
+            Name of the set split.
+
+        Returns
+        -------
+        str
+            Fingerprint of the set, or None if its input files are unknown.
+
+        """
+        input_files = self.get_set_input_files(set_name)
+        if input_files is None:
+            return None
+        return get_fingerprint(input_files,
+                               hash_contents=self.hash_inputs,
+                               task=type(self).__name__,
+                               version=get_source_version(type(self)),
+                               set_name=set_name,
+                               storage_profile=self.storage_profile,
+                               narrow_dtypes=self.narrow_dtypes)
+
+    def copy_unchanged_set(self, set_name, fingerprint):
+        """Copies a set from the previous HDF5 metadata file if its fingerprint did not change.
+
+        Returns
+        -------
+        bool
+            True if the set was copied.
+
+        """
+        if fingerprint is None or self.previous_hdf5_file is None:
+            return False
+        h5_group = self.previous_hdf5_file.get(set_name)
+        if not isinstance(h5_group, h5py.Group) or h5_group.attrs.get(HDF5_FINGERPRINT_ATTR) != fingerprint:
+            return False
+        self.hdf5_manager.add_group_from_file(self.previous_hdf5_file, set_name)
+        return True
+
+    def set_fingerprint(self, set_name, fingerprint):
+        """Stores the fingerprint of a set as an attribute of its group."""
+        if fingerprint is not None:
+            self.hdf5_manager.get_group(set_name).attrs[HDF5_FINGERPRINT_ATTR] = fingerprint
+
+    def get_sets(self, data_generator):
+        """Yields the sets to process, after copying the unchanged ones.
+
+        Sets are loaded by the task's set loaders (see get_set_loaders()),
+        if any, which lets unchanged sets be skipped without loading them.
+        Otherwise, they are loaded by 'data_generator'.
+
+        Parameters
+        ----------
+        data_generator : generator
+            A sequence of dictionary objects with a key-value pair
+            with the name of the set split and the data.
+
+        Returns
+        -------
+        generator
+            Sequence of (set name, fingerprint, data, load function) tuples,
+            where either the data or the function that loads it is None.
+
+        """
+        set_loaders = self.get_set_loaders()
+        if set_loaders is None:
+            sets = ((set_name, data[set_name], None) for data in data_generator for set_name in data)
+        else:
+            sets = ((set_name, None, load_set) for set_name, load_set in set_loaders)
+        for set_name, data, load_set in sets:
+            fingerprint = self.get_set_fingerprint(set_name)
+            if self.copy_unchanged_set(set_name, fingerprint):
+                if self.verbose:
+                    print('\nSet metadata unchanged: {}'.format(set_name))
+                continue
+            yield set_name, fingerprint, data, load_set
+
     def process_metadata(self, data_generator):
         """Processes the dataset's (meta)data and stores it into an HDF5 file."""
-        for data in data_generator:
-            for set_name in data:
-                if self.verbose:
-                    print('\nSaving set metadata: {}'.format(set_name))
-                self.process_set_metadata(data[set_name], set_name)
+        if self.workers > 1:
+            self.process_metadata_parallel(data_generator)
+            return
+        for set_name, fingerprint, data, load_set in self.get_sets(data_generator):
+            if load_set is not None:
+                data = load_set()
+            if self.verbose:
+                print('\nSaving set metadata: {}'.format(set_name))
+            self.process_set_metadata(data, set_name)
+            self.set_fingerprint(set_name, fingerprint)
+
+    def process_metadata_parallel(self, data_generator):
+        """Processes the sets of the dataset in a pool of processes.
+
+        Each process builds the fields of a set in an in-memory HDF5 file,
+        which is sent back as a file image and copied into the HDF5 metadata
+        file as soon as it is finished. Only this process writes to the file.
+
+        If the task has set loaders (see get_set_loaders()), the sets are
+        also loaded by the processes of the pool. Otherwise, they are loaded
+        by this process with 'data_generator' while the pool processes the
+        previous ones.
+
+        Parameters
+        ----------
+        data_generator : generator
+            A sequence of dictionary objects with a key-value pair
+            with the name of the set split and the data.
+
+        Raises
+        ------
+        ImportError
+            If concurrent.futures is not available (python 2 without the
+            'futures' package).
+
+        """
+        concurrent_futures = import_futures()
+        with concurrent_futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = set()
+            for set_name, fingerprint, data, load_set in self.get_sets(data_generator):
+                while len(futures) >= self.workers:
+                    futures = self.add_finished_sets(futures)
+                futures.add(executor.submit(process_set_metadata_to_image, self, set_name, data,
+                                            load_set, fingerprint))
+            while futures:
+                futures = self.add_finished_sets(futures)
+
+    def add_finished_sets(self, futures):
+        """Waits for sets to be processed and copies them into the HDF5 metadata file.
+
+        Returns
+        -------
+        set
+            Futures of the sets that are still being processed.
+
+        """
+        concurrent_futures = import_futures()
+        done, pending = concurrent_futures.wait(futures, return_when=concurrent_futures.FIRST_COMPLETED)
+        for future in done:
+            self.hdf5_manager.add_file_image(future.result())
+        return pending
 
     def process_set_metadata(self, data, set_name):
         """Sets up the set's data fields to be stored in the HDF5 metadata file.
@@ -256,8 +511,73 @@ class BaseTask(object):
         pass
 
     def teardown_hdf5_manager(self):
-        """Sets up the MetadataManager object to manage the metadata save process to disk."""
+        """Closes the metadata file and replaces the task's HDF5 metadata file with it."""
         self.hdf5_manager.close()
+        self.close_previous_hdf5_file()
+        rename_file(self.hdf5_manager.filename, self.hdf5_filepath)
+
+    def abort_hdf5_manager(self):
+        """Closes and removes the metadata file (keeping the task's HDF5 metadata file)."""
+        self.close_previous_hdf5_file()
+        if self.hdf5_manager is None:
+            return
+        try:
+            self.hdf5_manager.file.close()
+        finally:
+            if os.path.exists(self.hdf5_manager.filename):
+                os.remove(self.hdf5_manager.filename)
+
+    def close_previous_hdf5_file(self):
+        if self.previous_hdf5_file is not None:
+            self.previous_hdf5_file.close()
+            self.previous_hdf5_file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the HDF5 files are only accessed by the process that opened them
+        state['hdf5_manager'] = None
+        state['previous_hdf5_file'] = None
+        return state
+
+
+def process_set_metadata_to_image(task, set_name, data=None, load_set=None, fingerprint=None):
+    """Processes the metadata of a set into an in-memory HDF5 file.
+
+    Runs in the processes of the pool of BaseTask.process_metadata_parallel().
+
+    Parameters
+    ----------
+    task : BaseTask
+        Task processor.
+    set_name : str
+        Name of the set split.
+    data : dict, optional
+        Data annotations of the set split.
+    load_set : callable, optional
+        Function that loads the data annotations of the set split (if 'data' is None).
+    fingerprint : str, optional
+        Fingerprint of the inputs of the set split.
+
+    Returns
+    -------
+    bytes
+        Image (contents) of the HDF5 file with the set's fields.
+
+    """
+    if load_set is not None:
+        data = load_set()
+    if task.verbose:
+        print('\nSaving set metadata: {}'.format(set_name))
+    image = io.BytesIO()
+    task.hdf5_manager = HDF5Manager(filename=image,
+                                    storage_profile=task.storage_profile,
+                                    narrow_dtypes=task.narrow_dtypes)
+    try:
+        task.process_set_metadata(data, set_name)
+        task.set_fingerprint(set_name, fingerprint)
+    finally:
+        task.hdf5_manager.close()
+    return image.getvalue()
 
 
 class BaseField(object):
@@ -278,6 +598,9 @@ class BaseField(object):
             Name of the data field.
         data : np.ndarray
             Numpy ndarray of the field's data.
+        kwargs : dict, optional
+            Options of HDF5Manager.add_field_to_group() (e.g., narrow=True
+            to store the data with the narrowest type that holds it).
 
         """
         self.hdf5_manager.add_field_to_group(
@@ -287,6 +610,76 @@ class BaseField(object):
             **kwargs
         )
 
+    def save_list_field_to_hdf5(self, set_name, field, data, **kwargs):
+        """Saves a list of lists of a field into the HDF5 metadata file.
+
+        The lists are stored as values + offsets (CSR) instead of a padded
+        matrix (see dbcollection.utils.pad.pad_list()).
+
+        Parameters
+        ----------
+        set_name: str
+            Name of the set split.
+        field : str
+            Name of the data field.
+        data : list
+            List of lists of different sizes.
+
+        """
+        self.hdf5_manager.add_list_field_to_group(
+            group=set_name,
+            field=field,
+            data=data,
+            **kwargs
+        )
+
+    def save_ragged_field_to_hdf5(self, set_name, field, data, **kwargs):
+        """Saves a ragged field (rows of different lengths) into the HDF5 metadata file.
+
+        The rows are stored as values + offsets and are retrieved as one
+        array per row (see dbcollection.utils.hdf5.hdf5_write_ragged_data()).
+
+        Parameters
+        ----------
+        set_name: str
+            Name of the set split.
+        field : str
+            Name of the data field.
+        data : list
+            List of rows (lists or 1D arrays).
+
+        """
+        self.hdf5_manager.add_ragged_field_to_group(
+            group=set_name,
+            field=field,
+            data=data,
+            **kwargs
+        )
+
+    def save_string_field_to_hdf5(self, set_name, field, data, **kwargs):
+        """Saves a list of strings with a compressed encoding into the HDF5 metadata file.
+
+        The strings are stored with a dictionary encoding or front coding
+        (see dbcollection.utils.hdf5.HDF5Manager.add_string_field_to_group())
+        and are retrieved like a field of strings converted to ascii.
+
+        Parameters
+        ----------
+        set_name: str
+            Name of the set split.
+        field : str
+            Name of the data field.
+        data : list
+            List of strings.
+
+        """
+        self.hdf5_manager.add_string_field_to_group(
+            group=set_name,
+            field=field,
+            data=data,
+            **kwargs
+        )
+
 
 class BaseColumnField(BaseField):
     """Base class for the dataset's column data field processor."""
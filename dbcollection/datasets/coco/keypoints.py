@@ -6,6 +6,7 @@ COCO Keypoints 2016 process functions.
 from __future__ import print_function, division
 import os
 from collections import OrderedDict
+from functools import partial
 import numpy as np
 import progressbar
 
@@ -13,7 +14,7 @@ from dbcollection.datasets import BaseTask
 from dbcollection.utils.string_ascii import convert_str_to_ascii as str2ascii
 from dbcollection.utils.pad import pad_list, squeeze_list
 from dbcollection.utils.file_load import load_json
-from dbcollection.utils.hdf5 import hdf5_write_data
+from dbcollection.utils.hdf5 import hdf5_write_data, hdf5_write_ragged_data
 
 from .load_data_test import load_data_test
 
@@ -203,20 +204,39 @@ class Keypoints2016(BaseTask):
         """
         Load data of the dataset (create a generator).
         """
-        for set_name in self.image_dir_path:
-            if self.verbose:
-                print('\n> Loading data files for the set: ' + set_name)
+        for set_name, load_set in self.get_set_loaders():
+            yield {set_name: load_set()}
 
-            # image dir
-            image_dir = os.path.join(self.data_path, self.image_dir_path[set_name])
+    def get_set_loaders(self):
+        """
+        Returns the functions that load the data of each set.
+        """
+        return [(set_name, partial(self.load_set_data, set_name)) for set_name in self.image_dir_path]
 
-            # annotation file path
-            annot_filepath = os.path.join(self.data_path, self.annotation_path[set_name])
+    def get_set_input_files(self, set_name):
+        """
+        Returns the annotation file of a set.
+        """
+        return [os.path.join(self.data_path, self.annotation_path[set_name])]
 
-            if 'test' in set_name:
-                yield load_data_test(set_name, image_dir, annot_filepath, self.verbose)
-            else:
-                yield self.load_data_trainval(set_name, image_dir, annot_filepath)
+    def load_set_data(self, set_name):
+        """
+        Loads the data of a set.
+        """
+        if self.verbose:
+            print('\n> Loading data files for the set: ' + set_name)
+
+        # image dir
+        image_dir = os.path.join(self.data_path, self.image_dir_path[set_name])
+
+        # annotation file path
+        annot_filepath = os.path.join(self.data_path, self.annotation_path[set_name])
+
+        if 'test' in set_name:
+            data = load_data_test(set_name, image_dir, annot_filepath, self.verbose)
+        else:
+            data = self.load_data_trainval(set_name, image_dir, annot_filepath)
+        return data[set_name]
 
     def process_set_metadata(self, data, set_name):
         """
@@ -463,26 +483,9 @@ class Keypoints2016(BaseTask):
                             np.array(iscrowd, dtype=np.uint8),
                             fillvalue=-1)
 
-            nrows = len(segmentation)
-            ncols = max([len(l) for l in segmentation])
-            dset = hdf5_handler.create_dataset('segmentation',
-                                               (nrows, ncols),
-                                               dtype=np.float,
-                                               chunks=True,
-                                               compression="gzip",
-                                               compression_opts=4,
-                                               fillvalue=-1)
-
-            if self.verbose:
-                print('   -- Saving segmentation masks to disk (this will take some time)')
-                prgbar = progressbar.ProgressBar(max_value=nrows)
-            for i in range(nrows):
-                dset[i, :len(segmentation[i])] = np.array(segmentation[i], dtype=np.float)
-                if self.verbose:
-                    prgbar.update(i)
-
-            if self.verbose:
-                prgbar.finish()
+            # polygons/RLE counts have different lengths: store them as a ragged field
+            hdf5_write_ragged_data(hdf5_handler, 'segmentation', segmentation,
+                                   dtype=np.float64)
 
             hdf5_write_data(hdf5_handler, 'area',
                             np.array(area, dtype=np.int32),
@@ -24,16 +24,31 @@ class Keypoints(BaseTask):
         """
         Load data of the dataset (create a generator).
         """
+        for set_name, load_set in self.get_set_loaders():
+            yield {set_name: load_set()}
+
+    def get_set_loaders(self):
+        """
+        Returns the functions that load the data of each set.
+        """
         loader = DatasetAnnotationLoader(
             is_full=self.is_full,
             data_path=self.data_path,
             cache_path=self.cache_path,
             verbose=self.verbose
         )
-        yield {"train": loader.load_trainval_data()}
-        yield {"train01": loader.load_train_data()}
-        yield {"val01": loader.load_val_data()}
-        yield {"test": loader.load_test_data()}
+        return [
+            ("train", loader.load_trainval_data),
+            ("train01", loader.load_train_data),
+            ("val01", loader.load_val_data),
+            ("test", loader.load_test_data)
+        ]
+
+    def get_set_input_files(self, set_name):
+        """
+        Returns the annotation file of the sets.
+        """
+        return [os.path.join(self.data_path, 'mpii_human_pose_v1_u12_2', 'mpii_human_pose_v1_u12_1.mat')]
 
     def process_set_metadata(self, data, set_name):
         """
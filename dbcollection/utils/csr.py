@@ -0,0 +1,97 @@
+"""
+Compressed sparse row (CSR) encoding of lists of lists.
+
+Lists of lists with different sizes are stored as two arrays: 'values',
+with all lists concatenated, and 'offsets', with the position in 'values'
+where each list starts (plus the total size at the end). This avoids
+padding all lists to the size of the biggest one.
+"""
+
+
+import numpy as np
+
+
+def convert_list_to_csr(listA, dtype=np.int32):
+    """Encodes a list of lists into values + offsets arrays.
+
+    Parameters
+    ----------
+    listA : list
+        List of lists of different sizes.
+    dtype : np.dtype, optional
+        Data type of the values.
+
+    Returns
+    -------
+    np.ndarray
+        1D array of the concatenated values of all lists.
+    np.ndarray
+        1D array (np.int64) with len(listA) + 1 offsets.
+
+    Examples
+    --------
+    >>> from dbcollection.utils.csr import convert_list_to_csr
+    >>> convert_list_to_csr([[0, 1, 2], [], [3]])
+    (array([0, 1, 2, 3], dtype=int32), array([0, 3, 3, 4]))
+
+    """
+    assert isinstance(listA, list), 'Input must be a list. Got {}, expected {}' \
+                                    .format(type(listA), type(list))
+    lengths = np.array([len(row) for row in listA], dtype=np.int64)
+    offsets = np.zeros((len(listA) + 1,), dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.zeros((offsets[-1],), dtype=dtype)
+    for i, row in enumerate(listA):
+        values[offsets[i]:offsets[i + 1]] = row
+    return values, offsets
+
+
+def convert_csr_to_list(values, offsets):
+    """Decodes values + offsets arrays into a list of arrays.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of the concatenated values of all lists.
+    offsets : np.ndarray
+        1D array with the offsets of the lists (plus the total size).
+
+    Returns
+    -------
+    list
+        List of numpy arrays.
+
+    Examples
+    --------
+    >>> from dbcollection.utils.csr import convert_csr_to_list
+    >>> convert_csr_to_list(np.array([0, 1, 2, 3]), np.array([0, 3, 3, 4]))
+    [array([0, 1, 2]), array([], dtype=int64), array([3])]
+
+    """
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def get_csr_value_rows(starts, stops):
+    """Returns the positions in 'values' of all items of a selection of lists.
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        Offsets where each selected list starts.
+    stops : np.ndarray
+        Offsets where each selected list ends.
+
+    Returns
+    -------
+    np.ndarray
+        1D array with the positions of the values of all lists (in order).
+    np.ndarray
+        1D array with the position in the output where each list starts
+        (plus the total size at the end).
+
+    """
+    lengths = (stops - starts).astype(np.int64)
+    split = np.zeros((len(lengths) + 1,), dtype=np.int64)
+    np.cumsum(lengths, out=split[1:])
+    rows = np.arange(split[-1], dtype=np.int64) - np.repeat(split[:-1] - starts, lengths)
+    return rows, split
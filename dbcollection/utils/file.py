@@ -0,0 +1,16 @@
+"""
+File utility functions.
+"""
+
+
+import os
+
+
+def rename_file(src, dst):
+    """Renames a file, replacing the destination file if it exists."""
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # python 2
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
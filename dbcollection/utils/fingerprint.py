@@ -0,0 +1,107 @@
+"""
+Fingerprints of the input files and code used to process the metadata of a set.
+
+A fingerprint changes when an input file is modified (size, modification
+time and, optionally, the hash of its contents) or when the source code of
+the task processor changes, so unchanged sets can be reused when a task is
+processed again.
+"""
+
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+
+# Version of the format of the fingerprints (changing it invalidates all fingerprints).
+FINGERPRINT_VERSION = 1
+
+# Size (in bytes) of the blocks read to hash the contents of a file.
+HASH_BLOCK_NBYTES = 1024 * 1024
+
+
+def get_file_fingerprint(path, hash_contents=False):
+    """Returns the size, modification time and (optionally) the sha1 hash of a file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    hash_contents : bool, optional
+        Hash the contents of the file (if True).
+
+    Returns
+    -------
+    dict
+        Fingerprint of the file (with None values if the file does not exist).
+
+    """
+    assert path, 'Must input a valid file path.'
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"path": path, "size": None, "mtime": None}
+    fingerprint = {"path": path, "size": stat.st_size, "mtime": repr(stat.st_mtime)}
+    if hash_contents:
+        fingerprint["sha1"] = get_file_hash(path)
+    return fingerprint
+
+
+def get_file_hash(path):
+    """Returns the sha1 hash (hex digest) of the contents of a file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_NBYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_source_version(cls):
+    """Returns a hash of the source code of the modules of a class and its base classes."""
+    digest = hashlib.sha1()
+    paths = []
+    for base in inspect.getmro(cls):
+        module = sys.modules.get(base.__module__)
+        try:
+            path = inspect.getsourcefile(module)
+        except TypeError:  # built-in modules
+            path = None
+        if path and path not in paths:
+            paths.append(path)
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def get_fingerprint(files, hash_contents=False, **info):
+    """Returns the fingerprint of a list of input files plus other information.
+
+    Parameters
+    ----------
+    files : list
+        Paths of the input files.
+    hash_contents : bool, optional
+        Hash the contents of the files (if True). Otherwise, only their
+        size and modification time are used.
+    info : dict, optional
+        Other (JSON-serializable) information, like the version of the code
+        or the processing options.
+
+    Returns
+    -------
+    str
+        Fingerprint (sha1 hex digest).
+
+    Examples
+    --------
+    >>> get_fingerprint(['annotations.json'], version='1.0', set_name='train')
+    '8d4e...'
+
+    """
+    assert files is not None, 'Must input a list of files.'
+    fingerprint = dict(info,
+                       fingerprint_version=FINGERPRINT_VERSION,
+                       files=[get_file_fingerprint(path, hash_contents) for path in files])
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
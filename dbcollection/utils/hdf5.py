@@ -3,12 +3,249 @@ hdf5 utility functions.
 """
 
 
+import io
+import json
+
 import h5py
 import numpy as np
 
+from dbcollection.utils.csr import convert_list_to_csr
+from dbcollection.utils.string_ascii import convert_ascii_to_str
+
+
+# Default hdf5 raw data chunk cache settings (see H5Pset_chunk_cache).
+HDF5_DEFAULT_RDCC_NBYTES = 1024 * 1024
+HDF5_DEFAULT_RDCC_NSLOTS = 521
+HDF5_MAX_RDCC_NBYTES = 32 * 1024 * 1024
+HDF5_DEFAULT_RDCC_W0 = 0.75
+
+# Name of the root attribute storing the catalog of sets and fields of a metadata file.
+HDF5_CATALOG_ATTR = 'catalog'
+HDF5_CATALOG_VERSION = 1
+
+# Encoding of fields stored as a group of datasets instead of a single dataset.
+HDF5_ENCODING_ATTR = 'encoding'
+HDF5_CSR_ENCODING = 'csr'
+HDF5_RAGGED_ENCODING = 'ragged'
+HDF5_DICTIONARY_ENCODING = 'dictionary'
+HDF5_FRONT_CODED_ENCODING = 'front_coded'
+
+# Number of strings per block of front-coded string fields.
+DEFAULT_FRONT_CODING_BLOCK_SIZE = 16
+
+# Name of the root attribute storing the storage profile used to write a metadata file.
+HDF5_STORAGE_PROFILE_ATTR = 'storage_profile'
+
+# Storage layout profiles of the fields of a metadata file. The 'default' profile
+# uses the chunking/compression arguments of the write functions.
+HDF5_STORAGE_PROFILES = {
+    "default": None,
+    "random_access": {"chunk_nbytes": 16 * 1024, "compression": "lzf", "compression_opts": None,
+                      "shuffle": True},
+    "sequential": {"chunk_nbytes": 1024 * 1024, "compression": "gzip", "compression_opts": 4,
+                   "shuffle": True},
+    "compact": {"chunk_nbytes": 256 * 1024, "compression": "gzip", "compression_opts": 9,
+                "shuffle": True},
+    "uncompressed": {"chunk_nbytes": None, "compression": None, "compression_opts": None,
+                     "shuffle": False},
+}
+DEFAULT_STORAGE_PROFILE = 'default'
+
+# Number of chunks of the biggest field kept in the chunk cache of the files of each
+# profile: small chunks are read at random, big chunks are read sequentially once.
+HDF5_STORAGE_PROFILE_CACHE_CHUNKS = {
+    "random_access": 64,
+    "sequential": 2,
+}
+HDF5_DEFAULT_CACHE_CHUNKS = 4
+
+# Number of rows buffered by the field writers before writing them to the file.
+DEFAULT_WRITER_BUFFER_ROWS = 4096
+
+# Fields up to this size (in bytes) are stored contiguously and uncompressed by all profiles
+# (except 'default').
+HDF5_CONTIGUOUS_MAX_NBYTES = 64 * 1024
+
+# Name of the attribute storing the data type of a field before it was narrowed.
+HDF5_ORIGINAL_DTYPE_ATTR = 'original_dtype'
+
+# Name of the root attribute storing the tolerance used to narrow the fields of a metadata
+# file (the attribute does not exist if the fields are not narrowed).
+HDF5_NARROW_TOLERANCE_ATTR = 'narrow_tolerance'
+
+# Integer data types tried (in this order) when narrowing the type of a field.
+NARROW_INT_DTYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64)
+
+# Name of the attribute with the fingerprint of the inputs of a set (see dbcollection.utils.fingerprint).
+HDF5_FINGERPRINT_ATTR = 'fingerprint'
+
+
+def get_storage_layout(storage_profile, shape, dtype):
+    """Returns the chunking and compression options of a field for a storage profile.
+
+    Chunks span whole rows, with as many rows as fit in the chunk size of the
+    profile, so reading a row never touches more than one chunk. Small and
+    empty fields, scalars and fields of the 'uncompressed' profile are stored
+    contiguously without compression (which also lets them be memory-mapped
+    directly from the file).
+
+    Parameters
+    ----------
+    storage_profile : str
+        Name of the profile ('default', 'random_access', 'sequential',
+        'compact' or 'uncompressed').
+    shape : tuple
+        Shape of the field.
+    dtype : np.dtype
+        Data type of the field.
+
+    Returns
+    -------
+    dict
+        Options 'chunks', 'compression', 'compression_opts' and 'shuffle'
+        of h5py's create_dataset(), or None for the 'default' profile.
+
+    Raises
+    ------
+    KeyError
+        If the storage profile does not exist.
+
+    """
+    profile = HDF5_STORAGE_PROFILES[parse_storage_profile(storage_profile)]
+    if profile is None:
+        return None
+    shape = tuple(shape)
+    row_nbytes = int(np.prod(shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize
+    nbytes = row_nbytes * shape[0] if shape else 0
+    if profile["chunk_nbytes"] is None or nbytes <= HDF5_CONTIGUOUS_MAX_NBYTES or row_nbytes == 0:
+        return {"chunks": None, "compression": None, "compression_opts": None, "shuffle": False}
+    chunk_rows = max(1, min(shape[0], profile["chunk_nbytes"] // row_nbytes))
+    return {
+        "chunks": (chunk_rows,) + shape[1:],
+        "compression": profile["compression"],
+        "compression_opts": profile["compression_opts"],
+        "shuffle": profile["shuffle"],
+    }
+
+
+def parse_storage_profile(storage_profile):
+    """Checks if a storage profile exists (None is the default profile)."""
+    if storage_profile is None:
+        return DEFAULT_STORAGE_PROFILE
+    if storage_profile not in HDF5_STORAGE_PROFILES:
+        raise KeyError('Invalid storage profile: \'{}\'. Available profiles: {}.'
+                       .format(storage_profile, sorted(HDF5_STORAGE_PROFILES)))
+    return storage_profile
+
+
+def parse_narrow_tolerance(narrow):
+    """Returns the tolerance of a narrowing option (None if narrowing is disabled).
+
+    Parameters
+    ----------
+    narrow : bool/float
+        False (or None) disables narrowing, True only narrows to exact
+        types and a float is the tolerance of the conversions to float32.
+
+    Returns
+    -------
+    float
+        Maximum relative error of the values converted to float32 (or None).
+
+    """
+    if narrow is None or narrow is False:
+        return None
+    if narrow is True:
+        return 0.0
+    tolerance = float(narrow)
+    assert tolerance >= 0, 'Must input a non-negative narrowing tolerance.'
+    return tolerance
+
+
+def get_narrow_dtype(data, tolerance=0.0, fillvalue=None):
+    """Returns the smallest data type that stores the values of an array.
+
+    Integer values are stored in the smallest integer type that holds them
+    and the fill value. Float64 values are stored as float32 if no value
+    changes by more than the (relative) tolerance. Floats are never stored
+    as integers, even if all their values are whole numbers, so readers
+    keep getting floats back.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Data array.
+    tolerance : float, optional
+        Maximum relative error of the values converted to float32.
+    fillvalue : int/float, optional
+        Value used to pad the data (must be stored by the type).
+
+    Returns
+    -------
+    np.dtype
+        Narrowest data type (or the type of the array if none is smaller).
+
+    Examples
+    --------
+    >>> get_narrow_dtype(np.array([0., 1., 1.]))
+    dtype('float32')
+    >>> get_narrow_dtype(np.array([0, 300, 7]), fillvalue=-1)
+    dtype('int16')
+
+    """
+    dtype = data.dtype
+    if data.size == 0 or dtype.kind not in 'iuf':
+        return dtype
+    if fillvalue is not None and not np.isscalar(fillvalue):
+        return dtype
+    if dtype.kind == 'f':
+        if dtype.itemsize > 4 and _is_float32_exact(data, tolerance):
+            return np.dtype(np.float32)
+        return dtype
+    int_dtype = _get_narrow_int_dtype(data, fillvalue)
+    if int_dtype is not None and int_dtype.itemsize < dtype.itemsize:
+        return int_dtype
+    return dtype
+
+
+def _get_narrow_int_dtype(data, fillvalue):
+    """Returns the smallest integer type that holds the values of an integer array (or None)."""
+    values = [data.min(), data.max()]
+    if fillvalue is not None:
+        if not (np.isfinite(fillvalue) and float(fillvalue) == int(fillvalue)):
+            return None
+        values.append(fillvalue)
+    low, high = min(int(value) for value in values), max(int(value) for value in values)
+    for int_dtype in NARROW_INT_DTYPES:
+        info = np.iinfo(int_dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(int_dtype)
+    return None
+
+
+def _is_float32_exact(data, tolerance):
+    """Checks if the values change at most by the (relative) tolerance when stored as float32."""
+    with np.errstate(over='ignore', invalid='ignore'):
+        converted = data.astype(np.float32).astype(data.dtype)
+        error = np.abs(converted - data)
+        is_exact = (converted == data) | (error <= tolerance * np.abs(data))
+        is_nan = np.isnan(converted) & np.isnan(data)
+        return bool(np.all(is_exact | is_nan))
+
+
+def hdf5_get_original_dtype(h5_field):
+    """Returns the data type of a field before it was narrowed (or its data type)."""
+    original_dtype = h5_field.attrs.get(HDF5_ORIGINAL_DTYPE_ATTR)
+    if original_dtype is None:
+        return h5_field.dtype
+    if isinstance(original_dtype, bytes):
+        original_dtype = original_dtype.decode('utf-8')
+    return np.dtype(str(original_dtype))
+
 
 def hdf5_write_data(h5_handler, field_name, data, dtype=None, chunks=True,
-                    compression="gzip", compression_opts=4, fillvalue=-1):
+                    compression="gzip", compression_opts=4, fillvalue=-1,
+                    storage_profile=None, narrow=None):
     """Write/store data into a hdf5 file.
 
     Parameters
@@ -17,40 +254,979 @@ def hdf5_write_data(h5_handler, field_name, data, dtype=None, chunks=True,
         Handler for an HDF5 group object.
     field_name : str
         Field name.
-    data : np.ndarray
-        Data array.
-    dtype : np.dtype, optional
-        Data type.
+    data : np.ndarray
+        Data array.
+    dtype : np.dtype, optional
+        Data type.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    fillvalue : int/float, optional
+        Value to pad the data.
+    storage_profile : str, optional
+        Storage layout profile of the field (see get_storage_layout()). Defaults
+        to the profile of the file. The 'default' profile uses the chunks and
+        compression arguments.
+    narrow : bool/float, optional
+        Store the data with the narrowest type that holds its values (see
+        get_narrow_dtype() and parse_narrow_tolerance()). The original type
+        is stored as an attribute of the field. Defaults to the narrowing
+        option of the file.
+
+    Returns
+    -------
+    h5py._hl.dataset.Dataset
+        Handler for an HDF5 dataset object.
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert field_name, 'Must input a field name.'
+    assert isinstance(data, np.ndarray), 'Data must be a numpy array.'
+
+    if dtype is None:
+        dtype = data.dtype
+
+    if storage_profile is None:
+        storage_profile = hdf5_get_storage_profile(h5_handler.file)
+    if narrow is None:
+        narrow = h5_handler.file.attrs.get(HDF5_NARROW_TOLERANCE_ATTR)
+    tolerance = parse_narrow_tolerance(narrow)
+    original_dtype = None
+    if tolerance is not None:
+        data = np.asarray(data, dtype=dtype)
+        narrow_dtype = get_narrow_dtype(data, tolerance, fillvalue)
+        if narrow_dtype != data.dtype:
+            original_dtype, dtype = data.dtype, narrow_dtype
+            data = data.astype(dtype)
+
+    layout = get_field_layout(storage_profile, data.shape, dtype, chunks, compression,
+                              compression_opts)
+    h5_field = h5_handler.create_dataset(name=field_name,
+                                         data=data,
+                                         shape=data.shape,
+                                         dtype=dtype,
+                                         fillvalue=fillvalue,
+                                         **layout)
+    if original_dtype is not None:
+        h5_field.attrs[HDF5_ORIGINAL_DTYPE_ATTR] = original_dtype.str
+    return h5_field
+
+
+def get_field_layout(storage_profile, shape, dtype, chunks, compression, compression_opts):
+    """Returns the layout options of a field for a storage profile (or the given options)."""
+    layout = get_storage_layout(storage_profile, shape, dtype)
+    if layout is None:
+        return {"chunks": chunks, "compression": compression, "compression_opts": compression_opts}
+    return layout
+
+
+def hdf5_write_list_data(h5_handler, field_name, data, dtype=np.int32, chunks=True,
+                         compression="gzip", compression_opts=4, fillvalue=-1,
+                         storage_profile=None):
+    """Write/store a list of lists of different sizes into a hdf5 file.
+
+    Instead of padding the lists into a matrix, the lists are stored with a
+    compressed sparse row (CSR) encoding: a group with a 'values' dataset with
+    all lists concatenated and an 'offsets' dataset with the position where
+    each list starts.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    data : list
+        List of lists.
+    dtype : np.dtype, optional
+        Data type of the values.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    fillvalue : int/float, optional
+        Value used to pad the lists when they are retrieved as a matrix.
+    storage_profile : str, optional
+        Storage layout profile of the values and offsets (see get_storage_layout()).
+        Defaults to the profile of the file.
+
+    Returns
+    -------
+    h5py._hl.group.Group
+        Handler for the HDF5 group object of the field.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert field_name, 'Must input a field name.'
+    assert isinstance(data, list), 'Data must be a list of lists.'
+
+    return _hdf5_write_csr_data(h5_handler, field_name, data, dtype, HDF5_CSR_ENCODING,
+                                fillvalue, chunks, compression, compression_opts,
+                                storage_profile)
+
+
+def hdf5_write_ragged_data(h5_handler, field_name, data, dtype=None, chunks=True,
+                           compression="gzip", compression_opts=4, storage_profile=None):
+    """Write/store a ragged field (rows of different lengths) into a hdf5 file.
+
+    Ragged fields are stored like CSR-encoded lists (the values of all rows
+    concatenated plus the offsets where each row starts), but they are
+    retrieved as one array per row instead of a padded matrix. The values
+    follow the narrowing option of the file (see hdf5_write_data()).
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    data : list
+        List of rows (lists or 1D arrays).
+    dtype : np.dtype, optional
+        Data type of the values. Defaults to the type of the rows' values.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the values and offsets (see get_storage_layout()).
+        Defaults to the profile of the file.
+
+    Returns
+    -------
+    h5py._hl.group.Group
+        Handler for the HDF5 group object of the field.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert field_name, 'Must input a field name.'
+    assert isinstance(data, list), 'Data must be a list of rows.'
+
+    if dtype is None:
+        dtype = get_ragged_dtype(data)
+    return _hdf5_write_csr_data(h5_handler, field_name, data, dtype, HDF5_RAGGED_ENCODING, 0,
+                                chunks, compression, compression_opts, storage_profile)
+
+
+def get_ragged_dtype(data):
+    """Returns the data type that holds the values of all rows (float64 if all rows are empty)."""
+    dtypes = set(np.asarray(row).dtype for row in data if len(row))
+    if not dtypes:
+        return np.dtype(np.float64)
+    return np.result_type(*dtypes)
+
+
+def _hdf5_write_csr_data(h5_handler, field_name, data, dtype, encoding, fillvalue, chunks,
+                         compression, compression_opts, storage_profile):
+    values, offsets = convert_list_to_csr(data, dtype)
+    h5_group = h5_handler.create_group(field_name)
+    h5_group.attrs[HDF5_ENCODING_ATTR] = encoding
+    h5_group.attrs['fillvalue'] = fillvalue
+    h5_group.attrs['max_length'] = int(np.max(np.diff(offsets))) if len(data) else 0
+    # the values of ragged fields are never padded, so they follow the narrowing option of the file
+    narrow = None if encoding == HDF5_RAGGED_ENCODING else False
+    hdf5_write_data(h5_group, 'values', values, dtype=dtype, chunks=chunks,
+                    compression=compression, compression_opts=compression_opts,
+                    fillvalue=fillvalue, storage_profile=storage_profile, narrow=narrow)
+    hdf5_write_data(h5_group, 'offsets', offsets, dtype=np.int64, chunks=chunks,
+                    compression=compression, compression_opts=compression_opts,
+                    fillvalue=0, storage_profile=storage_profile, narrow=False)
+    return h5_group
+
+
+def hdf5_write_dictionary_strings(h5_handler, field_name, data, chunks=True, compression="gzip",
+                                  compression_opts=4, storage_profile=None):
+    """Write/store a string field with a dictionary encoding into a hdf5 file.
+
+    Each distinct string is stored once in a 'dictionary' matrix of ascii
+    codes and the rows store its position in a 'codes' array (with the
+    narrowest unsigned type). Suited for fields with few distinct strings
+    repeated across rows (e.g., category names per object).
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    data : list
+        List of strings.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the dictionary and codes (see get_storage_layout()).
+        Defaults to the profile of the file.
+
+    Returns
+    -------
+    h5py._hl.group.Group
+        Handler for the HDF5 group object of the field.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert field_name, 'Must input a field name.'
+    assert isinstance(data, (list, tuple)) and data, 'Data must be a non-empty list of strings.'
+
+    positions = {}
+    codes = np.array([positions.setdefault(string, len(positions)) for string in data])
+    dictionary = sorted(positions, key=positions.get)
+    h5_group = _hdf5_create_string_group(h5_handler, field_name, HDF5_DICTIONARY_ENCODING, data)
+    hdf5_write_data(h5_group, 'dictionary', _convert_str_to_ascii_matrix(dictionary), dtype=np.uint8,
+                    chunks=chunks, compression=compression, compression_opts=compression_opts,
+                    fillvalue=0, storage_profile=storage_profile, narrow=False)
+    hdf5_write_data(h5_group, 'codes', codes, dtype=get_narrow_dtype(codes), chunks=chunks,
+                    compression=compression, compression_opts=compression_opts,
+                    fillvalue=0, storage_profile=storage_profile, narrow=False)
+    return h5_group
+
+
+def hdf5_write_front_coded_strings(h5_handler, field_name, data, block_size=DEFAULT_FRONT_CODING_BLOCK_SIZE,
+                                   chunks=True, compression="gzip", compression_opts=4,
+                                   storage_profile=None):
+    """Write/store a string field with a front-coding (prefix compression) encoding into a hdf5 file.
+
+    The strings are split in blocks of 'block_size' rows. The first string
+    of a block is stored whole and the others only store the length of the
+    prefix shared with the previous string ('prefix_lengths') and the rest
+    of the string ('suffixes', the ascii codes of all rows concatenated,
+    with their lengths in 'suffix_lengths'). Only the offset of each block
+    in 'suffixes' is stored ('block_offsets'), since a row is decoded from
+    the start of its block. Suited for fields with long common prefixes
+    (e.g., sorted file names).
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    data : list
+        List of strings.
+    block_size : int, optional
+        Number of strings per block.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the prefix lengths and suffixes (see
+        get_storage_layout()). Defaults to the profile of the file.
+
+    Returns
+    -------
+    h5py._hl.group.Group
+        Handler for the HDF5 group object of the field.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert field_name, 'Must input a field name.'
+    assert isinstance(data, (list, tuple)) and data, 'Data must be a non-empty list of strings.'
+    assert block_size > 0, 'Must input a block size greater than 0.'
+
+    prefix_lengths, suffix_lengths, suffixes = encode_front_coding(data, block_size)
+    block_offsets = np.zeros((len(range(0, len(data), block_size)) + 1,), dtype=np.int64)
+    np.cumsum(np.add.reduceat(suffix_lengths, np.arange(0, len(data), block_size)), out=block_offsets[1:])
+    h5_group = _hdf5_create_string_group(h5_handler, field_name, HDF5_FRONT_CODED_ENCODING, data)
+    h5_group.attrs['block_size'] = block_size
+    fields = [('prefix_lengths', prefix_lengths), ('suffix_lengths', suffix_lengths),
+              ('block_offsets', block_offsets)]
+    for name, field_data in fields:
+        hdf5_write_data(h5_group, name, field_data, dtype=get_narrow_dtype(field_data),
+                        chunks=chunks, compression=compression, compression_opts=compression_opts,
+                        fillvalue=0, storage_profile=storage_profile, narrow=False)
+    hdf5_write_data(h5_group, 'suffixes', suffixes, dtype=np.uint8, chunks=chunks,
+                    compression=compression, compression_opts=compression_opts,
+                    fillvalue=0, storage_profile=storage_profile, narrow=False)
+    return h5_group
+
+
+def get_string_encoding(data):
+    """Returns the encoding that best compresses a list of strings.
+
+    Strings that repeat (at most half of the rows are distinct) use a
+    dictionary encoding, and the others use front coding.
+
+    """
+    if len(set(data)) * 2 <= len(data):
+        return HDF5_DICTIONARY_ENCODING
+    return HDF5_FRONT_CODED_ENCODING
+
+
+def encode_front_coding(data, block_size=DEFAULT_FRONT_CODING_BLOCK_SIZE):
+    """Splits strings into the length of the prefix shared with the previous string and the rest.
+
+    Parameters
+    ----------
+    data : list
+        List of strings.
+    block_size : int, optional
+        Number of strings per block. The first string of each block has no prefix.
+
+    Returns
+    -------
+    np.ndarray
+        Length of the shared prefix of each string.
+    np.ndarray
+        Length of the rest (suffix) of each string.
+    np.ndarray
+        Ascii codes (np.uint8) of the suffixes of all strings concatenated.
+
+    """
+    prefix_lengths = np.zeros((len(data),), dtype=np.int64)
+    suffix_lengths = np.zeros((len(data),), dtype=np.int64)
+    suffixes = []
+    previous = b''
+    for i, string in enumerate(data):
+        encoded = string.encode('latin-1')
+        prefix_length = 0
+        if i % block_size:
+            max_length = min(len(previous), len(encoded))
+            while prefix_length < max_length and previous[prefix_length] == encoded[prefix_length]:
+                prefix_length += 1
+        prefix_lengths[i] = prefix_length
+        suffix_lengths[i] = len(encoded) - prefix_length
+        suffixes.append(encoded[prefix_length:])
+        previous = encoded
+    return prefix_lengths, suffix_lengths, np.frombuffer(b''.join(suffixes), dtype=np.uint8)
+
+
+def _hdf5_create_string_group(h5_handler, field_name, encoding, data):
+    h5_group = h5_handler.create_group(field_name)
+    h5_group.attrs[HDF5_ENCODING_ATTR] = encoding
+    h5_group.attrs['num_rows'] = len(data)
+    h5_group.attrs['max_length'] = max(len(string) for string in data)
+    return h5_group
+
+
+def _convert_str_to_ascii_matrix(data):
+    """Converts a list of strings into a (2D) matrix of ascii codes padded with zeros.
+
+    Unlike convert_str_to_ascii(), it always returns a matrix (e.g., for a
+    single string) and accepts empty strings.
+
+    """
+    encoded = [string.encode('latin-1') for string in data]
+    matrix = np.zeros((len(encoded), max(len(string) for string in encoded) + 1), dtype=np.uint8)
+    for i, string in enumerate(encoded):
+        matrix[i, :len(string)] = np.frombuffer(string, dtype=np.uint8)
+    return matrix
+
+
+def hdf5_open_field_writer(h5_handler, field_name, dtype, row_shape=(), fillvalue=-1,
+                           chunks=True, compression="gzip", compression_opts=4,
+                           storage_profile=None, buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+    """Creates a resizable field in a hdf5 file and returns a writer to append rows to it.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    dtype : np.dtype
+        Data type.
+    row_shape : tuple, optional
+        Shape of the rows of the field (empty for 1-D fields).
+    fillvalue : int/float, optional
+        Value to pad the rows.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the field. Defaults to the profile of the file.
+    buffer_rows : int, optional
+        Number of rows buffered before writing them to the file.
+
+    Returns
+    -------
+    FieldWriter
+        Writer of the field.
+
+    Examples
+    --------
+    >>> with hdf5_open_field_writer(h5_group, 'segmentation', np.float32, (0,)) as writer:
+    ...     for annotation in annotations:
+    ...         writer.append([annotation['segmentation']])
+
+    """
+    return FieldWriter(h5_handler, field_name, dtype, row_shape=row_shape, fillvalue=fillvalue,
+                       chunks=chunks, compression=compression,
+                       compression_opts=compression_opts, storage_profile=storage_profile,
+                       buffer_rows=buffer_rows)
+
+
+def get_resizable_field_layout(storage_profile, row_shape, dtype, chunks, compression,
+                               compression_opts):
+    """Returns the layout options of a resizable field (which must be chunked).
+
+    Rows with unknown widths (0) use the chunk shape guessed by h5py.
+
+    """
+    if 0 in row_shape:
+        layout = get_field_layout(storage_profile, (0,) + row_shape, dtype, chunks,
+                                  compression, compression_opts)
+        return dict(layout, chunks=True)
+    shape = (np.iinfo(np.int32).max,) + row_shape
+    layout = get_field_layout(storage_profile, shape, dtype, chunks, compression,
+                              compression_opts)
+    if not layout["chunks"]:
+        layout = dict(layout, chunks=True)
+    return layout
+
+
+class FieldWriter(object):
+    """Writes the rows of a field in batches into a resizable HDF5 dataset.
+
+    Appended rows are buffered and written every 'buffer_rows' rows, so task
+    processors can stream a field to disk instead of building it in memory
+    first. Rows shorter than the width of the field are padded with the fill
+    value and longer rows grow the field (like pad_list()). When the writer
+    is closed, the buffered rows are written and the width of the field is
+    trimmed to the longest row.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    dtype : np.dtype
+        Data type.
+    row_shape : tuple, optional
+        Shape of the rows of the field (empty for 1-D fields). Widths of 0
+        are unknown and are set by the appended rows.
+    fillvalue : int/float, optional
+        Value to pad the rows.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the field. Defaults to the profile of the file.
+    buffer_rows : int, optional
+        Number of rows buffered before writing them to the file.
+
+    Attributes
+    ----------
+    dataset : h5py._hl.dataset.Dataset
+        Handler of the HDF5 dataset of the field.
+    dtype : np.dtype
+        Data type.
+    fillvalue : int/float
+        Value to pad the rows.
+    buffer_rows : int
+        Number of rows buffered before writing them to the file.
+    nrows : int
+        Number of appended rows (written or buffered).
+
+    """
+
+    def __init__(self, h5_handler, field_name, dtype, row_shape=(), fillvalue=-1, chunks=True,
+                 compression="gzip", compression_opts=4, storage_profile=None,
+                 buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+        """Initialize class."""
+        assert h5_handler, "Must input a hdf5 file handler"
+        assert field_name, 'Must input a field name.'
+        assert buffer_rows > 0, 'Must input a number of buffered rows greater than 0.'
+        self.dtype = np.dtype(dtype)
+        self.fillvalue = fillvalue
+        self.buffer_rows = buffer_rows
+        self.nrows = 0
+        row_shape = tuple(int(n) for n in row_shape)
+        if storage_profile is None:
+            storage_profile = hdf5_get_storage_profile(h5_handler.file)
+        layout = get_resizable_field_layout(storage_profile, row_shape, self.dtype, chunks,
+                                            compression, compression_opts)
+        self.dataset = h5_handler.create_dataset(name=field_name,
+                                                 shape=(0,) + row_shape,
+                                                 maxshape=(None,) * (len(row_shape) + 1),
+                                                 dtype=self.dtype,
+                                                 fillvalue=fillvalue,
+                                                 **layout)
+        self._row_ndim = len(row_shape)
+        self._max_row_shape = (0,) * len(row_shape)  # shape of the longest rows
+        self._buffer = []
+        self._num_buffered = 0
+        self._closed = False
+
+    def append(self, rows):
+        """Appends rows to the field.
+
+        Parameters
+        ----------
+        rows : np.ndarray/list
+            Array of rows (with shape (N,) + row shape), or list of rows
+            with different widths.
+
+        """
+        assert not self._closed, 'The field writer is closed.'
+        if isinstance(rows, np.ndarray) or self._row_ndim == 0:
+            rows = np.asarray(rows)
+            assert rows.ndim == self._row_ndim + 1, \
+                'Must input an array of rows with {} dimension(s).'.format(self._row_ndim + 1)
+            self._add(rows)
+        else:
+            for row in rows:
+                row = np.asarray(row, dtype=self.dtype)
+                assert row.ndim == self._row_ndim, \
+                    'Must input rows with {} dimension(s).'.format(self._row_ndim)
+                self._add(row[np.newaxis])
+
+    def _add(self, rows):
+        self._buffer.append(rows)
+        self._num_buffered += len(rows)
+        self.nrows += len(rows)
+        self._max_row_shape = tuple(max(n, m) for n, m in zip(self._max_row_shape, rows.shape[1:]))
+        if self._num_buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to the file."""
+        if not self._buffer:
+            return
+        row_shape = tuple(max(n, m) for n, m in zip(self.dataset.shape[1:], self._max_row_shape))
+        block = np.full((self._num_buffered,) + row_shape, self.fillvalue, dtype=self.dtype)
+        start = 0
+        for rows in self._buffer:
+            block[(slice(start, start + len(rows)),) + tuple(slice(0, n) for n in rows.shape[1:])] = rows
+            start += len(rows)
+        offset = self.dataset.shape[0]
+        self.dataset.resize((offset + self._num_buffered,) + row_shape)
+        self.dataset[offset:] = block
+        self._buffer = []
+        self._num_buffered = 0
+
+    def close(self):
+        """Writes the buffered rows and trims the width of the field to the longest row."""
+        if self._closed:
+            return
+        self.flush()
+        if self.nrows > 0 and self.dataset.shape[1:] != self._max_row_shape:
+            self.dataset.resize((self.nrows,) + self._max_row_shape)
+        self._closed = True
+
+    def __len__(self):
+        return self.nrows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def hdf5_open_ragged_field_writer(h5_handler, field_name, dtype, chunks=True,
+                                  compression="gzip", compression_opts=4, storage_profile=None,
+                                  buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+    """Creates a ragged field in a hdf5 file and returns a writer to append rows to it.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    dtype : np.dtype
+        Data type of the values.
+    chunks : bool, optional
+        Store data as chunks if True.
+    compression : str, optional
+        Compression algorithm type.
+    compression_opts : int, optional
+        Compression option (range: [1,10])
+    storage_profile : str, optional
+        Storage layout profile of the field. Defaults to the profile of the file.
+    buffer_rows : int, optional
+        Number of values/offsets buffered before writing them to the file.
+
+    Returns
+    -------
+    RaggedFieldWriter
+        Writer of the field.
+
+    """
+    return RaggedFieldWriter(h5_handler, field_name, dtype, chunks=chunks,
+                             compression=compression, compression_opts=compression_opts,
+                             storage_profile=storage_profile, buffer_rows=buffer_rows)
+
+
+class RaggedFieldWriter(object):
+    """Writes the rows of a ragged field in batches (see hdf5_write_ragged_data()).
+
+    The values and offsets of the appended rows are written with field
+    writers to resizable datasets of the field's group.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 group object.
+    field_name : str
+        Field name.
+    dtype : np.dtype
+        Data type of the values.
     chunks : bool, optional
         Store data as chunks if True.
     compression : str, optional
         Compression algorithm type.
     compression_opts : int, optional
         Compression option (range: [1,10])
-    fillvalue : int/float, optional
-        Value to pad the data.
+    storage_profile : str, optional
+        Storage layout profile of the field. Defaults to the profile of the file.
+    buffer_rows : int, optional
+        Number of values/offsets buffered before writing them to the file.
+
+    Attributes
+    ----------
+    group : h5py._hl.group.Group
+        Handler of the HDF5 group of the field.
+    values : FieldWriter
+        Writer of the concatenated values of the rows.
+    offsets : FieldWriter
+        Writer of the offsets of the rows in 'values'.
+
+    """
+
+    def __init__(self, h5_handler, field_name, dtype, chunks=True, compression="gzip",
+                 compression_opts=4, storage_profile=None,
+                 buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+        """Initialize class."""
+        assert h5_handler, "Must input a hdf5 file handler"
+        assert field_name, 'Must input a field name.'
+        if storage_profile is None:
+            storage_profile = hdf5_get_storage_profile(h5_handler.file)
+        self.group = h5_handler.create_group(field_name)
+        self.group.attrs[HDF5_ENCODING_ATTR] = HDF5_RAGGED_ENCODING
+        self.group.attrs['fillvalue'] = 0
+        self.values = FieldWriter(self.group, 'values', dtype, fillvalue=0, chunks=chunks,
+                                  compression=compression, compression_opts=compression_opts,
+                                  storage_profile=storage_profile, buffer_rows=buffer_rows)
+        self.offsets = FieldWriter(self.group, 'offsets', np.int64, fillvalue=0, chunks=chunks,
+                                   compression=compression, compression_opts=compression_opts,
+                                   storage_profile=storage_profile, buffer_rows=buffer_rows)
+        self.offsets.append([0])
+        self._num_values = 0
+        self._max_length = 0
+        self._closed = False
+
+    def append(self, rows):
+        """Appends rows to the field.
+
+        Parameters
+        ----------
+        rows : list
+            List of rows (lists or 1D arrays).
+
+        """
+        assert not self._closed, 'The field writer is closed.'
+        rows = [np.asarray(row, dtype=self.values.dtype) for row in rows]
+        if not rows:
+            return
+        assert all(row.ndim == 1 for row in rows), 'Must input rows with 1 dimension.'
+        lengths = np.array([len(row) for row in rows], dtype=np.int64)
+        self.values.append(np.concatenate(rows))
+        self.offsets.append(self._num_values + np.cumsum(lengths))
+        self._num_values += int(lengths.sum())
+        self._max_length = max(self._max_length, int(lengths.max()))
+
+    def flush(self):
+        """Writes the buffered values and offsets to the file."""
+        self.values.flush()
+        self.offsets.flush()
+
+    def close(self):
+        """Writes the buffered values and offsets and the length of the longest row."""
+        if self._closed:
+            return
+        self.values.close()
+        self.offsets.close()
+        self.group.attrs['max_length'] = self._max_length
+        self._closed = True
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def hdf5_get_encoding(h5_object):
+    """Returns the encoding of a field stored as a group (or None for datasets)."""
+    if not isinstance(h5_object, h5py.Group):
+        return None
+    encoding = h5_object.attrs.get(HDF5_ENCODING_ATTR)
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode('utf-8')
+    return encoding
+
+
+def hdf5_get_chunk_nbytes(h5_handler):
+    """Returns the size (in bytes) of a chunk of every chunked dataset of a file/group.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.group.Group
+        Handler for an HDF5 file or group object.
 
     Returns
     -------
-    h5py._hl.dataset.Dataset
-        Handler for an HDF5 dataset object.
+    list
+        List of chunk sizes (in bytes).
+
     """
     assert h5_handler, "Must input a hdf5 file handler"
-    assert field_name, 'Must input a field name.'
-    assert isinstance(data, np.ndarray), 'Data must be a numpy array.'
+    chunk_nbytes = []
 
-    if dtype is None:
-        dtype = data.dtype
+    def visit_dataset(name, obj):
+        if isinstance(obj, h5py.Dataset) and obj.chunks:
+            chunk_nbytes.append(int(np.prod(obj.chunks)) * obj.dtype.itemsize)
 
-    h5_field = h5_handler.create_dataset(name=field_name,
-                                         data=data,
-                                         shape=data.shape,
-                                         dtype=dtype,
-                                         chunks=chunks,
-                                         compression=compression,
-                                         compression_opts=compression_opts,
-                                         fillvalue=fillvalue)
-    return h5_field
+    h5_handler.visititems(visit_dataset)
+    return chunk_nbytes
+
+
+def hdf5_build_catalog(h5_handler):
+    """Builds a catalog with the sets, fields, shapes, dtypes and object fields of a file.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.files.File
+        Handler for an HDF5 file object.
+
+    Returns
+    -------
+    dict
+        Catalog of the file. Contains a 'sets' dictionary with the
+        'fields' (and their 'shape', 'dtype' and 'chunks') and the
+        'object_fields' of each set (group) of the file, and the
+        'storage_profile' used to write the file.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    sets = {}
+    for set_name, h5_group in h5_handler.items():
+        if not isinstance(h5_group, h5py.Group):
+            continue
+        fields = {}
+        for field, h5_field in h5_group.items():
+            fields[field] = hdf5_get_field_catalog(h5_field)
+        object_fields = []
+        if 'object_fields' in h5_group:
+            object_fields = convert_ascii_to_str(h5_group['object_fields'][()])
+            if isinstance(object_fields, str):
+                object_fields = [object_fields]
+        sets[set_name] = {"fields": fields, "object_fields": list(object_fields)}
+    return {"version": HDF5_CATALOG_VERSION, "sets": sets,
+            "storage_profile": hdf5_get_storage_profile(h5_handler)}
+
+
+def hdf5_get_field_catalog(h5_field):
+    """Returns the shape, dtype and chunk shape of a field (and the encoding of groups)."""
+    if not isinstance(h5_field, h5py.Dataset):
+        return {"shape": None, "dtype": None, "chunks": None,
+                "encoding": hdf5_get_encoding(h5_field)}
+    return {
+        "shape": list(h5_field.shape),
+        "dtype": h5_field.dtype.str,
+        "chunks": list(h5_field.chunks) if h5_field.chunks else None
+    }
+
+
+def hdf5_get_storage_profile(h5_handler):
+    """Returns the storage profile used to write a file ('default' for files without one)."""
+    storage_profile = h5_handler.attrs.get(HDF5_STORAGE_PROFILE_ATTR, DEFAULT_STORAGE_PROFILE)
+    if isinstance(storage_profile, bytes):
+        storage_profile = storage_profile.decode('utf-8')
+    return str(storage_profile)
+
+
+def hdf5_write_catalog(h5_handler, catalog):
+    """Stores a catalog as a (JSON-encoded) attribute of the root group of a file."""
+    assert h5_handler, "Must input a hdf5 file handler"
+    h5_handler.attrs[HDF5_CATALOG_ATTR] = json.dumps(catalog, sort_keys=True)
+
+
+def hdf5_read_catalog(h5_handler):
+    """Reads the catalog of a file.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.files.File
+        Handler for an HDF5 file object.
+
+    Returns
+    -------
+    dict
+        Catalog of the file or None if the file does not have one
+        (e.g., files processed by older versions of the package).
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    catalog = h5_handler.attrs.get(HDF5_CATALOG_ATTR)
+    if catalog is None:
+        return None
+    if isinstance(catalog, bytes):
+        catalog = catalog.decode('utf-8')
+    catalog = json.loads(catalog)
+    if catalog.get("version") != HDF5_CATALOG_VERSION:
+        return None
+    return catalog
+
+
+def hdf5_copy_file_image(h5_handler, image):
+    """Copies the groups and fields of an hdf5 file image into a file.
+
+    Groups that already exist in the file are merged with the ones of the image.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.files.File
+        hdf5 file handler.
+    image : bytes
+        Image (contents) of an hdf5 file.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    assert image, "Must input a valid hdf5 file image"
+    with h5py.File(io.BytesIO(image), 'r') as h5_image:
+        hdf5_copy_groups(h5_handler, h5_image)
+
+
+def hdf5_copy_groups(h5_handler, h5_source, names=None):
+    """Copies groups and fields of an hdf5 file into another file.
+
+    Groups that already exist in the file are merged with the ones of the source.
+
+    Parameters
+    ----------
+    h5_handler : h5py._hl.files.File
+        hdf5 file handler of the destination file.
+    h5_source : h5py._hl.files.File
+        hdf5 file handler of the source file.
+    names : list, optional
+        Names of the groups/fields to copy. By default, all are copied.
+
+    """
+    assert h5_handler, "Must input a hdf5 file handler"
+    for name in (names if names is not None else list(h5_source)):
+        h5_object = h5_source[name]
+        if isinstance(h5_object, h5py.Group) and name in h5_handler:
+            h5_handler[name].attrs.update(h5_object.attrs)
+            for field in h5_object:
+                h5_object.copy(field, h5_handler[name])
+        else:
+            h5_source.copy(name, h5_handler)
+
+
+def get_catalog_chunk_nbytes(catalog):
+    """Returns the size (in bytes) of a chunk of every chunked field of a catalog."""
+    chunk_nbytes = []
+    for set_catalog in catalog["sets"].values():
+        for field_catalog in set_catalog["fields"].values():
+            if field_catalog["chunks"]:
+                itemsize = np.dtype(field_catalog["dtype"]).itemsize
+                chunk_nbytes.append(int(np.prod(field_catalog["chunks"])) * itemsize)
+    return chunk_nbytes
+
+
+def get_chunk_cache_settings(chunk_nbytes, num_chunks=HDF5_DEFAULT_CACHE_CHUNKS):
+    """Computes the hdf5 raw data chunk cache settings for a list of chunk sizes.
+
+    The cache size is set to hold a few chunks of the biggest chunked dataset
+    and the number of hash slots follows the hdf5 recommendation of using a
+    prime number about 100 times bigger than the number of chunks that fit
+    in the cache.
+
+    Parameters
+    ----------
+    chunk_nbytes : list
+        List of chunk sizes (in bytes) of the datasets of a file.
+    num_chunks : int, optional
+        Number of chunks of the biggest dataset that fit in the cache.
+
+    Returns
+    -------
+    tuple
+        Size in bytes (rdcc_nbytes) and number of slots (rdcc_nslots) of the cache.
+
+    """
+    if not chunk_nbytes:
+        return HDF5_DEFAULT_RDCC_NBYTES, HDF5_DEFAULT_RDCC_NSLOTS
+    rdcc_nbytes = max(HDF5_DEFAULT_RDCC_NBYTES, max(chunk_nbytes) * num_chunks)
+    rdcc_nbytes = min(rdcc_nbytes, max(HDF5_MAX_RDCC_NBYTES, max(chunk_nbytes)))
+    max_num_chunks = max(1, rdcc_nbytes // max(1, min(chunk_nbytes)))
+    rdcc_nslots = next_prime(max(HDF5_DEFAULT_RDCC_NSLOTS, min(100 * max_num_chunks, 2 ** 20)))
+    return int(rdcc_nbytes), int(rdcc_nslots)
+
+
+def hdf5_get_object(h5_group, name, chunk_cache=None):
+    """Returns an object (group or dataset) of a group, opening datasets with their own chunk cache.
+
+    The raw data chunk cache is allocated per dataset when it is first
+    opened, so opening the datasets with a custom chunk cache has the same
+    effect as setting the default of the file, without reopening the file.
+    Datasets that are already open keep the cache they were opened with.
+
+    Parameters
+    ----------
+    h5_group : h5py._hl.group.Group
+        Handler for an HDF5 file or group object.
+    name : str
+        Name of the object.
+    chunk_cache : tuple, optional
+        Size in bytes (rdcc_nbytes) and number of slots (rdcc_nslots) of the
+        chunk cache of datasets. Defaults to the settings of the file.
+
+    Returns
+    -------
+    h5py._hl.group.Group/h5py._hl.dataset.Dataset
+        Handler of the object.
+
+    Raises
+    ------
+    KeyError
+        If the object does not exist in the group.
+
+    """
+    assert h5_group, "Must input a hdf5 group handler"
+    if chunk_cache is None or h5_group.get(name, getclass=True) is not h5py.Dataset:
+        return h5_group[name]
+    rdcc_nbytes, rdcc_nslots = chunk_cache
+    dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+    dapl.set_chunk_cache(rdcc_nslots, rdcc_nbytes, HDF5_DEFAULT_RDCC_W0)
+    return h5py.Dataset(h5py.h5d.open(h5_group.id, name.encode('utf-8'), dapl=dapl))
+
+
+def get_storage_profile_cache_chunks(storage_profile):
+    """Returns the number of chunks of the chunk cache of the files of a storage profile."""
+    return HDF5_STORAGE_PROFILE_CACHE_CHUNKS.get(storage_profile, HDF5_DEFAULT_CACHE_CHUNKS)
+
+
+def next_prime(n):
+    """Returns the smallest prime number greater or equal to n."""
+    n = max(2, int(n))
+    while any(n % d == 0 for d in range(2, int(n ** 0.5) + 1)):
+        n += 1
+    return n
 
 
 class HDF5Manager(object):
@@ -58,28 +1234,65 @@ class HDF5Manager(object):
 
     Parameters
     ----------
-    filename : str
-        File name + path of the HDF5 file.
+    filename : str/file-like object
+        File name + path of the HDF5 file (or a file-like object, e.g.,
+        io.BytesIO() to build the file in memory).
+    storage_profile : str, optional
+        Storage layout profile of the fields (see get_storage_layout()),
+        stored as an attribute of the file (keyword-only).
+    narrow_dtypes : bool/float, optional
+        Store the fields with the narrowest type that holds their values
+        (see parse_narrow_tolerance()), stored as an attribute of the file
+        (keyword-only).
 
     Arguments
     ---------
-    filename : str
+    filename : str/file-like object
         File name + path of the HDF5 file.
+    storage_profile : str
+        Storage layout profile of the fields.
+    narrow_tolerance : float
+        Tolerance of the narrowing of the fields' types (None if disabled).
+    writers : list
+        Field writers opened with open_field_writer().
 
     """
-    def __init__(self, filename):
+    def __init__(self, filename, **kwargs):
         assert filename, "Must insert a valid file name."
+        storage_profile = kwargs.pop('storage_profile', DEFAULT_STORAGE_PROFILE)
+        narrow_dtypes = kwargs.pop('narrow_dtypes', False)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: {}.'.format(sorted(kwargs)))
         self.filename = filename
+        self.storage_profile = parse_storage_profile(storage_profile)
+        self.narrow_tolerance = parse_narrow_tolerance(narrow_dtypes)
+        self.writers = []
         self.file = self.open_file(filename)
 
     def open_file(self, filename):
         """Opens/creates an HDF5 file in disk."""
         assert filename
-        return h5py.File(filename, 'w', libver='latest')
+        h5_file = h5py.File(filename, 'w', libver='latest')
+        h5_file.attrs[HDF5_STORAGE_PROFILE_ATTR] = self.storage_profile
+        if self.narrow_tolerance is not None:
+            h5_file.attrs[HDF5_NARROW_TOLERANCE_ATTR] = self.narrow_tolerance
+        return h5_file
 
     def close(self):
+        for writer in self.writers:
+            writer.close()
+        self.write_catalog()
         self.file.close()
 
+    def write_catalog(self):
+        """Stores a catalog of the sets and fields of the file as a root attribute.
+
+        The catalog lets data loaders open the file without visiting
+        every group and dataset of the file.
+
+        """
+        hdf5_write_catalog(self.file, hdf5_build_catalog(self.file))
+
     def exists_group(self, group):
         """Checks if a group exists in the file."""
         assert group, "Must input a valid group name."
@@ -91,7 +1304,8 @@ class HDF5Manager(object):
         return self.file.create_group(name)
 
     def add_field_to_group(self, group, field, data, dtype=None, fillvalue=-1, chunks=True,
-                           compression="gzip", compression_opts=4):
+                           compression="gzip", compression_opts=4, storage_profile=None,
+                           narrow=None):
         """Writes the data of a field into an HDF5 file.
 
         Parameters
@@ -112,6 +1326,13 @@ class HDF5Manager(object):
             Compression option (range: [1,10])
         fillvalue : int/float, optional
             Value to pad the data array.
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile
+            of the file. The 'default' profile uses the chunks and
+            compression arguments.
+        narrow : bool/float, optional
+            Store the data with the narrowest type that holds its values
+            (see hdf5_write_data()). Defaults to the option of the file.
 
         Returns
         -------
@@ -130,24 +1351,277 @@ class HDF5Manager(object):
 
         h5_group = self.get_group(group)
 
-        if dtype is None:
-            dtype = data.dtype
+        if narrow is None:
+            narrow = self.narrow_tolerance if self.narrow_tolerance is not None else False
+
+        return hdf5_write_data(h5_group, field, data, dtype=dtype, chunks=chunks,
+                               compression=compression, compression_opts=compression_opts,
+                               fillvalue=fillvalue,
+                               storage_profile=storage_profile or self.storage_profile,
+                               narrow=narrow)
+
+    def add_file_image(self, image):
+        """Copies the groups and fields of an hdf5 file image into the file.
 
-        h5_field = h5_group.create_dataset(
-            name=field,
-            data=data,
-            shape=data.shape,
-            dtype=dtype,
-            chunks=chunks,
-            compression=compression,
-            compression_opts=compression_opts,
-            fillvalue=fillvalue
-        )
+        Parameters
+        ----------
+        image : bytes
+            Image (contents) of an hdf5 file (e.g., built in memory by
+            another process).
+
+        """
+        hdf5_copy_file_image(self.file, image)
+
+    def add_group_from_file(self, h5_source, group):
+        """Copies a group (and its fields) of another hdf5 file into the file.
+
+        Parameters
+        ----------
+        h5_source : h5py._hl.files.File
+            hdf5 file handler of the source file.
+        group : str
+            Name of the group.
 
-        return h5_field
+        """
+        assert group, "Must input a valid group name."
+        hdf5_copy_groups(self.file, h5_source, [group])
 
     def get_group(self, group):
         if self.exists_group(group):
             return self.file[group]
         else:
             return self.create_group(group)
+
+    def add_list_field_to_group(self, group, field, data, dtype=np.int32, fillvalue=-1,
+                                chunks=True, compression="gzip", compression_opts=4,
+                                storage_profile=None):
+        """Writes a list of lists of a field into an HDF5 file (CSR-encoded).
+
+        Parameters
+        ----------
+        group : str
+            Name of the group.
+        field : str
+            Name of the field.
+        data : list
+            List of lists of different sizes.
+        dtype : np.dtype, optional
+            Data type of the values.
+        fillvalue : int/float, optional
+            Value used to pad the lists when they are retrieved as a matrix.
+        chunks : bool, optional
+            Stores the data as chunks if True.
+        compression : str, optional
+            Compression algorithm type.
+        compression_opts : int, optional
+            Compression option (range: [1,10])
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile of the file.
+
+        Returns
+        -------
+        h5py._hl.group.Group
+            Object handler of the created HDF5 group.
+
+        """
+        assert group, "Must input a valid group name."
+        assert field, "Must input a valid field name."
+        assert isinstance(data, list), "Must input a valid list of lists."
+
+        h5_group = self.get_group(group)
+        return hdf5_write_list_data(h5_group, field, data, dtype=dtype, chunks=chunks,
+                                    compression=compression,
+                                    compression_opts=compression_opts,
+                                    fillvalue=fillvalue,
+                                    storage_profile=storage_profile or self.storage_profile)
+
+    def add_string_field_to_group(self, group, field, data, encoding=None,
+                                  block_size=DEFAULT_FRONT_CODING_BLOCK_SIZE, chunks=True,
+                                  compression="gzip", compression_opts=4, storage_profile=None):
+        """Writes a string field into an HDF5 file with a compressed encoding.
+
+        Parameters
+        ----------
+        group : str
+            Name of the group.
+        field : str
+            Name of the field.
+        data : list
+            List of strings.
+        encoding : str, optional
+            Encoding of the strings: 'dictionary' (see hdf5_write_dictionary_strings())
+            or 'front_coded' (see hdf5_write_front_coded_strings()). By default,
+            it is chosen from the data (see get_string_encoding()).
+        block_size : int, optional
+            Number of strings per block of front-coded fields.
+        chunks : bool, optional
+            Stores the data as chunks if True.
+        compression : str, optional
+            Compression algorithm type.
+        compression_opts : int, optional
+            Compression option (range: [1,10])
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile of the file.
+
+        Returns
+        -------
+        h5py._hl.group.Group
+            Object handler of the created HDF5 group.
+
+        Raises
+        ------
+        KeyError
+            If the encoding is not valid.
+
+        """
+        assert group, "Must input a valid group name."
+        assert field, "Must input a valid field name."
+        assert isinstance(data, (list, tuple)), "Must input a valid list of strings."
+
+        if encoding is None:
+            encoding = get_string_encoding(data)
+        storage_profile = storage_profile or self.storage_profile
+        if encoding == HDF5_DICTIONARY_ENCODING:
+            return hdf5_write_dictionary_strings(self.get_group(group), field, data, chunks=chunks,
+                                                 compression=compression,
+                                                 compression_opts=compression_opts,
+                                                 storage_profile=storage_profile)
+        elif encoding == HDF5_FRONT_CODED_ENCODING:
+            return hdf5_write_front_coded_strings(self.get_group(group), field, data,
+                                                  block_size=block_size, chunks=chunks,
+                                                  compression=compression,
+                                                  compression_opts=compression_opts,
+                                                  storage_profile=storage_profile)
+        else:
+            raise KeyError('Invalid string encoding: \'{}\'. Valid encodings: {}.'
+                           .format(encoding, [HDF5_DICTIONARY_ENCODING, HDF5_FRONT_CODED_ENCODING]))
+
+    def open_field_writer(self, group, field, dtype, row_shape=(), fillvalue=-1, chunks=True,
+                          compression="gzip", compression_opts=4, storage_profile=None,
+                          buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+        """Creates a resizable field in a group and returns a writer to append rows to it.
+
+        The writer is closed when the file is closed (if not closed before).
+
+        Parameters
+        ----------
+        group : str
+            Name of the group.
+        field : str
+            Name of the field (h5 dataset).
+        dtype : np.dtype
+            Data type.
+        row_shape : tuple, optional
+            Shape of the rows of the field (empty for 1-D fields). Widths
+            of 0 are set by the appended rows.
+        fillvalue : int/float, optional
+            Value to pad the rows.
+        chunks : bool, optional
+            Stores the data as chunks if True.
+        compression : str, optional
+            Compression algorithm type.
+        compression_opts : int, optional
+            Compression option (range: [1,10])
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile of the file.
+        buffer_rows : int, optional
+            Number of rows buffered before writing them to the file.
+
+        Returns
+        -------
+        FieldWriter
+            Writer of the field.
+
+        """
+        assert group, "Must input a valid group name."
+        assert field, "Must input a valid field name."
+
+        writer = hdf5_open_field_writer(self.get_group(group), field, dtype, row_shape=row_shape,
+                                        fillvalue=fillvalue, chunks=chunks,
+                                        compression=compression,
+                                        compression_opts=compression_opts,
+                                        storage_profile=storage_profile or self.storage_profile,
+                                        buffer_rows=buffer_rows)
+        self.writers.append(writer)
+        return writer
+
+    def add_ragged_field_to_group(self, group, field, data, dtype=None, chunks=True,
+                                  compression="gzip", compression_opts=4, storage_profile=None):
+        """Writes a ragged field (rows of different lengths) into an HDF5 file.
+
+        Parameters
+        ----------
+        group : str
+            Name of the group.
+        field : str
+            Name of the field.
+        data : list
+            List of rows (lists or 1D arrays).
+        dtype : np.dtype, optional
+            Data type of the values. Defaults to the type of the rows' values.
+        chunks : bool, optional
+            Stores the data as chunks if True.
+        compression : str, optional
+            Compression algorithm type.
+        compression_opts : int, optional
+            Compression option (range: [1,10])
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile of the file.
+
+        Returns
+        -------
+        h5py._hl.group.Group
+            Object handler of the created HDF5 group.
+
+        """
+        assert group, "Must input a valid group name."
+        assert field, "Must input a valid field name."
+        assert isinstance(data, list), "Must input a valid list of rows."
+
+        return hdf5_write_ragged_data(self.get_group(group), field, data, dtype=dtype,
+                                      chunks=chunks, compression=compression,
+                                      compression_opts=compression_opts,
+                                      storage_profile=storage_profile or self.storage_profile)
+
+    def open_ragged_field_writer(self, group, field, dtype, chunks=True, compression="gzip",
+                                 compression_opts=4, storage_profile=None,
+                                 buffer_rows=DEFAULT_WRITER_BUFFER_ROWS):
+        """Creates a ragged field in a group and returns a writer to append rows to it.
+
+        The writer is closed when the file is closed (if not closed before).
+
+        Parameters
+        ----------
+        group : str
+            Name of the group.
+        field : str
+            Name of the field.
+        dtype : np.dtype
+            Data type of the values.
+        chunks : bool, optional
+            Stores the data as chunks if True.
+        compression : str, optional
+            Compression algorithm type.
+        compression_opts : int, optional
+            Compression option (range: [1,10])
+        storage_profile : str, optional
+            Storage layout profile of the field. Defaults to the profile of the file.
+        buffer_rows : int, optional
+            Number of values/offsets buffered before writing them to the file.
+
+        Returns
+        -------
+        RaggedFieldWriter
+            Writer of the field.
+
+        """
+        assert group, "Must input a valid group name."
+        assert field, "Must input a valid field name."
+
+        writer = hdf5_open_ragged_field_writer(self.get_group(group), field, dtype,
+                                               chunks=chunks, compression=compression,
+                                               compression_opts=compression_opts,
+                                               storage_profile=storage_profile or self.storage_profile,
+                                               buffer_rows=buffer_rows)
+        self.writers.append(writer)
+        return writer
@@ -0,0 +1,141 @@
+"""
+Memory-mapping utility functions for hdf5 datasets.
+"""
+
+
+import os
+import numpy as np
+
+from dbcollection.utils.file import rename_file
+
+
+def hdf5_dataset_memmap(h5_dataset):
+    """Maps the data of an hdf5 dataset directly from the hdf5 file.
+
+    Only datasets stored contiguously and without any filter (e.g. compression)
+    have their raw bytes laid out in the file as a numpy array would, so only
+    these can be mapped directly from the file.
+
+    Parameters
+    ----------
+    h5_dataset : h5py._hl.dataset.Dataset
+        Handler for an HDF5 dataset object.
+
+    Returns
+    -------
+    np.memmap
+        Read-only memory-mapped array of the dataset's data, or None if
+        the dataset cannot be mapped from the file.
+
+    """
+    assert h5_dataset, "Must input a valid hdf5 dataset."
+    if not is_hdf5_dataset_mappable(h5_dataset):
+        return None
+    offset = h5_dataset.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(h5_dataset.file.filename, dtype=h5_dataset.dtype, mode='r',
+                     offset=offset, shape=h5_dataset.shape)
+
+
+def is_hdf5_dataset_mappable(h5_dataset):
+    """Checks if a dataset of a local file is stored contiguously, uncompressed and with a plain dtype."""
+    return h5_dataset.file.driver != 'fileobj' \
+        and h5_dataset.chunks is None \
+        and not h5_dataset.compression \
+        and not getattr(h5_dataset, 'external', None) \
+        and h5_dataset.size > 0 \
+        and not h5_dataset.dtype.hasobject \
+        and h5_dataset.dtype.kind in 'biuf'
+
+
+def get_sidecar_filename(hdf5_filepath, *names, **kwargs):
+    """Returns the path of a sidecar file stored next to an hdf5 file.
+
+    Parameters
+    ----------
+    hdf5_filepath : str
+        File name + path of the hdf5 file.
+    names : str
+        Names to identify the sidecar file (e.g., set and field names).
+    ext : str, optional
+        File extension of the sidecar file.
+
+    Returns
+    -------
+    str
+        File name + path of the sidecar file.
+
+    Examples
+    --------
+    >>> get_sidecar_filename('/cache/coco/detection_2015.h5', 'train', 'boxes')
+    '/cache/coco/detection_2015.train.boxes.npy'
+
+    """
+    ext = kwargs.get('ext', '.npy')
+    root, _ = os.path.splitext(hdf5_filepath)
+    return '.'.join([root] + [name.replace('/', '.') for name in names]) + ext
+
+
+def is_sidecar_file_valid(sidecar_filename, hdf5_filepath):
+    """Checks if a sidecar file exists and is newer than the hdf5 file it was built from."""
+    if not os.path.exists(sidecar_filename):
+        return False
+    return os.path.getmtime(sidecar_filename) >= os.path.getmtime(hdf5_filepath)
+
+
+def hdf5_dataset_to_npy(h5_dataset, filename, read_block=None, block_rows=None):
+    """Decompresses an hdf5 dataset into a numpy .npy file.
+
+    The data is copied in blocks of rows so the whole dataset never has to be
+    loaded in memory. The file is first written with a temporary name and then
+    renamed, so concurrent processes never see a partially written file.
+
+    Parameters
+    ----------
+    h5_dataset : h5py._hl.dataset.Dataset
+        Handler for an HDF5 dataset object.
+    filename : str
+        File name + path of the .npy file.
+    read_block : callable, optional
+        Function that receives (start, stop) and returns the rows of the
+        dataset in that range. Defaults to slicing the dataset.
+    block_rows : int, optional
+        Number of rows copied per block.
+
+    """
+    assert h5_dataset, "Must input a valid hdf5 dataset."
+    assert filename, "Must input a valid file name."
+    if read_block is None:
+        def read_block(start, stop):
+            return h5_dataset[start:stop]
+    if block_rows is None:
+        block_rows = get_default_block_rows(h5_dataset)
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    out = np.lib.format.open_memmap(tmp_filename, mode='w+', dtype=h5_dataset.dtype,
+                                    shape=h5_dataset.shape)
+    try:
+        num_rows = h5_dataset.shape[0] if h5_dataset.shape else 0
+        for start in range(0, num_rows, block_rows):
+            stop = min(start + block_rows, num_rows)
+            out[start:stop] = read_block(start, stop)
+        if not h5_dataset.shape:
+            out[()] = h5_dataset[()]
+        out.flush()
+    finally:
+        del out
+    rename_file(tmp_filename, filename)
+
+
+def get_default_block_rows(h5_dataset, block_nbytes=16 * 1024 * 1024):
+    """Returns a number of rows, aligned with the chunks, that fits in block_nbytes bytes."""
+    shape = h5_dataset.shape
+    row_nbytes = max(1, int(np.prod(shape[1:], dtype=np.int64)) * h5_dataset.dtype.itemsize)
+    chunk_rows = h5_dataset.chunks[0] if h5_dataset.chunks else 1
+    num_chunks = max(1, block_nbytes // (row_nbytes * chunk_rows))
+    return num_chunks * chunk_rows
+
+
+def load_npy_memmap(filename):
+    """Loads a .npy file as a read-only memory-mapped array."""
+    return np.load(filename, mmap_mode='r')
@@ -0,0 +1,313 @@
+"""
+Shared memory utility functions to share read-only arrays between processes.
+"""
+
+
+import errno
+import hashlib
+import os
+import tempfile
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+# Prefix of the names of the shared memory blocks.
+SHARED_MEMORY_PREFIX = 'dbc_'
+
+# Number of bytes reserved at the start of a block for its header.
+SHARED_MEMORY_HEADER_NBYTES = 4096
+
+# Positions of the (int64) reference count, 'data is ready' flag and the first
+# slot of the ids of the processes holding references in the header.
+_REFCOUNT = 0
+_READY = 1
+_OWNERS = 2
+
+
+def is_shared_memory_available():
+    """Checks if named shared memory blocks are supported (python 3.8+)."""
+    return shared_memory is not None
+
+
+def get_shared_memory_name(hdf5_filepath, *names):
+    """Returns the name of the shared memory block of a field of an hdf5 file.
+
+    The name is derived from the absolute path and the modification time of
+    the file, so all processes on a host agree on it and blocks of older
+    versions of the file are never reused (files opened through a storage
+    backend, e.g. urls, only use their location). Names are kept short, since some
+    systems limit them to 30 characters.
+
+    Parameters
+    ----------
+    hdf5_filepath : str
+        File name + path of the hdf5 file.
+    names : str
+        Names to identify the block (e.g., set and field names).
+
+    Returns
+    -------
+    str
+        Name of the shared memory block.
+
+    """
+    if os.path.exists(hdf5_filepath):
+        hdf5_filepath = os.path.abspath(hdf5_filepath)
+        version = repr(os.path.getmtime(hdf5_filepath))
+    else:
+        version = ''  # remote file (e.g., a url)
+    key = '|'.join([hdf5_filepath, version] + list(names))
+    return SHARED_MEMORY_PREFIX + hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+
+class SharedArray(object):
+    """Read-only numpy array stored in a named and reference-counted shared memory block.
+
+    The first process to request a block creates it and fills it with the
+    data; the other processes attach to it by name and share the same memory.
+    Each SharedArray holds a reference to the block, which is released with
+    release() or when the object is garbage collected (or the process exits).
+    The block is removed when its last reference is released.
+
+    The header of the block (reference count, a 'data is ready' flag and the
+    ids of the processes holding references) is updated while holding a lock
+    file in the temporary directory, which is removed with the block.
+    References held by processes that died without releasing them are
+    reclaimed by the next process that opens the block. Processes forked from
+    the owner of a SharedArray use the inherited mapping without taking (or
+    releasing) a reference.
+
+    Parameters
+    ----------
+    name : str
+        Name of the shared memory block.
+    shape : tuple
+        Shape of the array.
+    dtype : np.dtype
+        Data type of the array.
+    fill : callable
+        Function that receives the (writable) array of a newly created
+        block and fills it with the data.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block.
+    data : np.ndarray
+        Read-only array with the data of the block (None if released).
+
+    Raises
+    ------
+    ImportError
+        If named shared memory is not supported (python < 3.8).
+
+    """
+
+    def __init__(self, name, shape, dtype, fill):
+        """Initialize class."""
+        if not is_shared_memory_available():
+            raise ImportError('Shared memory requires python 3.8 or higher.')
+        assert name, 'Must input a valid name.'
+        assert callable(fill), 'Must input a callable to fill the array.'
+        self.name = name
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        nbytes = SHARED_MEMORY_HEADER_NBYTES + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        with _lock(name):
+            shm = _open_or_create_shared_memory(name, nbytes)
+            try:
+                assert shm.size >= nbytes, \
+                    'The shared memory block \'{}\' is too small for the array.'.format(name)
+                header = _get_header(shm)
+                _reclaim_dead_owners(header)
+                if not header[_READY]:
+                    fill(np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                                    offset=SHARED_MEMORY_HEADER_NBYTES))
+                    header[_READY] = 1
+                slot = _add_owner(header, os.getpid())
+                del header
+            except BaseException:
+                header = None  # views of the block must be deleted before closing it
+                if _get_refcount(shm) <= 0:
+                    _unlink_shared_memory(shm)
+                    _remove_lock_file(name)
+                _close_shared_memory(shm)
+                raise
+        self.data = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=SHARED_MEMORY_HEADER_NBYTES)
+        self.data.flags.writeable = False
+        self._shm = shm
+        self._finalizer = weakref.finalize(self, _release_shared_memory, shm, os.getpid(), slot)
+
+    def release(self):
+        """Releases the reference to the block (and removes it if it was the last one)."""
+        self.data = None
+        self._finalizer()
+
+    def is_released(self):
+        """Checks if the reference to the block was released."""
+        return not self._finalizer.alive
+
+    def refcount(self):
+        """Returns the number of references to the block (0 if released)."""
+        if self.is_released():
+            return 0
+        return _get_refcount(self._shm)
+
+
+def _get_lock_filename(name):
+    return os.path.join(tempfile.gettempdir(), name + '.lock')
+
+
+@contextmanager
+def _lock(name):
+    """Holds an exclusive lock on the block's lock file (no-op where flock is not available).
+
+    The lock file is removed along with the block, so a process that was
+    waiting on a removed lock file opens (and locks) the new one instead.
+    """
+    if fcntl is None:
+        yield
+        return
+    filename = _get_lock_filename(name)
+    while True:
+        lock_file = open(filename, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            lock_file.close()
+            raise
+        if _is_same_file(lock_file, filename):
+            break
+        lock_file.close()  # removed by another process while waiting for the lock
+    try:
+        yield
+    finally:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def _is_same_file(opened_file, filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return False
+    opened_stat = os.fstat(opened_file.fileno())
+    return (stat.st_dev, stat.st_ino) == (opened_stat.st_dev, opened_stat.st_ino)
+
+
+def _remove_lock_file(name):
+    """Removes the lock file of a block (called while holding the lock)."""
+    if fcntl is None:
+        return
+    try:
+        os.remove(_get_lock_filename(name))
+    except OSError:
+        pass
+
+
+def _open_or_create_shared_memory(name, nbytes):
+    while True:
+        try:
+            return _open_shared_memory(name, create=True, size=nbytes)
+        except FileExistsError:
+            pass
+        try:
+            return _open_shared_memory(name, create=False)
+        except FileNotFoundError:
+            pass  # removed by another process in the meantime
+
+
+def _open_shared_memory(name, create, size=0):
+    """Opens a block without the resource tracker, which would remove it when this process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # python < 3.13
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _unlink_shared_memory(shm):
+    if os.name == 'posix' and not hasattr(shm, '_track'):  # python < 3.13
+        # unlink() unregisters the block from the resource tracker
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+
+
+def _close_shared_memory(shm):
+    try:
+        shm.close()
+    except BufferError:
+        pass  # arrays of the block are still in use; it is unmapped when they are deleted
+
+
+def _get_refcount(shm):
+    return int(np.frombuffer(shm.buf, dtype=np.int64, count=1)[0])
+
+
+def _get_header(shm):
+    return np.ndarray((SHARED_MEMORY_HEADER_NBYTES // 8,), dtype=np.int64, buffer=shm.buf)
+
+
+def _add_owner(header, pid):
+    """Takes a reference to a block and records the owner process in a free slot of the header.
+
+    Returns the slot (or None if all slots are taken, in which case the
+    reference cannot be reclaimed if the process dies without releasing it).
+    """
+    header[_REFCOUNT] += 1
+    free_slots = np.flatnonzero(header[_OWNERS:] == 0)
+    if not len(free_slots):
+        return None
+    slot = _OWNERS + int(free_slots[0])
+    header[slot] = pid
+    return slot
+
+
+def _reclaim_dead_owners(header):
+    """Releases the references held by processes that no longer exist."""
+    for slot in np.flatnonzero(header[_OWNERS:]) + _OWNERS:
+        if not _is_process_alive(int(header[slot])):
+            header[slot] = 0
+            header[_REFCOUNT] -= 1
+
+
+def _is_process_alive(pid):
+    if os.name != 'posix':
+        return True  # os.kill() terminates processes on windows
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM  # exists, but owned by another user
+    return True
+
+
+def _release_shared_memory(shm, pid, slot):
+    """Decrements the reference count of a block and removes it (and its lock file) if unused."""
+    if os.getpid() != pid:
+        return  # inherited by a forked process
+    with _lock(shm.name):
+        header = _get_header(shm)
+        if slot is not None and header[slot] == pid:
+            header[slot] = 0
+        header[_REFCOUNT] -= 1
+        is_unused = header[_REFCOUNT] <= 0
+        del header
+        if is_unused:
+            _unlink_shared_memory(shm)
+            _remove_lock_file(shm.name)
+    _close_shared_memory(shm)
@@ -4,6 +4,7 @@ String-to-ascii and ascii-to-string convertion methods.
 
 
 import numpy as np
+import six
 
 
 def convert_str_to_ascii(input_str):
@@ -127,6 +128,34 @@ def convert_ascii_to_str(input_array):
         return ascii_to_str(list(filter(lambda x: x > 0, list_str)))
 
 
+def convert_ascii_rows_to_str(input_array):
+    """Convert the rows of a 2D numpy array into a list of strings.
+
+    Produces the same output as convert_ascii_to_str() for 2D arrays, but
+    decodes each row from its raw bytes instead of converting each character
+    separately, which is much faster for large arrays.
+
+    Parameters
+    ----------
+    input_array : np.ndarray
+        2D array of strings encoded in ASCII format (dtype=np.uint8).
+
+    Returns
+    -------
+    list
+        List of strings.
+
+    """
+    assert isinstance(input_array, np.ndarray), "Must input a valid numpy array."
+    assert input_array.ndim == 2, "Must input a 2D array."
+    row_size = input_array.shape[1]
+    if row_size == 0:
+        return [''] * len(input_array)
+    data = np.ascontiguousarray(input_array, dtype=np.uint8).tobytes()
+    return [six.ensure_str(data[i:i + row_size].replace(b'\x00', b''), 'latin-1')
+            for i in range(0, len(data), row_size)]
+
+
 def ascii_to_str(input_array):
     """Converts an ascii encoded numpy array to a string.
 
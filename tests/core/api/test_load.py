@@ -3,9 +3,11 @@ Test dbcollection core API: load.
 """
 
 
+import numpy as np
 import pytest
 
 from dbcollection.core.api.load import load, LoadAPI
+from dbcollection.core.registry import LoaderRegistry
 
 
 @pytest.fixture()
@@ -66,6 +68,15 @@ class TestCallLoad:
         assert mock_run.called
         assert data_loader == {}
 
+    def test_call_with_loader_options(self, mocker, mocks_init_class):
+        mock_run = mocker.patch.object(LoadAPI, "run", return_value={})
+
+        data_loader = load('some_dataset', memory_budget='4GB', policy='auto')
+
+        assert_mock_init_class(mocks_init_class)
+        assert mock_run.called
+        assert data_loader == {}
+
     def test_call__raises_error_no_inputs(self, mocker):
         with pytest.raises(TypeError):
             load()
@@ -185,3 +196,76 @@ class TestClassLoadAPI:
 
         assert mock_get_metadata.called
         assert result == '/some/path/cache/task.h5'
+
+    def test_get_loader_obj_with_loader_options(self, mocker, mocks_init_class, test_data):
+        mock_loader = mocker.patch('dbcollection.core.api.load.DataLoader', return_value='loader')
+        load_api = LoadAPI(name=test_data["dataset"],
+                           task=test_data["task"],
+                           data_dir=test_data["data_dir"],
+                           verbose=test_data["verbose"],
+                           memory_budget='4GB',
+                           policy='auto')
+
+        data_loader = load_api.get_loader_obj('/some/path/data', '/some/path/cache/task.h5')
+
+        assert data_loader == 'loader'
+        mock_loader.assert_called_once_with(name=test_data["dataset"],
+                                            task='taskA',
+                                            data_dir='/some/path/data',
+                                            hdf5_filepath='/some/path/cache/task.h5',
+                                            memory_budget='4GB',
+                                            policy='auto')
+
+
+class TestLoadRegistry:
+    """Unit tests for the memoization of the loaders returned by load()."""
+
+    def test_call_returns_registered_loader(self, mocker):
+        mock_find = mocker.patch('dbcollection.core.api.load.loader_registry.find', return_value='loader')
+        mock_init = mocker.patch.object(LoadAPI, "__init__")
+
+        data_loader = load('some_dataset', 'default', reuse=True)
+
+        mock_find.assert_called_once_with('some_dataset', 'default', {})
+        assert not mock_init.called
+        assert data_loader == 'loader'
+
+    def test_call_registers_new_loader(self, mocker, mocks_init_class):
+        mocker.patch('dbcollection.core.api.load.loader_registry.find', return_value=None)
+        mock_add = mocker.patch('dbcollection.core.api.load.loader_registry.add', return_value='loader')
+        mocker.patch.object(LoadAPI, "run", return_value='new_loader')
+
+        data_loader = load('some_dataset', 'some_task', policy='auto', reuse=True)
+
+        mock_add.assert_called_once_with('some_dataset', 'taskA', 'new_loader', {'policy': 'auto'},
+                                         requested_task='some_task')
+        assert data_loader == 'loader'
+
+    def test_call_does_not_reuse_by_default(self, mocker, mocks_init_class):
+        mock_find = mocker.patch('dbcollection.core.api.load.loader_registry.find')
+        mock_add = mocker.patch('dbcollection.core.api.load.loader_registry.add')
+        mocker.patch.object(LoadAPI, "run", return_value='new_loader')
+
+        data_loader = load('some_dataset')
+
+        assert not mock_find.called
+        assert not mock_add.called
+        assert data_loader == 'new_loader'
+
+    def test_reused_loader_does_not_read_the_cache(self, mocker, make_data_loader):
+        mocker.patch('dbcollection.core.api.load.loader_registry', LoaderRegistry())
+        data_loader = make_data_loader({'labels': np.arange(3, dtype=np.int32)})
+        mock_cache = mocker.patch('dbcollection.core.api.load.CacheManager')
+        mock_metadata = mocker.patch('dbcollection.core.api.load.MetadataConstructor')
+        mock_metadata.return_value.parse_task_name.return_value = 'task'
+        mock_run = mocker.patch.object(LoadAPI, "run", return_value=data_loader)
+        assert load('some_db', reuse=True) is data_loader
+        for mock in (mock_cache, mock_metadata, mock_run):
+            mock.reset_mock()
+
+        assert load('some_db', reuse=True) is data_loader
+        assert load('some_db', 'task', reuse=True) is data_loader
+
+        assert not mock_cache.called
+        assert not mock_metadata.called
+        assert not mock_run.called
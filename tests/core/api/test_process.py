@@ -97,6 +97,55 @@ class TestClassProcessAPI:
         with pytest.raises(TypeError):
             ProcessAPI(test_data['dataset'], test_data['task'], test_data['verbose'], 'extra_input')
 
+    def test_init_with_storage_profile(self, mocker, mocks_init_class, test_data):
+        process_api = ProcessAPI(name=test_data['dataset'],
+                                 task=test_data['task'],
+                                 verbose=test_data['verbose'],
+                                 storage_profile='random_access')
+
+        assert process_api.storage_profile == 'random_access'
+
+    def test_init__raises_error_invalid_storage_profile(self, mocker, mocks_init_class, test_data):
+        with pytest.raises(KeyError):
+            ProcessAPI(test_data['dataset'], test_data['task'], test_data['verbose'],
+                       storage_profile='invalid')
+
+    def test_init_with_workers(self, mocker, mocks_init_class, test_data):
+        process_api = ProcessAPI(name=test_data['dataset'],
+                                 task=test_data['task'],
+                                 verbose=test_data['verbose'],
+                                 workers=4)
+
+        assert process_api.workers == 4
+
+    def test_init_with_hash_inputs(self, mocker, mocks_init_class, test_data):
+        process_api = ProcessAPI(name=test_data['dataset'],
+                                 task=test_data['task'],
+                                 verbose=test_data['verbose'],
+                                 hash_inputs=True)
+
+        assert process_api.hash_inputs is True
+
+    def test_init__raises_error_invalid_workers(self, mocker, mocks_init_class, test_data):
+        with pytest.raises(AssertionError):
+            ProcessAPI(name=test_data['dataset'],
+                       task=test_data['task'],
+                       verbose=test_data['verbose'],
+                       workers=0)
+
+    def test_init_with_narrow_dtypes(self, mocker, mocks_init_class, test_data):
+        process_api = ProcessAPI(name=test_data['dataset'],
+                                 task=test_data['task'],
+                                 verbose=test_data['verbose'],
+                                 narrow_dtypes=True)
+
+        assert process_api.narrow_dtypes is True
+
+    def test_init__raises_error_invalid_option(self, mocker, mocks_init_class, test_data):
+        with pytest.raises(TypeError):
+            ProcessAPI(test_data['dataset'], test_data['task'], test_data['verbose'],
+                       invalid_option=True)
+
     def test_init__raises_error_missing_one_input_arg(self, mocker, mocks_init_class, test_data):
         with pytest.raises(TypeError):
             ProcessAPI(test_data['dataset'], test_data['task'])
@@ -194,3 +243,7 @@ class TestClassProcessAPI:
         result = process_api_cls.process_dataset_metadata('/some/path/data', '/some/path/cache', 'taskA')
 
         assert mock_constructor.called
+        assert mock_constructor.return_value.return_value.storage_profile == 'default'
+        assert mock_constructor.return_value.return_value.narrow_dtypes is False
+        assert mock_constructor.return_value.return_value.workers == 1
+        assert mock_constructor.return_value.return_value.hash_inputs is False
@@ -0,0 +1,58 @@
+"""
+Shared fixtures of the tests of dbcollection/core.
+"""
+
+
+import sys
+import numpy as np
+import pytest
+
+from dbcollection.core.loader import DataLoader
+from dbcollection.utils.hdf5 import HDF5Manager
+from dbcollection.utils.string_ascii import convert_str_to_ascii as str_to_ascii
+
+
+# The asyncio interface uses async/await (and async generators), which are
+# syntax errors in older pythons, so its tests cannot even be collected.
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_async_loader.py')
+
+
+@pytest.fixture()
+def make_hdf5_file(tmpdir):
+    """Returns a function that writes a metadata file with the fields of a 'train' set.
+
+    The function receives a dictionary of fields (numpy arrays stored with
+    their type, or lists of strings stored as ascii codes), the names of the
+    'object_fields' (optional) and a function called with the HDF5Manager to
+    write other fields (optional). It returns the path of the file.
+
+    """
+    def make_hdf5_file(fields, object_fields=None, write=None, filename='task.h5'):
+        path = str(tmpdir.join(filename))
+        manager = HDF5Manager(path)
+        if object_fields is not None:
+            fields = dict(fields, object_fields=list(object_fields))
+        for field, data in fields.items():
+            if isinstance(data, (list, tuple)):
+                manager.add_field_to_group('train', field, str_to_ascii(data), dtype=np.uint8,
+                                           fillvalue=0)
+            else:
+                manager.add_field_to_group('train', field, data, dtype=data.dtype)
+        if write is not None:
+            write(manager)
+        manager.close()
+        return path
+
+    return make_hdf5_file
+
+
+@pytest.fixture()
+def make_data_loader(make_hdf5_file):
+    """Returns a function that writes a metadata file (see make_hdf5_file) and loads it."""
+    def make_data_loader(fields, object_fields=None, write=None, **kwargs):
+        filename = make_hdf5_file(fields, object_fields, write)
+        return DataLoader('some_db', 'task', './some/dir', filename, **kwargs)
+
+    return make_data_loader
@@ -0,0 +1,137 @@
+"""
+Test dbcollection/core/async_loader.py.
+"""
+
+
+# asyncio (and the async_loader module) requires python 3.5+ (see conftest.py)
+import asyncio
+import numpy as np
+import pytest
+
+from dbcollection.core.async_loader import AsyncDataLoader
+
+
+@pytest.fixture()
+def data_loader(make_data_loader):
+    return make_data_loader({
+        'object_ids': np.arange(40, dtype=np.int32).reshape(20, 2),
+        'classes': ['class_{}'.format(i) for i in range(40)],
+        'boxes': np.arange(160, dtype=np.float32).reshape(40, 4),
+        'labels': np.arange(20, dtype=np.int32),
+    }, object_fields=['classes', 'boxes'])
+
+
+@pytest.fixture()
+def async_loader(data_loader):
+    with AsyncDataLoader(data_loader, max_workers=2) as loader:
+        yield loader
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def assert_equal_outputs(output, expected):
+    if isinstance(expected, np.ndarray):
+        assert isinstance(output, np.ndarray)
+        assert output.shape == expected.shape
+        assert np.array_equal(output, expected)
+    else:
+        assert output == expected
+
+
+@pytest.mark.parametrize("field, index, convert_to_str", [
+    ('boxes', None, False),
+    ('boxes', 3, False),
+    ('boxes', [3], False),
+    ('boxes', [5, 1, 5], False),
+    ('boxes', slice(2, 8, 2), False),
+    ('boxes', np.array([], dtype=int), False),
+    ('labels', -1, False),
+    ('labels', [0, 19], False),
+    ('classes', [1, 2], True),
+    ('classes', 7, True),
+])
+def test_aget(data_loader, async_loader, field, index, convert_to_str):
+    output = run(async_loader.aget('train', field, index, convert_to_str))
+
+    expected = data_loader.get('train', field, index, convert_to_str)
+    assert_equal_outputs(output, expected)
+
+
+def test_aget_coalesces_concurrent_requests(data_loader, async_loader, mocker):
+    spy = mocker.spy(data_loader, 'get')
+    indexes = [[0, 1, 2], 2, slice(1, 4), [10, 0]]
+
+    async def read_all():
+        return await asyncio.gather(*[async_loader.aget('train', 'boxes', index)
+                                      for index in indexes])
+
+    outputs = run(read_all())
+
+    assert spy.call_count == 1
+    assert spy.call_args[0][2].tolist() == [0, 1, 2, 3, 10]
+    for output, index in zip(outputs, indexes):
+        assert_equal_outputs(output, data_loader.sets['train'].fields['boxes'].get(index))
+
+
+def test_aget_coalesces_requests_of_ragged_fields(make_data_loader):
+    rows = [[0, 1], [], [2, 3, 4], [5]]
+    data_loader = make_data_loader({'object_ids': np.arange(4, dtype=np.int32).reshape(4, 1)},
+                                   object_fields=['data'],
+                                   write=lambda manager: manager.add_ragged_field_to_group(
+                                       'train', 'data', rows))
+    indexes = [[3, 0], 2, slice(1, 3)]
+
+    async def read_all():
+        return await asyncio.gather(*[loader.aget('train', 'data', index) for index in indexes])
+
+    with AsyncDataLoader(data_loader) as loader:
+        outputs = run(read_all())
+
+    assert [row.tolist() for row in outputs[0]] == [rows[3], rows[0]]
+    assert outputs[1].tolist() == rows[2]
+    assert [row.tolist() for row in outputs[2]] == [rows[1], rows[2]]
+
+
+@pytest.mark.parametrize("set_name, field, index, error", [
+    ('val', 'boxes', 0, KeyError),
+    ('train', 'invalid', 0, KeyError),
+    ('train', 'boxes', 100, IndexError),
+    ('train', 'boxes', 'a', TypeError),
+])
+def test_aget_raise_errors(async_loader, set_name, field, index, error):
+    with pytest.raises(error):
+        run(async_loader.aget(set_name, field, index))
+
+
+@pytest.mark.parametrize("index, convert_to_value", [
+    (0, False),
+    ([0, 3], True),
+])
+def test_aobject(data_loader, async_loader, index, convert_to_value):
+    output = run(async_loader.aobject('train', index, convert_to_value))
+
+    expected = data_loader.object('train', index, convert_to_value)
+    assert str(output) == str(expected)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_aiter_batches(data_loader, async_loader, prefetch):
+    async def read_batches():
+        batches = []
+        async for batch in async_loader.aiter_batches('train', ['labels', 'object_ids'], 6,
+                                                      prefetch=prefetch):
+            batches.append(batch)
+        return batches
+
+    batches = run(read_batches())
+
+    assert [len(batch['labels']) for batch in batches] == [6, 6, 6, 2]
+    labels = np.concatenate([batch['labels'] for batch in batches])
+    assert np.array_equal(labels, data_loader.get('train', 'labels'))
+
+
+def test_aiter_batches_raise_error_invalid_set(async_loader):
+    with pytest.raises(KeyError):
+        async_loader.aiter_batches('val', 'labels')
@@ -0,0 +1,114 @@
+"""
+Test dbcollection/core/batch.py.
+"""
+
+
+import threading
+
+import numpy as np
+import pytest
+
+from dbcollection.core.batch import get_batch_indexes, get_chunk_aligned_reader, prefetch_batches
+
+
+def test_get_batch_indexes_sequential():
+    batches = get_batch_indexes(10, 4)
+
+    assert batches == [slice(0, 4), slice(4, 8), slice(8, 10)]
+
+
+def test_get_batch_indexes_drop_last():
+    batches = get_batch_indexes(10, 4, drop_last=True)
+
+    assert batches == [slice(0, 4), slice(4, 8)]
+
+
+def test_get_batch_indexes_shuffle():
+    batches = get_batch_indexes(10, 3, shuffle=True, seed=4)
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert sorted(np.concatenate(batches).tolist()) == list(range(10))
+    assert all(np.array_equal(a, b) for a, b in
+               zip(batches, get_batch_indexes(10, 3, shuffle=True, seed=4)))
+
+
+def get_aligned_reader(data, chunk_rows):
+    reads = []
+
+    def read_rows(index):
+        reads.append((index.start, index.stop))
+        return data[index]
+
+    return get_chunk_aligned_reader(read_rows, chunk_rows, len(data)), reads
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 4, 5, 11])
+def test_chunk_aligned_reader(batch_size):
+    data = np.arange(10)
+    read_batch, reads = get_aligned_reader(data, 4)
+
+    out = [read_batch(index) for index in get_batch_indexes(10, batch_size)]
+
+    assert [batch.tolist() for batch in out] == \
+        [data[index].tolist() for index in get_batch_indexes(10, batch_size)]
+    assert [start for start, _ in reads] == [stop for _, stop in [(0, 0)] + reads[:-1]]
+    assert all(stop % 4 == 0 or stop == 10 for _, stop in reads)
+    assert reads[-1][1] == 10
+
+
+def test_chunk_aligned_reader_restarts_at_other_rows():
+    data = np.arange(10)
+    read_batch, reads = get_aligned_reader(data, 4)
+
+    assert read_batch(slice(0, 3)).tolist() == [0, 1, 2]
+    assert read_batch(slice(6, 7)).tolist() == [6]
+    assert read_batch(slice(1, 2)).tolist() == [1]
+    assert reads == [(0, 4), (6, 8), (1, 4)]
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_prefetch_batches_keeps_order(prefetch):
+    batches = get_batch_indexes(20, 6)
+
+    out = list(prefetch_batches(lambda idx: np.arange(20)[idx], batches, prefetch))
+
+    assert np.array_equal(np.concatenate(out), np.arange(20))
+
+
+def test_prefetch_batches_reads_in_background_thread():
+    threads = []
+
+    def read_batch(batch):
+        threads.append(threading.current_thread())
+        return batch
+
+    list(prefetch_batches(read_batch, [1, 2], prefetch=1))
+
+    assert all(thread is not threading.current_thread() for thread in threads)
+
+
+def test_prefetch_batches_raises_reader_errors():
+    def read_batch(batch):
+        if batch == 2:
+            raise IndexError('bad batch')
+        return batch
+
+    iterator = prefetch_batches(read_batch, [1, 2, 3], prefetch=2)
+
+    assert next(iterator) == 1
+    with pytest.raises(IndexError):
+        next(iterator)
+
+
+def test_prefetch_batches_stops_reading_when_closed():
+    reads = []
+
+    def read_batch(batch):
+        reads.append(batch)
+        return batch
+
+    iterator = prefetch_batches(read_batch, list(range(100)), prefetch=2)
+    next(iterator)
+    iterator.close()
+
+    assert len(reads) < 100
@@ -0,0 +1,63 @@
+"""
+Test dbcollection/core/block_cache.py.
+"""
+
+
+import numpy as np
+import pytest
+
+from dbcollection.core.block_cache import BlockCache
+
+
+def test_get_counts_hits_and_misses():
+    cache = BlockCache(max_nbytes=1024)
+    block = np.zeros(10, dtype=np.uint8)
+
+    cache.get('a', lambda: block)
+    cache.get('a', lambda: block)
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.nbytes == 10
+
+
+def test_get_returns_read_only_blocks():
+    cache = BlockCache(max_nbytes=1024)
+
+    block = cache.get('a', lambda: np.zeros(10))
+
+    with pytest.raises(ValueError):
+        block[0] = 1
+
+
+def test_put_evicts_least_recently_used_block():
+    cache = BlockCache(max_nbytes=30)
+    for key in ('a', 'b', 'c'):
+        cache.get(key, lambda: np.zeros(10, dtype=np.uint8))
+    cache.get('a', lambda: np.zeros(10, dtype=np.uint8))  # 'b' is now the oldest
+
+    cache.get('d', lambda: np.zeros(10, dtype=np.uint8))
+
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache and 'd' in cache
+    assert cache.evictions == 1
+    assert cache.nbytes == 30
+
+
+def test_put_skips_blocks_bigger_than_the_budget():
+    cache = BlockCache(max_nbytes=5)
+
+    cache.get('a', lambda: np.zeros(10, dtype=np.uint8))
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_clear():
+    cache = BlockCache(max_nbytes=1024)
+    cache.get('a', lambda: np.zeros(10, dtype=np.uint8))
+
+    cache.clear()
+
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "blocks": 0,
+                             "nbytes": 0, "max_nbytes": 1024}
@@ -0,0 +1,58 @@
+"""
+Test dbcollection/core/chunk_reader.py.
+"""
+
+
+import h5py
+import numpy as np
+import pytest
+
+from dbcollection.core.chunk_reader import (is_parallel_decodable, read_rows_parallel,
+                                            get_chunk_offsets)
+
+
+@pytest.fixture()
+def hdf5_file(tmpdir):
+    filename = str(tmpdir.join('chunks.h5'))
+    with h5py.File(filename, 'w') as f:
+        f.create_dataset('gzip', data=np.arange(103 * 6, dtype=np.int32).reshape(103, 6),
+                         chunks=(10, 4), compression='gzip')
+        f.create_dataset('shuffle', data=np.linspace(0, 1, 50 * 3).reshape(50, 3),
+                         chunks=(8, 3), compression='gzip', shuffle=True)
+        f.create_dataset('sparse', shape=(40, 2), dtype=np.int16, chunks=(8, 2),
+                         compression='gzip', fillvalue=-1)
+        f['sparse'][8:16] = 5
+        f.create_dataset('lzf', data=np.arange(20), chunks=(4,), compression='lzf')
+        f.create_dataset('contiguous', data=np.arange(20))
+    h5file = h5py.File(filename, 'r')
+    yield h5file
+    h5file.close()
+
+
+def test_is_parallel_decodable(hdf5_file):
+    assert is_parallel_decodable(hdf5_file['gzip'])
+    assert is_parallel_decodable(hdf5_file['shuffle'])
+    assert not is_parallel_decodable(hdf5_file['lzf'])
+    assert not is_parallel_decodable(hdf5_file['contiguous'])
+
+
+@pytest.mark.parametrize("name, start, stop", [
+    ('gzip', 0, 103),
+    ('gzip', 15, 61),
+    ('shuffle', 3, 50),
+    ('sparse', 0, 40),
+])
+@pytest.mark.parametrize("num_threads", [1, 3])
+def test_read_rows_parallel(hdf5_file, name, start, stop, num_threads):
+    dataset = hdf5_file[name]
+
+    data = read_rows_parallel(dataset, start, stop, num_threads)
+
+    assert data.dtype == dataset.dtype
+    assert np.array_equal(data, dataset[start:stop])
+
+
+def test_get_chunk_offsets():
+    offsets = get_chunk_offsets((30, 5), (10, 3), 12, 25)
+
+    assert offsets == [(10, 0), (10, 3), (20, 0), (20, 3)]
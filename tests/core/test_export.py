@@ -0,0 +1,105 @@
+"""
+Test dbcollection/core/export.py.
+"""
+
+
+import numpy as np
+import pytest
+
+from dbcollection.core.export import (get_export_fields, get_column_kind, unpad_rows,
+                                      STRING_COLUMN, LIST_COLUMN, SCALAR_COLUMN, ARRAY_COLUMN)
+from dbcollection.utils.pad import pad_list
+
+
+filenames = ['img_{}.jpg'.format(i) for i in range(7)]
+lists = [[0, 1], [], [2], [3, 4, 5], [], [6], [1, 2]]
+boxes = np.arange(28, dtype=np.float32).reshape(7, 4)
+labels = np.arange(7, dtype=np.int32).reshape(7, 1)
+
+
+def write_list_objects(manager, encoding):
+    if encoding == 'csr':
+        manager.add_list_field_to_group('train', 'list_objects', lists)
+    elif encoding == 'ragged':
+        manager.add_ragged_field_to_group('train', 'list_objects', lists, dtype=np.int32)
+    else:
+        manager.add_field_to_group('train', 'list_objects',
+                                   np.array(pad_list(lists, -1), dtype=np.int32), dtype=np.int32)
+
+
+@pytest.fixture(params=['padded', 'csr', 'ragged'])
+def data_loader(request, make_data_loader):
+    return make_data_loader({
+        'object_ids': np.arange(14, dtype=np.int32).reshape(7, 2),
+        'filename': filenames,
+        'boxes': boxes,
+        'labels': labels,
+        'classes': ['cat', 'dog'],
+    }, object_fields=['filename', 'boxes'],
+        write=lambda manager: write_list_objects(manager, request.param))
+
+
+def test_get_export_fields(data_loader):
+    set_loader = data_loader.sets['train']
+
+    assert get_export_fields(set_loader) == ['boxes', 'filename', 'labels', 'list_objects',
+                                             'object_ids']
+    assert get_export_fields(set_loader, 'boxes') == ['boxes']
+    with pytest.raises(KeyError):
+        get_export_fields(set_loader, ['boxes', 'invalid'])
+
+
+@pytest.mark.parametrize("field, kind", [
+    ('filename', STRING_COLUMN),
+    ('list_objects', LIST_COLUMN),
+    ('labels', SCALAR_COLUMN),
+    ('boxes', ARRAY_COLUMN),
+])
+def test_get_column_kind(data_loader, field, kind):
+    assert get_column_kind(data_loader.sets['train'], field) == kind
+
+
+def test_unpad_rows():
+    values, offsets = unpad_rows(np.array([[1, 2, -1], [-1, -1, -1], [3, -1, -1]]), -1)
+
+    assert values.tolist() == [1, 2, 3]
+    assert offsets.tolist() == [0, 2, 2, 3]
+
+
+@pytest.mark.parametrize("chunk_size", [3, 100])
+def test_to_pandas(data_loader, chunk_size):
+    df = data_loader.to_pandas('train', chunk_size=chunk_size)
+
+    assert list(df.columns) == ['boxes', 'filename', 'labels', 'list_objects', 'object_ids']
+    assert len(df) == 7
+    assert df['filename'].tolist() == filenames
+    assert df['labels'].tolist() == labels[:, 0].tolist()
+    assert df['labels'].dtype == np.int32
+    assert [l.tolist() for l in df['list_objects']] == lists
+    assert np.array_equal(np.stack(df['boxes'].values), boxes)
+
+
+def test_to_pandas_raise_error_fields_with_different_rows(data_loader):
+    with pytest.raises(AssertionError):
+        data_loader.to_pandas('train', fields=['labels', 'classes'])
+
+
+def test_to_pandas_raise_error_invalid_set(data_loader):
+    with pytest.raises(KeyError):
+        data_loader.to_pandas('val')
+
+
+@pytest.mark.parametrize("chunk_size", [3, 100])
+def test_to_arrow(data_loader, chunk_size):
+    pa = pytest.importorskip('pyarrow')
+
+    table = data_loader.to_arrow('train', fields=['filename', 'labels', 'list_objects', 'boxes'],
+                                 chunk_size=chunk_size)
+
+    assert table.num_rows == 7
+    assert table.column('filename').to_pylist() == filenames
+    assert table.column('labels').to_pylist() == labels[:, 0].tolist()
+    assert table.column('list_objects').to_pylist() == lists
+    assert table.column('boxes').to_pylist() == boxes.tolist()
+    assert table.schema.field('labels').type == pa.int32()
+    assert table.schema.field('filename').type == pa.string()
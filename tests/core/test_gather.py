@@ -0,0 +1,75 @@
+"""
+Test dbcollection/core/gather.py.
+"""
+
+
+import numpy as np
+import pytest
+
+from dbcollection.core.gather import normalize_index, get_covering_ranges, gather_rows
+
+
+@pytest.mark.parametrize("index, expected", [
+    (3, 3),
+    (-1, 9),
+    ([], None),
+    ([4], 4),
+    ((2,), 2),
+    (slice(2, 5), slice(2, 5, 1)),
+])
+def test_normalize_index(index, expected):
+    assert normalize_index(index, 10) == expected
+
+
+def test_normalize_index_array_keeps_order_and_duplicates():
+    rows = normalize_index([5, 1, 1, -2], 10)
+
+    assert rows.tolist() == [5, 1, 1, 8]
+
+
+def test_normalize_index_boolean_mask():
+    mask = np.array([True, False, True, False])
+
+    rows = normalize_index(mask, 4)
+
+    assert rows.tolist() == [0, 2]
+
+
+def test_normalize_index_raises_error_invalid_type():
+    with pytest.raises(TypeError):
+        normalize_index({1, 2}, 10)
+
+
+@pytest.mark.parametrize("index", [10, -11, [0, 10], np.array([True, False])])
+def test_normalize_index_raises_error_out_of_range(index):
+    with pytest.raises(IndexError):
+        normalize_index(index, 10)
+
+
+def test_get_covering_ranges_merges_consecutive_chunks():
+    rows = np.array([0, 3, 4, 12, 27])
+
+    ranges = get_covering_ranges(rows, chunk_rows=4, length=30)
+
+    assert ranges == [(0, 8), (12, 16), (24, 28)]
+
+
+def test_get_covering_ranges_clips_last_chunk():
+    ranges = get_covering_ranges(np.array([29]), chunk_rows=4, length=30)
+
+    assert ranges == [(28, 30)]
+
+
+def test_gather_rows_reads_each_range_once():
+    data = np.arange(100).reshape(50, 2)
+    reads = []
+
+    def read_block(start, stop):
+        reads.append((start, stop))
+        return data[start:stop]
+
+    rows = np.array([40, 1, 2, 1, 49])
+    out = gather_rows(read_block, rows, chunk_rows=8, length=50)
+
+    assert np.array_equal(out, data[rows])
+    assert reads == [(0, 8), (40, 50)]
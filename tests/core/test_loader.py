@@ -5,11 +5,18 @@ Test dbcollection/utils/loader.py.
 
 import os
 import sys
+import pickle
 import numpy as np
 import h5py
 import pytest
 
-from dbcollection.core.loader import FieldLoader, SetLoader, DataLoader
+from dbcollection.core.block_cache import BlockCache
+from dbcollection.core.chunk_reader import read_rows_parallel
+from dbcollection.core.loader import (FieldLoader, CSRFieldLoader, RaggedFieldLoader, SetLoader,
+                                      DataLoader, DictionaryFieldLoader, FrontCodedFieldLoader)
+from dbcollection.utils.hdf5 import HDF5Manager, hdf5_write_data
+from dbcollection.utils.pad import pad_list
+from dbcollection.utils.shared_memory import is_shared_memory_available
 from dbcollection.utils.string_ascii import convert_ascii_to_str as ascii_to_str
 from dbcollection.utils.string_ascii import convert_str_to_ascii as str_to_ascii
 
@@ -244,7 +251,7 @@ class TestFieldLoader:
             idx = [0, 0]
             data = field_loader.get(idx)
 
-            assert np.array_equal(data, set_data['data'][list(set(idx))])
+            assert np.array_equal(data, set_data['data'][idx])
 
         def test_get_single_obj_list_of_equal_indexes_in_memory(self):
             field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
@@ -253,7 +260,7 @@ class TestFieldLoader:
             idx = [0, 0]
             data = field_loader.get(idx)
 
-            assert np.array_equal(data, set_data['data'][list(set(idx))])
+            assert np.array_equal(data, set_data['data'][idx])
 
         def test_get_single_obj_list(self):
             field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
@@ -403,7 +410,7 @@ class TestFieldLoader:
             idx = [8, 2, 5, 1]
             data = field_loader.get(idx)
 
-            assert not np.array_equal(data, set_data['data'][idx])
+            assert np.array_equal(data, set_data['data'][idx])
 
         def test_get_multiple_objs_unordered_in_memory(self):
             field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
@@ -412,7 +419,43 @@ class TestFieldLoader:
             idx = [8, 2, 5, 1]
             data = field_loader.get(idx)
 
-            assert not np.array_equal(data, set_data['data'][idx])
+            assert np.array_equal(data, set_data['data'][idx])
+
+        @pytest.mark.parametrize("to_memory", [False, True])
+        def test_get_numpy_array_unordered_with_duplicates(self, to_memory):
+            field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
+
+            field_loader.to_memory = to_memory
+            idx = np.array([9, 3, 3, 0, 9, -1])
+            data = field_loader.get(idx)
+
+            assert np.array_equal(data, set_data['data'][idx])
+
+        @pytest.mark.parametrize("to_memory", [False, True])
+        @pytest.mark.parametrize("idx", [slice(2, 7), slice(1, None, 3), slice(None, None, -2)])
+        def test_get_slice(self, idx, to_memory):
+            field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
+
+            field_loader.to_memory = to_memory
+            data = field_loader.get(idx)
+
+            assert np.array_equal(data, set_data['data'][idx])
+
+        @pytest.mark.parametrize("to_memory", [False, True])
+        def test_get_boolean_mask(self, to_memory):
+            field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
+
+            field_loader.to_memory = to_memory
+            mask = set_data['data'][:, 0] > 4
+            data = field_loader.get(mask)
+
+            assert np.array_equal(data, set_data['data'][mask])
+
+        def test_get_raises_error_index_out_of_range(self):
+            field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
+
+            with pytest.raises(IndexError):
+                field_loader.get([0, 10])
 
         def test_get_all_obj(self):
             field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
@@ -473,6 +516,33 @@ class TestFieldLoader:
 
         assert isinstance(field_loader.data, h5py._hl.dataset.Dataset)
 
+    def test_to_mmap_maps_contiguous_data_from_the_hdf5_file(self):
+        field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
+
+        field_loader.to_mmap = True
+
+        assert isinstance(field_loader.data, np.memmap)
+        assert field_loader.data.filename == os.path.abspath(db_generator.hdf5_filepath)
+        assert np.array_equal(field_loader.get([3, 1, 3]), set_data['data'][[3, 1, 3]])
+        assert np.array_equal(field_loader.get(), set_data['data'])
+
+    def test_to_mmap_to_disk(self):
+        field_loader, _ = db_generator.get_test_data_FieldLoader('train')
+
+        field_loader.to_mmap = True
+        field_loader.to_mmap = False
+
+        assert isinstance(field_loader.data, h5py._hl.dataset.Dataset)
+
+    def test_to_memory_disables_mmap(self):
+        field_loader, _ = db_generator.get_test_data_FieldLoader('train')
+
+        field_loader.to_mmap = True
+        field_loader.to_memory = True
+
+        assert not field_loader.to_mmap
+        assert not isinstance(field_loader.data, np.memmap)
+
     def test__len__(self):
         field_loader, set_data = db_generator.get_test_data_FieldLoader('train')
 
@@ -661,7 +731,7 @@ class TestSetLoader:
             idx = [0, 0]
             data = set_loader.get(field, idx)
 
-            assert np.array_equal(data, set_data[field][list(set(idx))])
+            assert np.array_equal(data, set_data[field][idx])
 
         def test_get_data_two_objs_in_memory(self):
             set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
@@ -671,7 +741,7 @@ class TestSetLoader:
             set_loader.fields[field].to_memory = True
             data = set_loader.get(field, idx)
 
-            assert np.array_equal(data, set_data[field][list(set(idx))])
+            assert np.array_equal(data, set_data[field][idx])
 
         def test_get_data_multiple_objs(self):
             set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
@@ -781,6 +851,51 @@ class TestSetLoader:
 
             assert compare_lists(data, expected)
 
+    class TestObjectColumns:
+        """Group tests for the object_columns() method."""
+
+        def test_object_columns_all_fields(self):
+            set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
+
+            idx = [4, 0, 4]
+            columns, masks = set_loader.object_columns(idx)
+
+            assert sorted(columns) == sorted(set_loader.object_fields)
+            for field in set_loader.object_fields:
+                assert np.array_equal(columns[field], set_data[field][idx])
+                assert masks[field].all()
+
+        def test_object_columns_single_obj(self):
+            set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
+
+            columns, _ = set_loader.object_columns(2, fields=['data'])
+
+            assert np.array_equal(columns['data'], set_data['data'][[2]])
+
+        def test_object_columns_fields_projection(self):
+            set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
+
+            columns, masks = set_loader.object_columns(fields=['number'])
+
+            assert list(columns) == ['number']
+            assert np.array_equal(columns['number'], set_data['number'])
+
+        def test_object_columns_as_structured_array(self):
+            set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
+
+            idx = [1, 3]
+            columns, _ = set_loader.object_columns(idx, fields=['data', 'number'], as_structured=True)
+
+            assert columns.dtype.names == ('data', 'number')
+            assert np.array_equal(columns['data'], set_data['data'][idx])
+            assert np.array_equal(columns['number'], set_data['number'][idx])
+
+        def test_object_columns_raises_error_invalid_field(self):
+            set_loader, _, _ = db_generator.get_test_dataset_SetLoader('train')
+
+            with pytest.raises(KeyError):
+                set_loader.object_columns(0, fields=['list_dummy_data'])
+
     def test_size(self):
         set_loader, set_data, _ = db_generator.get_test_dataset_SetLoader('train')
 
@@ -1115,3 +1230,789 @@ class TestDataLoader:
         matching_str = "DataLoader: some_db ('task' task)"
 
         assert str(data_loader) == matching_str
+
+
+class TestFieldLoaderBlockCache:
+    """Unit tests for reading compressed fields from disk through the block cache."""
+
+    @pytest.fixture()
+    def compressed_field(self, tmpdir):
+        filename = str(tmpdir.join('compressed.h5'))
+        data = np.arange(200 * 3).reshape(200, 3)
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('train/data', data=data, chunks=(16, 3), compression='gzip')
+        h5file = h5py.File(filename, 'r')
+        yield h5file['train/data'], data
+        h5file.close()
+
+    def test_get_single_row_hits_cache(self, compressed_field):
+        dataset, data = compressed_field
+        cache = BlockCache(1024 * 1024)
+        field_loader = FieldLoader(dataset, block_cache=cache)
+
+        out = [field_loader.get(i) for i in (0, 5, 15, 16)]
+
+        assert np.array_equal(np.array(out), data[[0, 5, 15, 16]])
+        assert cache.misses == 2
+        assert cache.hits == 2
+
+    def test_get_multiple_rows(self, compressed_field):
+        dataset, data = compressed_field
+        field_loader = FieldLoader(dataset, block_cache=BlockCache(1024 * 1024))
+
+        idx = [150, 3, 3, 199, 40]
+        out = field_loader.get(idx)
+
+        assert np.array_equal(out, data[idx])
+
+    def test_get_slice(self, compressed_field):
+        dataset, data = compressed_field
+        field_loader = FieldLoader(dataset, block_cache=BlockCache(1024 * 1024))
+
+        out = field_loader.get(slice(10, 50))
+
+        assert np.array_equal(out, data[10:50])
+
+    def test__getitem__(self, compressed_field):
+        dataset, data = compressed_field
+        field_loader = FieldLoader(dataset, block_cache=BlockCache(1024 * 1024))
+
+        assert np.array_equal(field_loader[-1], data[-1])
+        assert field_loader[20, 2] == data[20, 2]
+
+    def test_returned_rows_do_not_share_memory_with_the_cache(self, compressed_field):
+        dataset, data = compressed_field
+        field_loader = FieldLoader(dataset, block_cache=BlockCache(1024 * 1024))
+
+        row = field_loader.get(0)
+        row[0] = -100
+
+        assert field_loader.get(0)[0] == data[0, 0]
+
+
+class TestFieldLoaderMmap:
+    """Unit tests for memory-mapping compressed fields."""
+
+    def test_to_mmap_compressed_field_uses_sidecar_file(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        data = np.arange(100 * 4, dtype=np.float32).reshape(100, 4)
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('train/boxes', data=data, chunks=(8, 4), compression='gzip')
+        h5file = h5py.File(filename, 'r')
+        field_loader = FieldLoader(h5file['train/boxes'])
+
+        field_loader.to_mmap = True
+
+        assert isinstance(field_loader.data, np.memmap)
+        assert field_loader.data.filename == str(tmpdir.join('task.train.boxes.npy'))
+        assert not field_loader.data.flags.writeable
+        assert np.array_equal(field_loader.get(slice(None, None, -1)), data[::-1])
+        h5file.close()
+
+
+@pytest.mark.skipif(not is_shared_memory_available(), reason='requires python 3.8+')
+class TestFieldLoaderSharedMemory:
+    """Unit tests for storing fields in shared memory."""
+
+    @pytest.fixture()
+    def h5file(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('train/boxes', data=np.arange(100 * 4, dtype=np.float32).reshape(100, 4),
+                             chunks=(8, 4), compression='gzip')
+        h5file = h5py.File(filename, 'r')
+        yield h5file
+        h5file.close()
+
+    def test_to_shared_memory(self, h5file):
+        field_loader = FieldLoader(h5file['train/boxes'])
+
+        field_loader.to_shared_memory = True
+
+        assert field_loader.to_shared_memory
+        assert field_loader.to_memory
+        assert not field_loader.data.flags.writeable
+        assert np.array_equal(field_loader.get([3, 1]), h5file['train/boxes'][()][[3, 1]])
+        field_loader.to_shared_memory = False
+
+    def test_loaders_of_the_same_field_share_the_block(self, h5file):
+        field_loader = FieldLoader(h5file['train/boxes'])
+        other = FieldLoader(h5file['train/boxes'])
+
+        field_loader.to_shared_memory = True
+        other.to_shared_memory = True
+
+        assert other._shared_array.name == field_loader._shared_array.name
+        assert other._shared_array.refcount() == 2
+        field_loader.to_memory = False
+        assert other._shared_array.refcount() == 1
+        assert np.array_equal(other.get(), h5file['train/boxes'][()])
+        other.to_mmap = True
+        assert not other.to_shared_memory
+
+    def test_to_memory_releases_the_block(self, h5file):
+        field_loader = FieldLoader(h5file['train/boxes'])
+        field_loader.to_shared_memory = True
+        shared_array = field_loader._shared_array
+
+        field_loader.to_memory = True
+
+        assert shared_array.is_released()
+        assert field_loader.to_memory
+        assert not field_loader.to_shared_memory
+        assert field_loader.data.flags.writeable
+
+
+class TestSetLoaderUndefinedObjectIds:
+    """Unit tests for objects with undefined (-1) field indexes."""
+
+    @pytest.fixture()
+    def set_loader(self, tmpdir):
+        filename = str(tmpdir.join('objects.h5'))
+        with h5py.File(filename, 'w') as f:
+            f['train/boxes'] = np.arange(8, dtype=np.float32).reshape(4, 2)
+            f['train/labels'] = np.array([10, 20, 30], dtype=np.int32)
+            f['train/object_fields'] = str_to_ascii(['boxes', 'labels'])
+            f['train/object_ids'] = np.array([[0, 2], [3, -1], [-1, 0]], dtype=np.int32)
+        h5file = h5py.File(filename, 'r')
+        yield SetLoader(h5file['train'])
+        h5file.close()
+
+    def test_object_columns_masks(self, set_loader):
+        columns, masks = set_loader.object_columns()
+
+        assert masks['boxes'].tolist() == [True, True, False]
+        assert masks['labels'].tolist() == [True, False, True]
+        assert columns['labels'][[0, 2]].tolist() == [30, 10]
+        assert np.array_equal(columns['boxes'][:2], [[0, 1], [6, 7]])
+
+    def test_object_convert_to_value(self, set_loader):
+        data = set_loader.object([1, 2], convert_to_value=True)
+
+        assert np.array_equal(data[0][0], [6, 7])
+        assert data[0][1] == []
+        assert data[1][0] == []
+        assert data[1][1] == 10
+
+
+class TestDataLoaderProcessSafety:
+    """Unit tests for pickling, closing and reopening the DataLoader's hdf5 file."""
+
+    def test_pickle_round_trip(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert new_loader.db_name == data_loader.db_name
+        assert new_loader.hdf5_filepath == data_loader.hdf5_filepath
+        assert not new_loader._file_handler.is_open()
+        assert np.array_equal(new_loader.get('train', 'data', 2), dataset['train']['data'][2])
+
+    def test_pickle_keeps_access_modes(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+        data_loader.sets['train'].fields['data'].to_memory = True
+
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert new_loader.sets['train'].fields['data'].to_memory
+        assert np.array_equal(new_loader.get('train', 'data'), dataset['train']['data'])
+
+    @pytest.mark.skipif(not is_shared_memory_available(), reason='requires python 3.8+')
+    def test_pickle_keeps_shared_memory_access_mode(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+        data_loader.sets['train'].fields['data'].to_shared_memory = True
+
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert new_loader.sets['train'].fields['data'].to_shared_memory
+        assert np.array_equal(new_loader.get('train', 'data'), dataset['train']['data'])
+        new_loader.sets['train'].fields['data'].to_shared_memory = False
+        data_loader.sets['train'].fields['data'].to_shared_memory = False
+
+    def test_close_and_reopen(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+
+        data_loader.close()
+
+        assert not data_loader._file_handler.is_open()
+        assert np.array_equal(data_loader.get('train', 'data', 0), dataset['train']['data'][0])
+        assert np.array_equal(data_loader.sets['train'].fields['data'][1],
+                              dataset['train']['data'][1])
+
+    def test_context_manager_closes_file(self):
+        data_loader, _, _ = db_generator.get_test_dataset_DataLoader()
+
+        with data_loader as loader:
+            loader.get('train', 'data', 0)
+
+        assert not data_loader._file_handler.is_open()
+
+    def test_reopens_file_in_a_new_process(self, mocker):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+        old_file = data_loader.hdf5_file
+
+        mocker.patch('os.getpid', return_value=os.getpid() + 1)
+        data = data_loader.get('train', 'data', 3)
+
+        assert data_loader.hdf5_file is not old_file
+        assert data_loader.sets['train'].fields['data'].hdf5_handler.file == data_loader.hdf5_file
+        assert np.array_equal(data, dataset['train']['data'][3])
+
+
+class TestIterBatches:
+    """Unit tests for iterating over batches of rows of a set."""
+
+    def test_sequential_batches(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+
+        batches = list(data_loader.iter_batches('train', ['data', 'number'], batch_size=4))
+
+        assert len(batches) == 3
+        assert np.array_equal(np.concatenate([b['data'] for b in batches]),
+                              dataset['train']['data'])
+        assert np.array_equal(batches[1]['number'], dataset['train']['number'][4:8])
+
+    def test_shuffled_batches_drop_last(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+
+        batches = list(data_loader.iter_batches('train', 'data', batch_size=4, shuffle=True,
+                                                drop_last=True, seed=0))
+
+        assert [len(b['data']) for b in batches] == [4, 4]
+        rows = np.random.RandomState(0).permutation(10)[:4]
+        assert np.array_equal(batches[0]['data'], dataset['train']['data'][rows])
+
+    def test_sequential_batches_read_whole_chunks(self, mocker, make_data_loader):
+        def write(manager):
+            hdf5_write_data(manager.get_group('train'), 'labels', np.arange(10, dtype=np.int32),
+                            chunks=(4,), storage_profile='default')
+        data_loader = make_data_loader({'object_ids': np.arange(10, dtype=np.int32).reshape(10, 1)},
+                                       write=write)
+        field_loader = data_loader.sets['train'].fields['labels']
+        mock_get = mocker.patch.object(field_loader, 'get', side_effect=field_loader.get)
+
+        batches = list(data_loader.iter_batches('train', 'labels', batch_size=3))
+
+        assert [batch['labels'].tolist() for batch in batches] == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+        assert [call[0][0] for call in mock_get.call_args_list] == [slice(0, 4), slice(4, 8), slice(8, 10)]
+
+    def test_in_memory_field_is_not_copied(self):
+        data_loader, _, _ = db_generator.get_test_dataset_DataLoader()
+        field_loader = data_loader.sets['train'].fields['data']
+        field_loader.to_memory = True
+
+        batch = next(data_loader.iter_batches('train', 'data', batch_size=2, prefetch=0))
+
+        assert np.shares_memory(batch['data'], field_loader.data)
+
+    def test_raise_error_invalid_field(self):
+        data_loader, _, _ = db_generator.get_test_dataset_DataLoader()
+
+        with pytest.raises(KeyError):
+            data_loader.iter_batches('train', ['data', 'invalid_field'])
+
+    def test_raise_error_invalid_set(self):
+        data_loader, _, _ = db_generator.get_test_dataset_DataLoader()
+
+        with pytest.raises(KeyError):
+            data_loader.iter_batches('val', 'data')
+
+
+class TestFieldLoaderParallelDecode:
+    """Unit tests for reading compressed fields with parallel chunk decompression."""
+
+    @pytest.fixture()
+    def compressed_field(self, tmpdir, mocker):
+        filename = str(tmpdir.join('compressed.h5'))
+        data = np.arange(500 * 2, dtype=np.float64).reshape(500, 2)
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('train/data', data=data, chunks=(16, 2), compression='gzip')
+        h5file = h5py.File(filename, 'r')
+        spy = mocker.patch('dbcollection.core.loader.read_rows_parallel',
+                           side_effect=read_rows_parallel)
+        yield h5file['train/data'], data, spy
+        h5file.close()
+
+    def test_get_all_rows(self, compressed_field):
+        dataset, data, spy = compressed_field
+        field_loader = FieldLoader(dataset, num_decode_threads=3)
+
+        assert np.array_equal(field_loader.get(), data)
+        assert spy.call_count == 1
+
+    def test_to_memory(self, compressed_field):
+        dataset, data, spy = compressed_field
+        field_loader = FieldLoader(dataset, num_decode_threads=3)
+
+        field_loader.to_memory = True
+
+        assert spy.call_count == 1
+        assert np.array_equal(field_loader.data, data)
+
+    def test_large_slice_bypasses_block_cache(self, compressed_field):
+        dataset, data, spy = compressed_field
+        field_loader = FieldLoader(dataset, block_cache=BlockCache(1024),
+                                   num_decode_threads=3)
+
+        assert np.array_equal(field_loader.get(slice(7, 400)), data[7:400])
+        assert spy.call_count == 1
+
+    def test_single_thread_reads_with_h5py(self, compressed_field):
+        dataset, data, spy = compressed_field
+        field_loader = FieldLoader(dataset, num_decode_threads=1)
+
+        assert np.array_equal(field_loader.get(), data)
+        assert spy.call_count == 0
+
+
+class TestDataLoaderLazyLoading:
+    """Unit tests for the lazy creation of set/field loaders from the file's catalog."""
+
+    @pytest.fixture()
+    def hdf5_filepath(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        for set_name, size in (('train', 6), ('test', 3)):
+            manager.add_field_to_group(set_name, 'data', np.arange(size * 2).reshape(size, 2),
+                                       dtype=np.int64)
+            manager.add_field_to_group(set_name, 'object_ids', np.arange(size).reshape(size, 1),
+                                       dtype=np.int32)
+            manager.add_field_to_group(set_name, 'object_fields', str_to_ascii(['data']),
+                                       dtype=np.uint8, fillvalue=0)
+        manager.close()
+        return filename
+
+    def test_loaders_are_created_on_first_access(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+
+        assert data_loader._sets == ('test', 'train')
+        assert data_loader.object_fields == {'train': ('data',), 'test': ('data',)}
+        assert data_loader.sets.loaded() == {}
+
+        set_loader = data_loader.sets['train']
+
+        assert list(data_loader.sets.loaded()) == ['train']
+        assert set_loader.nelems == 6
+        assert set_loader.fields.loaded() == {}
+        assert np.array_equal(data_loader.get('train', 'data', 1), [2, 3])
+        assert list(set_loader.fields.loaded()) == ['data']
+
+    def test_open_with_catalog_does_not_visit_the_file(self, hdf5_filepath, mocker):
+        mock_build = mocker.patch('dbcollection.core.loader.hdf5_build_catalog')
+
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+
+        assert not mock_build.called
+        assert len(data_loader) == 2
+
+    def test_pickle_keeps_access_modes_of_unloaded_sets(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+        data_loader.sets['test'].fields['data'].to_memory = True
+
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+        newer_loader = pickle.loads(pickle.dumps(new_loader))
+
+        assert newer_loader.sets['test'].fields['data'].to_memory
+
+    def test_storage_profile_defaults_to_default(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+
+        assert data_loader.storage_profile == 'default'
+
+    def test_chunk_cache_follows_storage_profile(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename, storage_profile='random_access')
+        manager.add_field_to_group('train', 'data', np.zeros((100000, 8), dtype=np.float32),
+                                   dtype=np.float32)
+        manager.close()
+
+        data_loader = DataLoader('some_db', 'task', './some/dir', filename)
+
+        assert data_loader.storage_profile == 'random_access'
+        assert data_loader._get_chunk_cache_settings()[0] == 64 * 16 * 1024
+
+    def test_chunk_cache_set_per_dataset(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename, storage_profile='random_access')
+        manager.add_field_to_group('train', 'data', np.zeros((100000, 8), dtype=np.float32),
+                                   dtype=np.float32)
+        manager.add_field_to_group('train', 'object_ids', np.arange(100000).reshape(100000, 1),
+                                   dtype=np.int32)
+        manager.close()
+
+        data_loader = DataLoader('some_db', 'task', './some/dir', filename)
+        hdf5_field = data_loader.sets['train'].fields['data'].hdf5_handler
+
+        rdcc_nslots, rdcc_nbytes, _ = hdf5_field.id.get_access_plist().get_chunk_cache()
+        assert (rdcc_nbytes, rdcc_nslots) == data_loader._get_chunk_cache_settings()
+        assert data_loader.get('train', 'data', 5).tolist() == [0] * 8
+
+    def test_file_opened_once(self, mocker, hdf5_filepath):
+        mock_open = mocker.patch('dbcollection.core.loader.open_hdf5_file', side_effect=h5py.File)
+
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+        data_loader.get('train', 'data', 0)
+
+        assert mock_open.call_count == 1
+
+
+class TestFieldLoaderStringTable:
+    """Unit tests for the cache of decoded strings of string fields."""
+
+    @pytest.fixture()
+    def classes_field(self, tmpdir):
+        filename = str(tmpdir.join('classes.h5'))
+        classes = ['cat', 'dog', 'horse', 'dog']
+        with h5py.File(filename, 'w') as f:
+            f['train/classes'] = str_to_ascii(classes)
+        h5file = h5py.File(filename, 'r')
+        yield h5file['train/classes'], classes
+        h5file.close()
+
+    @pytest.mark.parametrize("index", [None, 2, -1, [3, 0, 0], slice(1, 3), np.array([], dtype=int)])
+    def test_get_convert_to_str(self, classes_field, index):
+        dataset, classes = classes_field
+        field_loader = FieldLoader(dataset)
+        expected = FieldLoader(dataset, string_table_nbytes=0).get(index, convert_to_str=True)
+
+        assert field_loader.get(index, convert_to_str=True) == expected
+
+    def test_strings_are_decoded_once(self, classes_field, mocker):
+        dataset, classes = classes_field
+        field_loader = FieldLoader(dataset)
+        spy = mocker.patch('dbcollection.core.loader.convert_ascii_rows_to_str',
+                           return_value=classes)
+
+        field_loader.get(0, convert_to_str=True)
+        field_loader.get([1, 2], convert_to_str=True)
+
+        assert spy.call_count == 1
+
+    def test_disabled_string_table(self, classes_field):
+        dataset, classes = classes_field
+        field_loader = FieldLoader(dataset, string_table_nbytes=0)
+
+        assert field_loader.get(1, convert_to_str=True) == 'dog'
+        assert field_loader._string_table is None
+
+    def test_index_of(self, classes_field):
+        dataset, _ = classes_field
+        field_loader = FieldLoader(dataset)
+
+        assert field_loader.index_of('horse') == 2
+        assert field_loader.index_of('dog') == 1
+        with pytest.raises(KeyError):
+            field_loader.index_of('bird')
+
+    def test_data_loader_index_of(self):
+        data_loader, dataset, _ = db_generator.get_test_dataset_DataLoader()
+        object_fields = ascii_to_str(dataset['train']['object_fields'])
+
+        assert data_loader.index_of('train', 'object_fields', object_fields[1]) == 1
+        with pytest.raises(KeyError):
+            data_loader.index_of('train', 'invalid_field', 'value')
+
+
+class TestListFields:
+    """Unit tests for CSR-encoded and padded list fields."""
+
+    lists = [[4, 1, 3], [], [0], [2, 5]]
+
+    @pytest.fixture()
+    def data_loader(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_field_to_group('train', 'object_ids', np.arange(4).reshape(4, 1),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str_to_ascii(['data']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.add_list_field_to_group('train', 'list_csr', self.lists)
+        manager.add_field_to_group('train', 'list_padded',
+                                   np.array(pad_list(self.lists, -1), dtype=np.int32),
+                                   dtype=np.int32)
+        manager.close()
+        return DataLoader('some_db', 'task', './some/dir', filename)
+
+    def test_csr_field_loader(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['list_csr']
+
+        assert isinstance(field_loader, CSRFieldLoader)
+        assert field_loader.shape == (4, 3)
+        assert len(field_loader) == 4
+
+    @pytest.mark.parametrize("field", ['list_csr', 'list_padded'])
+    @pytest.mark.parametrize("index", [0, 1, -1])
+    def test_get_list_single(self, data_loader, field, index):
+        data = data_loader.get_list('train', field, index)
+
+        assert data.tolist() == self.lists[index]
+
+    @pytest.mark.parametrize("field", ['list_csr', 'list_padded'])
+    @pytest.mark.parametrize("index", [None, [3, 1, 3], slice(1, 3), np.array([], dtype=int)])
+    def test_get_list_multiple(self, data_loader, field, index):
+        data = data_loader.get_list('train', field, index)
+
+        rows = np.arange(4) if index is None else np.arange(4)[index]
+        expected = [self.lists[i] for i in rows]
+        assert [l.tolist() for l in data] == expected
+
+    @pytest.mark.parametrize("index", [None, 2, [3, 0]])
+    def test_get_padded(self, data_loader, index):
+        csr = data_loader.get('train', 'list_csr', index)
+        padded = data_loader.get('train', 'list_padded', index)
+
+        assert np.array_equal(csr, padded)
+
+    def test_to_memory(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['list_csr']
+
+        field_loader.to_memory = True
+
+        assert field_loader.to_memory
+        assert field_loader.get_list(3).tolist() == [2, 5]
+
+    def test_to_mmap_of_two_csr_fields(self, tmpdir):
+        filename = str(tmpdir.join('two_lists.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_field_to_group('train', 'object_ids', np.arange(4).reshape(4, 1),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str_to_ascii(['data']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.add_list_field_to_group('train', 'list_csr', self.lists)
+        manager.add_list_field_to_group('train', 'list_other', [[9], [8, 7], [], [6]])
+        manager.close()
+        fields = DataLoader('some_db', 'task', './some/dir', filename).sets['train'].fields
+
+        fields['list_csr'].to_mmap = True
+        fields['list_other'].to_mmap = True
+
+        assert fields['list_csr'].values.name == 'list_csr/values'
+        assert fields['list_csr'].get_list(3).tolist() == [2, 5]
+        assert fields['list_other'].get_list(1).tolist() == [8, 7]
+
+    def test_get_list_raise_error_invalid_field(self, data_loader):
+        with pytest.raises(KeyError):
+            data_loader.get_list('train', 'list_invalid', 0)
+
+
+class TestRaggedFields:
+    """Unit tests for ragged fields (rows of different lengths)."""
+
+    rows = [[0.5, 1.5, 2.5], [], [3.0], [4.0, 5.0]]
+    captions = ['a cat', 'two dogs on a bed', '', 'x']
+
+    @pytest.fixture()
+    def data_loader(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_field_to_group('train', 'object_ids', np.arange(4).reshape(4, 1),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str_to_ascii(['segmentation']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.add_ragged_field_to_group('train', 'segmentation', self.rows, dtype=np.float32)
+        with manager.open_ragged_field_writer('train', 'captions', np.uint8,
+                                              buffer_rows=2) as writer:
+            for caption in self.captions:
+                writer.append([bytearray(caption.encode('ascii'))])
+        manager.close()
+        return DataLoader('some_db', 'task', './some/dir', filename)
+
+    def test_ragged_field_loader(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['segmentation']
+
+        assert isinstance(field_loader, RaggedFieldLoader)
+        assert field_loader.shape == (4, 3)
+        assert field_loader.type == np.float32
+
+    @pytest.mark.parametrize("index", [0, 1, -1])
+    def test_get_single_row(self, data_loader, index):
+        data = data_loader.get('train', 'segmentation', index)
+
+        assert isinstance(data, np.ndarray)
+        assert data.tolist() == self.rows[index]
+
+    @pytest.mark.parametrize("index", [None, [3, 0, 3], slice(1, 3), np.array([], dtype=int)])
+    def test_get_multiple_rows(self, data_loader, index):
+        data = data_loader.get('train', 'segmentation', index)
+
+        rows = np.arange(4) if index is None else np.arange(4)[index]
+        assert [row.tolist() for row in data] == [self.rows[i] for i in rows]
+
+    def test_get_rows_as_strings(self, data_loader):
+        assert data_loader.get('train', 'captions', 1, convert_to_str=True) == self.captions[1]
+        assert data_loader.get('train', 'captions', convert_to_str=True) == self.captions
+
+    def test_object_values(self, data_loader):
+        values = data_loader.object('train', 3, convert_to_value=True)
+
+        assert values[0].tolist() == self.rows[3]
+
+    @pytest.fixture()
+    def objects_loader(self, make_data_loader):
+        def write(manager):
+            manager.add_ragged_field_to_group('train', 'segmentation', self.rows, dtype=np.float32)
+        object_ids = np.array([[0, 3], [1, -1], [-1, 1]], dtype=np.int32)
+        return make_data_loader({'object_ids': object_ids, 'labels': np.array([5, 6], dtype=np.int32)},
+                                ['labels', 'segmentation'], write)
+
+    def test_object_values_with_undefined_rows(self, objects_loader):
+        values = objects_loader.object('train', [0, 1, 2], convert_to_value=True)
+
+        assert values[0][0] == 5 and values[0][1].tolist() == self.rows[3]
+        assert values[1][0] == 6 and values[1][1] == []
+        assert values[2][0] == [] and values[2][1].tolist() == self.rows[1]
+
+    def test_object_columns_with_undefined_rows(self, objects_loader):
+        columns, masks = objects_loader.object_columns('train', [0, 1])
+
+        assert isinstance(columns['segmentation'], list)
+        assert [row.tolist() for row in columns['segmentation']] == [self.rows[3], []]
+        assert columns['segmentation'][1].dtype == np.float32
+        assert masks['segmentation'].tolist() == [True, False]
+
+    @pytest.mark.parametrize("index", [[0, 1], [0]])
+    def test_object_columns_as_structured_array(self, objects_loader, index):
+        columns, _ = objects_loader.object_columns('train', index, as_structured=True)
+
+        assert columns['segmentation'].dtype == object
+        assert [row.tolist() for row in columns['segmentation']] == [self.rows[3], []][:len(index)]
+        assert columns['labels'].tolist() == [5, 6][:len(index)]
+
+    def test_iter_batches(self, data_loader):
+        batches = list(data_loader.iter_batches('train', 'segmentation', batch_size=3))
+
+        assert [len(batch['segmentation']) for batch in batches] == [3, 1]
+        assert batches[1]['segmentation'][0].tolist() == self.rows[3]
+
+
+class TestNarrowedFields:
+    """Unit tests for reading fields narrowed when written."""
+
+    @pytest.fixture()
+    def hdf5_filepath(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename, narrow_dtypes=True)
+        manager.add_field_to_group('train', 'object_ids', np.arange(3).reshape(3, 1),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str_to_ascii(['labels']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.add_field_to_group('train', 'labels', np.array([0., 1., 1.]), dtype=np.float64)
+        manager.add_ragged_field_to_group('train', 'segmentation', [[0.5, 1.25], [], [2.5]],
+                                          dtype=np.float64)
+        manager.close()
+        return filename
+
+    def test_get_narrowed_type(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+        field_loader = data_loader.sets['train'].fields['labels']
+
+        assert field_loader.type == np.float32
+        assert field_loader.original_type == np.float64
+        assert data_loader.get('train', 'labels').dtype == np.float32
+
+    @pytest.mark.parametrize("index", [None, 1, [2, 0]])
+    def test_get_upcast(self, hdf5_filepath, index):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath, upcast=True)
+
+        data = data_loader.get('train', 'labels', index)
+
+        assert data.dtype == np.float64
+        assert np.array_equal(data, np.array([0., 1., 1.])[index if index is not None else slice(None)])
+
+    def test_get_ragged_upcast(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath)
+        upcast_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath, upcast=True)
+
+        assert data_loader.get('train', 'segmentation', 0).dtype == np.float32
+        assert upcast_loader.get('train', 'segmentation', 0).dtype == np.float64
+        assert [row.tolist() for row in upcast_loader.get('train', 'segmentation', [0, 2])] == \
+            [[0.5, 1.25], [2.5]]
+
+    def test_pickle_keeps_upcast(self, hdf5_filepath):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filepath, upcast=True)
+
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert new_loader.get('train', 'labels').dtype == np.float64
+
+
+
+class TestStringFields:
+    """Unit tests for string fields stored with a dictionary encoding or front coding."""
+
+    filenames = ['train/n01/img_001.jpg', 'train/n01/img_002.jpg', 'train/n01/img_010.jpg',
+                 'train/n02/img_001.jpg', 'val/img_1.jpg', 'val/img_1.jpg', 'v', '', '']
+    categories = ['dog', 'cat', 'dog', 'dog', 'bird', 'cat', 'dog', 'dog', '']
+
+    @pytest.fixture()
+    def data_loader(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_field_to_group('train', 'object_ids', np.arange(9).reshape(9, 1),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str_to_ascii(['filename']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.add_string_field_to_group('train', 'filename', self.filenames,
+                                          encoding='front_coded', block_size=3)
+        manager.add_string_field_to_group('train', 'category', self.categories,
+                                          encoding='dictionary')
+        manager.close()
+        return DataLoader('some_db', 'task', './some/dir', filename)
+
+    def test_string_field_loaders(self, data_loader):
+        fields = data_loader.sets['train'].fields
+
+        assert isinstance(fields['filename'], FrontCodedFieldLoader)
+        assert isinstance(fields['category'], DictionaryFieldLoader)
+        assert fields['filename'].shape == str_to_ascii(self.filenames).shape
+        assert fields['category'].shape == str_to_ascii(self.categories).shape
+        assert fields['filename'].type == np.uint8
+
+    @pytest.mark.parametrize("field", ['filename', 'category'])
+    @pytest.mark.parametrize("index", [0, 4, -1])
+    def test_get_single_row(self, data_loader, field, index):
+        strings = getattr(self, field + 's' if field == 'filename' else 'categories')
+
+        data = data_loader.get('train', field, index)
+        string = data_loader.get('train', field, index, convert_to_str=True)
+
+        assert np.array_equal(data, str_to_ascii(strings)[index])
+        assert string == strings[index]
+
+    @pytest.mark.parametrize("field", ['filename', 'category'])
+    @pytest.mark.parametrize("index", [None, [6, 0, 3, 3], [8, 1], slice(2, 6), slice(None, None, -2),
+                                       np.array([], dtype=int)])
+    def test_get_multiple_rows(self, data_loader, field, index):
+        strings = getattr(self, field + 's' if field == 'filename' else 'categories')
+        rows = np.arange(9) if index is None else np.arange(9)[index]
+
+        data = data_loader.get('train', field, index)
+        converted = data_loader.get('train', field, index, convert_to_str=True)
+
+        assert np.array_equal(data, str_to_ascii(strings)[rows])
+        assert converted == [strings[i] for i in rows]
+
+    def test_index_of(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['filename']
+
+        assert field_loader.index_of('val/img_1.jpg') == 4
+        with pytest.raises(KeyError):
+            field_loader.index_of('invalid')
+
+    def test_object_values(self, data_loader):
+        values = data_loader.object('train', 2, convert_to_value=True)
+
+        assert np.array_equal(values[0], str_to_ascii(self.filenames)[2])
+
+    def test_to_memory(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['filename']
+
+        field_loader.to_memory = True
+
+        assert field_loader.to_memory
+        assert field_loader.get([5, 1], convert_to_str=True) == [self.filenames[5], self.filenames[1]]
+
+    def test_pickle(self, data_loader):
+        new_loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert new_loader.get('train', 'category', convert_to_str=True) == self.categories
@@ -0,0 +1,170 @@
+"""
+Test dbcollection/core/memory_policy.py.
+"""
+
+
+import pickle
+import threading
+import numpy as np
+import pytest
+
+from dbcollection.core.loader import DataLoader
+from dbcollection.core.memory_policy import (parse_memory_size, get_memory_policy, get_field_nbytes,
+                                             MemoryPolicy)
+
+
+@pytest.mark.parametrize("size, expected", [
+    (1024, 1024),
+    ('512', 512),
+    ('1KB', 1024),
+    ('4GB', 4 * 1024 ** 3),
+    ('1.5m', 1536 * 1024),
+])
+def test_parse_memory_size(size, expected):
+    assert parse_memory_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ['4XB', 'GB', -1])
+def test_parse_memory_size_raise_error_invalid_size(size):
+    with pytest.raises(ValueError):
+        parse_memory_size(size)
+
+
+def test_get_memory_policy():
+    assert get_memory_policy() is None
+    assert get_memory_policy('1GB', 'manual') is None
+    assert get_memory_policy('1GB', 'auto').memory_budget == 1024 ** 3
+    with pytest.raises(ValueError):
+        get_memory_policy('1GB', 'invalid')
+
+
+@pytest.fixture()
+def hdf5_filename(make_hdf5_file):
+    return make_hdf5_file({
+        'object_ids': np.arange(10, dtype=np.int32).reshape(10, 1),
+        'classes': ['cat', 'dog'],
+        'fieldA': np.arange(100000, dtype=np.float32),
+        'fieldB': np.arange(100000, dtype=np.float32),
+    }, object_fields=['classes'])
+
+
+class TestMemoryPolicy:
+    """Unit tests for the MemoryPolicy class."""
+
+    @pytest.fixture()
+    def data_loader(self, hdf5_filename):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filename,
+                                 memory_budget='500KB', policy='auto')
+        data_loader.memory_policy.rebalance_interval = 10
+        return data_loader
+
+    def read(self, data_loader, field, num_reads):
+        for i in range(num_reads):
+            data_loader.get('train', field, i)
+
+    def test_small_fields_are_pinned(self, data_loader):
+        fields = data_loader.sets['train'].fields
+
+        assert fields['classes'].to_memory
+        assert fields['object_fields'].to_memory
+        assert not fields['fieldA'].to_memory
+
+    def test_pins_most_read_field(self, data_loader):
+        fields = data_loader.sets['train'].fields
+
+        self.read(data_loader, 'fieldA', 8)
+        self.read(data_loader, 'fieldB', 2)
+
+        assert fields['fieldA'].to_memory
+        assert not fields['fieldB'].to_memory
+        assert fields['fieldA'].num_reads == 8
+
+    def test_demotes_cold_fields_over_budget(self, data_loader):
+        fields = data_loader.sets['train'].fields
+
+        self.read(data_loader, 'fieldA', 10)
+        self.read(data_loader, 'fieldB', 20)
+
+        assert not fields['fieldA'].to_memory
+        assert fields['fieldB'].to_memory
+        assert data_loader.memory_policy.pinned_nbytes() <= parse_memory_size('500KB')
+        assert data_loader.get('train', 'fieldA', 5) == 5
+
+    def test_demotes_to_mmap(self, data_loader):
+        fields = data_loader.sets['train'].fields
+        fields['fieldA'].to_mmap = True
+
+        self.read(data_loader, 'fieldA', 10)
+        assert fields['fieldA'].to_memory
+        self.read(data_loader, 'fieldB', 20)
+
+        assert fields['fieldA'].to_mmap
+
+    def test_ignores_fields_in_memory_by_the_user(self, data_loader):
+        fields = data_loader.sets['train'].fields
+        fields['fieldA'].to_memory = True
+
+        self.read(data_loader, 'fieldB', 20)
+
+        assert fields['fieldA'].to_memory
+        assert fields['fieldB'].to_memory
+        assert not data_loader.memory_policy.is_pinned(fields['fieldA'])
+
+    def test_pickle_keeps_policy_and_user_modes(self, data_loader):
+        fields = data_loader.sets['train'].fields
+        fields['fieldB'].to_mmap = True
+        self.read(data_loader, 'fieldA', 10)
+
+        loader = pickle.loads(pickle.dumps(data_loader))
+
+        assert loader.memory_budget == '500KB'
+        assert isinstance(loader.memory_policy, MemoryPolicy)
+        assert not loader.sets['train'].fields['fieldA'].to_memory
+        assert loader.sets['train'].fields['fieldB'].to_mmap
+        assert loader.sets['train'].fields['classes'].to_memory
+
+    def test_concurrent_reads_are_counted(self, data_loader):
+        fields = data_loader.sets['train'].fields
+        rebalance = data_loader.memory_policy.rebalance
+        calls = []
+
+        def count_rebalance():
+            calls.append(1)
+            rebalance()
+
+        data_loader.memory_policy.rebalance = count_rebalance
+        threads = [threading.Thread(target=self.read, args=(data_loader, 'fieldA', 250))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert fields['fieldA'].num_reads == 2000
+        assert len(calls) == 200
+
+    def test_swaps_wait_for_reads(self, data_loader):
+        field_loader = data_loader.sets['train'].fields['fieldA']
+        thread = threading.Thread(target=data_loader.memory_policy._pin, args=(field_loader,))
+
+        with field_loader._data_lock:  # held by get() while reading
+            thread.start()
+            thread.join(0.2)
+            assert thread.is_alive()
+            assert not field_loader.to_memory
+        thread.join()
+
+        assert field_loader.to_memory
+        assert field_loader.get(5) == 5
+
+    def test_without_budget(self, hdf5_filename):
+        data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filename)
+
+        assert data_loader.memory_policy is None
+        assert not data_loader.sets['train'].fields['classes'].to_memory
+
+
+def test_get_field_nbytes(hdf5_filename):
+    data_loader = DataLoader('some_db', 'task', './some/dir', hdf5_filename)
+
+    assert get_field_nbytes(data_loader.sets['train'].fields['fieldA']) == 400000
@@ -0,0 +1,114 @@
+"""
+Test dbcollection/core/query.py.
+"""
+
+
+import os
+import glob
+import numpy as np
+import pytest
+
+from dbcollection.core.query import (parse_condition, get_condition_key, build_inverted_index,
+                                     get_inverted_index_objects, SetQuery)
+
+
+@pytest.mark.parametrize("key, value, expected", [
+    ('area__gt', 1024, ('area', 'gt', 1024)),
+    ('category', 'person', ('category', 'eq', 'person')),
+    ('category__in', ('dog', 'cat'), ('category', 'in', ['cat', 'dog'])),
+    ('is__crowd', 1, ('is__crowd', 'eq', 1)),
+    ('iscrowd__ne', np.int32(0), ('iscrowd', 'ne', 0)),
+])
+def test_parse_condition(key, value, expected):
+    assert parse_condition(key, value) == expected
+
+
+def test_parse_condition_raise_error_in_operator_without_list():
+    with pytest.raises(TypeError):
+        parse_condition('category__in', 'person')
+
+
+def test_get_condition_key():
+    assert get_condition_key('area', 'gt', 5) == get_condition_key('area', 'gt', 5)
+    assert get_condition_key('area', 'gt', 5) != get_condition_key('area', 'ge', 5)
+
+
+def test_build_inverted_index():
+    ids = np.array([2, 0, -1, 2, 1, 0])
+
+    order, starts = build_inverted_index(ids, num_rows=4)
+
+    assert order.tolist() == [1, 5, 4, 0, 3]
+    assert starts.tolist() == [0, 2, 3, 5, 5]
+    assert get_inverted_index_objects(order, starts, [2, 0]).tolist() == [0, 1, 3, 5]
+    assert get_inverted_index_objects(order, starts, []).tolist() == []
+
+
+class TestSetQuery:
+    """Unit tests for the SetQuery class."""
+
+    categories = ['person', 'dog', 'cat']
+    # (category, area, iscrowd) rows referenced by each object
+    object_ids = np.array([[0, 0, 0],
+                           [1, 1, 1],
+                           [0, 2, 0],
+                           [2, 3, 0],
+                           [-1, 4, 1],
+                           [0, 5, 0]], dtype=np.int32)
+    area = np.array([100, 2000, 4000, 50, 3000, 1500], dtype=np.float32)
+
+    @pytest.fixture()
+    def data_loader(self, make_data_loader):
+        return make_data_loader({
+            'object_ids': self.object_ids,
+            'category': self.categories,
+            'area': self.area,
+            'iscrowd': np.array([[0], [1]], dtype=np.uint8),
+        }, object_fields=['category', 'area', 'iscrowd'])
+
+    @pytest.mark.parametrize("conditions, expected", [
+        ({}, [0, 1, 2, 3, 4, 5]),
+        ({'category': 'person'}, [0, 2, 5]),
+        ({'category__in': ['dog', 'cat']}, [1, 3]),
+        ({'category__ne': 'person'}, [1, 3]),
+        ({'area__gt': 1024}, [1, 2, 4, 5]),
+        ({'area__le': 100}, [0, 3]),
+        ({'iscrowd': 0}, [0, 2, 3, 5]),
+        ({'category': 'person', 'area__gt': 1024, 'iscrowd': 0}, [2, 5]),
+        ({'category': 'horse'}, []),
+    ])
+    def test_query(self, data_loader, conditions, expected):
+        indexes = data_loader.query('train', **conditions)
+
+        assert indexes.tolist() == expected
+
+    def test_query_raise_error_invalid_field(self, data_loader):
+        with pytest.raises(KeyError):
+            data_loader.query('train', width__gt=10)
+
+    def test_query_raise_error_invalid_set(self, data_loader):
+        with pytest.raises(KeyError):
+            data_loader.query('val', area__gt=10)
+
+    def test_query_results_are_persisted(self, data_loader, mocker):
+        data_loader.query('train', category='person', area__gt=1024)
+        root = os.path.splitext(data_loader.hdf5_filepath)[0]
+
+        assert len(glob.glob(root + '.train.query.*.npy')) == 2
+        assert os.path.exists(root + '.train.index.category.npy')
+
+        engine = SetQuery(data_loader.sets['train'])
+        mock_compute = mocker.patch.object(engine, '_compute_condition_mask')
+        mock_build = mocker.patch('dbcollection.core.query.build_inverted_index')
+
+        assert engine.query(category='person', area__gt=1024).tolist() == [2, 5]
+        assert engine._get_inverted_index('category')[0].tolist() == [0, 2, 5, 1, 3]
+        assert not mock_compute.called
+        assert not mock_build.called
+
+    def test_query_without_persistence(self, data_loader):
+        engine = SetQuery(data_loader.sets['train'], persist=False)
+
+        assert engine.query(category__in=['cat']).tolist() == [3]
+        root = os.path.splitext(data_loader.hdf5_filepath)[0]
+        assert glob.glob(root + '.train.*.npy') == []
@@ -0,0 +1,168 @@
+"""
+Test dbcollection/core/registry.py.
+"""
+
+
+import os
+import h5py
+import numpy as np
+import pytest
+
+from dbcollection.core.loader import DataLoader
+from dbcollection.core.registry import LoaderRegistry, get_loader_key, get_request_key, get_file_signature
+
+
+def create_hdf5_file(filename):
+    with h5py.File(filename, 'w') as f:
+        f['train/labels'] = np.arange(10, dtype=np.int32)
+        f['train/object_ids'] = np.arange(10, dtype=np.int32).reshape(10, 1)
+
+
+@pytest.fixture()
+def make_loader(tmpdir):
+    def make_loader(name='mnist', task='classification', filename='task.h5'):
+        hdf5_filepath = str(tmpdir.join(filename))
+        if not os.path.exists(hdf5_filepath):
+            create_hdf5_file(hdf5_filepath)
+        return DataLoader(name, task, str(tmpdir), hdf5_filepath)
+    return make_loader
+
+
+def test_get_loader_key(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+    link = str(tmpdir.join('link.h5'))
+    create_hdf5_file(filename)
+    os.symlink(filename, link)
+
+    assert get_loader_key('mnist', 'classification', filename) == \
+        ('mnist', 'classification', os.path.realpath(filename), ())
+    assert get_loader_key('mnist', 'classification', link) == \
+        get_loader_key('mnist', 'classification', filename)
+    assert get_loader_key('mnist', 'classification', 'file://' + filename) == \
+        get_loader_key('mnist', 'classification', filename)
+    assert get_loader_key('mnist', 'classification', filename, {'policy': 'auto', 'memory_budget': '1GB'}) == \
+        ('mnist', 'classification', os.path.realpath(filename), (('memory_budget', '1GB'), ('policy', 'auto')))
+    assert get_loader_key('mnist', 'classification', filename, {'tracer': []}) is None
+    assert get_loader_key('mnist', 'classification', None) is None
+
+
+def test_get_request_key():
+    assert get_request_key('mnist', 'default') == ('mnist', 'default', ())
+    assert get_request_key('mnist', 'default', {'policy': 'auto', 'memory_budget': '1GB'}) == \
+        ('mnist', 'default', (('memory_budget', '1GB'), ('policy', 'auto')))
+    assert get_request_key('mnist', 'default', {'tracer': []}) is None
+
+
+def test_get_file_signature(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+
+    assert get_file_signature(filename) is None
+    create_hdf5_file(filename)
+    assert get_file_signature(filename) == get_file_signature(filename)
+
+
+def test_get_registered_loader(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+    filename = data_loader.hdf5_filepath
+
+    assert registry.get('mnist', 'classification', filename) is None
+    assert registry.add('mnist', 'classification', data_loader) is data_loader
+    assert registry.get('mnist', 'classification', filename) is data_loader
+    assert registry.get('mnist', 'classification', filename, {'memory_budget': '1GB'}) is None
+    assert registry.get('mnist', 'detection', filename) is None
+    assert registry.get('mnist', 'classification', filename + '.other') is None
+
+
+def test_find_loader_of_a_request(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+
+    assert registry.find('mnist', 'default') is None
+    registry.add('mnist', 'classification', data_loader, requested_task='default')
+
+    assert registry.find('mnist', 'default') is data_loader
+    assert registry.find('mnist', 'classification') is data_loader
+    assert registry.find('mnist', 'default', {'memory_budget': '1GB'}) is None
+    assert registry.find('cifar10', 'default') is None
+
+
+def test_find_discards_loaders_of_modified_files(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+    registry.add('mnist', 'classification', data_loader, requested_task='default')
+    data_loader.close()
+
+    os.remove(data_loader.hdf5_filepath)
+    create_hdf5_file(data_loader.hdf5_filepath)
+    os.utime(data_loader.hdf5_filepath, (0, 0))
+
+    assert registry.find('mnist', 'default') is None
+    assert registry.find('mnist', 'classification') is None
+    assert len(registry) == 0
+
+
+def test_loaders_of_the_same_file_are_shared(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+    registry.add('mnist', 'classification', data_loader)
+    other = make_loader()
+
+    assert registry.add('mnist', 'classification', other) is data_loader
+    assert not other.is_open()
+    assert len(registry) == 1
+
+
+def test_loaders_of_other_files_are_not_shared(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+    registry.add('mnist', 'classification', data_loader)
+    other = make_loader(filename='other.h5')
+
+    assert registry.add('mnist', 'classification', other) is other
+    assert registry.get('mnist', 'classification', data_loader.hdf5_filepath) is data_loader
+    assert registry.get('mnist', 'classification', other.hdf5_filepath) is other
+    assert len(registry) == 2
+
+
+def test_modified_file_invalidates_the_loader(make_loader):
+    registry = LoaderRegistry()
+    data_loader = make_loader()
+    registry.add('mnist', 'classification', data_loader)
+    data_loader.close()
+
+    os.remove(data_loader.hdf5_filepath)
+    create_hdf5_file(data_loader.hdf5_filepath)
+    os.utime(data_loader.hdf5_filepath, (0, 0))
+
+    assert registry.get('mnist', 'classification', data_loader.hdf5_filepath) is None
+    assert len(registry) == 0
+
+
+def test_invalidate(make_loader):
+    registry = LoaderRegistry()
+    mnist = make_loader()
+    cifar10 = make_loader('cifar10', filename='cifar10.h5')
+    registry.add('mnist', 'classification', mnist)
+    registry.add('cifar10', 'classification', cifar10)
+
+    registry.invalidate('mnist')
+
+    assert registry.get('mnist', 'classification', mnist.hdf5_filepath) is None
+    assert registry.find('mnist', 'classification') is None
+    assert registry.get('cifar10', 'classification', cifar10.hdf5_filepath) is cifar10
+    registry.invalidate()
+    assert len(registry) == 0
+
+
+def test_closes_least_recently_used_files(make_loader):
+    registry = LoaderRegistry(max_open_files=2)
+    loaders = [make_loader(str(i), filename='task{}.h5'.format(i)) for i in range(3)]
+    for i, data_loader in enumerate(loaders[:2]):
+        registry.add(str(i), 'classification', data_loader)
+    registry.get('0', 'classification', loaders[0].hdf5_filepath)
+
+    registry.add('2', 'classification', loaders[2])
+
+    assert [data_loader.is_open() for data_loader in loaders] == [True, False, True]
+    assert np.array_equal(loaders[1].get('train', 'labels', 3), 3)
@@ -0,0 +1,160 @@
+"""
+Test dbcollection/core/stats.py.
+"""
+
+
+import pickle
+import numpy as np
+import pytest
+
+from dbcollection.core.stats import (AccessStats, get_latency_bucket, get_latency_percentile,
+                                     LATENCY_BUCKETS)
+
+
+@pytest.mark.parametrize("seconds, bucket", [
+    (0, 0),
+    (1e-6, 0),
+    (1.5e-6, 1),
+    (1e-3, 10),
+    (1e6, len(LATENCY_BUCKETS)),
+])
+def test_get_latency_bucket(seconds, bucket):
+    assert get_latency_bucket(seconds) == bucket
+
+
+def test_get_latency_percentile():
+    histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    assert get_latency_percentile(histogram, 50) is None
+
+    histogram[2], histogram[5] = 9, 1
+
+    assert get_latency_percentile(histogram, 50) == LATENCY_BUCKETS[2]
+    assert get_latency_percentile(histogram, 99) == LATENCY_BUCKETS[5]
+
+
+class TestAccessStats:
+    """Unit tests for the AccessStats class."""
+
+    def test_report(self):
+        stats = AccessStats(enabled=True)
+
+        stats.record_call('train', 'boxes', 'get', 10, 160, 0.5)
+        stats.record_call('train', 'classes', 'get', 1, 8, 0.1)
+        stats.record_call('train', 'boxes', 'get', 2, 32, 0.25)
+        stats.record_read('train', 'boxes', 12, 192, 0.3)
+        stats.record_cache('train', 'boxes', hit=True)
+        stats.record_cache('train', 'boxes', hit=False)
+        stats.record_conversion('train', 'classes', 'get', 0.05)
+
+        report = stats.report()
+        assert [(r['field'], r['op']) for r in report] == [('boxes', 'get'), ('classes', 'get')]
+        boxes = report[0]
+        assert boxes['calls'] == 2
+        assert boxes['rows'] == 12
+        assert boxes['nbytes'] == 192
+        assert boxes['seconds'] == 0.75
+        assert boxes['read_seconds'] == 0.3
+        assert boxes['disk_reads'] == 1
+        assert (boxes['cache_hits'], boxes['cache_misses']) == (1, 1)
+        assert sum(boxes['latency_histogram']) == 2
+        assert report[1]['convert_seconds'] == 0.05
+
+    def test_tracer(self):
+        events = []
+        stats = AccessStats()
+        stats.enable(events.append)
+
+        stats.record_call('train', 'boxes', 'get', 10, 160, 0.5)
+        stats.record_cache('train', 'boxes', hit=False)
+
+        assert [event['op'] for event in events] == ['get', 'cache']
+        assert events[0]['rows'] == 10
+        assert events[1]['hit'] is False
+
+    def test_reset_and_disable(self):
+        stats = AccessStats(enabled=True, tracer=lambda event: None)
+        stats.record_call('train', 'boxes', 'get', 10, 160, 0.5)
+
+        stats.reset()
+        stats.disable()
+
+        assert stats.report() == []
+        assert not stats.enabled
+        assert stats.tracer is None
+
+
+@pytest.fixture()
+def data_loader(make_data_loader):
+    return make_data_loader({
+        'object_ids': np.arange(2000, dtype=np.int32).reshape(1000, 2),
+        'classes': ['class_{}'.format(i) for i in range(1000)],
+        'boxes': np.zeros((1000, 4), dtype=np.float32),
+    }, object_fields=['classes', 'boxes'])
+
+
+class TestDataLoaderStats:
+    """Unit tests for the instrumentation of the DataLoader class."""
+
+    def get_stats(self, data_loader, field, op='get'):
+        for stats in data_loader.stats():
+            if (stats['set'], stats['field'], stats['op']) == ('train', field, op):
+                return stats
+
+    def test_disabled_by_default(self, data_loader):
+        data_loader.get('train', 'boxes', [0, 1])
+
+        assert data_loader.stats() == []
+
+    def test_get(self, data_loader):
+        data_loader.enable_stats()
+
+        data_loader.get('train', 'boxes', [0, 1, 2])
+        data_loader.get('train', 'boxes', 5)
+        data_loader.get('train', 'boxes', slice(0, 10))
+
+        stats = self.get_stats(data_loader, 'boxes')
+        assert stats['calls'] == 3
+        assert stats['rows'] == 14
+        assert stats['nbytes'] == 14 * 16
+        assert stats['cache_misses'] >= 1
+        assert stats['cache_hits'] >= 1
+        assert stats['read_seconds'] <= stats['seconds']
+
+    def test_string_conversion(self, data_loader):
+        data_loader.enable_stats()
+        data_loader.sets['train'].fields['classes'].string_table_nbytes = 0
+
+        data_loader.get('train', 'classes', [0, 1], convert_to_str=True)
+
+        stats = self.get_stats(data_loader, 'classes')
+        assert stats['rows'] == 2
+        assert stats['convert_seconds'] > 0
+
+    def test_object(self, data_loader):
+        data_loader.enable_stats()
+
+        data_loader.object('train', [0, 1, 2], convert_to_value=True)
+
+        stats = self.get_stats(data_loader, 'object_ids', 'object')
+        assert stats['calls'] == 1
+        assert stats['rows'] == 3
+        assert stats['convert_seconds'] > 0
+        assert self.get_stats(data_loader, 'boxes')['rows'] == 3
+
+    def test_tracer(self, data_loader):
+        events = []
+        data_loader.enable_stats(tracer=events.append)
+
+        data_loader.get('train', 'boxes', 0)
+        data_loader.disable_stats()
+        data_loader.get('train', 'boxes', 0)
+
+        assert [event['op'] for event in events if event['op'] == 'get'] == ['get']
+
+    def test_pickle_keeps_instrumentation(self, data_loader):
+        data_loader.enable_stats()
+
+        loader = pickle.loads(pickle.dumps(data_loader))
+        loader.get('train', 'boxes', 0)
+
+        assert loader.stats()[0]['field'] == 'boxes'
@@ -0,0 +1,212 @@
+"""
+Test dbcollection/core/storage.py.
+"""
+
+
+import io
+import os
+import threading
+import numpy as np
+import pytest
+from six.moves import BaseHTTPServer
+
+from dbcollection.core import storage
+from dbcollection.core.loader import DataLoader
+from dbcollection.core.storage import (RangeReader, FileRangeStorage, HTTPRangeStorage, LocalStorage,
+                                       get_storage_backend, register_storage_backend, open_hdf5_file,
+                                       is_local_hdf5_file, get_byte_view)
+from dbcollection.utils.hdf5 import HDF5Manager
+from dbcollection.utils.string_ascii import convert_str_to_ascii as str_to_ascii
+
+
+def get_range_reader(data, block_nbytes=4, cache_nbytes=16, readahead=2):
+    requests = []
+
+    def read_range(start, stop):
+        requests.append((start, stop))
+        return data[start:stop]
+
+    reader = RangeReader('bytes', len(data), read_range, block_nbytes, cache_nbytes, readahead)
+    return reader, requests
+
+
+class TestRangeReader:
+    """Unit tests for the RangeReader class."""
+
+    def test_read_and_seek(self):
+        data = bytes(bytearray(range(50)))
+        reader, _ = get_range_reader(data)
+
+        assert reader.read(6) == data[:6]
+        reader.seek(45)
+        assert reader.read(10) == data[45:]
+        assert reader.read(1) == b''
+        reader.seek(-3, io.SEEK_END)
+        assert reader.tell() == 47
+        reader.seek(-7, io.SEEK_CUR)
+        assert reader.read(3) == data[40:43]
+
+    def test_sequential_reads_use_readahead(self):
+        data = bytes(bytearray(range(50)))
+        reader, requests = get_range_reader(data)
+
+        assert reader.read(12) == data[:12]
+
+        assert requests == [(0, 4), (4, 12)]
+
+    def test_cached_blocks_are_not_read_again(self):
+        data = bytes(bytearray(range(50)))
+        reader, requests = get_range_reader(data, readahead=1)
+
+        reader.read(3)
+        reader.seek(1)
+        reader.read(2)
+
+        assert requests == [(0, 4)]
+        assert reader.num_requests == 1
+
+    def test_least_recently_used_blocks_are_evicted(self):
+        data = bytes(bytearray(range(50)))
+        reader, requests = get_range_reader(data, cache_nbytes=8, readahead=1)
+
+        for position in [0, 20, 40, 0]:
+            reader.seek(position)
+            reader.read(1)
+
+        assert len(requests) == 4
+
+    def test_readinto_buffers(self):
+        data = bytes(bytearray(range(50)))
+        reader, _ = get_range_reader(data)
+        buffer = bytearray(10)
+        array = np.zeros((2,), dtype=np.float32)
+
+        assert reader.readinto(buffer) == 10
+        assert reader.readinto(array) == 8
+        assert bytes(buffer) == data[:10]
+        assert array.tobytes() == data[10:18]
+
+
+def test_get_byte_view():
+    buffer = bytearray(4)
+
+    view = get_byte_view(buffer)
+    view[1:3] = b'ab'
+
+    assert buffer == bytearray(b'\x00ab\x00')
+    assert len(get_byte_view(np.zeros((2, 3), dtype=np.int16))) == 12
+
+
+def test_get_storage_backend():
+    assert isinstance(get_storage_backend('/cache/coco/detection_2015.h5'), LocalStorage)
+    assert isinstance(get_storage_backend('C:\\cache\\coco\\detection_2015.h5'), LocalStorage)
+    assert isinstance(get_storage_backend('https://host/coco/detection_2015.h5'), HTTPRangeStorage)
+
+
+@pytest.fixture()
+def hdf5_filename(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+    manager = HDF5Manager(filename)
+    manager.add_field_to_group('train', 'boxes', np.arange(4000, dtype=np.float32).reshape(1000, 4),
+                               dtype=np.float32, compression='gzip')
+    manager.add_field_to_group('train', 'classes', str_to_ascii(['cat', 'dog']),
+                               dtype=np.uint8, fillvalue=0)
+    manager.add_field_to_group('train', 'object_ids', np.arange(1000).reshape(1000, 1), dtype=np.int32)
+    manager.add_field_to_group('train', 'labels', np.arange(1000) % 10, dtype=np.int32)
+    manager.add_field_to_group('train', 'object_fields', str_to_ascii(['labels']),
+                               dtype=np.uint8, fillvalue=0)
+    manager.close()
+    return filename
+
+
+def test_data_loader_with_file_range_storage(hdf5_filename, monkeypatch):
+    monkeypatch.setitem(storage._storage_backends, 'file', FileRangeStorage(block_nbytes=4096))
+    url = 'file://' + hdf5_filename
+
+    data_loader = DataLoader('dataset', 'task', '/data/dir', url)
+
+    assert not is_local_hdf5_file(data_loader.hdf5_file)
+    assert data_loader.hdf5_file.filename == url
+    assert np.array_equal(data_loader.get('train', 'boxes', [10, 999]),
+                          np.arange(4000, dtype=np.float32).reshape(1000, 4)[[10, 999]])
+    assert data_loader.get('train', 'classes', 1, convert_to_str=True) == 'dog'
+    assert data_loader.query('train', labels=3).tolist()[:2] == [3, 13]
+    assert sorted(os.listdir(os.path.dirname(hdf5_filename))) == ['task.h5']
+    with pytest.raises(IOError):
+        data_loader.sets['train'].fields['boxes'].to_mmap = True
+
+
+def test_data_loader_with_file_url(hdf5_filename):
+    url = 'file://' + hdf5_filename
+
+    data_loader = DataLoader('dataset', 'task', '/data/dir', url)
+
+    assert isinstance(get_storage_backend(url), LocalStorage)
+    assert get_storage_backend(url).signature(url) == LocalStorage().signature(hdf5_filename)
+    assert is_local_hdf5_file(data_loader.hdf5_file)
+    assert data_loader.hdf5_file.filename == hdf5_filename
+    assert data_loader.get('train', 'labels', 13) == 3
+    data_loader.sets['train'].fields['boxes'].to_mmap = True
+    assert np.array_equal(data_loader.get('train', 'boxes', 999), [3996, 3997, 3998, 3999])
+
+
+class RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves the bytes of a file with range requests."""
+
+    filename = None
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(os.path.getsize(self.filename)))
+        self.end_headers()
+
+    def do_GET(self):
+        start, stop = self.headers['Range'].split('=')[1].split('-')
+        with open(self.filename, 'rb') as f:
+            f.seek(int(start))
+            data = f.read(int(stop) - int(start) + 1)
+        self.send_response(206)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def http_url(hdf5_filename):
+    handler = type('Handler', (RangeRequestHandler,), {"filename": hdf5_filename})
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}/task.h5'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_open_hdf5_file_with_http_range_storage(http_url, hdf5_filename):
+    with open_hdf5_file(http_url) as hdf5_file:
+        data = hdf5_file['train/boxes'][100:200]
+
+    assert np.array_equal(data, np.arange(4000, dtype=np.float32).reshape(1000, 4)[100:200])
+    assert get_storage_backend(http_url).signature(http_url) is not None
+
+
+def test_data_loader_opens_http_file_once(http_url, mocker):
+    spy = mocker.spy(HTTPRangeStorage, 'open')
+
+    data_loader = DataLoader('dataset', 'task', '/data/dir', http_url)
+    data_loader.get('train', 'labels', [0, 999])
+
+    assert spy.call_count == 1
+
+
+def test_register_storage_backend(monkeypatch):
+    backend = FileRangeStorage()
+    monkeypatch.setattr(storage, '_storage_backends', {})
+
+    register_storage_backend('S3', backend)
+
+    assert get_storage_backend('s3://bucket/task.h5') is backend
@@ -4,6 +4,8 @@ Test the base classes for managing datasets and tasks.
 
 
 import os
+from functools import partial
+import h5py
 import pytest
 import numpy as np
 
@@ -11,8 +13,10 @@ from dbcollection.datasets import (
     BaseDataset,
     BaseTask,
     BaseField,
-    BaseColumnField
+    BaseColumnField,
+    import_futures
 )
+from dbcollection.utils.hdf5 import hdf5_write_data
 
 
 @pytest.fixture()
@@ -238,12 +242,177 @@ class TestBaseTask:
         assert mock_process_metadata.called
 
     def test_teardown_hdf5_manager(self, mocker, mock_task_class):
+        mock_rename = mocker.patch("dbcollection.datasets.rename_file")
         mock_add_field = mocker.Mock()
+        mock_add_field.filename = '/path/to/cache/file.h5.tmp'
         mock_task_class.hdf5_manager = mock_add_field
 
         mock_task_class.teardown_hdf5_manager()
 
         mock_add_field.close.assert_called_once_with()
+        mock_rename.assert_called_once_with('/path/to/cache/file.h5.tmp', mock_task_class.hdf5_filepath)
+
+
+class SampleTask(BaseTask):
+    """Task that stores a few fields per set (for the tests of the parallel processing)."""
+
+    filename_h5 = 'sample'
+    set_sizes = {"train": 5, "val": 3, "test": 2}
+
+    def load_data(self):
+        for set_name in sorted(self.set_sizes):
+            yield {set_name: np.arange(self.set_sizes[set_name])}
+
+    def process_set_metadata(self, data, set_name):
+        BaseField(hdf5_manager=self.hdf5_manager).save_field_to_hdf5(
+            set_name, 'labels', data, dtype=np.int32)
+        BaseField(hdf5_manager=self.hdf5_manager).save_ragged_field_to_hdf5(
+            set_name, 'ragged', [list(range(i)) for i in data], dtype=np.int32)
+        hdf5_write_data(self.hdf5_manager.get_group(set_name), 'boxes',
+                        np.ones((len(data), 4)) * data.reshape(-1, 1), dtype=np.float32)
+
+
+class SampleTaskSetLoaders(SampleTask):
+    """Task with set loaders (for the tests of the parallel processing)."""
+
+    def load_data(self):
+        for set_name, load_set in self.get_set_loaders():
+            yield {set_name: load_set()}
+
+    def get_set_loaders(self):
+        return [(set_name, self.set_sizes[set_name].__index__) for set_name in sorted(self.set_sizes)]
+
+    def process_set_metadata(self, data, set_name):
+        super(SampleTaskSetLoaders, self).process_set_metadata(np.arange(data), set_name)
+
+
+class SampleTaskWithErrors(SampleTask):
+    """Task that fails to process a set (for the tests of the parallel processing)."""
+
+    def process_set_metadata(self, data, set_name):
+        if set_name == 'val':
+            raise ValueError('Invalid set.')
+        super(SampleTaskWithErrors, self).process_set_metadata(data, set_name)
+
+
+class SampleTaskInputFiles(SampleTaskSetLoaders):
+    """Task with an input file per set (for the tests of the incremental processing)."""
+
+    def get_set_loaders(self):
+        return [(set_name, partial(self.load_set_size, set_name)) for set_name in sorted(self.set_sizes)]
+
+    def get_set_input_files(self, set_name):
+        return [os.path.join(self.data_path, set_name + '.txt')]
+
+    def load_set_size(self, set_name):
+        with open(os.path.join(self.data_path, set_name + '.txt')) as f:
+            return int(f.read())
+
+
+class TestBaseTaskIncremental:
+    """Unit tests for the incremental processing of the sets of a task."""
+
+    @staticmethod
+    @pytest.fixture()
+    def task(tmpdir):
+        for set_name, size in SampleTask.set_sizes.items():
+            tmpdir.join(set_name + '.txt').write(str(size))
+        return SampleTaskInputFiles(data_path=str(tmpdir), cache_path=str(tmpdir), verbose=False)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run_skips_unchanged_sets(self, mocker, tmpdir, task, workers):
+        task.workers = workers
+        filename = task.run()
+        tmpdir.join('val.txt').write('4')
+        os.utime(str(tmpdir.join('val.txt')), (0, 0))
+        mock_load = mocker.spy(SampleTaskInputFiles, 'load_set_size')
+
+        task.run()
+
+        if workers == 1:
+            assert [call[0][1] for call in mock_load.call_args_list] == ['val']
+        with h5py.File(filename, 'r') as f:
+            assert f['val/labels'][()].tolist() == [0, 1, 2, 3]
+            assert f['train/labels'][()].tolist() == [0, 1, 2, 3, 4]
+            assert f['train/ragged'].attrs['encoding'] == 'ragged'
+            assert f['train'].attrs['fingerprint'] == task.get_set_fingerprint('train')
+        assert not [name for name in os.listdir(str(tmpdir)) if name.endswith('.tmp')]
+
+    def test_run_processes_sets_of_changed_options(self, mocker, task):
+        task.run()
+        mock_load = mocker.spy(SampleTaskInputFiles, 'load_set_size')
+
+        task.storage_profile = 'compact'
+        task.run()
+
+        assert mock_load.call_count == 3
+
+    def test_run_keeps_previous_file_on_errors(self, mocker, tmpdir, task):
+        filename = task.run()
+        tmpdir.join('val.txt').write('invalid size')
+
+        with pytest.raises(ValueError):
+            task.run()
+
+        with h5py.File(filename, 'r') as f:
+            assert f['val/labels'][()].tolist() == [0, 1, 2]
+        assert not [name for name in os.listdir(str(tmpdir)) if name.endswith('.tmp')]
+
+    def test_get_set_fingerprint_without_input_files(self, mock_task_class):
+        assert mock_task_class.get_set_fingerprint('train') is None
+
+
+class TestBaseTaskParallel:
+    """Unit tests for the processing of the sets of a task with a pool of processes."""
+
+    @staticmethod
+    def read_file(filename):
+        with h5py.File(filename, 'r') as f:
+            return {set_name: {field: f[set_name][field][()].tolist()
+                               for field in ('labels', 'boxes', 'ragged/values', 'ragged/offsets')}
+                    for set_name in f}
+
+    @pytest.mark.parametrize("task_class", [SampleTask, SampleTaskSetLoaders])
+    def test_run_with_workers(self, tmpdir, task_class):
+        task = task_class(data_path=str(tmpdir), cache_path=str(tmpdir.mkdir('serial')), verbose=False)
+        task_parallel = task_class(data_path=str(tmpdir), cache_path=str(tmpdir.mkdir('parallel')),
+                                   verbose=False)
+        task_parallel.workers = 2
+
+        filename = task.run()
+        filename_parallel = task_parallel.run()
+
+        assert self.read_file(filename_parallel) == self.read_file(filename)
+        with h5py.File(filename_parallel, 'r') as f:
+            assert sorted(f) == ['test', 'train', 'val']
+            assert f['train/labels'].compression == 'gzip'
+            assert f['train/ragged'].attrs['encoding'] == 'ragged'
+
+    def test_run_with_workers_raises_errors_of_the_sets(self, tmpdir):
+        task = SampleTaskWithErrors(data_path=str(tmpdir), cache_path=str(tmpdir), verbose=False)
+        task.workers = 2
+
+        with pytest.raises(ValueError):
+            task.run()
+
+    def test_run_with_workers_without_futures(self, mocker, tmpdir):
+        mocker.patch.dict('sys.modules', {'concurrent': None, 'concurrent.futures': None})
+        task = SampleTask(data_path=str(tmpdir), cache_path=str(tmpdir), verbose=False)
+        task.workers = 2
+
+        with pytest.raises(ImportError):
+            import_futures()
+        with pytest.raises(ImportError):
+            task.run()
+
+    def test_pickle_without_hdf5_manager(self, mocker, mock_task_class):
+        import pickle
+        mock_task_class.hdf5_manager = 'open file'
+
+        task = pickle.loads(pickle.dumps(mock_task_class))
+
+        assert task.hdf5_manager is None
+        assert task.data_path == mock_task_class.data_path
 
 
 class TestBaseField:
@@ -286,6 +455,34 @@ class TestBaseField:
             data=data
         )
 
+    def test_save_list_field_to_hdf5(self, mocker):
+        mock_hdf5_manager = mocker.Mock()
+        base_field = BaseField(set_name='train', hdf5_manager=mock_hdf5_manager)
+
+        data = [[0, 1], [], [2]]
+        base_field.save_list_field_to_hdf5('train', 'list_fieldA', data, dtype=np.int32)
+
+        mock_hdf5_manager.add_list_field_to_group.assert_called_once_with(
+            group='train',
+            field='list_fieldA',
+            data=data,
+            dtype=np.int32
+        )
+
+    def test_save_ragged_field_to_hdf5(self, mocker):
+        mock_hdf5_manager = mocker.Mock()
+        base_field = BaseField(set_name='train', hdf5_manager=mock_hdf5_manager)
+
+        data = [[0.5, 1.5], [], [2.5]]
+        base_field.save_ragged_field_to_hdf5('train', 'segmentation', data, dtype=np.float32)
+
+        mock_hdf5_manager.add_ragged_field_to_group.assert_called_once_with(
+            group='train',
+            field='segmentation',
+            data=data,
+            dtype=np.float32
+        )
+
     def test_save_field_to_hdf5_all_args(self, mocker):
         mock_hdf5_manager = mocker.Mock()
 
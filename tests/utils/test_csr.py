@@ -0,0 +1,30 @@
+"""
+Test dbcollection/utils/csr.py.
+"""
+
+
+import numpy as np
+import pytest
+
+from dbcollection.utils.csr import convert_list_to_csr, convert_csr_to_list, get_csr_value_rows
+
+
+@pytest.mark.parametrize("lists", [
+    [[0, 1, 2], [], [3]],
+    [[5]],
+    [[], []],
+    [],
+])
+def test_convert_list_to_csr_and_back(lists):
+    values, offsets = convert_list_to_csr(lists)
+
+    assert values.dtype == np.int32
+    assert len(offsets) == len(lists) + 1
+    assert [l.tolist() for l in convert_csr_to_list(values, offsets)] == lists
+
+
+def test_get_csr_value_rows():
+    rows, split = get_csr_value_rows(np.array([3, 0, 3, 5]), np.array([5, 2, 3, 6]))
+
+    assert rows.tolist() == [3, 4, 0, 1, 5]
+    assert split.tolist() == [0, 2, 4, 4, 5]
@@ -0,0 +1,33 @@
+"""
+Test dbcollection/utils/file.py.
+"""
+
+
+import os
+
+from dbcollection.utils.file import rename_file
+
+
+def test_rename_file(tmpdir):
+    src, dst = str(tmpdir.join('task.h5.tmp')), str(tmpdir.join('task.h5'))
+    with open(src, 'w') as f:
+        f.write('new')
+
+    rename_file(src, dst)
+
+    assert not os.path.exists(src)
+    with open(dst) as f:
+        assert f.read() == 'new'
+
+
+def test_rename_file_replaces_the_destination(tmpdir):
+    src, dst = str(tmpdir.join('task.h5.tmp')), str(tmpdir.join('task.h5'))
+    for filename, data in ((src, 'new'), (dst, 'old')):
+        with open(filename, 'w') as f:
+            f.write(data)
+
+    rename_file(src, dst)
+
+    assert os.listdir(str(tmpdir)) == ['task.h5']
+    with open(dst) as f:
+        assert f.read() == 'new'
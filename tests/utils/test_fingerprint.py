@@ -0,0 +1,80 @@
+"""
+Test the fingerprints of the input files of the sets.
+"""
+
+
+import hashlib
+import os
+
+import pytest
+
+from dbcollection.utils.fingerprint import (get_file_fingerprint, get_fingerprint,
+                                            get_source_version)
+
+
+@pytest.fixture()
+def input_file(tmpdir):
+    path = tmpdir.join('annotations.json')
+    path.write('{"images": []}')
+    return str(path)
+
+
+class TestGetFileFingerprint:
+    """Unit tests for the fingerprints of files."""
+
+    def test_get_file_fingerprint(self, input_file):
+        fingerprint = get_file_fingerprint(input_file)
+
+        assert fingerprint['path'] == input_file
+        assert fingerprint['size'] == 14
+        assert 'sha1' not in fingerprint
+
+    def test_get_file_fingerprint_with_hash(self, input_file):
+        fingerprint = get_file_fingerprint(input_file, hash_contents=True)
+
+        assert fingerprint['sha1'] == hashlib.sha1(b'{"images": []}').hexdigest()
+
+    def test_get_file_fingerprint_missing_file(self, tmpdir):
+        fingerprint = get_file_fingerprint(str(tmpdir.join('missing.json')))
+
+        assert fingerprint['size'] is None
+
+
+class TestGetFingerprint:
+    """Unit tests for the fingerprints of the inputs of a set."""
+
+    def test_same_inputs(self, input_file):
+        assert get_fingerprint([input_file], set_name='train') == get_fingerprint([input_file], set_name='train')
+
+    def test_changes_with_the_options(self, input_file):
+        assert get_fingerprint([input_file], set_name='train') != get_fingerprint([input_file], set_name='val')
+
+    def test_changes_with_the_modification_time(self, input_file):
+        fingerprint = get_fingerprint([input_file])
+
+        os.utime(input_file, (0, 0))
+
+        assert get_fingerprint([input_file]) != fingerprint
+
+    def test_changes_with_the_contents_if_hashed(self, input_file):
+        stat = os.stat(input_file)
+        fingerprint = get_fingerprint([input_file], hash_contents=True)
+
+        with open(input_file, 'w') as f:
+            f.write('{"images": [1]}'[:14])
+        os.utime(input_file, (stat.st_atime, stat.st_mtime))
+
+        assert get_fingerprint([input_file]) == get_fingerprint([input_file])
+        assert get_fingerprint([input_file], hash_contents=True) != fingerprint
+
+
+class TestGetSourceVersion:
+    """Unit tests for the versions of the source code of classes."""
+
+    def test_get_source_version(self):
+        class SampleClass(TestGetFingerprint):
+            pass
+
+        assert len(get_source_version(SampleClass)) == 40
+        assert get_source_version(SampleClass) == get_source_version(TestGetFingerprint)
+        assert get_source_version(SampleClass) != get_source_version(object)
@@ -3,11 +3,18 @@ Test the HDF5 metadata manager class.
 """
 
 
+import io
 import os
+import h5py
 import numpy as np
 import pytest
 
-from dbcollection.utils.hdf5 import HDF5Manager
+from dbcollection.utils.hdf5 import (HDF5Manager, get_chunk_cache_settings, next_prime, hdf5_get_object,
+                                     hdf5_read_catalog, get_catalog_chunk_nbytes, hdf5_get_encoding,
+                                     get_storage_layout, hdf5_get_storage_profile, hdf5_write_data,
+                                     hdf5_write_ragged_data, get_narrow_dtype, hdf5_get_original_dtype,
+                                     get_string_encoding, encode_front_coding)
+from dbcollection.utils.string_ascii import convert_str_to_ascii as str2ascii
 
 
 @pytest.fixture()
@@ -82,3 +89,381 @@ class TestHDF5Manager:
     def test_add_field_to_group__raises_error_no_input_args(self, mocker, mock_hdf5manager):
         with pytest.raises(TypeError):
             mock_hdf5manager.add_field_to_group()
+
+
+class TestChunkCacheSettings:
+    """Unit tests for the get_chunk_cache_settings() method."""
+
+    def test_defaults_without_chunked_datasets(self):
+        assert get_chunk_cache_settings([]) == (1024 * 1024, 521)
+
+    def test_cache_fits_biggest_chunks(self):
+        rdcc_nbytes, rdcc_nslots = get_chunk_cache_settings([4096, 2 * 1024 * 1024])
+
+        assert rdcc_nbytes == 8 * 1024 * 1024
+        assert rdcc_nslots >= 100 * (rdcc_nbytes // (2 * 1024 * 1024))
+        assert next_prime(rdcc_nslots) == rdcc_nslots
+
+    def test_get_object_with_chunk_cache(self, tmpdir):
+        with h5py.File(str(tmpdir.join('task.h5')), 'w') as f:
+            f.create_dataset('train/data', data=np.zeros((1000, 8)), chunks=(100, 8))
+
+            h5_field = hdf5_get_object(f['train'], 'data', chunk_cache=(2 * 1024 * 1024, 1031))
+
+            assert h5_field.id.get_access_plist().get_chunk_cache()[:2] == (1031, 2 * 1024 * 1024)
+            assert hdf5_get_object(f, 'train', chunk_cache=(2 * 1024 * 1024, 1031)).name == '/train'
+            with pytest.raises(KeyError):
+                hdf5_get_object(f['train'], 'invalid', chunk_cache=(2 * 1024 * 1024, 1031))
+
+    @pytest.mark.parametrize("n, expected", [(0, 2), (8, 11), (521, 521), (522, 523)])
+    def test_next_prime(self, n, expected):
+        assert next_prime(n) == expected
+
+
+class TestCatalog:
+    """Unit tests for the catalog of sets and fields of a metadata file."""
+
+    @pytest.fixture()
+    def filename(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_field_to_group('train', 'boxes', np.zeros((10, 4), dtype=np.float32),
+                                   dtype=np.float32, chunks=(5, 4))
+        manager.add_field_to_group('train', 'object_ids', np.zeros((10, 1), dtype=np.int32),
+                                   dtype=np.int32)
+        manager.add_field_to_group('train', 'object_fields', str2ascii(['boxes']),
+                                   dtype=np.uint8, fillvalue=0)
+        manager.close()
+        return filename
+
+    def test_close_writes_catalog(self, filename):
+        with h5py.File(filename, 'r') as f:
+            catalog = hdf5_read_catalog(f)
+
+        train = catalog["sets"]["train"]
+        assert sorted(train["fields"]) == ['boxes', 'object_fields', 'object_ids']
+        assert train["object_fields"] == ['boxes']
+        assert train["fields"]["boxes"] == {"shape": [10, 4], "dtype": '<f4', "chunks": [5, 4]}
+
+    def test_catalog_chunk_nbytes(self, filename):
+        with h5py.File(filename, 'r') as f:
+            catalog = hdf5_read_catalog(f)
+
+        assert 5 * 4 * 4 in get_catalog_chunk_nbytes(catalog)
+
+    def test_read_catalog_missing(self, tmpdir):
+        filename = str(tmpdir.join('old.h5'))
+        with h5py.File(filename, 'w') as f:
+            f['train/data'] = np.arange(3)
+            assert hdf5_read_catalog(f) is None
+
+
+class TestListFields:
+    """Unit tests for writing CSR-encoded list fields."""
+
+    def test_add_list_field_to_group(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename)
+        manager.add_list_field_to_group('train', 'list_boxes_per_image', [[0, 1, 2], [], [3]])
+        manager.close()
+
+        with h5py.File(filename, 'r') as f:
+            group = f['train/list_boxes_per_image']
+            assert hdf5_get_encoding(group) == 'csr'
+            assert group.attrs['max_length'] == 3
+            assert group['values'][()].tolist() == [0, 1, 2, 3]
+            assert group['offsets'][()].tolist() == [0, 3, 3, 4]
+            catalog = hdf5_read_catalog(f)
+            assert catalog["sets"]["train"]["fields"]["list_boxes_per_image"]["encoding"] == 'csr'
+
+    def test_get_encoding_of_dataset(self, tmpdir):
+        with h5py.File(str(tmpdir.join('task.h5')), 'w') as f:
+            f['train/data'] = np.arange(3)
+            assert hdf5_get_encoding(f['train/data']) is None
+
+
+class TestStorageProfiles:
+    """Unit tests for the storage layout profiles of the fields."""
+
+    def test_default_profile_keeps_write_arguments(self):
+        assert get_storage_layout('default', (1000, 4), np.float32) is None
+
+    def test_small_fields_are_contiguous(self):
+        layout = get_storage_layout('random_access', (10, 4), np.float32)
+
+        assert layout == {"chunks": None, "compression": None, "compression_opts": None,
+                          "shuffle": False}
+
+    @pytest.mark.parametrize("profile, chunk_nbytes", [('random_access', 16 * 1024),
+                                                       ('sequential', 1024 * 1024)])
+    def test_chunks_are_row_aligned(self, profile, chunk_nbytes):
+        layout = get_storage_layout(profile, (100000, 8), np.float32)
+
+        assert layout["chunks"] == (chunk_nbytes // 32, 8)
+
+    def test_invalid_profile(self):
+        with pytest.raises(KeyError):
+            get_storage_layout('invalid', (10,), np.int32)
+
+    def test_manager_records_profile(self, tmpdir):
+        filename = str(tmpdir.join('task.h5'))
+        manager = HDF5Manager(filename, storage_profile='random_access')
+        manager.add_field_to_group('train', 'data', np.zeros((100000, 8), dtype=np.float32),
+                                   dtype=np.float32)
+        manager.close()
+
+        with h5py.File(filename, 'r') as f:
+            assert hdf5_get_storage_profile(f) == 'random_access'
+            assert hdf5_read_catalog(f)["storage_profile"] == 'random_access'
+            assert f['train/data'].chunks == (512, 8)
+            assert f['train/data'].compression == 'lzf'
+
+    def test_write_data_uses_profile_of_the_file(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')), storage_profile='sequential')
+
+        h5_field = hdf5_write_data(manager.get_group('train'), 'data',
+                                   np.zeros((100000, 8), dtype=np.float32))
+
+        assert h5_field.chunks == (32768, 8)
+        assert h5_field.compression == 'gzip'
+        manager.close()
+
+    def test_manager__raises_error_invalid_kwargs(self, tmpdir):
+        with pytest.raises(TypeError):
+            HDF5Manager(str(tmpdir.join('task.h5')), invalid_option=True)
+
+
+class TestFieldWriter:
+    """Unit tests for the streaming field writer."""
+
+    @pytest.fixture()
+    def manager(self, tmpdir):
+        return HDF5Manager(str(tmpdir.join('task.h5')))
+
+    def test_append_rows_in_batches(self, manager):
+        writer = manager.open_field_writer('train', 'labels', np.int32, buffer_rows=4)
+        writer.append([0, 1, 2])
+
+        assert len(writer) == 3
+        assert writer.dataset.shape == (0,)
+
+        writer.append(np.arange(3, 6))
+        writer.append([6])
+
+        assert writer.dataset.shape == (6,)
+
+        writer.close()
+
+        assert writer.dataset[()].tolist() == [0, 1, 2, 3, 4, 5, 6]
+
+    def test_padded_rows_grow_and_trim_the_width(self, manager):
+        writer = manager.open_field_writer('train', 'segmentation', np.float32, (0,),
+                                           buffer_rows=2)
+        writer.append([[1, 2], [3], []])
+        writer.append([[4, 5, 6]])
+        writer.close()
+
+        data = writer.dataset[()]
+        assert data.tolist() == [[1, 2, -1], [3, -1, -1], [-1, -1, -1], [4, 5, 6]]
+
+    def test_initial_width_is_trimmed_to_longest_row(self, manager):
+        with manager.open_field_writer('train', 'data', np.int32, (10,)) as writer:
+            writer.append([[1], [2, 3]])
+
+        assert writer.dataset.shape == (2, 2)
+
+    def test_writers_are_closed_with_the_file(self, manager):
+        writer = manager.open_field_writer('train', 'boxes', np.float32, (4,),
+                                           storage_profile='random_access')
+        writer.append(np.ones((3, 4)))
+        manager.close()
+
+        with h5py.File(manager.filename, 'r') as f:
+            assert f['train/boxes'][()].tolist() == np.ones((3, 4)).tolist()
+            assert f['train/boxes'].compression == 'lzf'
+            assert hdf5_read_catalog(f)["sets"]["train"]["fields"]["boxes"]["shape"] == [3, 4]
+
+    def test_append__raises_error_invalid_rows(self, manager):
+        writer = manager.open_field_writer('train', 'data', np.int32, (0,))
+
+        with pytest.raises(AssertionError):
+            writer.append([[[1]]])
+
+
+class TestFileImages:
+    """Unit tests for the copy of hdf5 file images."""
+
+    def test_add_file_image(self, tmpdir):
+        image = io.BytesIO()
+        image_manager = HDF5Manager(image)
+        image_manager.add_field_to_group('train', 'labels', np.arange(5), dtype=np.int32)
+        image_manager.add_list_field_to_group('val', 'ids', [[0], [1, 2]])
+        image_manager.close()
+        manager = HDF5Manager(str(tmpdir.join('task.h5')))
+        manager.add_field_to_group('train', 'boxes', np.ones((5, 4)), dtype=np.float32)
+
+        manager.add_file_image(image.getvalue())
+
+        assert sorted(manager.file) == ['train', 'val']
+        assert sorted(manager.file['train']) == ['boxes', 'labels']
+        assert manager.file['train/labels'][()].tolist() == [0, 1, 2, 3, 4]
+        assert manager.file['train/labels'].compression == 'gzip'
+        assert manager.file['val/ids'].attrs['encoding'] == 'csr'
+        manager.close()
+
+
+class TestRaggedFields:
+    """Unit tests for writing ragged fields."""
+
+    def test_write_ragged_data_uses_type_of_values(self, tmpdir):
+        with h5py.File(str(tmpdir.join('task.h5')), 'w') as f:
+            group = hdf5_write_ragged_data(f, 'segmentation', [[1, 2], [], [3.5]])
+
+            assert hdf5_get_encoding(group) == 'ragged'
+            assert group['values'].dtype == np.float64
+            assert group['values'][()].tolist() == [1, 2, 3.5]
+            assert group['offsets'][()].tolist() == [0, 2, 2, 3]
+            assert group.attrs['max_length'] == 2
+
+    def test_write_ragged_data_narrows_values(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')), narrow_dtypes=1e-6)
+        group = hdf5_write_ragged_data(manager.get_group('train'), 'segmentation',
+                                       [[10.5, 20.25], [], [3.1]], dtype=np.float64)
+
+        assert group['values'].dtype == np.float32
+        assert hdf5_get_original_dtype(group['values']) == np.float64
+        assert group['offsets'].dtype == np.int64
+        manager.close()
+
+    def test_ragged_writer(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')))
+        writer = manager.open_ragged_field_writer('train', 'captions', np.uint8, buffer_rows=2)
+        writer.append([[1, 2, 3], []])
+        writer.append([np.array([4], dtype=np.uint8)])
+
+        assert len(writer) == 3
+
+        manager.close()
+
+        with h5py.File(manager.filename, 'r') as f:
+            group = f['train/captions']
+            assert hdf5_get_encoding(group) == 'ragged'
+            assert group['values'][()].tolist() == [1, 2, 3, 4]
+            assert group['offsets'][()].tolist() == [0, 3, 3, 4]
+            assert group.attrs['max_length'] == 3
+            catalog = hdf5_read_catalog(f)
+            assert catalog["sets"]["train"]["fields"]["captions"]["encoding"] == 'ragged'
+
+
+class TestNarrowDtypes:
+    """Unit tests for the narrowing of the types of the fields."""
+
+    @pytest.mark.parametrize("data, fillvalue, expected", [
+        (np.array([0., 1., 1.]), None, np.float32),
+        (np.array([0., 10., 20., 30.]), -1, np.float32),
+        (np.array([0., 1e20]), -1, np.float64),
+        (np.array([0, 1], dtype=np.int32), -0.5, np.int32),
+        (np.array([0, 300, 7], dtype=np.int32), -1, np.int16),
+        (np.array([0, 70000], dtype=np.int64), 0, np.uint32),
+        (np.array([0.5, 1.25]), -1, np.float32),
+        (np.array([0.1, 2.7]), -1, np.float64),
+        (np.array([1.5, np.nan]), -1, np.float32),
+        (np.array([1., np.inf]), -1, np.float32),
+        (np.array([], dtype=np.float64), -1, np.float64),
+        (np.array([1, 2], dtype=np.uint8), 0, np.uint8),
+    ])
+    def test_get_narrow_dtype(self, data, fillvalue, expected):
+        assert get_narrow_dtype(data, fillvalue=fillvalue) == expected
+
+    def test_get_narrow_dtype_with_tolerance(self):
+        data = np.array([0.1, 2.7, 123.45])
+
+        assert get_narrow_dtype(data, tolerance=1e-6) == np.float32
+        assert get_narrow_dtype(data, tolerance=1e-9) == np.float64
+
+    def test_write_data_records_original_dtype(self, tmpdir):
+        with h5py.File(str(tmpdir.join('task.h5')), 'w') as f:
+            h5_field = hdf5_write_data(f, 'occlusion', np.array([0., 1., 0.]), narrow=True)
+
+            assert h5_field.dtype == np.float32
+            assert hdf5_get_original_dtype(h5_field) == np.float64
+            assert h5_field[()].tolist() == [0, 1, 0]
+
+    def test_write_data_without_narrowing(self, tmpdir):
+        with h5py.File(str(tmpdir.join('task.h5')), 'w') as f:
+            h5_field = hdf5_write_data(f, 'occlusion', np.array([0., 1., 0.]))
+
+            assert h5_field.dtype == np.float64
+            assert hdf5_get_original_dtype(h5_field) == np.float64
+
+    def test_manager_narrows_all_fields(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')), narrow_dtypes=1e-6)
+        manager.add_field_to_group('train', 'boxes', np.array([[0.1, 2.7, 10.5, 20.25]]),
+                                   dtype=np.float64)
+        h5_field = hdf5_write_data(manager.get_group('train'), 'labels',
+                                   np.arange(10, dtype=np.int32))
+        manager.add_field_to_group('train', 'ids', np.arange(10), dtype=np.int32, narrow=False)
+
+        assert manager.file['train/boxes'].dtype == np.float32
+        assert h5_field.dtype == np.int8
+        assert manager.file['train/ids'].dtype == np.int32
+        manager.close()
+
+
+
+class TestStringEncodings:
+    """Unit tests for writing strings with a dictionary encoding or front coding."""
+
+    @pytest.mark.parametrize("data, expected", [
+        (['cat', 'dog', 'cat', 'cat'], 'dictionary'),
+        (['a/01.jpg', 'a/02.jpg', 'b/01.jpg'], 'front_coded'),
+    ])
+    def test_get_string_encoding(self, data, expected):
+        assert get_string_encoding(data) == expected
+
+    def test_encode_front_coding(self):
+        prefix_lengths, suffix_lengths, suffixes = encode_front_coding(['a/01', 'a/02', 'b/01', 'b/011'],
+                                                                       block_size=2)
+
+        assert prefix_lengths.tolist() == [0, 3, 0, 4]
+        assert suffix_lengths.tolist() == [4, 1, 4, 1]
+        assert suffixes.tobytes() == b'a/012b/011'
+
+    def test_write_dictionary_strings(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')))
+        manager.add_string_field_to_group('train', 'category', ['dog', 'cat', 'dog'],
+                                          encoding='dictionary')
+        manager.close()
+
+        with h5py.File(manager.filename, 'r') as f:
+            group = f['train/category']
+            assert hdf5_get_encoding(group) == 'dictionary'
+            assert group['dictionary'][()].tolist() == str2ascii(['dog', 'cat']).tolist()
+            assert group['codes'][()].tolist() == [0, 1, 0]
+            assert group['codes'].dtype == np.uint8
+            assert group.attrs['num_rows'] == 3
+            assert group.attrs['max_length'] == 3
+            catalog = hdf5_read_catalog(f)
+            assert catalog["sets"]["train"]["fields"]["category"]["encoding"] == 'dictionary'
+
+    def test_write_front_coded_strings(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')))
+        manager.add_string_field_to_group('train', 'filename', ['a/01', 'a/02', 'b/01'],
+                                          encoding='front_coded', block_size=2)
+        manager.close()
+
+        with h5py.File(manager.filename, 'r') as f:
+            group = f['train/filename']
+            assert hdf5_get_encoding(group) == 'front_coded'
+            assert group.attrs['block_size'] == 2
+            assert group['prefix_lengths'][()].tolist() == [0, 3, 0]
+            assert group['suffix_lengths'][()].tolist() == [4, 1, 4]
+            assert group['block_offsets'][()].tolist() == [0, 5, 9]
+            assert group['block_offsets'].dtype == np.uint8
+            assert group['suffixes'][()].tobytes() == b'a/012b/01'
+
+    def test_write_strings_raise_error_invalid_encoding(self, tmpdir):
+        manager = HDF5Manager(str(tmpdir.join('task.h5')))
+        with pytest.raises(KeyError):
+            manager.add_string_field_to_group('train', 'filename', ['a'], encoding='invalid')
+        manager.close()
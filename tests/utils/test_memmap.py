@@ -0,0 +1,63 @@
+"""
+Test dbcollection/utils/memmap.py.
+"""
+
+
+import os
+import time
+import h5py
+import numpy as np
+import pytest
+
+from dbcollection.utils.memmap import (hdf5_dataset_memmap, hdf5_dataset_to_npy, get_sidecar_filename,
+                                       is_sidecar_file_valid, load_npy_memmap)
+
+
+@pytest.fixture()
+def hdf5_file(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+    with h5py.File(filename, 'w') as f:
+        f.create_dataset('train/contiguous', data=np.arange(20).reshape(10, 2))
+        f.create_dataset('train/compressed', data=np.arange(20).reshape(10, 2),
+                         chunks=(3, 2), compression='gzip')
+    h5file = h5py.File(filename, 'r')
+    yield h5file
+    h5file.close()
+
+
+def test_hdf5_dataset_memmap_contiguous_dataset(hdf5_file):
+    memmap = hdf5_dataset_memmap(hdf5_file['train/contiguous'])
+
+    assert isinstance(memmap, np.memmap)
+    assert np.array_equal(memmap, hdf5_file['train/contiguous'][()])
+
+
+def test_hdf5_dataset_memmap_compressed_dataset_returns_none(hdf5_file):
+    assert hdf5_dataset_memmap(hdf5_file['train/compressed']) is None
+
+
+def test_get_sidecar_filename():
+    filename = get_sidecar_filename('/cache/coco/detection_2015.h5', 'train', 'boxes')
+
+    assert filename == '/cache/coco/detection_2015.train.boxes.npy'
+
+
+def test_hdf5_dataset_to_npy(hdf5_file, tmpdir):
+    filename = str(tmpdir.join('out.npy'))
+
+    hdf5_dataset_to_npy(hdf5_file['train/compressed'], filename, block_rows=4)
+
+    assert np.array_equal(load_npy_memmap(filename), hdf5_file['train/compressed'][()])
+    assert sorted(os.listdir(str(tmpdir))) == ['out.npy', 'task.h5']
+
+
+def test_is_sidecar_file_valid(hdf5_file, tmpdir):
+    filename = str(tmpdir.join('task.train.compressed.npy'))
+    hdf5_filepath = hdf5_file.filename
+
+    assert not is_sidecar_file_valid(filename, hdf5_filepath)
+    hdf5_dataset_to_npy(hdf5_file['train/compressed'], filename)
+    assert is_sidecar_file_valid(filename, hdf5_filepath)
+    future = time.time() + 10
+    os.utime(hdf5_filepath, (future, future))
+    assert not is_sidecar_file_valid(filename, hdf5_filepath)
@@ -0,0 +1,134 @@
+"""
+Test dbcollection/utils/shared_memory.py.
+"""
+
+
+import os
+import tempfile
+import numpy as np
+import pytest
+
+from dbcollection.utils.shared_memory import (SharedArray, get_shared_memory_name,
+                                              is_shared_memory_available, shared_memory)
+
+
+pytestmark = pytest.mark.skipif(not is_shared_memory_available(),
+                                reason='requires python 3.8+')
+
+
+@pytest.fixture()
+def name(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+    open(filename, 'w').close()
+    return get_shared_memory_name(filename, 'train', 'boxes')
+
+
+def fill_arange(out):
+    out[:] = np.arange(out.size).reshape(out.shape)
+
+
+def fail_to_fill(out):
+    raise AssertionError('The block should already be filled.')
+
+
+def test_get_shared_memory_name(tmpdir):
+    filename = str(tmpdir.join('task.h5'))
+    open(filename, 'w').close()
+
+    name = get_shared_memory_name(filename, 'train', 'boxes')
+
+    assert name.startswith('dbc_')
+    assert len(name) <= 30
+    assert name == get_shared_memory_name(filename, 'train', 'boxes')
+    assert name != get_shared_memory_name(filename, 'test', 'boxes')
+
+
+def test_shared_array_is_read_only(name):
+    shared_array = SharedArray(name, (5, 2), np.float32, fill_arange)
+
+    assert np.array_equal(shared_array.data, np.arange(10, dtype=np.float32).reshape(5, 2))
+    assert not shared_array.data.flags.writeable
+    shared_array.release()
+
+
+def test_shared_array_attaches_to_existing_block(name):
+    shared_array = SharedArray(name, (5, 2), np.int32, fill_arange)
+    other = SharedArray(name, (5, 2), np.int32, fail_to_fill)
+
+    assert np.array_equal(other.data, shared_array.data)
+    assert other.refcount() == 2
+    shared_array.release()
+    other.release()
+
+
+def test_shared_array_is_removed_with_the_last_reference(name):
+    shared_array = SharedArray(name, (4,), np.int64, fill_arange)
+    other = SharedArray(name, (4,), np.int64, fail_to_fill)
+
+    shared_array.release()
+    assert shared_array.is_released()
+    assert other.refcount() == 1
+    assert np.array_equal(other.data, [0, 1, 2, 3])
+    other.release()
+
+    new = SharedArray(name, (4,), np.int64, lambda out: out.fill(7))
+    assert new.data.tolist() == [7, 7, 7, 7]
+    new.release()
+
+
+def test_shared_array_is_removed_if_filling_fails(name):
+    with pytest.raises(AssertionError):
+        SharedArray(name, (4,), np.int64, fail_to_fill)
+
+    shared_array = SharedArray(name, (4,), np.int64, fill_arange)
+    assert shared_array.data.tolist() == [0, 1, 2, 3]
+    shared_array.release()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork()')
+def test_shared_array_release_in_forked_process_keeps_reference(name):
+    shared_array = SharedArray(name, (4,), np.int64, fill_arange)
+
+    pid = os.fork()
+    if pid == 0:
+        shared_array.release()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert shared_array.refcount() == 1
+    assert shared_array.data.tolist() == [0, 1, 2, 3]
+    shared_array.release()
+
+
+def get_lock_files():
+    return [filename for filename in os.listdir(tempfile.gettempdir())
+            if filename.startswith('dbc_') and filename.endswith('.lock')]
+
+
+def test_shared_array_lock_file_is_removed_with_the_block(name):
+    lock_files = get_lock_files()
+    shared_array = SharedArray(name, (4,), np.int64, fill_arange)
+    other = SharedArray(name, (4,), np.int64, fail_to_fill)
+
+    other.release()
+    assert name + '.lock' in get_lock_files()
+    shared_array.release()
+
+    assert sorted(get_lock_files()) == sorted(lock_files)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork()')
+def test_shared_array_reclaims_references_of_dead_processes(name):
+    pid = os.fork()
+    if pid == 0:
+        shared_array = SharedArray(name, (4,), np.int64, fill_arange)
+        os._exit(0)  # exits without releasing the reference
+    os.waitpid(pid, 0)
+
+    shared_array = SharedArray(name, (4,), np.int64, fail_to_fill)
+
+    assert shared_array.refcount() == 1
+    assert shared_array.data.tolist() == [0, 1, 2, 3]
+    shared_array.release()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -10,7 +10,8 @@ from dbcollection.utils.string_ascii import (
     str_to_ascii,
     ascii_to_str,
     convert_str_to_ascii,
-    convert_ascii_to_str
+    convert_ascii_to_str,
+    convert_ascii_rows_to_str
 )
 
 
@@ -74,3 +75,14 @@ def test_convert_ascii_to_str_multiple_strings(sample, output):
 def test_convert_ascii_to_str__raises_error__empty_input():
     with pytest.raises(AssertionError):
         convert_ascii_to_str([])
+
+
+@pytest.mark.parametrize("sample, output", testdata_multiple_strings)
+def test_convert_ascii_rows_to_str(sample, output):
+    assert convert_ascii_rows_to_str(np.array(output, dtype=np.uint8)) == sample
+
+
+def test_convert_ascii_rows_to_str_matches_convert_ascii_to_str():
+    data = np.array([[0, 97, 0, 98], [99, 0, 0, 0], [0, 0, 0, 0]], dtype=np.uint8)
+
+    assert convert_ascii_rows_to_str(data) == convert_ascii_to_str(data)